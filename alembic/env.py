@@ -0,0 +1,69 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Alembic migration environment."""
+
+from logging.config import fileConfig
+
+import sqlalchemy as sa
+from alembic import context
+
+from src.boilerplate.config import config as app_config
+from src.boilerplate.db.pool import get_dsn
+from src.boilerplate.db.tables import metadata
+
+alembic_config = context.config
+
+if alembic_config.config_file_name is not None:
+    fileConfig(alembic_config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = metadata
+
+
+def run_migrations_offline() -> None:
+    """Run migrations in 'offline' mode, i.e. emit SQL to the script output."""
+    context.configure(
+        url=get_dsn(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={'paramstyle': 'named'},
+        include_schemas=True,
+        version_table_schema=app_config.DB_SCHEMA,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode, i.e. against a database connection."""
+    engine = sa.create_engine(get_dsn(), poolclass=sa.pool.NullPool)
+
+    with engine.connect() as connection:
+        connection.execute(sa.text('CREATE SCHEMA IF NOT EXISTS {schema}'.format(schema=app_config.DB_SCHEMA)))
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_schemas=True,
+            version_table_schema=app_config.DB_SCHEMA,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
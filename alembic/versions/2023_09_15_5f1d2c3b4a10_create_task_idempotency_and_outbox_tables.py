@@ -0,0 +1,157 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Create task, idempotency and outbox tables.
+
+Revision ID: 5f1d2c3b4a10
+Revises:
+Create Date: 2023-09-15 11:23:04.055239
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+from src.boilerplate.config import config
+
+# Revision identifiers, used by Alembic.
+revision = '5f1d2c3b4a10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+schema = config.DB_SCHEMA
+
+
+def _created_datetime_column() -> sa.Column:  # type: ignore[type-arg]
+    return sa.Column('created_datetime', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now())
+
+
+def upgrade() -> None:
+    """Create the task, error, callback, idempotency key and outbox tables with their indexes."""
+    op.create_table(
+        'task',
+        sa.Column('task_id', sa.BigInteger, primary_key=True),
+        sa.Column('idempotency_key', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('callback_url', sa.Text, nullable=True),
+        sa.Column('status', sa.Text, nullable=False, server_default='pending'),
+        _created_datetime_column(),
+        sa.Column('updated_datetime', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        schema=schema,
+    )
+    op.create_index(
+        'ix_task_pending_created_datetime',
+        'task',
+        ['created_datetime'],
+        schema=schema,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.create_index(
+        'ix_task_created_datetime_brin',
+        'task',
+        ['created_datetime'],
+        schema=schema,
+        postgresql_using='brin',
+    )
+
+    op.create_table(
+        'task_error',
+        sa.Column('id', sa.BigInteger, sa.Identity(always=False), primary_key=True),
+        sa.Column('task_id', sa.BigInteger, nullable=True),
+        sa.Column('error_name', sa.Text, nullable=True),
+        sa.Column('error_message', postgresql.JSONB, nullable=True),
+        sa.Column('error_source', sa.Text, nullable=True),
+        _created_datetime_column(),
+        schema=schema,
+    )
+    op.create_index(
+        'ix_task_error_created_datetime_brin',
+        'task_error',
+        ['created_datetime'],
+        schema=schema,
+        postgresql_using='brin',
+    )
+
+    op.create_table(
+        'task_callback',
+        sa.Column('id', sa.BigInteger, sa.Identity(always=False), primary_key=True),
+        sa.Column('task_id', sa.BigInteger, nullable=False),
+        sa.Column('callback_url', sa.Text, nullable=True),
+        sa.Column('http_response_status_code', sa.Integer, nullable=True),
+        sa.Column('http_response_status_reason', sa.Text, nullable=True),
+        _created_datetime_column(),
+        schema=schema,
+    )
+    op.create_index(
+        'ix_task_callback_created_datetime_brin',
+        'task_callback',
+        ['created_datetime'],
+        schema=schema,
+        postgresql_using='brin',
+    )
+
+    op.create_table(
+        'idempotency_key',
+        sa.Column('id', sa.BigInteger, sa.Identity(always=False), primary_key=True),
+        sa.Column('idempotency_key', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('task_id', sa.BigInteger, nullable=True),
+        sa.Column('request_hash', sa.Text, nullable=True),
+        _created_datetime_column(),
+        sa.Column('expires_datetime', sa.DateTime(timezone=True), nullable=False),
+        schema=schema,
+    )
+    op.create_index(
+        'uq_idempotency_key_idempotency_key',
+        'idempotency_key',
+        ['idempotency_key'],
+        unique=True,
+        schema=schema,
+    )
+    op.create_index(
+        'ix_idempotency_key_expires_datetime',
+        'idempotency_key',
+        ['expires_datetime'],
+        schema=schema,
+    )
+
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.BigInteger, sa.Identity(always=False), primary_key=True),
+        sa.Column('topic', sa.Text, nullable=False),
+        sa.Column('message_key', sa.Text, nullable=True),
+        sa.Column('payload', postgresql.JSONB, nullable=False),
+        _created_datetime_column(),
+        sa.Column('sent_datetime', sa.DateTime(timezone=True), nullable=True),
+        schema=schema,
+    )
+    op.create_index(
+        'ix_outbox_unsent_id',
+        'outbox',
+        ['id'],
+        schema=schema,
+        postgresql_where=sa.text('sent_datetime IS NULL'),
+    )
+    op.create_index(
+        'ix_outbox_created_datetime_brin',
+        'outbox',
+        ['created_datetime'],
+        schema=schema,
+        postgresql_using='brin',
+    )
+
+
+def downgrade() -> None:
+    """Drop the tables, the dependent ones first."""
+    for table_name in ('outbox', 'idempotency_key', 'task_callback', 'task_error', 'task'):
+        op.drop_table(table_name, schema=schema)
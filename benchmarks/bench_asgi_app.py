@@ -0,0 +1,264 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""In-process load harness of the application.
+
+Drives the `app` object through the ASGI interface, without sockets, a server or a load
+generator, with `CONCURRENCY` concurrent requests, `REQUESTS_NUM` requests per round. For
+the whole app and for the app without each middleware and dependency, prints the round of
+`ROUNDS_NUM` with the least CPU time:
+
+* RPS (requests per second of wall time);
+* p50 / p95 / p99 latency per request (`time.perf_counter`); each request is a task, as in
+  the server, so the latency includes the waiting for the event loop;
+* CPU time per request (`time.process_time`) and how much of it the removed component costs.
+
+The requests are `GET` requests of the app config, the route with the bearer auth, the
+`Accept` check and the `ETag`, with `Accept-Encoding: gzip`. The route does not use the
+database, so the numbers are the costs of the framework and the middleware only.
+Sentry runs with the configured sampling; the events are dropped by the transport.
+
+Usage:
+    ```
+    python -m benchmarks.bench_asgi_app
+    ```
+"""
+
+import asyncio
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, NamedTuple, Optional
+
+import sentry_sdk
+from fastapi.routing import APIRoute
+from pydantic import SecretStr
+from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
+from starlette.types import Message
+
+from benchmarks.bench_sentry import NullTransport
+from src.boilerplate.app import app
+from src.boilerplate.compression import CompressionMiddleware
+from src.boilerplate.conditional_requests import ETagMiddleware
+from src.boilerplate.config import config
+from src.boilerplate.dependencies import is_media_type_application_json, is_request_has_correct_http_bearer_token
+from src.boilerplate.metrics import MetricsMiddleware
+from src.boilerplate.sentry import RequestBodyRecorderMiddleware, init_sentry
+
+CONCURRENCY = 100
+REQUESTS_NUM = 5000
+WARMUP_REQUESTS_NUM = 500
+ROUNDS_NUM = 5
+PATH = '/api/{version}/admin/app-config'.format(version=config.APP_API_VERSION)
+BEARER_TOKEN = 'benchmark-token'  # noqa: S105 - the token of the benchmark app only
+HEADERS = (
+    (b'authorization', 'Bearer {token}'.format(token=BEARER_TOKEN).encode()),
+    (b'accept', b'application/json'),
+    (b'accept-encoding', b'gzip'),
+)
+
+
+class Variant(NamedTuple):
+    """App setup of the benchmark: the middleware and the dependencies removed from the app."""
+
+    name: str
+    removed_middleware: tuple[type, ...] = ()
+    removed_dependencies: tuple[Any, ...] = ()
+
+
+class RoundStats(NamedTuple):
+    """Stats of a round of requests."""
+
+    rps: float
+    latency_percentiles: list[float]
+    cpu_seconds: float
+
+
+VARIANTS = (
+    Variant('whole app'),
+    Variant('without compression', removed_middleware=(CompressionMiddleware,)),
+    Variant('without ETag', removed_middleware=(ETagMiddleware,)),
+    Variant('without Sentry', removed_middleware=(SentryAsgiMiddleware, RequestBodyRecorderMiddleware)),
+    Variant('without metrics', removed_middleware=(MetricsMiddleware,)),
+    Variant('without bearer auth', removed_dependencies=(is_request_has_correct_http_bearer_token,)),
+    Variant('without Accept check', removed_dependencies=(is_media_type_application_json,)),
+    Variant(
+        'bare app',
+        removed_middleware=(
+            CompressionMiddleware,
+            ETagMiddleware,
+            SentryAsgiMiddleware,
+            RequestBodyRecorderMiddleware,
+            MetricsMiddleware,
+        ),
+        removed_dependencies=(is_request_has_correct_http_bearer_token, is_media_type_application_json),
+    ),
+)
+
+
+@contextmanager
+def app_variant(variant: Variant) -> Iterator[None]:
+    """Remove the middleware and the dependencies of the variant from the app, then restore them.
+
+    Starlette builds the middleware stack on the first call, so the stack is reset to be rebuilt.
+    The dependencies are removed from the dependency trees of the routes, rather than replaced
+    with `app.dependency_overrides`: FastAPI inspects an override on each request.
+
+    Args:
+        variant: the app setup of the benchmark.
+
+    Yields:
+        None, while the app is set up as the variant.
+    """
+    user_middleware = app.user_middleware
+    app.user_middleware = [
+        middleware for middleware in user_middleware if middleware.cls not in variant.removed_middleware
+    ]
+    app.middleware_stack = None
+    route_dependencies = {
+        route.dependant: route.dependant.dependencies for route in app.routes if isinstance(route, APIRoute)
+    }
+    for dependant, dependencies in route_dependencies.items():
+        dependant.dependencies = [
+            dependency for dependency in dependencies if dependency.call not in variant.removed_dependencies
+        ]
+    if SentryAsgiMiddleware in variant.removed_middleware:
+        sentry_sdk.Hub.current.bind_client(None)
+    else:
+        init_sentry()
+        sentry_sdk.Hub.current.client.transport = NullTransport()
+    try:
+        yield
+    finally:
+        app.user_middleware = user_middleware
+        app.middleware_stack = None
+        for dependant, dependencies in route_dependencies.items():  # noqa: WPS440
+            dependant.dependencies = dependencies
+        sentry_sdk.Hub.current.bind_client(None)
+
+
+async def call_app() -> None:
+    """Send a request to the app and check that the response is successful.
+
+    Raises:
+        RuntimeError: If the status code of the response is not `200`.
+    """
+    response_starts: list[Message] = []
+    request_messages: list[Message] = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    client_disconnected = asyncio.Event()
+
+    async def receive() -> Message:  # noqa: WPS430
+        if request_messages:
+            return request_messages.pop()
+        # The client stays connected until the whole response is sent.
+        await client_disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message: Message) -> None:  # noqa: WPS430
+        if message['type'] == 'http.response.start':
+            response_starts.append(message)
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'scheme': 'http',
+        'server': ('127.0.0.1', 50000),
+        'client': ('127.0.0.1', 40000),
+        'method': 'GET',
+        'root_path': '',
+        'path': PATH,
+        'raw_path': PATH.encode(),
+        'query_string': b'',
+        'headers': list(HEADERS),
+    }
+    await app(scope, receive, send)
+    client_disconnected.set()
+    status_code = response_starts[0]['status'] if response_starts else None
+    if status_code != 200:
+        raise RuntimeError('Unexpected status code: {code}.'.format(code=status_code))
+
+
+async def run_round(requests_num: int) -> RoundStats:
+    """Send the requests with `CONCURRENCY` concurrent clients.
+
+    A response that is not successful fails the round with `RuntimeError`.
+
+    Args:
+        requests_num: the number of requests of the round.
+
+    Returns:
+        The stats of the round.
+    """
+    latencies = []
+    # The clients take the requests from the shared iterator.
+    requests = iter(range(requests_num))
+
+    async def run_client() -> None:  # noqa: WPS430
+        for _ in requests:
+            started = time.perf_counter()
+            # A task per request, as in the server: the request waits for the event loop.
+            await asyncio.create_task(call_app())
+            latencies.append(time.perf_counter() - started)
+
+    round_started, cpu_started = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(run_client() for _ in range(CONCURRENCY)))
+    return RoundStats(
+        rps=requests_num / (time.perf_counter() - round_started),
+        cpu_seconds=(time.process_time() - cpu_started) / requests_num,
+        latency_percentiles=statistics.quantiles(latencies, n=100),
+    )
+
+
+async def bench(variant: Variant, whole_app_stats: Optional[RoundStats]) -> RoundStats:
+    """Send the requests to the variant of the app and print the stats of the best round."""
+    with app_variant(variant):
+        await run_round(WARMUP_REQUESTS_NUM)
+        rounds_stats = [await run_round(REQUESTS_NUM) for _ in range(ROUNDS_NUM)]
+    round_stats = min(
+        rounds_stats,
+        key=lambda stats: stats.cpu_seconds,
+    )
+
+    cost = '' if whole_app_stats is None else '{cost:+9.1f} us'.format(
+        cost=(whole_app_stats.cpu_seconds - round_stats.cpu_seconds) * 10**6,
+    )
+    print('{name:<22} {rps:8.0f} {p50:8.2f} {p95:8.2f} {p99:8.2f} {cpu:10.1f} {cost:>12}'.format(
+        name=variant.name,
+        rps=round_stats.rps,
+        p50=round_stats.latency_percentiles[49] * 1000,
+        p95=round_stats.latency_percentiles[94] * 1000,
+        p99=round_stats.latency_percentiles[98] * 1000,
+        cpu=round_stats.cpu_seconds * 10**6,
+        cost=cost,
+    ))
+    return round_stats
+
+
+async def main() -> None:
+    """Run the benchmark and print the stats of each variant."""
+    config.APP_API_ACCESS_HTTP_BEARER_TOKEN = SecretStr(BEARER_TOKEN)
+    print('GET {path}, {concurrency} concurrent clients, {requests} requests per round.'.format(
+        path=PATH, concurrency=CONCURRENCY, requests=REQUESTS_NUM,
+    ))
+    print('{name:<22} {rps:>8} {p50:>8} {p95:>8} {p99:>8} {cpu:>10} {cost:>12}'.format(
+        name='Variant', rps='RPS', p50='p50 ms', p95='p95 ms', p99='p99 ms', cpu='CPU us/req', cost='Cost',
+    ))
+    whole_app_stats = await bench(VARIANTS[0], whole_app_stats=None)
+    for variant in VARIANTS[1:]:
+        await bench(variant, whole_app_stats=whole_app_stats)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
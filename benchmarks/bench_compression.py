@@ -0,0 +1,106 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Benchmark of the response compression middleware.
+
+Sends JSON responses of several sizes through `CompressionMiddleware` with each available
+encoding and without compression, and prints:
+* CPU time per request (`time.process_time`), which is what compression costs the worker;
+* p50 / p99 latency per request (`time.perf_counter`);
+* the compression ratio.
+
+The ASGI app is called directly, so the numbers do not include the network or the server.
+
+Usage:
+    ```
+    python -m benchmarks.bench_compression
+    ```
+"""
+
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Any
+
+from starlette.responses import Response
+from starlette.types import Message
+
+from src.boilerplate.compression import CompressionMiddleware, get_available_compressors
+from src.boilerplate.responses import ORJSONResponse
+
+PAYLOAD_ITEMS_NUMS = (10, 1_000, 10_000)
+REQUESTS_NUM = 200
+
+
+def _get_payload(items_num: int) -> dict[str, Any]:
+    return {
+        'items': [
+            {'task_id': item_idx, 'idempotency_key': str(uuid.uuid4()), 'status': 'pending', 'is_error': False}
+            for item_idx in range(items_num)
+        ],
+    }
+
+
+async def _call(middleware: CompressionMiddleware, accept_encoding: str) -> int:
+    body_size = 0
+
+    async def receive() -> Message:  # noqa: WPS430
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: Message) -> None:  # noqa: WPS430
+        nonlocal body_size
+        body_size += len(message.get('body', b''))
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': [(b'accept-encoding', accept_encoding.encode())]}
+    await middleware(scope, receive, send)
+    return body_size
+
+
+async def _bench(body: bytes, encoding: str) -> None:
+    async def app(scope: Any, receive: Any, send: Any) -> None:  # noqa: WPS430
+        # The middleware edits the headers of the start message, so each request gets its own response.
+        await Response(body, media_type='application/json')(scope, receive, send)
+
+    middleware = CompressionMiddleware(app)
+    latencies = []
+    cpu_started = time.process_time()
+    for _ in range(REQUESTS_NUM):
+        started = time.perf_counter()
+        body_size = await _call(middleware, accept_encoding=encoding)
+        latencies.append(time.perf_counter() - started)
+    cpu_seconds = (time.process_time() - cpu_started) / REQUESTS_NUM
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    print('  {encoding:<10} {cpu:9.3f} ms CPU/request {p50:9.3f} ms p50 {p99:9.3f} ms p99 {ratio:6.1f}x'.format(
+        encoding=encoding,
+        cpu=cpu_seconds * 1000,
+        p50=percentiles[49] * 1000,
+        p99=percentiles[98] * 1000,
+        ratio=len(body) / body_size,
+    ))
+
+
+async def main() -> None:
+    """Run the benchmark and print the cost of each encoding."""
+    encodings = ['identity', *get_available_compressors()]
+    for items_num in PAYLOAD_ITEMS_NUMS:
+        body = ORJSONResponse(content=_get_payload(items_num)).body
+        print('Payload: {items} items, {size:.1f} KB of JSON.'.format(items=items_num, size=len(body) / 1024))
+        for encoding in encodings:
+            await _bench(body, encoding=encoding)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Benchmark of `BulkWriter` against row-by-row `INSERT` statements.
+
+Requires a reachable PostgreSQL configured with the `DB_*` settings. The benchmark uses a
+temporary table, so it does not need the application schema.
+
+Usage:
+    ```
+    python -m benchmarks.bench_db_bulk_writer
+    ```
+"""
+
+import asyncio
+from time import perf_counter
+
+import asyncpg
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.boilerplate.db.bulk_writer import BulkWriter
+from src.boilerplate.db.pool import get_dsn
+from src.boilerplate.schemas.common_schemas import ErrorSchema
+
+ROWS_NUM = 100_000
+BATCH_SIZE = 5_000
+
+_bench_table = sa.Table(
+    'bench_task_error',
+    sa.MetaData(),
+    sa.Column('task_id', sa.BigInteger),
+    sa.Column('error_name', sa.Text),
+    sa.Column('error_message', JSONB),
+    sa.Column('error_source', sa.Text),
+)
+_columns = ('task_id', 'error_name', 'error_message', 'error_source')
+
+
+def _get_records() -> list[ErrorSchema]:
+    return [
+        ErrorSchema(error_name='TimeoutError', error_message={'detail': 'Read timeout.'}, error_source='bench')
+        for _ in range(ROWS_NUM)
+    ]
+
+
+async def _bench_row_by_row_insert(connection: asyncpg.Connection, records: list[ErrorSchema]) -> float:
+    start_time = perf_counter()
+    async with connection.transaction():
+        for task_id, record in enumerate(records):
+            await connection.execute(
+                'INSERT INTO bench_task_error (task_id, error_name, error_message, error_source) '
+                'VALUES ($1, $2, $3, $4)',
+                task_id,
+                record.error_name,
+                '{"detail": "Read timeout."}',
+                record.error_source,
+            )
+    return perf_counter() - start_time
+
+
+async def _bench_bulk_writer(pool: asyncpg.Pool, records: list[ErrorSchema]) -> float:
+    writer = BulkWriter(table=_bench_table, columns=_columns, max_batch_size=BATCH_SIZE, pool=pool)
+    start_time = perf_counter()
+    for task_id, record in enumerate(records):
+        await writer.add(record, task_id=task_id)
+    await writer.flush()
+    return perf_counter() - start_time
+
+
+async def main() -> None:
+    """Run the benchmark and print the throughput of both approaches."""
+    records = _get_records()
+    # A single connection, so that the temporary table is visible to both approaches.
+    pool = await asyncpg.create_pool(dsn=get_dsn(), min_size=1, max_size=1)
+    try:
+        async with pool.acquire() as connection:
+            await connection.execute(
+                'CREATE TEMPORARY TABLE bench_task_error ' +
+                '(task_id bigint, error_name text, error_message jsonb, error_source text)',
+            )
+            insert_seconds = await _bench_row_by_row_insert(connection=connection, records=records)
+            await connection.execute('TRUNCATE bench_task_error')
+        copy_seconds = await _bench_bulk_writer(pool=pool, records=records)
+    finally:
+        await pool.close()
+
+    print('Rows: {rows}; COPY batch size: {batch}.'.format(rows=ROWS_NUM, batch=BATCH_SIZE))
+    print('Row-by-row INSERT: {rps:,.0f} rows/s.'.format(rps=ROWS_NUM / insert_seconds))
+    print('BulkWriter (binary COPY): {rps:,.0f} rows/s.'.format(rps=ROWS_NUM / copy_seconds))
+    print('Speedup: x{speedup:.1f}.'.format(speedup=insert_seconds / copy_seconds))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
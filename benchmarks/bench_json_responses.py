@@ -0,0 +1,89 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Benchmark of the JSON response serialization.
+
+Compares the stdlib-based `JSONResponse` with the application-wide `ORJSONResponse` on a
+large nested payload.
+
+Usage:
+    ```
+    python -m benchmarks.bench_json_responses
+    ```
+"""
+
+import timeit
+import uuid
+from datetime import datetime, timezone
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.boilerplate.responses import ORJSONResponse
+
+ITEMS_NUM = 10_000
+REPEATS = 5
+NUMBER = 10
+
+
+def _get_payload() -> dict[str, Any]:
+    return {
+        'items': [
+            {
+                'task_id': item_idx,
+                'idempotency_key': str(uuid.uuid4()),
+                'created_datetime': datetime.now(tz=timezone.utc).isoformat(),
+                'scores': [item_idx * 0.1, item_idx * 0.2, item_idx * 0.3],
+                'error': {'error_name': None, 'error_message': {'detail': 'ok', 'codes': [1, 2, 3]}},
+            }
+            for item_idx in range(ITEMS_NUM)
+        ],
+    }
+
+
+def _bench(name: str, render: Any, payload: dict[str, Any]) -> None:
+    body_size = len(render(payload))
+    best_seconds = min(timeit.repeat(lambda: render(payload), repeat=REPEATS, number=NUMBER)) / NUMBER
+    print('{name:<40} {ms:8.2f} ms/response {mbps:8.1f} MB/s'.format(
+        name=name,
+        ms=best_seconds * 1000,
+        mbps=body_size / best_seconds / 1024 / 1024,
+    ))
+
+
+def main() -> None:
+    """Run the benchmark and print the serialization throughput."""
+    payload = _get_payload()
+    print('Payload: {items} nested items, {size:.1f} MB of JSON.'.format(
+        items=ITEMS_NUM,
+        size=len(ORJSONResponse(content=payload).body) / 1024 / 1024,
+    ))
+
+    _bench('JSONResponse (stdlib json)', lambda content: JSONResponse(content=content).body, payload)
+    _bench('ORJSONResponse', lambda content: ORJSONResponse(content=content).body, payload)
+    _bench(
+        'jsonable_encoder + JSONResponse',
+        lambda content: JSONResponse(content=jsonable_encoder(content)).body,
+        payload,
+    )
+    _bench(
+        'jsonable_encoder + ORJSONResponse',
+        lambda content: ORJSONResponse(content=jsonable_encoder(content)).body,
+        payload,
+    )
+
+
+if __name__ == '__main__':
+    main()
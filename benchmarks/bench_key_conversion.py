@@ -0,0 +1,138 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Throughput benchmark of the snake_case <-> camelCase key conversion.
+
+Compares the memoized converters with the uncached ones, for single keys and for a
+payload of 10k records with nested lists of dictionaries.
+
+Usage:
+    ```
+    python -m benchmarks.bench_key_conversion
+    ```
+"""
+
+import timeit
+from typing import Any, Callable
+
+from src.boilerplate.pydantic_helpers import (
+    convert_keys_camel_to_snake,
+    convert_keys_snake_to_camel,
+    convert_str_camel_to_snake,
+    convert_str_snake_to_camel,
+)
+
+RECORDS_NUMBER = 10_000
+REPEATS = 5
+
+_SNAKE_KEYS = (
+    'idempotency_key',
+    'task_id',
+    'callback_url',
+    'created_datetime',
+    'updated_datetime',
+    'error_type',
+    'error_message',
+    'http_status_code',
+    'retry_count',
+    'is_final_attempt',
+)
+
+
+def _get_payload(convert_key: Callable[[str], str]) -> list[dict[str, Any]]:
+    keys = [convert_key(snake_key) for snake_key in _SNAKE_KEYS]
+    return [
+        {**{key: record_index for key in keys}, convert_key('task_errors'): [{keys[5]: 'x', keys[6]: 'y'}]}
+        for record_index in range(RECORDS_NUMBER)
+    ]
+
+
+def _convert_keys_uncached(payload: Any, convert_key: Callable[[str], str]) -> Any:
+    # The straightforward recursive transform without memoization, as a baseline.
+    if isinstance(payload, dict):
+        return {convert_key(key): _convert_keys_uncached(child, convert_key) for key, child in payload.items()}
+    elif isinstance(payload, list):
+        return [_convert_keys_uncached(child, convert_key) for child in payload]
+    return payload
+
+
+def _bench(name: str, bench_func: Callable[[], Any], number: int, items_number: int) -> None:
+    best_seconds = min(timeit.repeat(bench_func, repeat=REPEATS, number=number)) / number
+    print('{name:<44} {rate:14,.0f} keys/s'.format(name=name, rate=items_number / best_seconds))
+
+
+def main() -> None:
+    """Run the benchmark and print the throughput."""
+    uncached_snake_to_camel = convert_str_snake_to_camel.__wrapped__
+    uncached_camel_to_snake = convert_str_camel_to_snake.__wrapped__
+    camel_keys = [convert_str_snake_to_camel(snake_key) for snake_key in _SNAKE_KEYS]
+    snake_payload = _get_payload(convert_key=str)
+    camel_payload = _get_payload(convert_key=convert_str_snake_to_camel)
+    payload_keys_number = RECORDS_NUMBER * (len(_SNAKE_KEYS) + 3)
+
+    print('Single keys:')
+    _bench(
+        'snake -> camel, uncached',
+        lambda: [uncached_snake_to_camel(snake_key) for snake_key in _SNAKE_KEYS],
+        10_000,
+        len(_SNAKE_KEYS),
+    )
+    _bench(
+        'snake -> camel, memoized',
+        lambda: [convert_str_snake_to_camel(snake_key) for snake_key in _SNAKE_KEYS],
+        10_000,
+        len(_SNAKE_KEYS),
+    )
+    _bench(
+        'camel -> snake, uncached',
+        lambda: [uncached_camel_to_snake(camel_key) for camel_key in camel_keys],
+        10_000,
+        len(_SNAKE_KEYS),
+    )
+    _bench(
+        'camel -> snake, memoized',
+        lambda: [convert_str_camel_to_snake(camel_key) for camel_key in camel_keys],
+        10_000,
+        len(_SNAKE_KEYS),
+    )
+
+    print('Payload of {records} records ({keys} keys):'.format(records=RECORDS_NUMBER, keys=payload_keys_number))
+    _bench(
+        'snake -> camel, recursive uncached',
+        lambda: _convert_keys_uncached(snake_payload, uncached_snake_to_camel),
+        3,
+        payload_keys_number,
+    )
+    _bench(
+        'snake -> camel, convert_keys_snake_to_camel',
+        lambda: convert_keys_snake_to_camel(snake_payload),
+        3,
+        payload_keys_number,
+    )
+    _bench(
+        'camel -> snake, recursive uncached',
+        lambda: _convert_keys_uncached(camel_payload, uncached_camel_to_snake),
+        3,
+        payload_keys_number,
+    )
+    _bench(
+        'camel -> snake, convert_keys_camel_to_snake',
+        lambda: convert_keys_camel_to_snake(camel_payload),
+        3,
+        payload_keys_number,
+    )
+
+
+if __name__ == '__main__':
+    main()
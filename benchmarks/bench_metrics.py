@@ -0,0 +1,78 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Benchmark of the overhead of the metrics middleware.
+
+Calls a minimal ASGI app directly, with and without `MetricsMiddleware`, and prints the
+time per request and the difference, which is the cost of the middleware.
+
+Usage:
+    ```
+    python -m benchmarks.bench_metrics
+    ```
+"""
+
+import asyncio
+import time
+from typing import Any
+
+from starlette.types import Message
+
+from src.boilerplate.metrics import MetricsMiddleware
+
+REQUESTS_NUM = 100_000
+REPEATS_NUM = 5
+
+
+async def _endpoint() -> None:
+    """Endpoint that the app reports as matched."""
+
+
+async def _app(scope: Any, receive: Any, send: Any) -> None:
+    scope['endpoint'] = _endpoint
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b'{"status": "pending"}'})
+
+
+async def _receive() -> Message:
+    return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+
+async def _send(message: Message) -> None:
+    """Drop the message."""
+
+
+async def _get_request_time_ns(app: Any) -> float:
+    best_time = float('inf')
+    for _ in range(REPEATS_NUM):
+        started = time.perf_counter_ns()
+        for _ in range(REQUESTS_NUM):  # noqa: WPS440
+            await app({'type': 'http', 'method': 'GET', 'path': '/', 'app': None}, _receive, _send)
+        best_time = min(best_time, (time.perf_counter_ns() - started) / REQUESTS_NUM)
+    return best_time
+
+
+async def main() -> None:
+    """Run the benchmark and print the overhead of the middleware."""
+    bare_time = await _get_request_time_ns(_app)
+    measured_time = await _get_request_time_ns(MetricsMiddleware(_app))
+    print('Without middleware: {bare:.0f} ns/request; with middleware: {measured:.0f} ns/request.'.format(
+        bare=bare_time,
+        measured=measured_time,
+    ))
+    print('Overhead: {overhead:.2f} us/request.'.format(overhead=(measured_time - bare_time) / 1000))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
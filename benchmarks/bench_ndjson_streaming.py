@@ -0,0 +1,164 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Memory benchmark of the NDJSON streaming endpoints.
+
+Sends a 1 GB NDJSON body of `MetadataMan` lines through an ASGI app in 64 KB chunks, as
+an ASGI server would, and samples the RSS of the process while the body is processed. The
+streaming endpoint is compared with an endpoint that buffers the whole body and validates
+it as a list; the buffered one gets a smaller body, since its memory grows with the body.
+
+Usage:
+    ```
+    python -m benchmarks.bench_ndjson_streaming
+    ```
+"""
+
+import asyncio
+import resource
+import uuid
+from time import perf_counter
+from typing import Any, Callable
+
+import orjson
+from fastapi import FastAPI, Request
+
+from src.boilerplate.responses import NDJSONResponse, ORJSONResponse
+from src.boilerplate.schemas.common_schemas import MetadataMan
+from src.boilerplate.streaming import stream_ndjson
+from src.boilerplate.validation_registry import validate_json
+
+STREAMED_BODY_SIZE_BYTES = 1024 ** 3
+BUFFERED_BODY_SIZE_BYTES = 128 * 1024 ** 2
+CHUNK_SIZE_BYTES = 64 * 1024
+RSS_SAMPLES_NUMBER = 8
+
+_bench_app = FastAPI()
+
+
+async def _accept_task(metadata: MetadataMan) -> dict[str, Any]:
+    return {'task_id': metadata.task_id}
+
+
+@_bench_app.post('/streamed')
+async def _streamed(request: Request) -> NDJSONResponse:
+    return NDJSONResponse(stream_ndjson(byte_chunks=request.stream(), schema=MetadataMan, process=_accept_task))
+
+
+@_bench_app.post('/buffered')
+async def _buffered(request: Request) -> ORJSONResponse:
+    body = await request.body()
+    metadata_lines = [validate_json(MetadataMan, line) for line in body.splitlines()]
+    return ORJSONResponse([{'task_id': metadata.task_id} for metadata in metadata_lines])
+
+
+def _get_rss_mb() -> float:
+    with open('/proc/self/status') as status_file:
+        for status_line in status_file:
+            if status_line.startswith('VmRSS:'):
+                return int(status_line.split()[1]) / 1024
+    return 0
+
+
+def _get_peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _get_chunk() -> bytes:
+    # Lines with distinct keys, repeated to fill a chunk: the content does not affect memory.
+    lines = []
+    chunk_size = 0
+    task_id = 1
+    while chunk_size < CHUNK_SIZE_BYTES:
+        line = orjson.dumps(
+            {'idempotency_key': str(uuid.uuid4()), 'task_id': task_id, 'callback_url': 'http://127.0.0.1/callback'},
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+        lines.append(line)
+        chunk_size += len(line)
+        task_id += 1
+    return b''.join(lines)
+
+
+async def _send_request(path: str, body_size: int, on_progress: Callable[[float], None]) -> int:
+    chunk = _get_chunk()
+    chunks_number = body_size // len(chunk)
+    sample_every_chunks = max(chunks_number // RSS_SAMPLES_NUMBER, 1)
+    sent_chunks = 0
+    response_size = 0
+
+    async def receive() -> dict[str, Any]:  # noqa: WPS430
+        nonlocal sent_chunks
+        sent_chunks += 1
+        if sent_chunks % sample_every_chunks == 0:
+            on_progress(sent_chunks / chunks_number)
+        # A new object per message, as an ASGI server allocates one per read from the socket.
+        return {'type': 'http.request', 'body': bytes(memoryview(chunk)), 'more_body': sent_chunks < chunks_number}
+
+    async def send(message: dict[str, Any]) -> None:  # noqa: WPS430
+        nonlocal response_size
+        response_size += len(message.get('body', b''))
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'POST',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'content-type', b'application/x-ndjson')],
+        'server': ('127.0.0.1', 8000),
+        'client': ('127.0.0.1', 50000),
+    }
+    await _bench_app(scope, receive, send)
+    return response_size
+
+
+async def _bench(path: str, body_size: int) -> None:
+    start_rss_mb = _get_rss_mb()
+    rss_samples_mb = []
+
+    def on_progress(progress: float) -> None:  # noqa: WPS430
+        rss_samples_mb.append('{progress:4.0%}: {rss:7.1f} MB'.format(progress=progress, rss=_get_rss_mb()))
+
+    start_time = perf_counter()
+    response_size = await _send_request(path=path, body_size=body_size, on_progress=on_progress)
+    elapsed_seconds = perf_counter() - start_time
+
+    print(
+        '{path}: body {body_mb:.0f} MB, response {response_mb:.0f} MB in {seconds:.1f} s, '
+        'RSS before {rss:.1f} MB, after {rss_after:.1f} MB, process peak {peak_rss:.1f} MB'.format(
+            path=path,
+            body_mb=body_size / 1024 ** 2,
+            response_mb=response_size / 1024 ** 2,
+            seconds=elapsed_seconds,
+            rss=start_rss_mb,
+            rss_after=_get_rss_mb(),
+            peak_rss=_get_peak_rss_mb(),
+        ),
+    )
+    print('  RSS while reading the body: {samples}'.format(samples=', '.join(rss_samples_mb)))
+
+
+async def main() -> None:
+    """Run the benchmark and print the RSS samples."""
+    await _bench(path='/streamed', body_size=STREAMED_BODY_SIZE_BYTES)
+    await _bench(path='/buffered', body_size=BUFFERED_BODY_SIZE_BYTES)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
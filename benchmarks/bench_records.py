@@ -0,0 +1,93 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Memory and allocation benchmark of the internal records against the Pydantic models.
+
+Builds 1M instances of each representation and reports the memory held by them (traced
+with `tracemalloc`), the number of allocated memory blocks and the build time (measured in
+a separate build without tracing). The field values are created once and shared, so only
+the per-instance overhead is measured.
+
+Usage:
+    ```
+    python -m benchmarks.bench_records
+    ```
+"""
+
+import gc
+import sys
+import tracemalloc
+import uuid
+from time import perf_counter
+from typing import Any, Callable
+
+from src.boilerplate.schemas.common_schemas import ErrorSchema, HTTPResponseStatusCodeSchema, MetadataMan
+from src.boilerplate.schemas.records import ErrorRecord, HTTPResponseStatusCodeRecord, MetadataRecord
+
+RECORDS_NUMBER = 1_000_000
+
+
+def _measure(name: str, build_instance: Callable[[], Any]) -> None:
+    gc.collect()
+    start_time = perf_counter()
+    instances = [build_instance() for _ in range(RECORDS_NUMBER)]
+    elapsed_seconds = perf_counter() - start_time
+    del instances  # noqa: WPS420
+    gc.collect()
+
+    tracemalloc.start()
+    start_blocks = sys.getallocatedblocks()
+    instances = [build_instance() for _ in range(RECORDS_NUMBER)]
+    allocated_blocks = sys.getallocatedblocks() - start_blocks
+    traced_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('  {name:<52} {mb:8.1f} MB {blocks:12,d} blocks {seconds:7.2f} s'.format(
+        name=name,
+        mb=traced_bytes / 1024 ** 2,
+        blocks=allocated_blocks,
+        seconds=elapsed_seconds,
+    ))
+
+
+def main() -> None:
+    """Run the benchmark and print the memory, allocations and build time."""
+    metadata = MetadataMan(idempotency_key=uuid.uuid4(), task_id=1, callback_url='http://127.0.0.1/callback')
+    error = ErrorSchema(error_name='TimeoutError', error_message={'detail': 'Read timeout.'}, error_source='bench')
+    status_code = HTTPResponseStatusCodeSchema(http_response_status_code=504)
+    raw_metadata = metadata.model_dump()
+    raw_error = error.model_dump()
+    metadata_record = MetadataRecord.from_model(metadata)
+
+    print('{records:,d} instances:'.format(records=RECORDS_NUMBER))
+    _measure('MetadataMan.model_validate(dict)', lambda: MetadataMan.model_validate(raw_metadata))
+    _measure('MetadataMan.model_construct(**dict)', lambda: MetadataMan.model_construct(**raw_metadata))
+    _measure('dict', lambda: dict(raw_metadata))
+    _measure('MetadataRecord.from_model(model)', lambda: MetadataRecord.from_model(metadata))
+    _measure('MetadataRecord.to_model()', metadata_record.to_model)
+
+    _measure('ErrorSchema.model_construct(**dict)', lambda: ErrorSchema.model_construct(**raw_error))
+    _measure('ErrorRecord.from_model(model)', lambda: ErrorRecord.from_model(error))
+
+    _measure(
+        'HTTPResponseStatusCodeSchema(...)',
+        lambda: HTTPResponseStatusCodeSchema(http_response_status_code=504),
+    )
+    _measure(
+        'HTTPResponseStatusCodeRecord.from_model(model)',
+        lambda: HTTPResponseStatusCodeRecord.from_model(status_code),
+    )
+
+
+if __name__ == '__main__':
+    main()
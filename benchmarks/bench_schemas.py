@@ -0,0 +1,63 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Benchmark of the schema validation and serialization throughput.
+
+Usage:
+    ```
+    python -m benchmarks.bench_schemas
+    ```
+"""
+
+import timeit
+import uuid
+from typing import Any, Callable
+
+from src.boilerplate.schemas.common_schemas import ErrorSchema, MetadataOpt
+
+NUMBER = 100_000
+REPEATS = 3
+
+RAW_METADATA = {
+    'idempotency_key': str(uuid.uuid4()),
+    'task_id': 555,
+    'callback_url': 'http://127.0.0.1:50000/callback_url',
+}
+RAW_ERROR = {
+    'error_name': 'TimeoutError',
+    'error_message': {'detail': 'Read timeout.', 'attempt': 3},
+    'error_source': 'aiohttp',
+}
+
+
+def _bench(name: str, bench_func: Callable[[], Any]) -> None:
+    best_seconds = min(timeit.repeat(bench_func, repeat=REPEATS, number=NUMBER))
+    print('{name:<32} {ops:12,.0f} ops/s'.format(name=name, ops=NUMBER / best_seconds))
+
+
+def main() -> None:
+    """Run the benchmark and print the throughput."""
+    metadata = MetadataOpt.model_validate(RAW_METADATA)
+    error = ErrorSchema.model_validate(RAW_ERROR)
+
+    _bench('MetadataOpt validate', lambda: MetadataOpt.model_validate(RAW_METADATA))
+    _bench('MetadataOpt dump', metadata.model_dump)
+    _bench('MetadataOpt dump json', metadata.model_dump_json)
+    _bench('ErrorSchema validate', lambda: ErrorSchema.model_validate(RAW_ERROR))
+    _bench('ErrorSchema dump', error.model_dump)
+    _bench('ErrorSchema dump json', error.model_dump_json)
+
+
+if __name__ == '__main__':
+    main()
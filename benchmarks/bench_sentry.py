@@ -0,0 +1,194 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Benchmark of the Sentry tracing overhead per request.
+
+Sends requests through `SentryAsgiMiddleware` to a trivial ASGI app and prints the CPU time
+per request (`time.process_time`), the best of `ROUNDS_NUM` rounds, for each setup:
+* the app without the middleware;
+* Sentry is disabled;
+* the fixed rate of 0.1, as before the rule-based sampling;
+* `TracesSampler` for a route with a zero rate, e.g. `/static`;
+* `TracesSampler` with the rate of 0.1 decided when the transaction starts;
+* `TracesSampler` with the rate of 0.1 decided when the transaction finishes, so that errors
+  and slow requests are kept.
+
+Then sends JSON `POST` requests to a FastAPI endpoint with all transactions sampled and
+prints the CPU time per request of the event loop thread (`time.thread_time`), which is the
+request path, and of the whole process, which includes the background threads:
+* Sentry is disabled;
+* request bodies are read and parsed before the endpoint, events are built inline;
+* the same, with the debug logs of the SDK dropped before the records are built;
+* request bodies are recorded lazily and events are built in the background thread.
+
+The events are dropped by the transport, so the numbers do not include the network.
+
+Usage:
+    ```
+    python -m benchmarks.bench_sentry
+    ```
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Optional, Union
+
+import orjson
+import sentry_sdk
+from fastapi import FastAPI
+from sentry_sdk.envelope import Envelope
+from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
+from sentry_sdk.scope import add_global_event_processor
+from sentry_sdk.transport import Transport
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.boilerplate.config import config
+from src.boilerplate.sentry import RequestBodyRecorderMiddleware, TracesSampler, init_sentry
+
+REQUESTS_NUM = 2_000
+ROUNDS_NUM = 5
+SAMPLE_RATE = 0.1
+
+
+class NullTransport(Transport):
+    """Sentry transport dropping the events."""
+
+    def capture_event(self, event: dict[str, Any]) -> None:
+        """Drop the event."""
+
+    def capture_envelope(self, envelope: Envelope) -> None:
+        """Drop the envelope."""
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    """Respond with an empty body."""
+    await Response(b'{}', media_type='application/json')(scope, receive, send)
+
+
+def get_sampler(keep_errors_and_slow: bool) -> TracesSampler:
+    """Create the sampler of the benchmark."""
+    sampler = TracesSampler(
+        default_sample_rate=SAMPLE_RATE,
+        route_sample_rates={'/static': 0},
+        keep_errors_and_slow=keep_errors_and_slow,
+        slow_request_seconds=1.0,
+        max_per_second=None,
+    )
+    add_global_event_processor(sampler.process_event)
+    return sampler
+
+
+async def bench(
+    name: str,
+    path: str,
+    traces_sampler: Optional[Callable[[dict[str, Any]], Union[bool, float]]],
+    is_sentry_enabled: bool = True,
+    with_middleware: bool = True,
+) -> None:
+    """Send the requests and print the CPU time per request."""
+    if is_sentry_enabled:
+        sentry_sdk.init(transport=NullTransport(), traces_sampler=traces_sampler, default_integrations=False)
+    else:
+        sentry_sdk.Hub.current.bind_client(None)
+    middleware = SentryAsgiMiddleware(app) if with_middleware else app
+
+    async def receive() -> Message:  # noqa: WPS430
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: Message) -> None:  # noqa: WPS430
+        return None
+
+    rounds_cpu_seconds = []
+    for _ in range(ROUNDS_NUM):
+        cpu_started = time.process_time()
+        for _ in range(REQUESTS_NUM):  # noqa: WPS440
+            scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': [], 'query_string': b''}
+            await middleware(scope, receive, send)
+        rounds_cpu_seconds.append((time.process_time() - cpu_started) / REQUESTS_NUM)
+    cpu_seconds = min(rounds_cpu_seconds)
+    print('{name:<45} {cpu:8.1f} us CPU/request'.format(name=name, cpu=cpu_seconds * 10**6))
+
+
+def get_fastapi_app() -> ASGIApp:
+    """Create the app with a JSON endpoint and the Sentry middleware, as in `app.py`."""
+    fastapi_app = FastAPI()
+
+    @fastapi_app.post('/tasks')  # noqa: WPS430
+    async def create_task(task: dict[str, Any]) -> dict[str, Any]:
+        return task
+
+    return SentryAsgiMiddleware(RequestBodyRecorderMiddleware(fastapi_app))
+
+
+async def bench_fastapi(name: str, is_sentry_enabled: bool, is_deferred: bool) -> None:
+    """Send the JSON requests and print the CPU time per request."""
+    config.SENTRY_LAZY_REQUEST_BODIES = is_deferred
+    config.SENTRY_BACKGROUND_EVENTS = is_deferred
+    if is_sentry_enabled:
+        init_sentry()
+        sentry_sdk.Hub.current.client.transport = NullTransport()
+        sentry_sdk.Hub.current.client.options['traces_sampler'] = lambda sampling_context: 1.0
+    else:
+        sentry_sdk.Hub.current.bind_client(None)
+    asgi_app = get_fastapi_app()
+    body = orjson.dumps({'task_id': 1, 'items': [{'item_id': item_id, 'name': 'item'} for item_id in range(50)]})
+
+    async def receive() -> Message:  # noqa: WPS430
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message: Message) -> None:  # noqa: WPS430
+        return None
+
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    rounds_cpu_seconds = []
+    for _ in range(ROUNDS_NUM):
+        thread_started, process_started = time.thread_time(), time.process_time()
+        for _ in range(REQUESTS_NUM):  # noqa: WPS440
+            scope = {'type': 'http', 'method': 'POST', 'path': '/tasks', 'headers': headers, 'query_string': b''}
+            await asgi_app(scope, receive, send)
+        thread_cpu_seconds = time.thread_time() - thread_started
+        if is_sentry_enabled:
+            sentry_sdk.flush()
+        process_cpu_seconds = time.process_time() - process_started
+        rounds_cpu_seconds.append((thread_cpu_seconds / REQUESTS_NUM, process_cpu_seconds / REQUESTS_NUM))
+    thread_cpu_seconds, process_cpu_seconds = min(rounds_cpu_seconds)
+    print('{name:<45} {thread:8.1f} us request path {process:8.1f} us process CPU/request'.format(
+        name=name,
+        thread=thread_cpu_seconds * 10**6,
+        process=process_cpu_seconds * 10**6,
+    ))
+
+
+async def main() -> None:
+    """Run the benchmark and print the cost of each setup."""
+    # As in `init_sentry`: the debug logs of the SDK are dropped before the records are built.
+    logging.getLogger('sentry_sdk.errors').setLevel(logging.WARNING)
+    await bench('no middleware', '/api', traces_sampler=None, is_sentry_enabled=False, with_middleware=False)
+    await bench('Sentry disabled', '/api', traces_sampler=None, is_sentry_enabled=False)
+    await bench('fixed rate', '/api', traces_sampler=lambda sampling_context: SAMPLE_RATE)
+    await bench('TracesSampler, disabled route', '/static/a.png', traces_sampler=get_sampler(False))
+    await bench('TracesSampler, decided at start', '/api', traces_sampler=get_sampler(False))
+    await bench('TracesSampler, decided at finish', '/api', traces_sampler=get_sampler(True))
+
+    print('FastAPI JSON POST, all transactions sampled:')
+    await bench_fastapi('Sentry disabled', is_sentry_enabled=False, is_deferred=False)
+    await bench_fastapi('inline bodies and events', is_sentry_enabled=True, is_deferred=False)
+    await bench_fastapi('lazy bodies, background events', is_sentry_enabled=True, is_deferred=True)
+    sentry_sdk.Hub.current.bind_client(None)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Throughput benchmark of the task batch endpoint against one item per request.
+
+The requests go through the whole application in-process: the bearer token and `Accept`
+checks, the Sentry and GZip middleware and the response validation. The task storage is
+replaced with a stub that sleeps for the configured database latency.
+
+Usage:
+    ```
+    python -m benchmarks.bench_task_batch
+    ```
+"""
+
+import asyncio
+import uuid
+from time import perf_counter
+from typing import Any
+
+import httpx
+from pydantic import SecretStr
+
+from src.boilerplate.app import app
+from src.boilerplate.config import config
+from src.boilerplate.routers.task_controller import get_task_creator
+from src.boilerplate.schemas.common_schemas import MetadataMan, TaskStateSchema, TaskStatus
+
+ITEMS_NUMBER = 2_000
+BATCH_SIZE = 100
+CONCURRENT_CLIENTS = 8
+DB_LATENCIES_SECONDS = (0, 0.002)
+
+
+def _get_items() -> list[dict[str, Any]]:
+    return [
+        {'idempotency_key': str(uuid.uuid4()), 'task_id': task_id, 'callback_url': 'http://127.0.0.1/callback'}
+        for task_id in range(1, ITEMS_NUMBER + 1)
+    ]
+
+
+async def _post_batches(client: httpx.AsyncClient, batches: list[list[dict[str, Any]]]) -> None:
+    for batch_items in batches:
+        response = await client.post('/api/v1/tasks/batch', json={'items': batch_items})
+        response.raise_for_status()
+
+
+async def _bench(client: httpx.AsyncClient, name: str, batch_size: int, clients_number: int) -> None:
+    items = _get_items()
+    batches = [items[item_idx:item_idx + batch_size] for item_idx in range(0, len(items), batch_size)]
+    start_time = perf_counter()
+    await asyncio.gather(*(
+        _post_batches(client=client, batches=batches[client_idx::clients_number])
+        for client_idx in range(clients_number)
+    ))
+    elapsed_seconds = perf_counter() - start_time
+    print('  {name:<46} {rate:10,.0f} items/s'.format(name=name, rate=len(items) / elapsed_seconds))
+
+
+async def main() -> None:
+    """Run the benchmark and print the throughput."""
+    if config.APP_API_ACCESS_HTTP_BEARER_TOKEN is None:
+        config.APP_API_ACCESS_HTTP_BEARER_TOKEN = SecretStr('bench-token')
+    headers = {
+        'Authorization': 'Bearer {token}'.format(token=config.APP_API_ACCESS_HTTP_BEARER_TOKEN.get_secret_value()),
+        'Accept': 'application/json',
+        'Accept-Encoding': 'gzip',
+    }
+    await app.router.startup()  # adds the GZip and Sentry middleware
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', headers=headers) as client:
+        for db_latency_seconds in DB_LATENCIES_SECONDS:
+
+            async def create_task_stub(metadata: MetadataMan) -> TaskStateSchema:  # noqa: WPS430
+                await asyncio.sleep(db_latency_seconds)  # noqa: B023
+                return TaskStateSchema(task_id=metadata.task_id, status=TaskStatus.pending)
+
+            app.dependency_overrides[get_task_creator] = lambda: create_task_stub  # noqa: B023
+            print('{items} items, task creation latency {latency_ms:g} ms:'.format(
+                items=ITEMS_NUMBER,
+                latency_ms=db_latency_seconds * 1000,
+            ))
+            await _bench(client=client, name='1 item per request, 1 client', batch_size=1, clients_number=1)
+            await _bench(
+                client=client,
+                name='1 item per request, {clients} clients'.format(clients=CONCURRENT_CLIENTS),
+                batch_size=1,
+                clients_number=CONCURRENT_CLIENTS,
+            )
+            await _bench(
+                client=client,
+                name='{size} items per request, 1 client'.format(size=BATCH_SIZE),
+                batch_size=BATCH_SIZE,
+                clients_number=1,
+            )
+    await app.router.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
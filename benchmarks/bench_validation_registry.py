@@ -0,0 +1,89 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Benchmark of the request-body-to-model latency.
+
+Compares the ways to turn a raw JSON request body into `MetadataMan` models, for a single
+item and a batch of 10k items.
+
+Usage:
+    ```
+    python -m benchmarks.bench_validation_registry
+    ```
+"""
+
+import json
+import timeit
+import uuid
+from typing import Any, Callable
+
+import orjson
+from pydantic import TypeAdapter
+
+from src.boilerplate.schemas.common_schemas import MetadataMan
+from src.boilerplate.validation_registry import validate_json, validate_python
+
+BATCH_SIZE = 10_000
+REPEATS = 5
+
+
+def _get_raw_item(task_id: int) -> dict[str, Any]:
+    return {
+        'idempotency_key': str(uuid.uuid4()),
+        'task_id': task_id,
+        'callback_url': 'http://127.0.0.1:50000/callback_url',
+    }
+
+
+def _bench(name: str, bench_func: Callable[[], Any], number: int) -> None:
+    best_seconds = min(timeit.repeat(bench_func, repeat=REPEATS, number=number)) / number
+    print('{name:<52} {us:12.1f} µs'.format(name=name, us=best_seconds * 1_000_000))
+
+
+def main() -> None:
+    """Run the benchmark and print the latency per request body."""
+    single_body = orjson.dumps(_get_raw_item(task_id=1))
+    batch_body = orjson.dumps([_get_raw_item(task_id=task_id) for task_id in range(1, BATCH_SIZE + 1)])
+    batch_schema = list[MetadataMan]
+
+    print('Single item ({size} bytes):'.format(size=len(single_body)))
+    _bench(
+        'json.loads + MetadataMan.model_validate',
+        lambda: MetadataMan.model_validate(json.loads(single_body)),
+        20_000,
+    )
+    _bench('orjson.loads + validate_python', lambda: validate_python(MetadataMan, orjson.loads(single_body)), 20_000)
+    _bench('validate_json (cached TypeAdapter)', lambda: validate_json(MetadataMan, single_body), 20_000)
+    _bench(
+        'TypeAdapter built per call + validate_json',
+        lambda: TypeAdapter(MetadataMan).validate_json(single_body),
+        2_000,
+    )
+
+    print('Batch of {items} items ({size} bytes):'.format(items=BATCH_SIZE, size=len(batch_body)))
+    _bench(
+        'json.loads + MetadataMan.model_validate per item',
+        lambda: [MetadataMan.model_validate(raw_item) for raw_item in json.loads(batch_body)],
+        5,
+    )
+    _bench(
+        'orjson.loads + validate_python(list[...])',
+        lambda: validate_python(batch_schema, orjson.loads(batch_body)),
+        5,
+    )
+    _bench('validate_json(list[...]) (cached TypeAdapter)', lambda: validate_json(batch_schema, batch_body), 5)
+
+
+if __name__ == '__main__':
+    main()
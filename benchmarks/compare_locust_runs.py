@@ -0,0 +1,228 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Comparison of two Locust runs.
+
+Reads the JSON stats of two runs, saved with `--stats-json-file` of `locustfile.py` or with
+`locust --json-file` (see `package_scripts/run_load_test.sh`), and prints for each endpoint
+and for all of them:
+* p50 / p95 / p99 latency, calculated from the response time histograms;
+* RPS over the duration of the run.
+
+A latency percentile that grows by more than `--latency-threshold` percent and by at least
+`--min-latency-delta-ms`, or an RPS that drops by more than `--rps-threshold` percent, is
+flagged as a regression, and the script exits with the code 1. Endpoints with fewer than
+`--min-requests` requests in a run are printed, but not flagged: their percentiles are noise.
+Endpoints present in only one of the runs are listed, but not compared.
+
+Usage:
+    ```
+    python -m benchmarks.compare_locust_runs \
+        load_test_results/v1.2.0/stats.json load_test_results/v1.3.0/stats.json
+    ```
+"""
+
+import argparse
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+import orjson
+
+PERCENTILES = (0.5, 0.95, 0.99)
+AGGREGATED_NAME = 'Aggregated'
+
+
+class RunStats(NamedTuple):
+    """Stats of an endpoint, or of all of them, in a run."""
+
+    num_requests: int
+    num_failures: int
+    latency_ms: dict[float, int]
+    rps: float
+
+
+def get_percentile(response_times: Counter[int], num_requests: int, percentile: float) -> int:
+    """Get the smallest response time that the `percentile` share of the requests does not exceed.
+
+    Args:
+        response_times: histogram of the response times: rounded response time in ms -> number of requests.
+        num_requests: number of requests in the histogram.
+        percentile: percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        Response time in ms, 0 for an empty histogram.
+    """
+    processed_count = 0
+    for response_time in sorted(response_times):
+        processed_count += response_times[response_time]
+        if processed_count >= num_requests * percentile:
+            return response_time
+    return 0
+
+
+def load_run(stats_path: Path) -> dict[str, RunStats]:
+    """Load the stats of a run, saved by `--stats-json-file` or `locust --json-file`.
+
+    Args:
+        stats_path: path of the JSON file.
+
+    Returns:
+        Stats by endpoint, e.g. 'POST /tasks/batch [1 item]', and the 'Aggregated' stats.
+    """
+    entries: list[dict[str, Any]] = orjson.loads(stats_path.read_bytes())
+    run_started = min((entry['start_time'] for entry in entries), default=0)
+    run_ended = max((entry['last_request_timestamp'] or run_started for entry in entries), default=0)
+    run_duration = max(run_ended - run_started, 1)
+
+    run_stats = {}
+    total_response_times: Counter[int] = Counter()
+    for entry in entries:
+        # The histogram keys are strings in JSON, e.g. '7' or, for the rounded long response times, '510.0'.
+        response_times = Counter({round(float(rt)): count for rt, count in entry['response_times'].items()})
+        total_response_times.update(response_times)
+        run_stats['{method} {name}'.format(method=entry['method'], name=entry['name'])] = _get_run_stats(
+            response_times,
+            num_requests=entry['num_requests'],
+            num_failures=entry['num_failures'],
+            run_duration=run_duration,
+        )
+    run_stats[AGGREGATED_NAME] = _get_run_stats(
+        total_response_times,
+        num_requests=sum(entry['num_requests'] for entry in entries),
+        num_failures=sum(entry['num_failures'] for entry in entries),
+        run_duration=run_duration,
+    )
+    return run_stats
+
+
+def compare_runs(
+    base_run: dict[str, RunStats],
+    new_run: dict[str, RunStats],
+    latency_threshold: float,
+    min_latency_delta_ms: int,
+    rps_threshold: float,
+    min_requests: int,
+) -> list[str]:
+    """Print the comparison of two runs and get the regressions.
+
+    Args:
+        base_run: stats of the base run, e.g. of the previous release.
+        new_run: stats of the new run.
+        latency_threshold: allowed growth of a latency percentile, %.
+        min_latency_delta_ms: latency growth that is never a regression, ms.
+        rps_threshold: allowed drop of the RPS, %.
+        min_requests: number of requests in each run that an endpoint needs to be flagged.
+
+    Returns:
+        Descriptions of the regressions.
+    """
+    regressions = []
+    print('{name:<45} {metric:>8} {base:>10} {new:>10} {change:>9}'.format(
+        name='Endpoint', metric='Metric', base='Base', new='New', change='Change',
+    ))
+    for name in sorted(base_run.keys() & new_run.keys(), key=lambda key: (key == AGGREGATED_NAME, key)):
+        base_stats, new_stats = base_run[name], new_run[name]
+        is_comparable = min(base_stats.num_requests, new_stats.num_requests) >= min_requests
+        for percentile in PERCENTILES:
+            base_ms, new_ms = base_stats.latency_ms[percentile], new_stats.latency_ms[percentile]
+            change = _get_change(base_ms, new_ms)
+            is_regression = is_comparable and change is not None and change > latency_threshold and (
+                new_ms - base_ms >= min_latency_delta_ms
+            )
+            metric = 'p{percent:g}'.format(percent=percentile * 100)
+            _print_row(name, metric, '{ms} ms'.format(ms=base_ms), '{ms} ms'.format(ms=new_ms), change, is_regression)
+            if is_regression:
+                regressions.append('{name}: {metric} {base} -> {new} ms'.format(
+                    name=name, metric=metric, base=base_ms, new=new_ms,
+                ))
+        change = _get_change(base_stats.rps, new_stats.rps)
+        is_regression = is_comparable and change is not None and change < -rps_threshold
+        base_rps, new_rps = '{rps:.1f}'.format(rps=base_stats.rps), '{rps:.1f}'.format(rps=new_stats.rps)
+        _print_row(name, 'RPS', base_rps, new_rps, change, is_regression)
+        if is_regression:
+            regressions.append('{name}: RPS {base:.1f} -> {new:.1f}'.format(
+                name=name, base=base_stats.rps, new=new_stats.rps,
+            ))
+
+    for name in sorted(base_run.keys() - new_run.keys()):
+        print('Only in the base run: {name}'.format(name=name))
+    for name in sorted(new_run.keys() - base_run.keys()):
+        print('Only in the new run: {name}'.format(name=name))
+    return regressions
+
+
+def _get_run_stats(response_times: Counter[int], num_requests: int, num_failures: int, run_duration: float) -> RunStats:
+    return RunStats(
+        num_requests=num_requests,
+        num_failures=num_failures,
+        latency_ms={
+            percentile: get_percentile(response_times, sum(response_times.values()), percentile)
+            for percentile in PERCENTILES
+        },
+        rps=num_requests / run_duration,
+    )
+
+
+def _get_change(base_value: float, new_value: float) -> Optional[float]:
+    if not base_value:
+        return None
+    return (new_value - base_value) / base_value * 100
+
+
+def _print_row(name: str, metric: str, base: str, new: str, change: Optional[float], is_regression: bool) -> None:
+    print('{name:<45} {metric:>8} {base:>10} {new:>10} {change:>9}{flag}'.format(
+        name=name[:45],
+        metric=metric,
+        base=base,
+        new=new,
+        change='n/a' if change is None else '{change:+.1f}%'.format(change=change),
+        flag='  REGRESSION' if is_regression else '',
+    ))
+
+
+def main() -> None:
+    """Compare two runs and exit with the code 1 if the new run regressed."""
+    parser = argparse.ArgumentParser(description='Compare the JSON stats of two Locust runs.')
+    parser.add_argument('base_stats', type=Path, help='JSON stats of the base run.')
+    parser.add_argument('new_stats', type=Path, help='JSON stats of the new run.')
+    parser.add_argument('--latency-threshold', type=float, default=10, help='Allowed p50/p95/p99 growth, %%.')
+    parser.add_argument(
+        '--min-latency-delta-ms', type=int, default=5, help='Latency growth that is never a regression, ms.',
+    )
+    parser.add_argument('--rps-threshold', type=float, default=10, help='Allowed RPS drop, %%.')
+    parser.add_argument(
+        '--min-requests', type=int, default=100, help='Requests in each run an endpoint needs to be flagged.',
+    )
+    args = parser.parse_args()
+
+    regressions = compare_runs(
+        load_run(args.base_stats),
+        load_run(args.new_stats),
+        latency_threshold=args.latency_threshold,
+        min_latency_delta_ms=args.min_latency_delta_ms,
+        rps_threshold=args.rps_threshold,
+        min_requests=args.min_requests,
+    )
+    if regressions:
+        print('\nRegressions:')
+        for regression in regressions:
+            print('  {regression}'.format(regression=regression))
+        sys.exit(1)
+    print('\nNo regressions.')
+
+
+if __name__ == '__main__':
+    main()
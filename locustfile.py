@@ -12,78 +12,466 @@
 #  permissions and limitations under the License.
 # ########################################################################################
 
-"""API load testing module using the locust library."""
+"""API load testing module using the locust library.
+
+The load profile mixes the users of the API:
+
+* `TaskClientUser` — the clients of the task API. They submit a task and poll its state with
+  `If-None-Match`, retry a submission with the same idempotency key, upload batches and NDJSON
+  streams and request the statuses of their tasks;
+* `AdminUser` — the operators calling the admin endpoints and scraping `/metrics`.
+
+The bearer token is taken from the `APP_API_ACCESS_HTTP_BEARER_TOKEN` environment variable, as
+on the server. The number of users grows in steps, see `StepLoadShape` and the `--step-*`
+options in `locust.conf`. The run fails if the global or the per-endpoint thresholds of
+`ENDPOINT_THRESHOLDS` are exceeded.
+"""
 
 import logging
-from typing import Any
+import os
+import random
+import time
+import uuid
+from collections import deque
+from typing import Any, Iterator, NamedTuple, Optional
+
+import orjson
+from locust import FastHttpUser, LoadTestShape, between, events, tag, task
+from locust.env import Environment
+from locust.runners import WorkerRunner
+from locust.stats import StatsEntry
+
+API_PREFIX = '/api/v1'
+BEARER_TOKEN = os.environ.get('APP_API_ACCESS_HTTP_BEARER_TOKEN', '')
+BATCH_SIZE = 50
+STREAM_LINES_NUM = 500
+STREAM_LINES_PER_CHUNK = 50
+POLLS_MAX_NUM = 5
+POLL_INTERVAL_SECONDS = 0.5
+TERMINAL_TASK_STATUSES = frozenset(('completed', 'failed'))
+UNEXPECTED_STATUS_MESSAGE = 'Unexpected status code {code}.'
+
+# A JSON object of a request or a response.
+JsonObject = dict[str, Any]
+# The status of a task, if changed, and the `ETag` of the response.
+TaskStatusResponse = tuple[Optional[str], Optional[str]]
+
+
+class EndpointThreshold(NamedTuple):
+    """Pass/fail thresholds of the requests of an endpoint."""
+
+    method: str
+    name: str
+    fail_ratio: float
+    p95_ms: float
+
+
+ENDPOINT_THRESHOLDS = (
+    EndpointThreshold('POST', '/tasks/batch [1 item]', fail_ratio=0.01, p95_ms=300),
+    EndpointThreshold('POST', '/tasks/batch [retry]', fail_ratio=0.01, p95_ms=300),
+    EndpointThreshold('POST', '/tasks/batch [{size} items]'.format(size=BATCH_SIZE), fail_ratio=0.01, p95_ms=1000),
+    EndpointThreshold('GET', '/tasks/[task_id]', fail_ratio=0.01, p95_ms=100),
+    EndpointThreshold(
+        'POST', '/tasks/ndjson [{lines} lines]'.format(lines=STREAM_LINES_NUM), fail_ratio=0.01, p95_ms=3000,
+    ),
+    EndpointThreshold('POST', '/tasks/statuses/ndjson', fail_ratio=0.01, p95_ms=500),
+    EndpointThreshold('GET', '/admin/app-config', fail_ratio=0, p95_ms=100),
+    EndpointThreshold('GET', '/admin/cache-stats', fail_ratio=0, p95_ms=100),
+    EndpointThreshold('GET', '/admin/loop-stats', fail_ratio=0, p95_ms=100),
+    EndpointThreshold('GET', '/metrics', fail_ratio=0, p95_ms=200),
+)
+
+
+class TaskIds(object):
+    """Task ids chosen by the clients; each locust process starts at its own random offset."""
+
+    def __init__(self) -> None:
+        """Perform custom instantiation of the class."""
+        self._next_task_id = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Choose a new random offset."""
+        self._next_task_id = random.randrange(1, 2**62)
+
+    def get_next(self) -> int:
+        """Get the next task id."""
+        self._next_task_id += 1
+        return self._next_task_id
+
+
+task_ids = TaskIds()
+
+
+@events.init.add_listener
+def _(environment: Environment, **kw: Any) -> None:
+    """Choose the offset of the task ids of the process.
+
+    The workers started with `--processes` are forked after this module is imported,
+    so each of them chooses its own offset here.
+
+    Args:
+        environment: locust Environment instance.
+        kw: Keyword arguments passed in to a function call.
+    """
+    task_ids.reset()
+
 
-from locust import between, env, events, tag, task
-from locust_plugins.users import RestUser
+@events.init_command_line_parser.add_listener
+def _(parser: Any) -> None:
+    """Add the options of `StepLoadShape`.
+
+    Args:
+        parser: locust argument parser.
+    """
+    parser.add_argument('--step-users', type=int, default=20, help='Users added at each step of the load.')
+    parser.add_argument('--step-duration', type=float, default=60, help='Duration of each step, seconds.')
+    parser.add_argument('--step-count', type=int, default=5, help='Number of steps; the run ends after the last.')
+    parser.add_argument('--step-spawn-rate', type=float, default=10, help='Users started per second in a step.')
+    parser.add_argument(
+        '--stats-json-file',
+        default='',
+        help='Save the final stats with the response time histograms to this JSON file.',
+    )
 
 
 @events.quitting.add_listener
-def _(environment: env.Environment, **kw: Any) -> None:
+def _(environment: Environment, **kw: Any) -> None:
     """Set the exit code to non-zero.
 
     Set the exit code to non-zero if any of the following conditions are met:
         * More than 1% of the requests failed.
         * The average response time is longer than 200 ms.
         * The 95th percentile for response time is larger than 1000 ms.
+        * An endpoint of `ENDPOINT_THRESHOLDS` exceeds its failure ratio or 95th percentile.
 
     `quitting` — EventHook. Fired after quitting events, just before process is exited.
+    In the distributed mode, only the master checks the stats aggregated from the workers.
 
     Args:
         environment: locust Environment instance.
         kw: Keyword arguments passed in to a function call.
     """
-    if environment.stats.total.fail_ratio * 100 > 1:
-        logging.error('Test failed due to failure ratio > 1%')
-        environment.process_exit_code = 1
-    elif environment.stats.total.avg_response_time > 200:
-        logging.error('Test failed due to average response time ratio > 200 ms')
-        environment.process_exit_code = 1
-    elif environment.stats.total.get_response_time_percentile(0.95) > 1000:
-        logging.error('Test failed due to 95th percentile response time > 1000 ms')
-        environment.process_exit_code = 1
-    else:
-        environment.process_exit_code = 0
-
-
-class FastApiRestUser(RestUser):
-    """The user to test the REST API.
-
-    Uses `locust_plugins`.
-    Code example:https://github.com/SvenskaSpel/locust-plugins/blob/master/examples/rest_ex.py
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    errors = get_total_errors(environment.stats.total)
+    for endpoint_threshold in ENDPOINT_THRESHOLDS:
+        endpoint_stats = environment.stats.entries.get((endpoint_threshold.name, endpoint_threshold.method))
+        if endpoint_stats is not None and endpoint_stats.num_requests:
+            errors.extend(get_endpoint_errors(endpoint_stats, endpoint_threshold=endpoint_threshold))
+
+    for error in errors:
+        logging.error('Test failed due to {error}'.format(error=error))
+    environment.process_exit_code = 1 if errors else 0
+
+
+@events.quitting.add_listener
+def _(environment: Environment, **kw: Any) -> None:
+    """Save the final stats of the run to the `--stats-json-file` file.
+
+    The file has the format of `locust --json-file`, which cannot be combined with `--csv`:
+    it resets the stats before the last CSV rows are written. The entries are serialized here
+    without the reset. Compare the files of two runs with `benchmarks/compare_locust_runs.py`.
+
+    Args:
+        environment: locust Environment instance.
+        kw: Keyword arguments passed in to a function call.
     """
+    stats_json_file = environment.parsed_options and environment.parsed_options.stats_json_file
+    if not stats_json_file or isinstance(environment.runner, WorkerRunner):
+        return
+    entries = [entry.serialize() for entry in environment.stats.entries.values() if entry.num_requests]
+    with open(stats_json_file, 'wb') as stats_file:
+        stats_file.write(orjson.dumps(entries, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+
+def get_total_errors(total_stats: StatsEntry) -> list[str]:
+    """Get the global thresholds exceeded by all requests of the run."""
+    errors = []
+    if total_stats.fail_ratio * 100 > 1:
+        errors.append('failure ratio > 1%')
+    if total_stats.avg_response_time > 200:
+        errors.append('average response time ratio > 200 ms')
+    if total_stats.get_response_time_percentile(0.95) > 1000:
+        errors.append('95th percentile response time > 1000 ms')
+    return errors
+
+
+def get_endpoint_errors(endpoint_stats: StatsEntry, endpoint_threshold: EndpointThreshold) -> list[str]:
+    """Get the thresholds exceeded by the requests of the endpoint."""
+    errors = []
+    endpoint = '{method} {name}'.format(method=endpoint_threshold.method, name=endpoint_threshold.name)
+    if endpoint_stats.fail_ratio > endpoint_threshold.fail_ratio:
+        errors.append('{endpoint}: failure ratio {ratio:.2%} > {threshold:.2%}'.format(
+            endpoint=endpoint, ratio=endpoint_stats.fail_ratio, threshold=endpoint_threshold.fail_ratio,
+        ))
+    p95_ms = endpoint_stats.get_response_time_percentile(0.95)
+    if p95_ms > endpoint_threshold.p95_ms:
+        errors.append('{endpoint}: 95th percentile {p95:.0f} ms > {threshold:.0f} ms'.format(
+            endpoint=endpoint, p95=p95_ms, threshold=endpoint_threshold.p95_ms,
+        ))
+    return errors
+
+
+class StepLoadShape(LoadTestShape):
+    """Add `--step-users` users every `--step-duration` seconds, `--step-count` times, then stop."""
+
+    def tick(self) -> Optional[tuple[int, float]]:
+        """Get the number of users and the spawn rate for the current time of the run."""
+        options = self.runner.environment.parsed_options
+        step_idx = int(self.get_run_time() // options.step_duration)
+        if step_idx >= options.step_count:
+            return None
+        return (step_idx + 1) * options.step_users, options.step_spawn_rate
+
+
+def get_auth_headers(accept: str = 'application/json') -> dict[str, str]:
+    """Get the headers of an authenticated request."""
+    return {'Authorization': 'Bearer {token}'.format(token=BEARER_TOKEN), 'Accept': accept}
+
+
+def get_new_metadata() -> JsonObject:
+    """Get the metadata of a new task."""
+    return {
+        'idempotency_key': str(uuid.uuid4()),
+        'task_id': task_ids.get_next(),
+        'callback_url': 'http://127.0.0.1:50000/callback_url',
+    }
+
+
+def check_status(resp: Any, expected_status: int = 200) -> None:
+    """Fail the request made with `rest` if the status code is not the expected one."""
+    assert resp.status_code == expected_status, UNEXPECTED_STATUS_MESSAGE.format(code=resp.status_code)
+
+
+class TaskApiUser(FastHttpUser):
+    """Base of the users of the task API, with the requests shared by their tasks."""
+
+    abstract = True
+    host = 'http://127.0.0.1:50000'
+
+    def on_start(self) -> None:
+        """Prepare the ids of the tasks created by the user."""
+        self.task_ids: deque[int] = deque(maxlen=100)
+
+    def submit(self, metadata_batch: list[JsonObject], name: str) -> bool:
+        """Submit a batch of tasks; check that every task is created.
+
+        Args:
+            metadata_batch: the metadata of the tasks.
+            name: the name of the request in the stats.
+
+        Returns:
+            Whether the tasks are created.
+        """
+        with self.rest(
+            method='POST',
+            url='{prefix}/tasks/batch'.format(prefix=API_PREFIX),
+            name=name,
+            headers=get_auth_headers(),
+            json={'items': metadata_batch},
+        ) as resp:
+            check_status(resp)
+            assert resp.js['error_count'] == 0, 'Failed items.'
+            submitted_task_ids = [metadata['task_id'] for metadata in metadata_batch]
+            created_task_ids = [task_state['task_id'] for task_state in resp.js['items']]
+            assert created_task_ids == submitted_task_ids, 'Unexpected task ids.'
+            self.task_ids.extend(submitted_task_ids)
+            return True
+        return False
+
+    def get_task_status(self, task_id: int, etag: Optional[str]) -> TaskStatusResponse:
+        """Get the state of a task, revalidating the previous response with its `ETag`.
+
+        Args:
+            task_id: the id of the task.
+            etag: the `ETag` of the previous response.
+
+        Returns:
+            The status of the task, None if it is unchanged or the request failed, and the `ETag`.
+        """
+        headers = get_auth_headers()
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        with self.rest(
+            method='GET',
+            url='{prefix}/tasks/{task_id}'.format(prefix=API_PREFIX, task_id=task_id),
+            name='/tasks/[task_id]',
+            headers=headers,
+        ) as resp:
+            if resp.status_code == 304:
+                resp.success()
+                return None, etag
+            check_status(resp)
+            return resp.js['status'], resp.headers.get('etag')
+        return None, etag
+
+    def post_ndjson(self, url: str, name: str, lines: list[JsonObject]) -> Optional[list[JsonObject]]:
+        """Post the lines as an NDJSON stream with chunked transfer coding.
+
+        Args:
+            url: the URL of the endpoint.
+            name: the name of the request in the stats.
+            lines: the JSON objects of the lines.
+
+        Returns:
+            The result lines, or None if the request failed.
+        """
+        headers = get_auth_headers(accept='application/x-ndjson')
+        headers['Content-Type'] = 'application/x-ndjson'
+        with self.client.post(
+            url,
+            name=name,
+            headers=headers,
+            data=get_ndjson_chunks(lines),
+            catch_response=True,
+        ) as resp:
+            if resp.status_code != 200:
+                resp.failure(UNEXPECTED_STATUS_MESSAGE.format(code=resp.status_code))
+                return None
+            result_lines = [orjson.loads(result_line) for result_line in resp.text.splitlines()]
+            has_errors = any(result_line['is_error'] for result_line in result_lines)
+            if has_errors or len(result_lines) != len(lines):
+                resp.failure('Missing or failed result lines: {text}'.format(text=resp.text[:200]))
+                return None
+            return result_lines
+
+
+def get_ndjson_chunks(lines: list[JsonObject]) -> Iterator[bytes]:
+    """Serialize the lines in chunks of `STREAM_LINES_PER_CHUNK` lines."""
+    for chunk_start in range(0, len(lines), STREAM_LINES_PER_CHUNK):
+        chunk_lines = lines[chunk_start:chunk_start + STREAM_LINES_PER_CHUNK]
+        yield b''.join(
+            orjson.dumps(line, option=orjson.OPT_APPEND_NEWLINE) for line in chunk_lines
+        )
+
+
+class TaskClientUser(TaskApiUser):
+    """A client of the task API."""
+
+    weight = 9
+    wait_time = between(0.5, 2)
+
+    @tag('rest_api', 'tasks')
+    @task(5)
+    def submit_and_poll_task(self) -> None:
+        """Submit a task and poll its state until it is final or the polls are over.
+
+        The polls send the `ETag` of the previous response, so an unchanged state is `304`.
+        """
+        metadata = get_new_metadata()
+        if not self.submit(metadata_batch=[metadata], name='/tasks/batch [1 item]'):
+            return
+
+        etag = None
+        for _ in range(POLLS_MAX_NUM):
+            task_status, etag = self.get_task_status(metadata['task_id'], etag=etag)
+            if task_status in TERMINAL_TASK_STATUSES:
+                return
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+    @tag('rest_api', 'tasks')
+    @task(2)
+    def retry_task_submission(self) -> None:
+        """Submit a task and resubmit it with the same idempotency key, as after a timeout.
+
+        The retry must return the task of the first submission.
+        """
+        metadata = get_new_metadata()
+        if not self.submit(metadata_batch=[metadata], name='/tasks/batch [1 item]'):
+            return
+        self.submit(metadata_batch=[metadata], name='/tasks/batch [retry]')
+
+    @tag('rest_api', 'tasks', 'batch')
+    @task(1)
+    def upload_batch(self) -> None:
+        """Submit a batch of new tasks."""
+        self.submit(
+            metadata_batch=[get_new_metadata() for _ in range(BATCH_SIZE)],
+            name='/tasks/batch [{size} items]'.format(size=BATCH_SIZE),
+        )
+
+    @tag('rest_api', 'tasks', 'stream')
+    @task(1)
+    def upload_ndjson_stream(self) -> None:
+        """Upload a stream of new tasks with chunked transfer coding."""
+        metadata_lines = [get_new_metadata() for _ in range(STREAM_LINES_NUM)]
+        result_lines = self.post_ndjson(
+            url='{prefix}/tasks/ndjson'.format(prefix=API_PREFIX),
+            name='/tasks/ndjson [{lines} lines]'.format(lines=STREAM_LINES_NUM),
+            lines=metadata_lines,
+        )
+        if result_lines is not None:
+            self.task_ids.extend(result_line['task_id'] for result_line in result_lines)
+
+    @tag('rest_api', 'tasks', 'stream')
+    @task(1)
+    def request_task_statuses(self) -> None:
+        """Request the statuses of the tasks created by the user as an NDJSON stream."""
+        if not self.task_ids:
+            return
+        self.post_ndjson(
+            url='{prefix}/tasks/statuses/ndjson'.format(prefix=API_PREFIX),
+            name='/tasks/statuses/ndjson',
+            lines=[{'task_id': task_id} for task_id in self.task_ids],
+        )
+
+
+class AdminUser(FastHttpUser):
+    """An operator calling the admin endpoints and a metrics scraper."""
+
     host = 'http://127.0.0.1:50000'
-    concurrency = 10
-    wait_time = between(1, 5)
+    weight = 1
+    wait_time = between(2, 5)
+
+    def on_start(self) -> None:
+        """Prepare the `ETag` of the app config."""
+        self.app_config_etag: Optional[str] = None
+
+    @tag('rest_api', 'admin')
+    @task(3)
+    def revalidate_app_config(self) -> None:
+        """Revalidate the app config with the `ETag` of the previous response."""
+        headers = get_auth_headers()
+        if self.app_config_etag is not None:
+            headers['If-None-Match'] = self.app_config_etag
+        with self.rest(
+            method='GET',
+            url='{prefix}/admin/app-config'.format(prefix=API_PREFIX),
+            name='/admin/app-config',
+            headers=headers,
+        ) as resp:
+            if resp.status_code == 304:
+                resp.success()
+            else:
+                check_status(resp)
+                self.app_config_etag = resp.headers.get('etag')
+
+    @tag('rest_api', 'admin')
+    @task(1)
+    def request_cache_stats(self) -> None:
+        """Request the cache statistics."""
+        self._request_admin_stats(path='/admin/cache-stats')
 
-    @tag('fast', 'rest_api')
+    @tag('rest_api', 'admin')
     @task(1)
-    def test_api_root_response_with_get_request(self) -> None:
-        """Test the API root response with a GET request."""
+    def request_loop_stats(self) -> None:
+        """Request the event loop statistics."""
+        self._request_admin_stats(path='/admin/loop-stats')
+
+    @tag('rest_api', 'admin')
+    @task(2)
+    def scrape_metrics(self) -> None:
+        """Scrape the metrics, as Prometheus does."""
+        with self.client.get('/metrics', name='/metrics', catch_response=True) as resp:
+            if resp.status_code != 200 or 'http_requests_total' not in resp.text:
+                resp.failure('Unexpected metrics response: {code}.'.format(code=resp.status_code))
+
+    def _request_admin_stats(self, path: str) -> None:
         with self.rest(
             method='GET',
-            url='/',
-            headers=None,
-            json={'message': 'Hey there! How are you?'},
+            url='{prefix}{path}'.format(prefix=API_PREFIX, path=path),
+            name=path,
+            headers=get_auth_headers(),
         ) as resp:
-            if not resp.js:
-                resp.failure(
-                    'resp.js is None, which it will be when there is a connection failure, a non-json responses etc.',
-                )
-
-            if resp.js and 'error' in resp.js and resp.js['error'] is not None:
-                resp.failure(resp.js['error'])
-
-            # Answer check option #1.
-            if resp.js['message'] != "Thanks, I'm fine!":
-                resp.failure("Unexpected value of 'message' in response: {resp_text}.".format(resp_text=resp.text))
-
-            # Answer check option #2.
-            # The `AssertionError` they raise will be caught by rest() and mark the
-            # request as failed with the message 'Assertion failed'. For details, see the library code.
-            assert resp.js['message'] == "Thanks, I'm fine!", (
-                "Unexpected value of 'message' in response: {resp_text}.".format(resp_text=resp.text)
-            )
+            check_status(resp)
@@ -0,0 +1,155 @@
+#!/bin/bash
+#
+# Run the benchmarks of `tests/test_benchmarks.py`: save a baseline or compare with it.
+#
+# Usage:
+#   bash package_scripts/run_benchmarks.sh save     # save the results as the new baseline
+#   bash package_scripts/run_benchmarks.sh compare  # fail if a benchmark regressed beyond the threshold
+#
+# The results are stored in "<project_root>/.benchmarks/<machine_id>/", so a run is compared
+# only with the runs of the same platform and Python version. Save the baseline on the
+# machine that runs the comparison, e.g. on the CI agent after a merge to the main branch.
+# The comparison fails if there is no baseline for the machine: nothing would be checked.
+#
+# Environment variables:
+#   BENCHMARK_COMPARE_FAIL — the regression threshold, "median:20%" by default;
+#     see `pytest --help` for the `--benchmark-compare-fail` format.
+#
+#
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       https://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+#######################################
+# Print a message to stdout with the date and time.
+# Arguments:
+#  Text message.
+#######################################
+function log_to_stdout() {
+  echo "[$(date +'%Y-%m-%dT%H:%M:%S%z')]: $*" >&1
+}
+
+#######################################
+# Print an error message to stderr with the date and time.
+# Arguments:
+#  Text message.
+#######################################
+function log_to_stderr() {
+  echo "[$(date +'%Y-%m-%dT%H:%M:%S%z')]: $*" >&2
+}
+
+#######################################
+# Run the benchmarks and save the results as the baseline.
+# Globals:
+#   PWD
+#   project_root
+# Arguments:
+#  None
+#######################################
+function save_baseline() {
+  log_to_stdout 'Running the benchmarks and saving the baseline...'
+  log_to_stdout '>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>'
+
+  cd "${project_root}" || exit 1
+  log_to_stdout "Current pwd: ${PWD}"
+
+  if ! pytest tests/test_benchmarks.py --no-cov --benchmark-enable --benchmark-only --benchmark-save=baseline; then
+    log_to_stderr 'Benchmarks failed. Exit.'
+    exit 1
+  else
+    log_to_stdout 'The baseline is saved.'
+    log_to_stdout '<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<'
+  fi
+}
+
+#######################################
+# Run the benchmarks and compare the results with the last saved baseline.
+# Globals:
+#   BENCHMARK_COMPARE_FAIL
+#   PWD
+#   project_root
+#   script_basename
+# Arguments:
+#  None
+#######################################
+function compare_with_baseline() {
+  local compare_fail
+  compare_fail="${BENCHMARK_COMPARE_FAIL:-median:20%}"
+
+  log_to_stdout "Running the benchmarks and comparing them with the baseline, threshold: ${compare_fail}..."
+  log_to_stdout '>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>'
+
+  cd "${project_root}" || exit 1
+  log_to_stdout "Current pwd: ${PWD}"
+
+  # Without a saved run, `--benchmark-compare` only warns, and every comparison would pass.
+  local machine_id
+  machine_id="$(python -c 'from pytest_benchmark.utils import get_machine_id; print(get_machine_id())')"
+  local baseline_path
+  baseline_path="$(find ".benchmarks/${machine_id}" -name '*_baseline.json' 2>/dev/null | sort | tail -n 1)"
+  if [[ -z "${baseline_path}" ]]; then
+    log_to_stderr "No baseline in \".benchmarks/${machine_id}/\". Run \"${script_basename} save\" first. Exit."
+    exit 1
+  fi
+  # The run number, e.g. "0003" of "0003_baseline.json": later runs of other names are not compared.
+  local baseline_run
+  baseline_run="$(basename "${baseline_path}")"
+  baseline_run="${baseline_run%%_*}"
+  log_to_stdout "Baseline: ${baseline_path}"
+
+  if ! pytest tests/test_benchmarks.py --no-cov --benchmark-enable --benchmark-only \
+    --benchmark-compare="${baseline_run}" --benchmark-compare-fail="${compare_fail}"; then
+    log_to_stderr 'Benchmarks failed or regressed beyond the threshold. Exit.'
+    exit 1
+  else
+    log_to_stdout 'No benchmark regressed beyond the threshold.'
+    log_to_stdout '<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<'
+  fi
+}
+
+#######################################
+# Run the main function of the script.
+# Globals:
+#   BASH_SOURCE
+# Arguments:
+#  Mode: "save" or "compare".
+#######################################
+function main() {
+  # 1. Declaring Local Variables.
+  local script_basename
+  script_basename=$(basename "${BASH_SOURCE[0]##*/}")  # don't change
+  readonly script_basename
+
+  local project_root
+  project_root="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+  readonly project_root
+
+  local mode
+  readonly mode="${1:-compare}"
+
+  # 2. Execution of script logic.
+  log_to_stdout "${script_basename}: START SCRIPT EXECUTION"
+
+  if [[ "${mode}" == 'save' ]]; then
+    save_baseline
+  elif [[ "${mode}" == 'compare' ]]; then
+    compare_with_baseline
+  else
+    log_to_stderr "Unknown mode: \"${mode}\". Expected \"save\" or \"compare\". Exit."
+    exit 1
+  fi
+
+  log_to_stdout "${script_basename}: END OF SCRIPT EXECUTION"
+}
+
+main "$@"
@@ -0,0 +1,165 @@
+#!/bin/bash
+#
+# Run the distributed Locust load test and export its results, or compare the results of two runs.
+#
+# Usage:
+#   bash package_scripts/run_load_test.sh run <run_name> [workers_num] [locust options...]
+#   bash package_scripts/run_load_test.sh compare <base_run_name> <new_run_name>
+#
+# `run` starts a master and `workers_num` local workers (4 by default) with `locust.conf` and
+# `locust_distributed.conf`, and saves the results to "<project_root>/load_test_results/<run_name>/":
+#   * stats.json — the final stats with the response time histogram of each endpoint;
+#   * locust_stats.csv, locust_stats_history.csv, locust_failures.csv, locust_exceptions.csv — the CSV
+#     stats with the percentiles, the history is recorded for each endpoint;
+#   * report.html — the HTML report.
+# Name the runs after the releases, e.g. "v1.2.0", to track the performance across the releases.
+# The locust options override the configuration files, e.g. "--step-count 3".
+# The server must be running, and the APP_API_ACCESS_HTTP_BEARER_TOKEN variable must be set.
+#
+# `compare` diffs the p50, p95, p99 latency and the RPS of the runs with
+# `benchmarks/compare_locust_runs.py` and fails on a regression.
+#
+# Environment variables:
+#   LOAD_TEST_LATENCY_THRESHOLD — the allowed growth of a latency percentile, 10 (%) by default;
+#   LOAD_TEST_RPS_THRESHOLD — the allowed drop of the RPS, 10 (%) by default;
+#   LOAD_TEST_MIN_REQUESTS — the requests of an endpoint in each run needed to flag it, 100 by default.
+#
+#
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       https://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+#######################################
+# Print a message to stdout with the date and time.
+# Arguments:
+#  Text message.
+#######################################
+function log_to_stdout() {
+  echo "[$(date +'%Y-%m-%dT%H:%M:%S%z')]: $*" >&1
+}
+
+#######################################
+# Print an error message to stderr with the date and time.
+# Arguments:
+#  Text message.
+#######################################
+function log_to_stderr() {
+  echo "[$(date +'%Y-%m-%dT%H:%M:%S%z')]: $*" >&2
+}
+
+#######################################
+# Run the load test and export the results.
+# Globals:
+#   PWD
+#   project_root
+# Arguments:
+#  Run name.
+#  Number of workers.
+#  Locust options.
+#######################################
+function run_load_test() {
+  local run_name="${1}"
+  local workers_num="${2:-4}"
+  local results_dir="load_test_results/${run_name}"
+  shift 2
+
+  log_to_stdout "Running the load test \"${run_name}\" with ${workers_num} workers..."
+  log_to_stdout '>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>'
+
+  cd "${project_root}" || exit 1
+  log_to_stdout "Current pwd: ${PWD}"
+  mkdir -p "${results_dir}" || exit 1
+
+  if ! locust --config locust_distributed.conf --processes "${workers_num}" \
+    --csv "${results_dir}/locust" --csv-full-history --stats-json-file "${results_dir}/stats.json" \
+    --html "${results_dir}/report.html" "$@"; then
+    log_to_stderr "Load test failed, the results are in \"${results_dir}\". Exit."
+    exit 1
+  else
+    log_to_stdout "The load test passed, the results are in \"${results_dir}\"."
+    log_to_stdout '<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<'
+  fi
+}
+
+#######################################
+# Compare the results of two runs.
+# Globals:
+#   LOAD_TEST_LATENCY_THRESHOLD
+#   LOAD_TEST_MIN_REQUESTS
+#   LOAD_TEST_RPS_THRESHOLD
+#   PWD
+#   project_root
+# Arguments:
+#  Base run name.
+#  New run name.
+#######################################
+function compare_runs() {
+  local base_run_name="${1}"
+  local new_run_name="${2}"
+
+  log_to_stdout "Comparing the load test \"${new_run_name}\" with \"${base_run_name}\"..."
+  log_to_stdout '>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>'
+
+  cd "${project_root}" || exit 1
+  log_to_stdout "Current pwd: ${PWD}"
+
+  if ! python -m benchmarks.compare_locust_runs \
+    "load_test_results/${base_run_name}/stats.json" "load_test_results/${new_run_name}/stats.json" \
+    --latency-threshold "${LOAD_TEST_LATENCY_THRESHOLD:-10}" --rps-threshold "${LOAD_TEST_RPS_THRESHOLD:-10}" \
+    --min-requests "${LOAD_TEST_MIN_REQUESTS:-100}"; then
+    log_to_stderr 'The comparison failed or the new run regressed. Exit.'
+    exit 1
+  else
+    log_to_stdout 'The new run did not regress.'
+    log_to_stdout '<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<'
+  fi
+}
+
+#######################################
+# Run the main function of the script.
+# Globals:
+#   BASH_SOURCE
+# Arguments:
+#  Mode: "run" or "compare".
+#  Arguments of the mode.
+#######################################
+function main() {
+  # 1. Declaring Local Variables.
+  local script_basename
+  script_basename=$(basename "${BASH_SOURCE[0]##*/}")  # don't change
+  readonly script_basename
+
+  local project_root
+  project_root="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+  readonly project_root
+
+  local mode
+  readonly mode="${1:-}"
+
+  # 2. Execution of script logic.
+  log_to_stdout "${script_basename}: START SCRIPT EXECUTION"
+
+  if [[ "${mode}" == 'run' && -n "${2:-}" ]]; then
+    run_load_test "${2}" "${3:-4}" "${@:4}"
+  elif [[ "${mode}" == 'compare' && -n "${2:-}" && -n "${3:-}" ]]; then
+    compare_runs "${2}" "${3}"
+  else
+    log_to_stderr "Unknown mode or missing arguments: \"$*\". Expected \"run <run_name> [workers_num]\" \
+or \"compare <base_run_name> <new_run_name>\". Exit."
+    exit 1
+  fi
+
+  log_to_stdout "${script_basename}: END OF SCRIPT EXECUTION"
+}
+
+main "$@"
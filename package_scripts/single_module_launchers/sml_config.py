@@ -16,7 +16,7 @@ from src.boilerplate.config import config
 
 
 def main() -> None:
-    print(config.json())
+    print(config.model_dump_json())
     print(config.ASGI_HOST.exploded)
     print(type(config.ASGI_HOST.exploded))
 
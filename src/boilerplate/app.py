@@ -17,19 +17,31 @@
 # ########################################################################################
 
 """FastAPI application initialization module."""
+import asyncio
 from pathlib import Path
 
 from fastapi import FastAPI, Request
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
-from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 
+from src.boilerplate.compression import CompressionMiddleware
+from src.boilerplate.conditional_requests import ETagMiddleware
 from src.boilerplate.config import config
 from src.boilerplate.custom_logger import CustomLogger
-from src.boilerplate.routers import admin_controller
-from src.boilerplate.sentry import init_sentry
+from src.boilerplate.db.pool import close_pool
+from src.boilerplate.loop_watchdog import loop_watchdog
+from src.boilerplate.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    MetricsMiddleware,
+    render_metrics,
+    write_snapshot,
+    write_snapshots_periodically,
+)
+from src.boilerplate.responses import ORJSONResponse
+from src.boilerplate.routers import admin_controller, task_controller, task_stream_controller
+from src.boilerplate.sentry import RequestBodyRecorderMiddleware, init_sentry
 
 _module_logger = CustomLogger().get_module_logger(
     name=__name__,
@@ -45,6 +57,10 @@ tags_metadata = [
                 'You can get a token from a DevOps engineer.'
             ),
     },
+    {
+        'name': 'task-controller',
+        'description': 'Asynchronous background tasks. Use `Bearer` token authorization.',
+    },
 ]
 
 _module_logger.debug('Initializing the FastAPI application...')
@@ -100,6 +116,7 @@ app = FastAPI(
     description=app_description,
     version=config.APP_API_VERSION,
     openapi_tags=tags_metadata,
+    default_response_class=ORJSONResponse,
     docs_url=None,
     redoc_url=None,
     contact={
@@ -119,6 +136,18 @@ app.mount(path='/static', app=StaticFiles(directory=static_dir_path), name='stat
 
 _module_logger.debug('Initializing Routers...')
 app.include_router(admin_controller.router)
+app.include_router(task_controller.router)
+app.include_router(task_stream_controller.router)
+
+# Middleware must be added before the application starts: Starlette builds the middleware stack on the first call.
+_module_logger.debug('Initializing Middleware...')
+# The last added middleware is the outermost one: bodies are tagged before compression.
+app.add_middleware(ETagMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RequestBodyRecorderMiddleware)
+app.add_middleware(SentryAsgiMiddleware)
+# The outermost middleware, so the latency includes all other middleware.
+app.add_middleware(MetricsMiddleware)
 
 
 @app.on_event('startup')
@@ -126,16 +155,16 @@ async def startup() -> None:
     """Execute application startup operations."""
     _module_logger.debug('Executing startup operations...')
 
-    _module_logger.debug('Initializing Middleware...')
-
-    minimum_size_in_bytes_for_gzip_compression = 150
-    app.add_middleware(GZipMiddleware, minimum_size=minimum_size_in_bytes_for_gzip_compression)
-
-    app.add_middleware(SentryAsgiMiddleware)
-
     _module_logger.debug('Initializing Sentry...')
     init_sentry()
 
+    _module_logger.debug('Starting the metrics snapshot writer...')
+    app.state.metrics_snapshot_writer = asyncio.create_task(write_snapshots_periodically())
+
+    if config.LOOP_WATCHDOG_ENABLED:
+        _module_logger.debug('Starting the event loop watchdog...')
+        loop_watchdog.start()
+
     _module_logger.debug('Startup operations completed.')
 
 
@@ -144,6 +173,14 @@ async def shutdown() -> None:
     """Execute application shutdown operations."""
     _module_logger.debug('Executing operations operations...')
 
+    await close_pool()
+
+    await loop_watchdog.stop()
+
+    app.state.metrics_snapshot_writer.cancel()
+    if config.METRICS_MULTIPROCESS_DIR is not None:
+        write_snapshot(config.METRICS_MULTIPROCESS_DIR)
+
     _module_logger.debug('Shutdown operations completed.')
 
 
@@ -170,6 +207,19 @@ async def favicon() -> FileResponse:
     )
 
 
+@app.get(
+    path='/metrics',
+    include_in_schema=False,
+    response_class=PlainTextResponse,
+)
+def metrics() -> PlainTextResponse:
+    """Get the metrics in the Prometheus text format.
+
+    The function is sync, so the snapshot files of the workers are read in the thread pool.
+    """
+    return PlainTextResponse(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get(
     path='/docs',
     include_in_schema=False,
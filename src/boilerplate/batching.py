@@ -0,0 +1,76 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Concurrent processing of batch request items.
+
+A batch request carries many independent items. They are fanned out across a bounded
+pool of workers, so a batch of 1000 items does not open 1000 database transactions at
+once, and the failure of one item does not fail the others.
+
+Example:
+    ```python
+    results = await process_batch(items, process=create_task)
+    failed_items = [result for result in results if isinstance(result, ErrorSchema)]
+    ```
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Optional, Sequence, TypeVar, Union
+
+from src.boilerplate.config import config
+from src.boilerplate.errors import get_error_schema
+from src.boilerplate.schemas.common_schemas import ErrorSchema
+
+ItemT = TypeVar('ItemT')
+ResultT = TypeVar('ResultT')
+
+
+async def process_batch(
+    items: Sequence[ItemT],
+    process: Callable[[ItemT], Awaitable[ResultT]],
+    max_concurrency: Optional[int] = None,
+) -> list[Union[ResultT, ErrorSchema]]:
+    """Process the items concurrently, at most `max_concurrency` at a time.
+
+    Args:
+        items: batch items.
+        process: coroutine function called with each item.
+        max_concurrency: the maximum number of items processed at the same time.
+
+    Returns:
+        Results in the order of the items; the items that raised an exception get the
+        `ErrorSchema` of the exception instead.
+    """
+    results: list[Union[ResultT, ErrorSchema]] = [ErrorSchema()] * len(items)
+    item_indexes = iter(range(len(items)))
+
+    async def work() -> None:  # noqa: WPS430
+        # Workers share the iterator, so each item is taken exactly once.
+        for item_index in item_indexes:
+            results[item_index] = await _process_item(item=items[item_index], process=process)
+
+    workers_number = min(max_concurrency or config.BATCH_MAX_CONCURRENCY, len(items))
+    await asyncio.gather(*(work() for _ in range(workers_number)))
+    return results
+
+
+async def _process_item(
+    item: ItemT,
+    process: Callable[[ItemT], Awaitable[ResultT]],
+) -> Union[ResultT, ErrorSchema]:
+    try:
+        return await process(item)
+    except Exception as exc:
+        # Unknown errors are logged by `get_error_schema`.
+        return get_error_schema(exc)
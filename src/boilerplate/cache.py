@@ -0,0 +1,207 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Read-through in-process cache with stampede protection.
+
+`AsyncCache.get_or_compute` returns the cached value of a key or computes it with the
+given coroutine function. The cache has the following properties:
+  1. Single-flight: concurrent misses of the same key share one computation. The
+     computation runs in its own task, so cancelling the caller that started it does not
+     cancel it for the other callers.
+  2. Bounded: entries expire after `ttl_seconds` and the least recently used entries are
+     evicted when there are more than `max_size` of them.
+  3. Negative caching: `None` results are cached for `negative_ttl_seconds`, so lookups
+     of missing records do not hit the database on every call.
+  4. Explicit invalidation: `invalidate` drops the entry and detaches an in-flight
+     computation, so its (possibly stale) result is not stored.
+
+The cache is local to the worker process. Invalidation in one worker does not reach the
+others, so the TTL is the upper bound of staleness between workers.
+
+Use `get_cache` to get a named cache; `get_caches_stats` returns hit and miss metrics of
+all named caches.
+"""
+
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+from src.boilerplate.config import config
+
+ValueT = TypeVar('ValueT')
+
+
+class _CacheEntry(Generic[ValueT]):
+    __slots__ = ('value', 'expires_at')
+
+    def __init__(self, cache_value: ValueT, expires_at: float) -> None:
+        self.value = cache_value
+        self.expires_at = expires_at
+
+
+class AsyncCache(Generic[ValueT]):
+    """Read-through TTL and LRU bounded cache for coroutine results."""
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        negative_ttl_seconds: Optional[float] = None,
+        timer: Callable[[], float] = monotonic,
+    ) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            max_size: the maximum number of entries.
+            ttl_seconds: lifetime of an entry; `0` disables caching.
+            negative_ttl_seconds: lifetime of an entry with the `None` value; `0` disables
+                negative caching.
+            timer: monotonic clock function, in seconds.
+        """
+        self._max_size = config.CACHE_MAX_SIZE if max_size is None else max_size
+        self._ttl_seconds = config.CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        if negative_ttl_seconds is None:
+            negative_ttl_seconds = config.CACHE_NEGATIVE_TTL_SECONDS
+        self._negative_ttl_seconds = negative_ttl_seconds
+        self._timer = timer
+
+        self._entries: OrderedDict[Hashable, _CacheEntry[Optional[ValueT]]] = OrderedDict()
+        self._in_flight: dict[Hashable, asyncio.Task[Optional[ValueT]]] = {}
+        # Strong references to the computations, including the detached ones.
+        self._compute_tasks: set[asyncio.Task[Optional[ValueT]]] = set()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        """Get the number of entries, including expired ones that have not been removed yet."""
+        return len(self._entries)
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Optional[ValueT]]],
+    ) -> Optional[ValueT]:
+        """Get the value of the key, computing and caching it on a miss.
+
+        Args:
+            key: cache key.
+            compute: coroutine function that returns the value of the key.
+
+        Returns:
+            The cached or the computed value.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > self._timer():
+                self._entries.move_to_end(key)
+                if entry.value is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return entry.value
+            del self._entries[key]  # noqa: WPS420
+
+        compute_task = self._in_flight.get(key)
+        if compute_task is None:
+            self.misses += 1
+            compute_task = asyncio.create_task(self._compute(key=key, compute=compute))
+            self._in_flight[key] = compute_task
+            self._compute_tasks.add(compute_task)
+            compute_task.add_done_callback(self._on_compute_done)
+        else:
+            self.coalesced += 1
+        # `shield` keeps the shared computation alive if a caller, including the one that
+        # started it, is cancelled.
+        return await asyncio.shield(compute_task)
+
+    def set(self, key: Hashable, cache_value: Optional[ValueT]) -> None:  # noqa: WPS125
+        """Put the value of the key into the cache."""
+        ttl_seconds = self._ttl_seconds if cache_value is not None else self._negative_ttl_seconds
+        if not ttl_seconds:
+            return
+        self._entries[key] = _CacheEntry(cache_value=cache_value, expires_at=self._timer() + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop the key, e.g. when the underlying record has changed."""
+        self.invalidations += 1
+        self._entries.pop(key, None)
+        # The result of the detached computation is returned to its waiters, but not stored.
+        self._in_flight.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+        self._in_flight.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get hit and miss metrics of the cache."""
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        return {
+            'size': len(self._entries),
+            'max_size': self._max_size,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_ratio': (self.hits + self.negative_hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+    async def _compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Optional[ValueT]]],
+    ) -> Optional[ValueT]:
+        compute_task = asyncio.current_task()
+        try:
+            computed_value = await compute()
+        finally:
+            is_detached = self._in_flight.get(key) is not compute_task
+            if not is_detached:
+                del self._in_flight[key]  # noqa: WPS420
+        if not is_detached:
+            self.set(key=key, cache_value=computed_value)
+        return computed_value
+
+    def _on_compute_done(self, compute_task: asyncio.Task[Optional[ValueT]]) -> None:
+        self._compute_tasks.discard(compute_task)
+        if not compute_task.cancelled():
+            # Mark the exception as retrieved in case all callers have been cancelled.
+            compute_task.exception()
+
+
+_caches: dict[str, AsyncCache[Any]] = {}
+
+
+def get_cache(name: str) -> AsyncCache[Any]:
+    """Get the named cache, creating it with the default settings if necessary."""
+    if name not in _caches:
+        _caches[name] = AsyncCache()
+    return _caches[name]
+
+
+def get_caches_stats() -> dict[str, dict[str, Any]]:
+    """Get hit and miss metrics of all named caches."""
+    return {name: cache.get_stats() for name, cache in _caches.items()}
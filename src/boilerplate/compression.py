@@ -0,0 +1,291 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Response compression middleware with `Content-Encoding` negotiation.
+
+`CompressionMiddleware` replaces Starlette's `GZipMiddleware`:
+* the encoding is negotiated from the `Accept-Encoding` header, with q-values: `zstd`, `br`
+  or `gzip`, in the order of `COMPRESSION_ENCODINGS`. `br` and `zstd` require the optional
+  `brotli` and `zstandard` packages (the `compression` extra); without them, the encodings
+  are not offered;
+* the levels are tuned for dynamic responses, where compression time counts as much as the
+  ratio;
+* bodies smaller than `COMPRESSION_MINIMUM_SIZE_BYTES` and already compressed media types
+  (images, video, archives, ...) are sent as is;
+* streaming responses are compressed chunk by chunk: each chunk is flushed, so the client
+  receives it without waiting for the end of the stream;
+* chunks of at least `COMPRESSION_THREAD_POOL_MIN_SIZE_BYTES` are compressed in the thread
+  pool, so a large body does not block the event loop. `zlib`, `brotli` and `zstandard`
+  release the GIL while compressing.
+"""
+
+import zlib
+from typing import Callable, Final, Optional, Protocol, Sequence
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.boilerplate.config import config
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None  # type: ignore[assignment]
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore[assignment]
+
+_GZIP_WBITS: Final[int] = zlib.MAX_WBITS | 16
+
+# Media types that are compressed already; `image/svg+xml` is text and is compressed.
+_INCOMPRESSIBLE_MEDIA_TYPE_PREFIXES: Final[tuple[str, ...]] = (
+    'image/png',
+    'image/jpeg',
+    'image/gif',
+    'image/webp',
+    'image/avif',
+    'image/x-icon',
+    'image/vnd.microsoft.icon',
+    'video/',
+    'audio/',
+    'font/woff',
+    'application/zip',
+    'application/gzip',
+    'application/x-gzip',
+    'application/zstd',
+    'application/x-bzip2',
+    'application/x-7z-compressed',
+    'application/x-rar-compressed',
+    'application/pdf',
+)
+
+
+class StreamCompressor(Protocol):
+    """Compressor of a body sent in one or more chunks."""
+
+    def compress(self, chunk: bytes, is_last: bool) -> bytes:
+        """Compress the chunk and flush it, or finish the stream if the chunk is the last one."""
+
+
+class GzipStreamCompressor(object):
+    """`gzip` stream compressor."""
+
+    def __init__(self) -> None:
+        self._compressor = zlib.compressobj(config.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, _GZIP_WBITS)
+
+    def compress(self, chunk: bytes, is_last: bool) -> bytes:
+        """Compress the chunk and flush it, or finish the stream if the chunk is the last one."""
+        flush_mode = zlib.Z_FINISH if is_last else zlib.Z_SYNC_FLUSH
+        return self._compressor.compress(chunk) + self._compressor.flush(flush_mode)
+
+
+class BrotliStreamCompressor(object):
+    """`br` stream compressor."""
+
+    def __init__(self) -> None:
+        self._compressor = brotli.Compressor(quality=config.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, chunk: bytes, is_last: bool) -> bytes:
+        """Compress the chunk and flush it, or finish the stream if the chunk is the last one."""
+        compressed_chunk = self._compressor.process(chunk)
+        return compressed_chunk + (self._compressor.finish() if is_last else self._compressor.flush())
+
+
+class ZstdStreamCompressor(object):
+    """`zstd` stream compressor."""
+
+    def __init__(self) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=config.COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, chunk: bytes, is_last: bool) -> bytes:
+        """Compress the chunk and flush it, or finish the stream if the chunk is the last one."""
+        flush_mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if is_last else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return self._compressor.compress(chunk) + self._compressor.flush(flush_mode)
+
+
+def get_available_compressors() -> dict[str, Callable[[], StreamCompressor]]:
+    """Get the compressor factories of the configured encodings whose packages are installed.
+
+    Returns:
+        Compressor factories by encoding, in the order of preference.
+    """
+    installed_compressors: dict[str, Optional[Callable[[], StreamCompressor]]] = {
+        'gzip': GzipStreamCompressor,
+        'br': None if brotli is None else BrotliStreamCompressor,
+        'zstd': None if zstandard is None else ZstdStreamCompressor,
+    }
+    return {
+        encoding: installed_compressors[encoding]
+        for encoding in config.COMPRESSION_ENCODINGS
+        if installed_compressors[encoding] is not None
+    }
+
+
+def negotiate_encoding(accept_encoding: str, supported_encodings: Sequence[str]) -> Optional[str]:
+    """Choose the content encoding of the response.
+
+    The encoding with the highest q-value in `Accept-Encoding` wins; on a tie, the one that
+    comes first in `supported_encodings`.
+
+    Args:
+        accept_encoding: value of the `Accept-Encoding` request header, e.g. 'gzip, br;q=0.9'.
+        supported_encodings: encodings of the server, in the order of preference.
+
+    Returns:
+        The chosen encoding, or None if the client accepts none of them.
+    """
+    qualities: dict[str, float] = {}
+    for coding_part in accept_encoding.split(','):
+        coding, _, coding_params = coding_part.partition(';')
+        qualities[coding.strip().lower()] = _parse_quality(coding_params)
+
+    wildcard_quality = qualities.get('*', 0)
+    chosen_encoding = None
+    chosen_quality = 0.0
+    for encoding in supported_encodings:
+        quality = qualities.get(encoding, wildcard_quality)
+        if quality > chosen_quality:
+            chosen_encoding, chosen_quality = encoding, quality
+    return chosen_encoding
+
+
+def _parse_quality(coding_params: str) -> float:
+    param_name, _, param_value = coding_params.strip().partition('=')
+    if param_name.strip().lower() != 'q':
+        return 1
+    try:
+        return float(param_value)
+    except ValueError:
+        return 0
+
+
+class CompressionMiddleware(object):
+    """ASGI middleware compressing the response bodies with the negotiated encoding."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        thread_pool_min_size: Optional[int] = None,
+    ) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            app: the wrapped ASGI application.
+            minimum_size: bodies of fewer bytes are not compressed.
+            thread_pool_min_size: chunks of at least this number of bytes are compressed in
+                the thread pool.
+        """
+        self.app = app
+        self._minimum_size = config.COMPRESSION_MINIMUM_SIZE_BYTES if minimum_size is None else minimum_size
+        self._thread_pool_min_size = (
+            config.COMPRESSION_THREAD_POOL_MIN_SIZE_BYTES if thread_pool_min_size is None else thread_pool_min_size
+        )
+        self._compressors = get_available_compressors()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle the ASGI call."""
+        if scope['type'] == 'http':
+            accept_encoding = Headers(scope=scope).get('accept-encoding', '')
+            encoding = negotiate_encoding(accept_encoding=accept_encoding, supported_encodings=tuple(self._compressors))
+            if encoding is not None:
+                compressing_send = _CompressingSend(
+                    send=send,
+                    encoding=encoding,
+                    create_compressor=self._compressors[encoding],
+                    minimum_size=self._minimum_size,
+                    thread_pool_min_size=self._thread_pool_min_size,
+                )
+                await self.app(scope, receive, compressing_send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _CompressingSend(object):
+    # Holds the response start message until the first body chunk shows how to send it.
+
+    def __init__(
+        self,
+        send: Send,
+        encoding: str,
+        create_compressor: Callable[[], StreamCompressor],
+        minimum_size: int,
+        thread_pool_min_size: int,
+    ) -> None:
+        self._send = send
+        self._encoding = encoding
+        self._create_compressor = create_compressor
+        self._minimum_size = minimum_size
+        self._thread_pool_min_size = thread_pool_min_size
+        self._start_message: Optional[Message] = None
+        self._compressor: Optional[StreamCompressor] = None
+        self._is_started = False
+
+    async def __call__(self, message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            self._start_message = message
+            return
+        if message['type'] != 'http.response.body':
+            await self._send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if not self._is_started:
+            self._is_started = True
+            await self._start(body=body, more_body=more_body)
+            if self._compressor is not None and not more_body:
+                return  # the whole body has been sent by `_start`
+        if self._compressor is None:
+            await self._send(message)
+            return
+
+        compressed_body = await self._compress(chunk=body, is_last=not more_body)
+        if compressed_body or not more_body:
+            await self._send({'type': 'http.response.body', 'body': compressed_body, 'more_body': more_body})
+
+    async def _start(self, body: bytes, more_body: bool) -> None:
+        start_message: Message = self._start_message  # type: ignore[assignment]
+        headers = MutableHeaders(raw=start_message['headers'])
+        is_compressible = (
+            'content-encoding' not in headers and
+            not headers.get('content-type', '').startswith(_INCOMPRESSIBLE_MEDIA_TYPE_PREFIXES) and
+            (more_body or len(body) >= self._minimum_size)
+        )
+        if not is_compressible:
+            await self._send(start_message)
+            return
+
+        self._compressor = self._create_compressor()
+        headers['Content-Encoding'] = self._encoding
+        headers.add_vary_header('Accept-Encoding')
+        if more_body:
+            # The length of a streamed body is not known in advance.
+            if 'content-length' in headers:
+                del headers['Content-Length']  # noqa: WPS420
+            await self._send(start_message)
+            return
+
+        compressed_body = await self._compress(chunk=body, is_last=True)
+        headers['Content-Length'] = str(len(compressed_body))
+        await self._send(start_message)
+        await self._send({'type': 'http.response.body', 'body': compressed_body, 'more_body': False})
+
+    async def _compress(self, chunk: bytes, is_last: bool) -> bytes:
+        if len(chunk) >= self._thread_pool_min_size:
+            return await run_in_threadpool(self._compressor.compress, chunk, is_last)  # type: ignore[union-attr]
+        return self._compressor.compress(chunk, is_last)  # type: ignore[union-attr]
@@ -0,0 +1,200 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""HTTP conditional `GET` requests: `ETag`, `If-None-Match` and `Cache-Control`.
+
+Responses that repeat between calls are validated with an `ETag` instead of being sent
+again, in one of two ways:
+* `ETagMiddleware` hashes the body of a `200` response to `GET` or `HEAD` sent in one
+  message, sets the `ETag` header and, if `If-None-Match` matches, replaces the response
+  with an empty `304 Not Modified`. The handler still runs, but the body is not sent;
+* for content whose version is known without building it, e.g. the config, a route uses
+  the `conditional_get` dependency with a `ContentVersion`: a matching `If-None-Match` is
+  answered with `304` before the handler runs.
+
+`conditional_get` also sets the `Cache-Control` header of the route.
+
+The tags are weak (`W/"..."`): the middleware runs inside `CompressionMiddleware`, so one
+tag is used for every content encoding of the same body.
+
+Example:
+    ```python
+    @router.get('/app-config', dependencies=[Depends(conditional_get(cache_control='no-cache', version=version))])
+    ```
+"""
+
+import hashlib
+from typing import Awaitable, Callable, Final, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_ETAG_DIGEST_SIZE_BYTES: Final[int] = 16
+
+_CONDITIONAL_METHODS: Final[frozenset[str]] = frozenset(('GET', 'HEAD'))
+
+# Representation headers that a `304` response must not have.
+_NOT_MODIFIED_EXCLUDED_HEADERS: Final[tuple[str, ...]] = ('content-length', 'content-type')
+
+
+def compute_etag(body: bytes) -> str:
+    """Compute the weak `ETag` of the body.
+
+    Args:
+        body: the response body before compression.
+
+    Returns:
+        The tag, e.g. 'W/"9b2f...4c1a"'.
+    """
+    return 'W/"{digest}"'.format(digest=hashlib.blake2b(body, digest_size=_ETAG_DIGEST_SIZE_BYTES).hexdigest())
+
+
+def is_etag_matched(if_none_match: str, etag: str) -> bool:
+    """Check the `If-None-Match` header against the tag with the weak comparison.
+
+    Args:
+        if_none_match: value of the `If-None-Match` request header, e.g. 'W/"a", "b"' or '*'.
+        etag: the current tag of the resource.
+
+    Returns:
+        True if the client has the current version, and `304` can be sent.
+    """
+    current_tag = etag.removeprefix('W/')
+    for client_tag in if_none_match.split(','):
+        client_tag = client_tag.strip()
+        if client_tag == '*' or client_tag.removeprefix('W/') == current_tag:
+            return True
+    return False
+
+
+class ContentVersion(object):
+    """Version of content that changes rarely, e.g. the application config.
+
+    The tag is the hash of the content, computed on the first use and cached until `bump`
+    reports a change, so the conditional requests are answered without building the
+    response. Workers with the same content get the same tag.
+    """
+
+    def __init__(self, get_content: Callable[[], bytes]) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            get_content: function building the content, e.g. the serialized config.
+        """
+        self._get_content = get_content
+        self._etag: Optional[str] = None
+        self.generation = 0
+
+    @property
+    def etag(self) -> str:
+        """Get the tag of the current version."""
+        if self._etag is None:
+            self._etag = compute_etag(self._get_content())
+        return self._etag
+
+    def bump(self) -> None:
+        """Report that the content has changed; the tag is recomputed on the next use."""
+        self.generation += 1
+        self._etag = None
+
+
+def conditional_get(
+    cache_control: str,
+    version: Optional[ContentVersion] = None,
+) -> Callable[[Request, Response], Awaitable[None]]:
+    """Create the dependency of a route that sets `Cache-Control` and, if given, the version tag.
+
+    Args:
+        cache_control: value of the `Cache-Control` response header, e.g. 'private, no-cache'.
+        version: version of the route content. If given, a matching `If-None-Match` is
+            answered with `304` before the handler runs; otherwise, `ETagMiddleware` tags
+            the built body.
+
+    Returns:
+        The dependency.
+    """
+    async def check_version(request: Request, response: Response) -> None:  # noqa: WPS430
+        response.headers['Cache-Control'] = cache_control
+        if version is None:
+            return
+        etag = version.etag
+        response.headers['ETag'] = etag
+        if is_etag_matched(if_none_match=request.headers.get('if-none-match', ''), etag=etag):
+            raise HTTPException(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag, 'Cache-Control': cache_control},
+            )
+
+    return check_version
+
+
+class ETagMiddleware(object):
+    """ASGI middleware tagging the `GET` responses and answering `If-None-Match` with `304`."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            app: the wrapped ASGI application.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle the ASGI call."""
+        if scope['type'] == 'http' and scope['method'] in _CONDITIONAL_METHODS:
+            if_none_match = Headers(scope=scope).get('if-none-match', '')
+            await self.app(scope, receive, _ETagSend(send=send, if_none_match=if_none_match))
+            return
+        await self.app(scope, receive, send)
+
+
+class _ETagSend(object):
+    # Holds the response start message until the first body chunk shows whether the body
+    # is sent in one message and can be tagged.
+
+    def __init__(self, send: Send, if_none_match: str) -> None:
+        self._send = send
+        self._if_none_match = if_none_match
+        self._start_message: Optional[Message] = None
+        self._is_started = False
+
+    async def __call__(self, message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            self._start_message = message
+            return
+        if message['type'] != 'http.response.body' or self._is_started:
+            await self._send(message)
+            return
+
+        self._is_started = True
+        start_message: Message = self._start_message  # type: ignore[assignment]
+        headers = MutableHeaders(scope=start_message)
+        if start_message['status'] != status.HTTP_200_OK or message.get('more_body', False):
+            # Streaming responses are not buffered to be hashed.
+            await self._send(start_message)
+            await self._send(message)
+            return
+
+        etag = headers.get('etag')
+        if etag is None:
+            etag = compute_etag(message.get('body', b''))
+            headers['ETag'] = etag
+        if self._if_none_match and is_etag_matched(if_none_match=self._if_none_match, etag=etag):
+            for header_name in _NOT_MODIFIED_EXCLUDED_HEADERS:
+                del headers[header_name]  # noqa: WPS420
+            start_message['status'] = status.HTTP_304_NOT_MODIFIED
+            message = {'type': 'http.response.body', 'body': b''}
+        await self._send(start_message)
+        await self._send(message)
@@ -33,18 +33,24 @@ classes must be done in conjunction with DevOps engineers responsible for the CI
 our team and this project in particular: `Bitbucket`, `Jenkins`, `GitLab`, etc.
 
 The module was developed using [Pydantic Settings management](
-https://pydantic-docs.helpmanual.io/usage/settings/).
+https://docs.pydantic.dev/latest/concepts/pydantic_settings/).
 """
 
 import math
 from ipaddress import IPv4Address
 from pathlib import Path
-from typing import Optional, Union
+from typing import Annotated, Final, Literal, Optional, Union
 
 import pydantic
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from src.boilerplate.schemas.common_schemas import EnvState
 
+_DEFAULT_APP_NAME_VALUE: Final[str] = 'boilerplate'
+
+# A probability, e.g. a Sentry sample rate.
+SampleRate = Annotated[float, pydantic.Field(ge=0, le=1)]
+
 
 def _get_path_to_dotenv_file(dotenv_filename: str, num_of_parent_dirs_up: int) -> Optional[Path]:
     """Get the path to the `.env` file.
@@ -75,7 +81,7 @@ class AppInternalLogicConfig(pydantic.BaseModel):
     RANDOM_SEED: int = 42
 
 
-class GlobalConfig(pydantic.BaseSettings, AppInternalLogicConfig):
+class GlobalConfig(BaseSettings, AppInternalLogicConfig):
     """Global configurations.
 
     `GlobalConfig` defines the variables that propagate through other environment classes
@@ -86,12 +92,12 @@ class GlobalConfig(pydantic.BaseSettings, AppInternalLogicConfig):
 
     The class `GlobalConfig` inherits from Pydantic’s `BaseSettings` which helps to load
     and read the variables from the `.env file`. The `.env` file itself is loaded in
-    the nested `Config` class.
+    `model_config`.
 
     Although the environment variables are loaded from the `.env` file, Pydantic also
     loads your actual shell environment variables at the same time.
 
-    From Pydantic’s [documentation](https://pydantic-docs.helpmanual.io/usage/settings/):
+    From Pydantic’s [documentation](https://docs.pydantic.dev/latest/concepts/pydantic_settings/):
 
     ```text
     Even when using a `.env` file, `pydantic` will still read environment variables
@@ -100,26 +106,31 @@ class GlobalConfig(pydantic.BaseSettings, AppInternalLogicConfig):
     ```
     """
 
-    # General application config.
-    _DEFAULT_APP_NAME_VALUE: str = 'boilerplate'
+    model_config = SettingsConfigDict(
+        # Loads the dotenv file. Environment variables will always take priority over values
+        # loaded from a dotenv file.
+        env_file=_get_path_to_dotenv_file(dotenv_filename='.env', num_of_parent_dirs_up=2),
+        str_strip_whitespace=True,
+        # The dotenv file is shared with Docker and CI, so it contains other variables too.
+        extra='ignore',
+    )
 
-    APP_NAME: str = pydantic.Field(
+    # General application config.
+    APP_NAME: Literal['boilerplate'] = pydantic.Field(
         title='APP_NAME',
         description='The name of the application',
         default=_DEFAULT_APP_NAME_VALUE,
-        const=True,
-        min_length=1,
     )
-    APP_ENV_STATE: EnvState = pydantic.Field(env='APP_ENV_STATE', default=EnvState.development, min_length=1)
+    APP_ENV_STATE: EnvState = EnvState.development
     APP_ROOT_PATH: str = ''
-    APP_API_VERSION: str = pydantic.Field(default='v1', regex=r'^v\d+$')  # v1, v12, v123
-    APP_API_ACCESS_HTTP_BEARER_TOKEN: Optional[pydantic.SecretStr] = pydantic.Field(min_length=1)
+    APP_API_VERSION: str = pydantic.Field(default='v1', pattern=r'^v\d+$')  # v1, v12, v123
+    APP_API_ACCESS_HTTP_BEARER_TOKEN: Optional[pydantic.SecretStr] = pydantic.Field(default=None, min_length=1)
     APP_VCS_REF: str = pydantic.Field(default='development_git_rev_short_sha', min_length=1)  # git commit hash.
     APP_IDEMPOTENCY_KEY_VALIDITY_TIME_SECONDS: pydantic.PositiveInt = 5 * 60
     APP_HTTP_HEADERS_CONTENT_TYPE_JSON: str = pydantic.Field(default='application/json', min_length=1)
 
     # Uvicorn config.
-    ASGI_PROTOCOL: str = pydantic.Field(default='http', regex='^(http|https)$')
+    ASGI_PROTOCOL: str = pydantic.Field(default='http', pattern='^(http|https)$')
     ASGI_HOST: IPv4Address = IPv4Address('0.0.0.0')  # noqa: S104; do not specify the value 127.0.0.1
     ASGI_PORT: int = pydantic.Field(default=50000, ge=50000, le=60000)
 
@@ -131,16 +142,120 @@ class GlobalConfig(pydantic.BaseSettings, AppInternalLogicConfig):
     DB_PASSWORD: pydantic.SecretStr = pydantic.Field(min_length=1)
     DB_DATABASE: str = pydantic.Field(default='boilerplate', min_length=1)
     DB_SCHEMA: str = pydantic.Field(default='app_work_data', min_length=1)
-    DB_DSN: Optional[pydantic.PostgresDsn]
+    DB_DSN: Optional[pydantic.PostgresDsn] = None
+    DB_POOL_MIN_SIZE: pydantic.PositiveInt = 1
+    DB_POOL_MAX_SIZE: pydantic.PositiveInt = 10
+
+    # Database retention config.
+    DB_RETENTION_DAYS: pydantic.PositiveInt = 30
+    DB_RETENTION_BATCH_SIZE: pydantic.PositiveInt = 10_000
+
+    # Database bulk writer config.
+    DB_BULK_WRITER_MAX_BATCH_SIZE: pydantic.PositiveInt = 1000
+    DB_BULK_WRITER_FLUSH_INTERVAL_SECONDS: pydantic.PositiveFloat = 1.0
+    DB_BULK_WRITER_MAX_BUFFER_SIZE: pydantic.PositiveInt = 100_000
+
+    # Read-through cache config.
+    CACHE_MAX_SIZE: pydantic.PositiveInt = 10_000
+    CACHE_TTL_SECONDS: pydantic.PositiveFloat = 5.0
+    CACHE_NEGATIVE_TTL_SECONDS: pydantic.NonNegativeFloat = 1.0
+
+    # Response compression config; `br` and `zstd` require the `compression` extra.
+    COMPRESSION_ENCODINGS: list[Literal['zstd', 'br', 'gzip']] = ['zstd', 'br', 'gzip']
+    COMPRESSION_MINIMUM_SIZE_BYTES: pydantic.PositiveInt = 1024
+    COMPRESSION_THREAD_POOL_MIN_SIZE_BYTES: pydantic.PositiveInt = 256 * 1024
+    COMPRESSION_GZIP_LEVEL: int = pydantic.Field(default=6, ge=1, le=9)
+    COMPRESSION_BROTLI_QUALITY: int = pydantic.Field(default=4, ge=0, le=11)
+    COMPRESSION_ZSTD_LEVEL: int = pydantic.Field(default=3, ge=1, le=22)
+
+    # HTTP caching config: `Cache-Control` of the `GET` routes validated with `ETag`.
+    HTTP_CACHE_CONTROL_APP_CONFIG: str = pydantic.Field(default='private, no-cache', min_length=1)
+    HTTP_CACHE_CONTROL_TASK_STATE: str = pydantic.Field(default='private, no-cache', min_length=1)
+
+    # Metrics config. Set `METRICS_MULTIPROCESS_DIR` to a directory shared by the workers if
+    # there are several worker processes, so that `/metrics` reports all of them.
+    METRICS_MULTIPROCESS_DIR: Optional[Path] = None
+    METRICS_MULTIPROCESS_FLUSH_INTERVAL_SECONDS: pydantic.PositiveFloat = 5.0
+    METRICS_HTTP_DURATION_BUCKETS_SECONDS: list[pydantic.PositiveFloat] = [
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    ]
+    METRICS_HTTP_RESPONSE_SIZE_BUCKETS_BYTES: list[pydantic.PositiveInt] = [
+        100, 1000, 10_000, 100_000, 1_000_000, 10_000_000,
+    ]
+
+    # Profiling config: if disabled, the `profile` decorator returns the function as is.
+    PROFILING_ENABLED: bool = True
+
+    # Event loop watchdog config, see `loop_watchdog.py`.
+    LOOP_WATCHDOG_ENABLED: bool = True
+    LOOP_WATCHDOG_INTERVAL_SECONDS: pydantic.PositiveFloat = 0.1
+    LOOP_WATCHDOG_SLOW_CALLBACK_SECONDS: pydantic.PositiveFloat = 0.1
+    LOOP_WATCHDOG_WARNING_INTERVAL_SECONDS: pydantic.PositiveFloat = 60.0
+    LOOP_WATCHDOG_MAX_REPORTS: pydantic.PositiveInt = 20
+
+    # On-demand sampling profiler config, see `sampling_profiler.py`.
+    PROFILER_SAMPLING_INTERVAL_SECONDS: pydantic.PositiveFloat = 0.01
+    PROFILER_MAX_DURATION_SECONDS: pydantic.PositiveFloat = 60.0
+    PROFILER_MAX_STACK_DEPTH: pydantic.PositiveInt = 128
+    PROFILER_MAX_STACKS: pydantic.PositiveInt = 10_000
+
+    # Batch endpoints config; keep the concurrency within `DB_POOL_MAX_SIZE`.
+    BATCH_MAX_CONCURRENCY: pydantic.PositiveInt = 8
+
+    # NDJSON streaming config.
+    STREAMING_NDJSON_MAX_LINE_SIZE_BYTES: pydantic.PositiveInt = 64 * 1024
+    STREAMING_NDJSON_MAX_PENDING_CHUNKS: pydantic.PositiveInt = 8
+    STREAMING_NDJSON_MAX_BATCH_SIZE: pydantic.PositiveInt = 1000
+
+    # Kafka config.
+    KAFKA_BOOTSTRAP_SERVERS: str = pydantic.Field(default='localhost:9092', min_length=1)
+    KAFKA_CONSUMER_GROUP_ID: str = pydantic.Field(default=_DEFAULT_APP_NAME_VALUE, min_length=1)
+    KAFKA_TASK_TOPIC: str = pydantic.Field(default='boilerplate.tasks', min_length=1)
+    KAFKA_CONSUMER_MAX_BATCH_SIZE: pydantic.PositiveInt = 500
+    KAFKA_CONSUMER_FETCH_TIMEOUT_MS: pydantic.PositiveInt = 1000
+    KAFKA_CONSUMER_MAX_IN_FLIGHT_BATCHES: pydantic.PositiveInt = 4
+    KAFKA_CONSUMER_MAX_PENDING_BATCHES_PER_PARTITION: pydantic.PositiveInt = 2
+    KAFKA_TASK_EVENTS_TOPIC: str = pydantic.Field(default='boilerplate.task-events', min_length=1)
+    KAFKA_PRODUCER_LINGER_MS: pydantic.NonNegativeInt = 5
+
+    # Transactional outbox relay config.
+    OUTBOX_RELAY_BATCH_SIZE: pydantic.PositiveInt = 500
+    OUTBOX_RELAY_POLL_INTERVAL_SECONDS: pydantic.PositiveFloat = 1.0
 
     # Sentry config : https://docs.sentry.io/product/sentry-basics/dsn-explainer/
-    SENTRY_DSN: Optional[pydantic.HttpUrl]
-    SENTRY_ENVIRONMENT: EnvState = pydantic.Field(env='APP_ENV_STATE', default=EnvState.development, min_length=1)
-    SENTRY_RELEASE: Optional[str] = pydantic.Field(env='APP_VCS_REF', default='development_release', min_length=1)
+    SENTRY_DSN: Optional[pydantic.HttpUrl] = None
+    SENTRY_ENVIRONMENT: EnvState = pydantic.Field(validation_alias='APP_ENV_STATE', default=EnvState.development)
+    SENTRY_RELEASE: Optional[str] = pydantic.Field(
+        validation_alias='APP_VCS_REF',
+        default='development_release',
+        min_length=1,
+    )
+    # Sentry traces sampling config, see `sentry.TracesSampler`.
+    # The rate of the routes without a rule; by default, it depends on the environment.
+    SENTRY_TRACES_SAMPLE_RATE: Optional[SampleRate] = None
+    # Sample rates by the request path prefix; a zero rate disables tracing of the route.
+    SENTRY_TRACES_ROUTE_SAMPLE_RATES: dict[str, SampleRate] = {
+        '/static': 0,
+        '/docs': 0,
+        '/openapi.json': 0,
+        '/favicon.ico': 0,
+        '/metrics': 0,
+    }
+    # Record every transaction of a route with a rate and decide when it finishes, to keep the server errors and
+    # the slow requests. Costs CPU on every request, so it is off by default: the decision is made at the start.
+    SENTRY_TRACES_KEEP_ERRORS_AND_SLOW: bool = False
+    SENTRY_TRACES_SLOW_REQUEST_SECONDS: pydantic.PositiveFloat = 1.0
+    # The cap of the transactions sent with a route rate; errors and slow requests are not capped.
+    SENTRY_TRACES_MAX_PER_SECOND: Optional[pydantic.PositiveFloat] = 10.0
+    # Sentry overhead config, see `sentry.py`.
+    SENTRY_LAZY_REQUEST_BODIES: bool = True
+    SENTRY_MAX_REQUEST_BODY_BYTES: pydantic.PositiveInt = 10_000  # the `medium` request bodies of the SDK
+    SENTRY_BACKGROUND_EVENTS: bool = True
+    SENTRY_EVENT_QUEUE_SIZE: pydantic.PositiveInt = 100
 
     # Elastic APM Python Agent config: https://www.elastic.co/guide/en/apm/agent/python/current/index.html
-    ELASTIC_APM_SCHEME: Optional[str] = pydantic.Field(default='http', regex='^(http|https)$')
-    ELASTIC_APM_HOST: Optional[str] = pydantic.Field(min_length=1)
+    ELASTIC_APM_SCHEME: Optional[str] = pydantic.Field(default='http', pattern='^(http|https)$')
+    ELASTIC_APM_HOST: Optional[str] = pydantic.Field(default=None, min_length=1)
     ELASTIC_APM_PORT: Optional[int] = pydantic.Field(default=8200, ge=0)
 
     # Aiohttp config.
@@ -158,15 +273,6 @@ class GlobalConfig(pydantic.BaseSettings, AppInternalLogicConfig):
     DOCKER_IMAGE_TAG: str = pydantic.Field(default='latest', min_length=1)
     DOCKER_CI_PROJECT_NAME: str = pydantic.Field(default=_DEFAULT_APP_NAME_VALUE, min_length=1)
 
-    class Config(object):
-        """Pydantic Model Config.
-
-        Loads the dotenv file. Environment variables will always take priority over values
-        loaded from a dotenv file.
-        """
-        env_file: Optional[Path] = _get_path_to_dotenv_file(dotenv_filename='.env', num_of_parent_dirs_up=2)
-        anystr_strip_whitespace = True
-
 
 class DevelopmentConfig(GlobalConfig):
     """Development configurations.
@@ -183,11 +289,6 @@ class DevelopmentConfig(GlobalConfig):
     APP_IDEMPOTENCY_KEY_VALIDITY_TIME_SECONDS: pydantic.PositiveInt = 15
     DB_HOST: str = pydantic.Field(default='localhost', min_length=1)
 
-    class Config(object):
-        """Pydantic Model Config."""
-
-        anystr_strip_whitespace = True
-
 
 class StagingConfig(GlobalConfig):
     """Staging configurations.
@@ -200,11 +301,6 @@ class StagingConfig(GlobalConfig):
     # Defining new attributes that are not in the `GlobalConfig` class.
     IS_DEBUG: bool = True
 
-    class Config(object):
-        """Pydantic Model Config."""
-
-        anystr_strip_whitespace = True
-
 
 class ProductionConfig(GlobalConfig):
     """Production configurations.
@@ -217,10 +313,8 @@ class ProductionConfig(GlobalConfig):
     # Defining new attributes that are not in the `GlobalConfig` class.
     IS_DEBUG: bool = False
 
-    class Config(object):
-        """Pydantic Model Config."""
-
-        anystr_strip_whitespace = True
+    # Redefining attributes defined earlier in the `GlobalConfig` class.
+    PROFILING_ENABLED: bool = False
 
 
 class FactoryConfig(object):
@@ -0,0 +1,76 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""The module contains vectorized helpers for cleaning tabular data.
+
+They are the column-wise counterparts of the scalar helpers in `pydantic_helpers.py`,
+for inputs that are already loaded into a `pandas.DataFrame`.
+"""
+
+from itertools import repeat
+from typing import Final, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+_EMPTY_STRINGS: Final[tuple[str, ...]] = ('', 'None')
+_CONTAINER_TYPES: Final[tuple[type, ...]] = (list, dict)
+
+
+def replace_empty_values_to_none_in_frame(
+    frame: pd.DataFrame,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """Replace empty lists, dictionaries and strings with None column-wise.
+
+    Vectorized version of `replace_empty_values_to_none`: strings '' and 'None', empty
+    lists and empty dictionaries become None. Only object and string columns are
+    processed; other dtypes cannot hold these values. The frame is not modified.
+
+    Args:
+        frame: frame to clean.
+        columns: names of the columns to clean; all columns by default.
+
+    Returns:
+        Cleaned copy of the frame.
+    """
+    cleaned_frame = frame.copy()
+    for column_name in frame.columns if columns is None else columns:
+        column = cleaned_frame[column_name]
+        if pd.api.types.is_string_dtype(column.dtype) and column.dtype != object:
+            empty_mask = column.isin(_EMPTY_STRINGS).to_numpy(dtype=bool)
+        elif column.dtype == object:
+            empty_mask = _get_empty_values_mask(column)
+        else:
+            continue
+        if empty_mask.any():
+            cleaned_frame[column_name] = column.mask(empty_mask, None)
+    return cleaned_frame
+
+
+def _get_empty_values_mask(column: pd.Series) -> np.ndarray:
+    values = column.to_numpy(dtype=object)
+    empty_mask = (values == _EMPTY_STRINGS[0]) | (values == _EMPTY_STRINGS[1])
+    # `map` over builtins runs in C, so no Python-level loop is executed per cell.
+    # `isinstance` also matches subclasses, e.g. `OrderedDict`, as in the scalar version.
+    container_mask = np.fromiter(
+        map(isinstance, values, repeat(_CONTAINER_TYPES)),
+        dtype=bool,
+        count=len(values),
+    )
+    if container_mask.any():
+        containers = values[container_mask]
+        container_lengths = np.fromiter(map(len, containers), dtype=np.int64, count=len(containers))
+        empty_mask[container_mask] = container_lengths == 0
+    return empty_mask
@@ -0,0 +1,329 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Bulk writer of validated models to PostgreSQL.
+
+Single-row `INSERT` statements are expensive when many task, error and callback records
+are recorded. `BulkWriter` buffers the rows of validated Pydantic models or of their
+internal records (see `schemas/records.py`) in memory and writes them to the table in
+batches with `COPY ... FROM STDIN (FORMAT binary)` through `asyncpg`.
+
+A flush is triggered when either of the following happens:
+  1. The buffer reaches `max_batch_size` rows.
+  2. `flush_interval_seconds` have passed since the previous periodic flush.
+
+Batches are written strictly in the order in which the records were added. Rows of a
+batch are removed from the buffer only after the `COPY` has succeeded, so a failed batch
+is retried (see the `TENACITY_*` settings) before any record added after it, and remains
+at the head of the buffer if all attempts fail.
+
+A batch rejected because of its data (e.g. `DataError`, `UniqueViolationError`) is not
+retried: it is written row by row, and the rows that are rejected again are passed to the
+dead-letter handler (by default, logged and dropped), so a poison row cannot block the
+buffer.
+
+The buffer holds at most `max_buffer_size` rows. When it is full, `add` waits for a flush
+(backpressure); if the flush fails, `BulkWriterOverflowError` is raised and the row is not
+added.
+
+Example:
+    ```python
+    writer = create_task_error_writer()
+    await writer.start()
+    await writer.add(ErrorRecord(error_name='TimeoutError'), task_id=1)
+    await writer.stop()  # flushes the remaining records
+    ```
+"""
+
+import asyncio
+import contextlib
+from collections import deque
+from enum import Enum
+from typing import Any, Awaitable, Callable, Iterable, Optional, Sequence, Union
+
+import asyncpg
+import orjson
+import sqlalchemy as sa
+from pydantic import AnyUrl, BaseModel
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, stop_after_delay, wait_fixed, wait_random
+
+from src.boilerplate.config import config
+from src.boilerplate.custom_logger import CustomLogger
+from src.boilerplate.db.pool import get_pool
+from src.boilerplate.db.tables import task_callback_table, task_error_table, task_table
+from src.boilerplate.schemas.records import Record
+
+_module_logger = CustomLogger().get_module_logger(
+    name=__name__,
+    module_extra=None,  # optional data that will be added to each message of this logger
+)
+
+# Errors after which the same batch can be sent again. Data errors are not retried.
+_RETRIABLE_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.TooManyConnectionsError,
+)
+
+# Errors caused by the rows themselves. The client-side `asyncpg` encoding error is
+# an `InterfaceError` and a `ValueError` at the same time.
+_POISON_ROW_ERRORS = (
+    asyncpg.DataError,
+    asyncpg.IntegrityConstraintViolationError,
+    ValueError,
+    TypeError,
+)
+
+DeadLetterHandler = Callable[[sa.Table, tuple[Any, ...], Exception], Awaitable[None]]
+
+
+class BulkWriterOverflowError(RuntimeError):
+    """The buffer is full and the buffered rows cannot be written."""
+
+
+def _is_retriable_error(exc: BaseException) -> bool:
+    return isinstance(exc, _RETRIABLE_ERRORS) and not isinstance(exc, _POISON_ROW_ERRORS)
+
+
+async def log_dead_letter_row(table: sa.Table, row: tuple[Any, ...], exc: Exception) -> None:
+    """Log a row rejected by the database and drop it; the default dead-letter handler."""
+    _module_logger.error(
+        msg="A row has been rejected by '{table}' and dropped: {exc!r}; row: {row!r}.".format(
+            table=table.fullname,
+            exc=exc,
+            row=row,
+        ),
+    )
+
+
+def _encode_value(column_value: Any) -> Any:
+    """Convert a model field value to a value accepted by the `asyncpg` binary codecs."""
+    if isinstance(column_value, (dict, list)):
+        # `asyncpg` encodes `json` and `jsonb` columns from `str`.
+        return orjson.dumps(column_value).decode()
+    elif isinstance(column_value, Enum):
+        return column_value.value
+    elif isinstance(column_value, AnyUrl):
+        return str(column_value)
+    return column_value
+
+
+class BulkWriter(object):
+    """Buffered writer of Pydantic models or internal records to a PostgreSQL table."""
+
+    def __init__(
+        self,
+        table: sa.Table,
+        columns: Sequence[str],
+        max_batch_size: Optional[int] = None,
+        flush_interval_seconds: Optional[float] = None,
+        pool: Optional[asyncpg.Pool] = None,
+        max_buffer_size: Optional[int] = None,
+        dead_letter: DeadLetterHandler = log_dead_letter_row,
+    ) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            table: target table.
+            columns: table columns to be filled; other columns get their server defaults.
+            max_batch_size: the number of buffered rows that triggers a flush.
+            flush_interval_seconds: the period of the background flush.
+            pool: `asyncpg` pool; the application-wide pool is used by default.
+            max_buffer_size: the maximum number of buffered rows.
+            dead_letter: the handler of the rows rejected by the database.
+        """
+        self._table = table
+        self._columns = tuple(columns)
+        self._max_batch_size = max_batch_size or config.DB_BULK_WRITER_MAX_BATCH_SIZE
+        self._flush_interval_seconds = flush_interval_seconds or config.DB_BULK_WRITER_FLUSH_INTERVAL_SECONDS
+        self._pool = pool
+        self._max_buffer_size = max_buffer_size or config.DB_BULK_WRITER_MAX_BUFFER_SIZE
+        self._dead_letter = dead_letter
+
+        self._buffer: deque[tuple[Any, ...]] = deque()
+        self._flush_lock = asyncio.Lock()
+        self._flusher_task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def buffered_rows(self) -> int:
+        """Get the number of rows waiting to be written."""
+        return len(self._buffer)
+
+    async def start(self) -> None:
+        """Start the background periodic flush."""
+        if self._flusher_task is None:
+            self._flusher_task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """Stop the background periodic flush and write the remaining rows."""
+        if self._flusher_task is not None:
+            self._flusher_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flusher_task
+            self._flusher_task = None
+        await self.flush()
+
+    async def add(self, record: Union[BaseModel, Record], **extra_columns: Any) -> None:
+        """Add a record to the buffer.
+
+        Args:
+            record: validated model or its internal record. Its fields are matched to the
+                table columns by name.
+            extra_columns: values of the columns that are not in the model, e.g. `task_id`.
+
+        Raises:
+            BulkWriterOverflowError: If the buffer is full and cannot be flushed.
+        """
+        await self._append(self._to_row(record=record, extra_columns=extra_columns))
+        if len(self._buffer) >= self._max_batch_size:
+            await self.flush()
+
+    async def add_many(self, records: Iterable[Union[BaseModel, Record]], **extra_columns: Any) -> None:
+        """Add several records to the buffer; `extra_columns` are applied to each of them.
+
+        Raises:
+            BulkWriterOverflowError: If the buffer is full and cannot be flushed.
+        """
+        for record in records:
+            await self._append(self._to_row(record=record, extra_columns=extra_columns))
+        if len(self._buffer) >= self._max_batch_size:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write all buffered rows in batches of at most `max_batch_size` rows.
+
+        Returns:
+            The number of rows written.
+        """
+        written_rows = 0
+        async with self._flush_lock:
+            while self._buffer:
+                batch_size = min(len(self._buffer), self._max_batch_size)
+                batch = [self._buffer[row_idx] for row_idx in range(batch_size)]
+                try:
+                    await self._copy_with_retry(batch=batch)
+                except _POISON_ROW_ERRORS:
+                    written_rows += await self._flush_row_by_row(batch_size=batch_size)
+                    continue
+                for _ in range(batch_size):
+                    self._buffer.popleft()
+                written_rows += batch_size
+        return written_rows
+
+    async def _append(self, row: tuple[Any, ...]) -> None:
+        if len(self._buffer) >= self._max_buffer_size:
+            # Backpressure: the caller waits until the buffered rows are written.
+            try:
+                await self.flush()
+            except Exception as exc:
+                raise BulkWriterOverflowError(
+                    "The buffer of '{table}' is full: {rows} rows.".format(
+                        table=self._table.fullname,
+                        rows=len(self._buffer),
+                    ),
+                ) from exc
+        self._buffer.append(row)
+
+    async def _flush_row_by_row(self, batch_size: int) -> int:
+        # Isolates the rows that made the batch fail. Each row leaves the buffer as soon as
+        # it is written or dead-lettered, so a retriable error here does not duplicate rows.
+        written_rows = 0
+        for _ in range(batch_size):
+            row = self._buffer[0]
+            try:
+                await self._copy_with_retry(batch=[row])
+            except _POISON_ROW_ERRORS as exc:
+                await self._dead_letter(self._table, row, exc)
+            else:
+                written_rows += 1
+            self._buffer.popleft()
+        return written_rows
+
+    def _to_row(self, record: Union[BaseModel, Record], extra_columns: dict[str, Any]) -> tuple[Any, ...]:
+        # Fields are read as attributes, so models and slotted records are handled alike,
+        # without building the intermediate dictionary of `model_dump`.
+        return tuple(
+            _encode_value(extra_columns[column] if column in extra_columns else getattr(record, column, None))
+            for column in self._columns
+        )
+
+    async def _copy_with_retry(self, batch: list[tuple[Any, ...]]) -> None:
+        retrying = AsyncRetrying(
+            retry=retry_if_exception(_is_retriable_error),
+            stop=(
+                stop_after_attempt(config.TENACITY_STOP_AFTER_ATTEMPT) |
+                stop_after_delay(config.TENACITY_STOP_AFTER_DELAY_SECONDS)
+            ),
+            wait=(
+                wait_fixed(config.TENACITY_WAIT_FIXED) +
+                wait_random(config.TENACITY_WAIT_RANDOM_MIN, config.TENACITY_WAIT_RANDOM_MAX)
+            ),
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
+                await self._copy(batch=batch)
+
+    async def _copy(self, batch: list[tuple[Any, ...]]) -> None:
+        pool = self._pool or await get_pool()
+        async with pool.acquire() as connection:
+            await connection.copy_records_to_table(
+                self._table.name,
+                records=batch,
+                columns=self._columns,
+                schema_name=self._table.schema,
+            )
+        _module_logger.debug(
+            msg="{rows} rows have been written to '{table}'.".format(rows=len(batch), table=self._table.fullname),
+        )
+
+    async def _flush_periodically(self) -> None:
+        while True:  # noqa: WPS457
+            await asyncio.sleep(self._flush_interval_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                # The rows stay in the buffer and will be retried on the next flush.
+                _module_logger.exception(
+                    msg="Periodic flush to '{table}' failed.".format(table=self._table.fullname),
+                )
+
+
+def create_task_writer(**kwargs: Any) -> BulkWriter:
+    """Create a bulk writer of `MetadataMan` models or `MetadataRecord` records to the `task` table."""
+    return BulkWriter(
+        table=task_table,
+        columns=('task_id', 'idempotency_key', 'callback_url'),
+        **kwargs,
+    )
+
+
+def create_task_error_writer(**kwargs: Any) -> BulkWriter:
+    """Create a bulk writer of `ErrorSchema` models or `ErrorRecord` records to the `task_error` table."""
+    return BulkWriter(
+        table=task_error_table,
+        columns=('task_id', 'error_name', 'error_message', 'error_source'),
+        **kwargs,
+    )
+
+
+def create_task_callback_writer(**kwargs: Any) -> BulkWriter:
+    """Create a bulk writer of `HTTPResponseStatusCodeSchema` models or records to the `task_callback` table."""
+    return BulkWriter(
+        table=task_callback_table,
+        columns=('task_id', 'callback_url', 'http_response_status_code', 'http_response_status_reason'),
+        **kwargs,
+    )
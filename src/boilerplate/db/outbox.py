@@ -0,0 +1,120 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Transactional outbox.
+
+Events that must reach Kafka are written to the `outbox` table in the same database
+transaction as the state change that produced them. There is no dual write: either both
+the state change and the event are committed, or neither is. The events are published
+later by the outbox relay, see `src/boilerplate/messaging/outbox_relay.py`.
+"""
+
+from typing import Any, Optional, Sequence
+
+import asyncpg
+import orjson
+
+from src.boilerplate.db.tables import outbox_table
+
+
+async def add_outbox_message(
+    connection: asyncpg.Connection,
+    topic: str,
+    payload: dict[str, Any],
+    message_key: Optional[str] = None,
+) -> None:
+    """Add a message to the outbox.
+
+    Call it inside the transaction that changes the state the message is about.
+
+    Args:
+        connection: connection with an open transaction.
+        topic: Kafka topic of the message.
+        payload: message body.
+        message_key: Kafka message key; messages with the same key go to the same partition.
+    """
+    await connection.execute(
+        'INSERT INTO {table} (topic, message_key, payload) VALUES ($1, $2, $3)'.format(
+            table=outbox_table.fullname,
+        ),
+        topic,
+        message_key,
+        orjson.dumps(payload).decode(),
+    )
+
+
+async def add_outbox_messages(
+    connection: asyncpg.Connection,
+    topic: str,
+    payloads: Sequence[dict[str, Any]],
+    message_keys: Sequence[Optional[str]],
+) -> None:
+    """Add several messages to the outbox with a single statement.
+
+    Call it inside the transaction that changes the state the messages are about.
+
+    Args:
+        connection: connection with an open transaction.
+        topic: Kafka topic of the messages.
+        payloads: message bodies.
+        message_keys: Kafka message keys, one per payload.
+    """
+    await connection.execute(
+        (
+            'INSERT INTO {table} (topic, message_key, payload) ' +
+            'SELECT $1, message.message_key, message.payload::jsonb ' +
+            'FROM unnest($2::text[], $3::text[]) WITH ORDINALITY AS message (message_key, payload, position) ' +
+            'ORDER BY message.position'
+        ).format(table=outbox_table.fullname),
+        topic,
+        list(message_keys),
+        [orjson.dumps(payload).decode() for payload in payloads],
+    )
+
+
+async def lock_unsent_messages(connection: asyncpg.Connection, batch_size: int) -> list[asyncpg.Record]:
+    """Select and lock the oldest unsent messages.
+
+    `SKIP LOCKED` makes concurrent relays take disjoint batches instead of waiting for each
+    other. The locks are held until the end of the transaction.
+
+    Args:
+        connection: connection with an open transaction.
+        batch_size: the maximum number of messages.
+
+    Returns:
+        Records with the `id`, `topic`, `message_key` and `payload` fields.
+    """
+    return await connection.fetch(
+        (
+            'SELECT id, topic, message_key, payload FROM {table} ' +
+            'WHERE sent_datetime IS NULL ORDER BY id LIMIT $1 FOR UPDATE SKIP LOCKED'
+        ).format(table=outbox_table.fullname),
+        batch_size,
+    )
+
+
+async def mark_messages_sent(connection: asyncpg.Connection, message_ids: list[int]) -> None:
+    """Mark the messages as sent with a single statement.
+
+    Args:
+        connection: connection with an open transaction.
+        message_ids: `id` values of the sent messages.
+    """
+    await connection.execute(
+        'UPDATE {table} SET sent_datetime = now() WHERE id = ANY($1::bigint[])'.format(
+            table=outbox_table.fullname,
+        ),
+        message_ids,
+    )
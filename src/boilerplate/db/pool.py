@@ -0,0 +1,85 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Database connection pool module.
+
+The `asyncpg` pool is created lazily on the first call to `get_pool`, so the application
+can start even if the database is not reachable yet. Close the pool on shutdown with
+`close_pool`.
+"""
+
+import asyncio
+from typing import Optional
+
+import asyncpg
+
+from src.boilerplate.config import config
+from src.boilerplate.custom_logger import CustomLogger
+
+_module_logger = CustomLogger().get_module_logger(
+    name=__name__,
+    module_extra=None,  # optional data that will be added to each message of this logger
+)
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+
+def get_dsn() -> str:
+    """Get the database DSN.
+
+    `DB_DSN` takes precedence; otherwise the DSN is assembled from the `DB_*` settings.
+
+    Returns:
+        PostgreSQL connection string.
+    """
+    if config.DB_DSN:
+        return str(config.DB_DSN)
+    return '{driver}://{user}:{password}@{host}:{port}/{database}'.format(
+        driver=config.DB_DRIVER,
+        user=config.DB_USER.get_secret_value(),
+        password=config.DB_PASSWORD.get_secret_value(),
+        host=config.DB_HOST,
+        port=config.DB_PORT,
+        database=config.DB_DATABASE,
+    )
+
+
+async def get_pool() -> asyncpg.Pool:
+    """Get the application-wide `asyncpg` connection pool, creating it if necessary."""
+    global _pool  # noqa: WPS420
+
+    if _pool is not None:
+        return _pool
+
+    async with _pool_lock:
+        if _pool is None:
+            _module_logger.debug('Creating the database connection pool...')
+            _pool = await asyncpg.create_pool(  # noqa: WPS442
+                dsn=get_dsn(),
+                min_size=config.DB_POOL_MIN_SIZE,
+                max_size=config.DB_POOL_MAX_SIZE,
+                server_settings={'application_name': config.APP_NAME},
+            )
+    return _pool
+
+
+async def close_pool() -> None:
+    """Close the connection pool if it has been created."""
+    global _pool  # noqa: WPS420
+
+    if _pool is not None:
+        _module_logger.debug('Closing the database connection pool...')
+        await _pool.close()
+        _pool = None  # noqa: WPS442
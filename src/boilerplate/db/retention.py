@@ -0,0 +1,144 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Retention job for the append-only tables.
+
+Task, audit, idempotency and outbox rows are only needed for a limited time. The job
+deletes expired rows in small batches, so that each `DELETE` holds its locks for a short
+time and does not bloat the WAL with one huge transaction. Time-range scans of the
+candidates are served by the BRIN indexes on `created_datetime`.
+
+Retention rules:
+  1. `task`, `task_error`, `task_callback`: rows older than `DB_RETENTION_DAYS`.
+  2. `outbox`: sent messages older than `DB_RETENTION_DAYS`; unsent ones are kept.
+  3. `idempotency_key`: rows whose `expires_datetime` has passed.
+
+Run the job periodically, e.g. from a Kubernetes `CronJob`:
+
+```
+python -m src.boilerplate.db.retention
+```
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Final, Optional
+
+import asyncpg
+
+from src.boilerplate.config import config
+from src.boilerplate.custom_logger import CustomLogger
+from src.boilerplate.db.pool import close_pool, get_pool
+from src.boilerplate.db.tables import (
+    idempotency_key_table,
+    outbox_table,
+    task_callback_table,
+    task_error_table,
+    task_table,
+)
+
+_module_logger = CustomLogger().get_module_logger(
+    name=__name__,
+    module_extra=None,  # optional data that will be added to each message of this logger
+)
+
+# Table, primary key column, expiration condition. `$1` is the retention boundary.
+_RETENTION_RULES: Final[tuple[tuple[str, str, str], ...]] = (
+    (task_table.fullname, 'task_id', 'created_datetime < $1'),
+    (task_error_table.fullname, 'id', 'created_datetime < $1'),
+    (task_callback_table.fullname, 'id', 'created_datetime < $1'),
+    (outbox_table.fullname, 'id', 'created_datetime < $1 AND sent_datetime IS NOT NULL'),
+    (idempotency_key_table.fullname, 'id', 'expires_datetime < now()'),
+)
+
+
+async def purge_table(
+    pool: asyncpg.Pool,
+    table: str,
+    primary_key: str,
+    condition: str,
+    boundary_datetime: datetime,
+    batch_size: int,
+) -> int:
+    """Delete the expired rows of the table in batches.
+
+    Args:
+        pool: `asyncpg` pool.
+        table: full name of the table.
+        primary_key: primary key column of the table.
+        condition: SQL condition of the expired rows.
+        boundary_datetime: rows created before this moment are expired.
+        batch_size: the maximum number of rows deleted by one statement.
+
+    Returns:
+        The number of deleted rows.
+    """
+    # The table, the column and the condition come from `_RETENTION_RULES`, not from user input.
+    delete_query = (
+        'DELETE FROM {table} WHERE {pk} IN ' +
+        '(SELECT {pk} FROM {table} WHERE {condition} LIMIT {batch_size})'
+    ).format(table=table, pk=primary_key, condition=condition, batch_size=batch_size)
+    query_args = (boundary_datetime,) if '$1' in condition else ()
+
+    deleted_rows = 0
+    while True:  # noqa: WPS457
+        command_tag = await pool.execute(delete_query, *query_args)
+        batch_deleted_rows = int(command_tag.split()[-1])
+        deleted_rows += batch_deleted_rows
+        if batch_deleted_rows < batch_size:
+            return deleted_rows
+
+
+async def purge_expired_rows(
+    retention_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> dict[str, int]:
+    """Delete the expired rows of all tables.
+
+    Args:
+        retention_days: retention period; `DB_RETENTION_DAYS` by default.
+        batch_size: the maximum number of rows deleted by one statement.
+
+    Returns:
+        The number of deleted rows per table.
+    """
+    boundary_datetime = datetime.now(tz=timezone.utc) - timedelta(days=retention_days or config.DB_RETENTION_DAYS)
+    pool = await get_pool()
+
+    deleted_rows = {}
+    for table, primary_key, condition in _RETENTION_RULES:
+        deleted_rows[table] = await purge_table(
+            pool=pool,
+            table=table,
+            primary_key=primary_key,
+            condition=condition,
+            boundary_datetime=boundary_datetime,
+            batch_size=batch_size or config.DB_RETENTION_BATCH_SIZE,
+        )
+        _module_logger.info(
+            msg='{rows} expired rows have been deleted from {table}.'.format(rows=deleted_rows[table], table=table),
+        )
+    return deleted_rows
+
+
+async def main() -> None:
+    """Run the retention job once."""
+    try:
+        await purge_expired_rows()
+    finally:
+        await close_pool()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
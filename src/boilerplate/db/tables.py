@@ -0,0 +1,102 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Database table definitions.
+
+The tables are described with SQLAlchemy Core. The definitions are used to build queries
+and as the `target_metadata` of the Alembic migrations, so any change here must be
+accompanied by a migration in `alembic/versions`.
+
+Indexes follow the access patterns of the application:
+  1. Workers pick up pending tasks in creation order: partial index on pending tasks.
+  2. Append-only tables are scanned and purged by time ranges: BRIN indexes on
+     `created_datetime`, which are tiny compared to B-tree indexes.
+  3. Repeated requests are detected by the idempotency key: unique index.
+  4. The outbox relay reads unsent messages in order: partial index on unsent messages.
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+from src.boilerplate.config import config
+from src.boilerplate.schemas.common_schemas import TaskStatus
+
+metadata = sa.MetaData(schema=config.DB_SCHEMA)
+
+task_table = sa.Table(
+    'task',
+    metadata,
+    sa.Column('task_id', sa.BigInteger, primary_key=True),
+    sa.Column('idempotency_key', UUID(as_uuid=True), nullable=False),
+    sa.Column('callback_url', sa.Text, nullable=True),
+    sa.Column('status', sa.Text, nullable=False, server_default=TaskStatus.pending.value),
+    sa.Column('created_datetime', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    sa.Column('updated_datetime', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    sa.Index(
+        'ix_task_pending_created_datetime',
+        'created_datetime',
+        postgresql_where=sa.text("status = '{status}'".format(status=TaskStatus.pending.value)),
+    ),
+    sa.Index('ix_task_created_datetime_brin', 'created_datetime', postgresql_using='brin'),
+)
+
+task_error_table = sa.Table(
+    'task_error',
+    metadata,
+    sa.Column('id', sa.BigInteger, sa.Identity(always=False), primary_key=True),
+    sa.Column('task_id', sa.BigInteger, nullable=True),
+    sa.Column('error_name', sa.Text, nullable=True),
+    sa.Column('error_message', JSONB, nullable=True),
+    sa.Column('error_source', sa.Text, nullable=True),
+    sa.Column('created_datetime', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    sa.Index('ix_task_error_created_datetime_brin', 'created_datetime', postgresql_using='brin'),
+)
+
+task_callback_table = sa.Table(
+    'task_callback',
+    metadata,
+    sa.Column('id', sa.BigInteger, sa.Identity(always=False), primary_key=True),
+    sa.Column('task_id', sa.BigInteger, nullable=False),
+    sa.Column('callback_url', sa.Text, nullable=True),
+    sa.Column('http_response_status_code', sa.Integer, nullable=True),
+    sa.Column('http_response_status_reason', sa.Text, nullable=True),
+    sa.Column('created_datetime', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    sa.Index('ix_task_callback_created_datetime_brin', 'created_datetime', postgresql_using='brin'),
+)
+
+idempotency_key_table = sa.Table(
+    'idempotency_key',
+    metadata,
+    sa.Column('id', sa.BigInteger, sa.Identity(always=False), primary_key=True),
+    sa.Column('idempotency_key', UUID(as_uuid=True), nullable=False),
+    sa.Column('task_id', sa.BigInteger, nullable=True),
+    sa.Column('request_hash', sa.Text, nullable=True),
+    sa.Column('created_datetime', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    sa.Column('expires_datetime', sa.DateTime(timezone=True), nullable=False),
+    sa.Index('uq_idempotency_key_idempotency_key', 'idempotency_key', unique=True),
+    sa.Index('ix_idempotency_key_expires_datetime', 'expires_datetime'),
+)
+
+outbox_table = sa.Table(
+    'outbox',
+    metadata,
+    sa.Column('id', sa.BigInteger, sa.Identity(always=False), primary_key=True),
+    sa.Column('topic', sa.Text, nullable=False),
+    sa.Column('message_key', sa.Text, nullable=True),
+    sa.Column('payload', JSONB, nullable=False),
+    sa.Column('created_datetime', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    sa.Column('sent_datetime', sa.DateTime(timezone=True), nullable=True),
+    sa.Index('ix_outbox_unsent_id', 'id', postgresql_where=sa.text('sent_datetime IS NULL')),
+    sa.Index('ix_outbox_created_datetime_brin', 'created_datetime', postgresql_using='brin'),
+)
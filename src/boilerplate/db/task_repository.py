@@ -0,0 +1,290 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Task repository.
+
+Creates, reads and updates the `task` table. Task status lookups are served through the
+`task_status` read-through cache, since clients poll the task status through the URL from
+the `Location` header. Every status change invalidates the cached value.
+"""
+
+from typing import Optional, Sequence, Union
+from uuid import UUID
+
+import asyncpg
+
+from src.boilerplate.cache import get_cache
+from src.boilerplate.config import config
+from src.boilerplate.db.outbox import add_outbox_message, add_outbox_messages
+from src.boilerplate.db.pool import get_pool
+from src.boilerplate.db.tables import idempotency_key_table, task_table
+from src.boilerplate.errors import TaskConflictError, TaskNotFoundError
+from src.boilerplate.profiling import profile
+from src.boilerplate.schemas.common_schemas import MetadataMan, TaskStateSchema, TaskStatus
+from src.boilerplate.schemas.records import MetadataRecord
+
+task_status_cache = get_cache('task_status')
+
+# Task metadata validated at the API boundary, or its internal record, e.g. of a consumed message.
+TaskMetadata = Union[MetadataMan, MetadataRecord]
+
+
+@profile()
+async def get_task_status(task_id: int) -> Optional[TaskStatus]:
+    """Get the task status.
+
+    Args:
+        task_id: the `id` of the task.
+
+    Returns:
+        The task status or `None` if there is no such task.
+    """
+    async def _select_task_status() -> Optional[TaskStatus]:  # noqa: WPS430
+        pool = await get_pool()
+        task_status = await pool.fetchval(
+            'SELECT status FROM {table} WHERE task_id = $1'.format(table=task_table.fullname),
+            task_id,
+        )
+        return TaskStatus(task_status) if task_status is not None else None
+
+    return await task_status_cache.get_or_compute(key=task_id, compute=_select_task_status)
+
+
+@profile()
+async def set_task_status(task_id: int, task_status: TaskStatus) -> bool:
+    """Update the task status and invalidate its cached value.
+
+    The `task-status-changed` event is added to the outbox in the same transaction, so it
+    is published if and only if the update is committed.
+
+    Args:
+        task_id: the `id` of the task.
+        task_status: new task status.
+
+    Returns:
+        `True` if the task exists and has been updated.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as connection:
+        async with connection.transaction():
+            command_tag = await connection.execute(
+                'UPDATE {table} SET status = $2, updated_datetime = now() WHERE task_id = $1'.format(
+                    table=task_table.fullname,
+                ),
+                task_id,
+                task_status.value,
+            )
+            is_updated = command_tag != 'UPDATE 0'
+            if is_updated:
+                await add_outbox_message(
+                    connection=connection,
+                    topic=config.KAFKA_TASK_EVENTS_TOPIC,
+                    payload={'event': 'task-status-changed', 'task_id': task_id, 'status': task_status.value},
+                    message_key=str(task_id),
+                )
+    task_status_cache.invalidate(key=task_id)
+    return is_updated
+
+
+@profile()
+async def create_task(metadata: MetadataMan) -> TaskStateSchema:
+    """Create a pending task, unless its idempotency key has already been used.
+
+    A repeated request with an unexpired idempotency key does not create a task; the state
+    of the task created by the first request is returned instead. The key, the task and the
+    `task-created` event are written in one transaction.
+
+    Args:
+        metadata: task metadata with the idempotency key.
+
+    Returns:
+        State of the created task, or of the task created with the same idempotency key.
+
+    Raises:
+        TaskConflictError: If the `task_id` belongs to a task with another idempotency key.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as connection:
+        async with connection.transaction():
+            # An expired key is taken over, as if it had already been deleted by the retention job.
+            created_task_id = await connection.fetchval(
+                (
+                    'INSERT INTO {table} AS used_key (idempotency_key, task_id, expires_datetime) ' +
+                    'VALUES ($1, $2, now() + make_interval(secs => $3)) ' +
+                    'ON CONFLICT (idempotency_key) DO UPDATE ' +
+                    'SET task_id = EXCLUDED.task_id, created_datetime = now(), ' +
+                    'expires_datetime = EXCLUDED.expires_datetime ' +
+                    'WHERE used_key.expires_datetime < now() ' +
+                    'RETURNING task_id'
+                ).format(table=idempotency_key_table.fullname),
+                metadata.idempotency_key,
+                metadata.task_id,
+                float(config.APP_IDEMPOTENCY_KEY_VALIDITY_TIME_SECONDS),
+            )
+            if created_task_id is None:
+                return await _get_task_state_by_idempotency_key(connection=connection, metadata=metadata)
+
+            inserted_task_id = await connection.fetchval(
+                (
+                    'INSERT INTO {table} (task_id, idempotency_key, callback_url) VALUES ($1, $2, $3) ' +
+                    'ON CONFLICT (task_id) DO NOTHING RETURNING task_id'
+                ).format(table=task_table.fullname),
+                metadata.task_id,
+                metadata.idempotency_key,
+                None if metadata.callback_url is None else str(metadata.callback_url),
+            )
+            if inserted_task_id is None:
+                # Raised inside the transaction, so the taken idempotency key is rolled back.
+                raise TaskConflictError(
+                    'Task {task_id} belongs to another idempotency key.'.format(task_id=metadata.task_id),
+                )
+            await add_outbox_message(
+                connection=connection,
+                topic=config.KAFKA_TASK_EVENTS_TOPIC,
+                payload={'event': 'task-created', 'task_id': metadata.task_id, 'status': TaskStatus.pending.value},
+                message_key=str(metadata.task_id),
+            )
+    # Drop the cached "not found" of a client that polled before the task was created.
+    task_status_cache.invalidate(key=metadata.task_id)
+    return TaskStateSchema(task_id=metadata.task_id, status=TaskStatus.pending)
+
+
+@profile()
+async def create_tasks(metadata_batch: Sequence[TaskMetadata]) -> list[Optional[TaskStateSchema]]:
+    """Create pending tasks in bulk, with the same idempotency rules as `create_task`.
+
+    The keys, the tasks and the `task-created` events of the whole batch are written in one
+    transaction with a constant number of statements, so redelivered or resent items are
+    answered with the state of the task created the first time instead of failing the batch.
+    An idempotency key repeated within the batch refers to its first item.
+
+    Args:
+        metadata_batch: task metadata or metadata records with the idempotency keys.
+
+    Returns:
+        States of the tasks, in the order of the items. `None` if the item is rejected: its
+        `task_id` belongs to a task (or an earlier item) with another idempotency key, or the
+        task of its idempotency key has been deleted by the retention job.
+    """
+    unique_metadata: dict[UUID, TaskMetadata] = {}
+    batch_task_ids: set[int] = set()
+    for metadata in metadata_batch:
+        if metadata.idempotency_key in unique_metadata or metadata.task_id in batch_task_ids:
+            continue  # a repeated key, or a `task_id` taken by another key of the batch
+        unique_metadata[metadata.idempotency_key] = metadata
+        batch_task_ids.add(metadata.task_id)
+
+    pool = await get_pool()
+    async with pool.acquire() as connection:
+        async with connection.transaction():
+            created_keys = await _insert_idempotency_keys(connection=connection, metadata_batch=unique_metadata)
+            created_metadata = [unique_metadata[idempotency_key] for idempotency_key in created_keys]
+            if created_metadata:
+                await _insert_tasks(connection=connection, metadata_batch=created_metadata)
+            task_states = await _get_task_states_by_idempotency_keys(
+                connection=connection,
+                idempotency_keys=[key for key in unique_metadata if key not in created_keys],
+            )
+
+    for metadata in created_metadata:
+        task_status_cache.invalidate(key=metadata.task_id)
+        task_states[metadata.idempotency_key] = TaskStateSchema(task_id=metadata.task_id, status=TaskStatus.pending)
+    return [task_states.get(metadata.idempotency_key) for metadata in metadata_batch]
+
+
+async def _insert_idempotency_keys(
+    connection: asyncpg.Connection,
+    metadata_batch: dict[UUID, TaskMetadata],
+) -> set[UUID]:
+    # The keys of the `task_id` values that already exist are not taken; `create_task` rejects
+    # them with `TaskConflictError` and rolls the key back.
+    created_keys = await connection.fetch(
+        (
+            'INSERT INTO {table} AS used_key (idempotency_key, task_id, expires_datetime) ' +
+            'SELECT item.idempotency_key, item.task_id, now() + make_interval(secs => $3) ' +
+            'FROM unnest($1::uuid[], $2::bigint[]) AS item (idempotency_key, task_id) ' +
+            'WHERE NOT EXISTS (SELECT 1 FROM {task_table} AS task WHERE task.task_id = item.task_id) ' +
+            'ON CONFLICT (idempotency_key) DO UPDATE ' +
+            'SET task_id = EXCLUDED.task_id, created_datetime = now(), ' +
+            'expires_datetime = EXCLUDED.expires_datetime ' +
+            'WHERE used_key.expires_datetime < now() ' +
+            'RETURNING idempotency_key'
+        ).format(table=idempotency_key_table.fullname, task_table=task_table.fullname),
+        list(metadata_batch),
+        [metadata.task_id for metadata in metadata_batch.values()],
+        float(config.APP_IDEMPOTENCY_KEY_VALIDITY_TIME_SECONDS),
+    )
+    return {created_key['idempotency_key'] for created_key in created_keys}
+
+
+async def _insert_tasks(connection: asyncpg.Connection, metadata_batch: list[TaskMetadata]) -> None:
+    await connection.execute(
+        (
+            'INSERT INTO {table} (task_id, idempotency_key, callback_url) ' +
+            'SELECT * FROM unnest($1::bigint[], $2::uuid[], $3::text[])'
+        ).format(table=task_table.fullname),
+        [metadata.task_id for metadata in metadata_batch],
+        [metadata.idempotency_key for metadata in metadata_batch],
+        [None if metadata.callback_url is None else str(metadata.callback_url) for metadata in metadata_batch],
+    )
+    await add_outbox_messages(
+        connection=connection,
+        topic=config.KAFKA_TASK_EVENTS_TOPIC,
+        payloads=[
+            {'event': 'task-created', 'task_id': metadata.task_id, 'status': TaskStatus.pending.value}
+            for metadata in metadata_batch
+        ],
+        message_keys=[str(metadata.task_id) for metadata in metadata_batch],
+    )
+
+
+async def _get_task_states_by_idempotency_keys(
+    connection: asyncpg.Connection,
+    idempotency_keys: list[UUID],
+) -> dict[UUID, TaskStateSchema]:
+    if not idempotency_keys:
+        return {}
+    task_states = await connection.fetch(
+        (
+            'SELECT used_key.idempotency_key, task.task_id, task.status ' +
+            'FROM {idempotency_key_table} AS used_key ' +
+            'JOIN {task_table} AS task ON task.task_id = used_key.task_id ' +
+            'WHERE used_key.idempotency_key = ANY($1::uuid[])'
+        ).format(idempotency_key_table=idempotency_key_table.fullname, task_table=task_table.fullname),
+        idempotency_keys,
+    )
+    return {
+        task_state['idempotency_key']: TaskStateSchema(task_id=task_state['task_id'], status=task_state['status'])
+        for task_state in task_states
+    }
+
+
+async def _get_task_state_by_idempotency_key(
+    connection: asyncpg.Connection,
+    metadata: MetadataMan,
+) -> TaskStateSchema:
+    task_state = await connection.fetchrow(
+        (
+            'SELECT task.task_id, task.status FROM {idempotency_key_table} AS used_key ' +
+            'JOIN {task_table} AS task ON task.task_id = used_key.task_id ' +
+            'WHERE used_key.idempotency_key = $1'
+        ).format(idempotency_key_table=idempotency_key_table.fullname, task_table=task_table.fullname),
+        metadata.idempotency_key,
+    )
+    if task_state is None:
+        # The task of the key has been deleted by the retention job.
+        raise TaskNotFoundError(
+            'Task of the idempotency key {idempotency_key} not found.'.format(idempotency_key=metadata.idempotency_key),
+        )
+    return TaskStateSchema(task_id=task_state['task_id'], status=task_state['status'])
@@ -0,0 +1,105 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Conversion of exceptions to `ErrorSchema` entries.
+
+Used where the errors of individual items are reported to the client instead of failing
+the whole request, e.g. in batch and streaming endpoints.
+
+Only the known errors are described to the client: validation errors, HTTP exceptions and
+subclasses of `ClientError`. Any other exception may carry internal details, e.g. SQL or
+hostnames, so the client gets a generic message with a reference, and the details are
+logged under the same reference.
+"""
+
+import uuid
+from typing import Any, Final
+
+from pydantic import ValidationError
+from starlette.exceptions import HTTPException
+
+from src.boilerplate.config import config
+from src.boilerplate.custom_logger import CustomLogger
+from src.boilerplate.schemas.common_schemas import ErrorSchema
+
+_module_logger = CustomLogger().get_module_logger(
+    name=__name__,
+    module_extra=None,  # optional data that will be added to each message of this logger
+)
+
+# Validation error details returned to the client: `input` may be the whole item, and
+# `ctx` may hold exception objects.
+_VALIDATION_ERROR_KEYS: Final[tuple[str, ...]] = ('type', 'loc', 'msg')
+
+_INTERNAL_ERROR_NAME: Final[str] = 'InternalError'
+
+
+class ClientError(Exception):
+    """Base class of the domain errors whose messages are written for the client."""
+
+
+class TaskConflictError(ClientError, LookupError):
+    """The task belongs to another idempotency key."""
+
+
+class TaskNotFoundError(ClientError, LookupError):
+    """The task does not exist, e.g. it has been deleted by the retention job."""
+
+
+def get_error_schema(exc: Exception) -> ErrorSchema:
+    """Describe the exception as an `ErrorSchema` entry.
+
+    Args:
+        exc: the exception raised while processing an item.
+
+    Returns:
+        `ErrorSchema` with the exception class name and its details for a known error,
+        or with a generic message and the reference of the logged details otherwise.
+    """
+    error_message: dict[str, Any]
+    if isinstance(exc, ValidationError):
+        validation_errors = exc.errors(include_url=False)
+        error_message = {
+            'errors': [
+                {error_key: error[error_key] for error_key in _VALIDATION_ERROR_KEYS if error_key in error}
+                for error in validation_errors
+            ],
+        }
+    elif isinstance(exc, HTTPException):
+        error_message = {'detail': exc.detail}
+    elif isinstance(exc, ClientError):
+        error_message = {'detail': str(exc)}
+    else:
+        return _get_internal_error_schema(exc)
+    return ErrorSchema(
+        error_name=type(exc).__name__,
+        error_message=error_message,
+        error_source=config.APP_NAME,
+    )
+
+
+def _get_internal_error_schema(exc: Exception) -> ErrorSchema:
+    error_reference = uuid.uuid4().hex
+    _module_logger.error(
+        msg='Item processing failed, error reference {reference}: {exc!r}'.format(reference=error_reference, exc=exc),
+        exc_info=exc,
+    )
+    return ErrorSchema(
+        error_name=_INTERNAL_ERROR_NAME,
+        error_message={
+            'detail': 'The item could not be processed.',
+            'error_reference': error_reference,
+        },
+        error_source=config.APP_NAME,
+    )
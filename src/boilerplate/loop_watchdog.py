@@ -0,0 +1,176 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Watchdog of the event loop lag and of the callbacks blocking the loop.
+
+A blocking call in a coroutine, e.g. a synchronous write or a CPU-heavy validation, stalls
+every request of the worker. `LoopWatchdog` finds such calls in production, where the
+`asyncio` debug mode is too expensive:
+* a heartbeat coroutine sleeps for `LOOP_WATCHDOG_INTERVAL_SECONDS` and records how late it
+  wakes up: the loop lag. The lag is recorded in a `LatencyHistogram` for the percentiles of
+  `get_stats` and in the `event_loop_lag_seconds` histogram of `/metrics`;
+* a daemon thread checks the heartbeat. If the loop has not run the heartbeat for
+  `LOOP_WATCHDOG_SLOW_CALLBACK_SECONDS` beyond its interval, the running callback is blocking
+  the loop: the thread takes the stack of the loop thread, which points at the blocking code,
+  keeps it with the last `LOOP_WATCHDOG_MAX_REPORTS` reports and logs a warning. Warnings are
+  rate limited to one per `LOOP_WATCHDOG_WARNING_INTERVAL_SECONDS`; the number of the
+  suppressed ones is added to the next warning.
+
+The watchdog is started and stopped with the application, see `app.py`.
+"""
+
+import asyncio
+import contextlib
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Final, Optional
+
+from src.boilerplate.config import config
+from src.boilerplate.custom_logger import CustomLogger
+from src.boilerplate.metrics import registry
+from src.boilerplate.profiling import LatencyHistogram
+
+_module_logger = CustomLogger().get_module_logger(
+    name=__name__,
+    module_extra=None,  # optional data that will be added to each message of this logger
+)
+
+_MICROSECONDS_IN_SECOND: Final[int] = 10**6
+_MAX_STACK_DEPTH: Final[int] = 32  # the innermost frames
+
+event_loop_lag_seconds = registry.histogram(
+    name='event_loop_lag_seconds',
+    documentation='Delay of the event loop timers of the worker.',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+event_loop_blocked_total = registry.counter(
+    name='event_loop_blocked_total',
+    documentation='Number of times a callback blocked the event loop longer than the threshold.',
+)
+
+
+class LoopWatchdog(object):
+    """Watchdog of the event loop of the current worker."""
+
+    def __init__(
+        self,
+        interval_seconds: Optional[float] = None,
+        slow_callback_seconds: Optional[float] = None,
+        warning_interval_seconds: Optional[float] = None,
+    ) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            interval_seconds: the period of the heartbeat.
+            slow_callback_seconds: the blocking time that is reported.
+            warning_interval_seconds: the minimum time between two warnings.
+        """
+        self._interval_seconds = config.LOOP_WATCHDOG_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self._slow_callback_seconds = (
+            config.LOOP_WATCHDOG_SLOW_CALLBACK_SECONDS if slow_callback_seconds is None else slow_callback_seconds
+        )
+        self._warning_interval_seconds = (
+            config.LOOP_WATCHDOG_WARNING_INTERVAL_SECONDS if warning_interval_seconds is None else warning_interval_seconds
+        )
+
+        self.lag = LatencyHistogram()
+        self.blocked_reports: deque[dict[str, Any]] = deque(maxlen=config.LOOP_WATCHDOG_MAX_REPORTS)
+
+        self._last_heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task[None]] = None
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._last_warning_time = -float('inf')
+        self._suppressed_warnings = 0
+
+    def start(self) -> None:
+        """Start the heartbeat in the running event loop and the monitor thread."""
+        if self._heartbeat_task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_heartbeat = time.monotonic()
+        self._stop_event.clear()
+        self._heartbeat_task = asyncio.create_task(self._beat(), name='loop-watchdog-heartbeat')
+        self._monitor_thread = threading.Thread(target=self._monitor, name='loop-watchdog', daemon=True)
+        self._monitor_thread.start()
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and the monitor thread."""
+        self._stop_event.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._heartbeat_task
+            self._heartbeat_task = None
+        self._monitor_thread = None
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get the loop lag percentiles and the last reports of the blocking callbacks."""
+        return {
+            'loop_lag': self.lag.get_stats(),
+            'blocked_reports': list(self.blocked_reports),
+        }
+
+    async def _beat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self._interval_seconds)
+            self._last_heartbeat = time.monotonic()
+            lag_seconds = max(loop.time() - started - self._interval_seconds, 0)
+            self.lag.record(int(lag_seconds * _MICROSECONDS_IN_SECOND))
+            event_loop_lag_seconds.observe(lag_seconds)
+
+    def _monitor(self) -> None:
+        reported_heartbeat = None
+        check_interval_seconds = min(self._interval_seconds, self._slow_callback_seconds) / 2
+        while not self._stop_event.wait(check_interval_seconds):
+            last_heartbeat = self._last_heartbeat
+            blocked_seconds = time.monotonic() - last_heartbeat - self._interval_seconds
+            if blocked_seconds >= self._slow_callback_seconds and last_heartbeat != reported_heartbeat:
+                # One report per stall: the heartbeat is updated when the loop runs again.
+                reported_heartbeat = last_heartbeat
+                self._report_blocked_loop(blocked_seconds=blocked_seconds)
+
+    def _report_blocked_loop(self, blocked_seconds: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)  # noqa: WPS437
+        stack = traceback.format_stack(frame, limit=_MAX_STACK_DEPTH) if frame is not None else []
+        event_loop_blocked_total.inc()
+        self.blocked_reports.append({
+            'detected_at': time.time(),
+            'blocked_seconds_at_least': round(blocked_seconds, 3),
+            'stack': [stack_line.rstrip() for stack_line in stack],
+        })
+
+        now = time.monotonic()
+        if now - self._last_warning_time < self._warning_interval_seconds:
+            self._suppressed_warnings += 1
+            return
+        _module_logger.warning(
+            msg='The event loop is blocked for at least {blocked_ms:.0f} ms ({suppressed} similar warnings '
+                'suppressed since the previous one). Stack of the blocking callback:\n{stack}'.format(
+                    blocked_ms=blocked_seconds * 1000,
+                    suppressed=self._suppressed_warnings,
+                    stack=''.join(stack),
+                ),
+        )
+        self._last_warning_time = now
+        self._suppressed_warnings = 0
+
+
+loop_watchdog = LoopWatchdog()
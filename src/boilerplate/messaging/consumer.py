@@ -0,0 +1,288 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Kafka consumer of task messages.
+
+`BatchConsumer` feeds the task engine from a Kafka topic in addition to the HTTP API:
+  1. Messages are fetched in batches with `getmany`, validated with the `MetadataMan`
+     schema and passed to the handler as compact `MetadataRecord` records. Invalid
+     messages are logged and skipped.
+  2. Each partition has its own worker, so batches of one partition are processed in
+     order, while different partitions are processed concurrently. The number of batches
+     processed at the same time is limited by `max_in_flight_batches`.
+  3. Offsets are committed manually, only after the handler has durably processed the
+     batch. A handler error stops the consumer without committing, so the batch is
+     consumed again after restart (at-least-once delivery).
+  4. A partition is paused when `max_pending_batches` of its batches are waiting for
+     processing, and resumed when its worker catches up (backpressure).
+
+The consumer works with any object that implements the used subset of the
+`AIOKafkaConsumer` interface, e.g. a fake broker in tests.
+
+Usage:
+    ```
+    python -m src.boilerplate.messaging.consumer
+    ```
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Optional, Protocol
+
+import pydantic
+from aiokafka import AIOKafkaConsumer, ConsumerRecord, TopicPartition
+from aiokafka.abc import ConsumerRebalanceListener
+
+from src.boilerplate.config import config
+from src.boilerplate.custom_logger import CustomLogger
+from src.boilerplate.db.pool import close_pool
+from src.boilerplate.db.task_repository import create_tasks
+from src.boilerplate.schemas.common_schemas import MetadataMan
+from src.boilerplate.schemas.records import MetadataRecord
+from src.boilerplate.validation_registry import validate_json
+
+_module_logger = CustomLogger().get_module_logger(
+    name=__name__,
+    module_extra=None,  # optional data that will be added to each message of this logger
+)
+
+MessagesHandler = Callable[[list[MetadataRecord]], Awaitable[None]]
+
+
+class KafkaConsumerProtocol(Protocol):
+    """The subset of the `AIOKafkaConsumer` interface used by `BatchConsumer`."""
+
+    async def getmany(
+        self,
+        *partitions: TopicPartition,
+        timeout_ms: int = 0,
+        max_records: Optional[int] = None,
+    ) -> dict[TopicPartition, list[ConsumerRecord]]:  # type: ignore[type-arg]
+        """Fetch records of the assigned partitions."""
+
+    async def commit(self, offsets: Optional[dict[TopicPartition, int]] = None) -> None:
+        """Commit offsets."""
+
+    def pause(self, *partitions: TopicPartition) -> None:
+        """Suspend fetching from the partitions."""
+
+    def resume(self, *partitions: TopicPartition) -> None:
+        """Resume fetching from the partitions."""
+
+    def paused(self) -> set[TopicPartition]:
+        """Get the paused partitions."""
+
+
+class BatchConsumer(object):
+    """Batch consumer with per-partition workers and manual offset commit."""
+
+    def __init__(
+        self,
+        consumer: KafkaConsumerProtocol,
+        handler: MessagesHandler,
+        max_batch_size: Optional[int] = None,
+        fetch_timeout_ms: Optional[int] = None,
+        max_in_flight_batches: Optional[int] = None,
+        max_pending_batches: Optional[int] = None,
+    ) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            consumer: started Kafka consumer with `enable_auto_commit=False`.
+            handler: coroutine function that durably processes a batch of messages.
+            max_batch_size: the maximum number of records fetched by one `getmany` call.
+            fetch_timeout_ms: `getmany` timeout.
+            max_in_flight_batches: the maximum number of batches processed concurrently.
+            max_pending_batches: the number of waiting batches that pauses the partition.
+        """
+        self._consumer = consumer
+        self._handler = handler
+        self._max_batch_size = max_batch_size or config.KAFKA_CONSUMER_MAX_BATCH_SIZE
+        self._fetch_timeout_ms = fetch_timeout_ms or config.KAFKA_CONSUMER_FETCH_TIMEOUT_MS
+        self._max_pending_batches = max_pending_batches or config.KAFKA_CONSUMER_MAX_PENDING_BATCHES_PER_PARTITION
+        self._in_flight = asyncio.Semaphore(max_in_flight_batches or config.KAFKA_CONSUMER_MAX_IN_FLIGHT_BATCHES)
+
+        self._queues: dict[TopicPartition, asyncio.Queue[list[ConsumerRecord]]] = {}  # type: ignore[type-arg]
+        self._workers: dict[TopicPartition, asyncio.Task[None]] = {}
+        self._is_running = False
+
+        self.processed_messages = 0
+        self.invalid_messages = 0
+
+    async def run(self) -> None:
+        """Consume the messages until `stop` is called or the handler fails."""
+        self._is_running = True
+        try:
+            while self._is_running:
+                batches = await self._consumer.getmany(
+                    timeout_ms=self._fetch_timeout_ms,
+                    max_records=self._max_batch_size,
+                )
+                for partition, records in batches.items():
+                    if records:
+                        self._enqueue(partition=partition, records=records)
+                self._raise_worker_error()
+            await self.drain()
+        finally:
+            self._cancel_workers(partitions=list(self._workers))
+
+    def stop(self) -> None:
+        """Stop fetching; the already fetched batches are processed and committed."""
+        self._is_running = False
+
+    async def drain(self, partitions: Optional[list[TopicPartition]] = None) -> None:
+        """Wait until the fetched batches of the partitions are processed and committed.
+
+        Args:
+            partitions: partitions to drain; all partitions by default.
+        """
+        for partition in partitions if partitions is not None else list(self._queues):
+            queue = self._queues.get(partition)
+            worker = self._workers.get(partition)
+            if queue is None or worker is None:
+                continue
+            queue_joined = asyncio.ensure_future(queue.join())
+            # A failed worker never joins its queue.
+            await asyncio.wait({queue_joined, worker}, return_when=asyncio.FIRST_COMPLETED)
+            queue_joined.cancel()
+        self._raise_worker_error()
+
+    async def forget(self, partitions: list[TopicPartition]) -> None:
+        """Drain the partitions and release their workers, e.g. when they are revoked."""
+        await self.drain(partitions=partitions)
+        self._cancel_workers(partitions=partitions)
+
+    def _enqueue(self, partition: TopicPartition, records: list[ConsumerRecord]) -> None:  # type: ignore[type-arg]
+        queue = self._queues.get(partition)
+        if queue is None:
+            queue = asyncio.Queue()
+            self._queues[partition] = queue
+            self._workers[partition] = asyncio.create_task(self._process_partition(partition=partition))
+
+        queue.put_nowait(records)
+        if queue.qsize() >= self._max_pending_batches:
+            self._consumer.pause(partition)
+
+    async def _process_partition(self, partition: TopicPartition) -> None:
+        queue = self._queues[partition]
+        while True:  # noqa: WPS457
+            records = await queue.get()
+            async with self._in_flight:
+                await self._process_batch(partition=partition, records=records)
+            queue.task_done()
+            if queue.qsize() < self._max_pending_batches and partition in self._consumer.paused():
+                self._consumer.resume(partition)
+
+    async def _process_batch(
+        self,
+        partition: TopicPartition,
+        records: list[ConsumerRecord],  # type: ignore[type-arg]
+    ) -> None:
+        messages = []
+        for record in records:
+            try:
+                messages.append(MetadataRecord.from_model(validate_json(MetadataMan, record.value)))
+            except pydantic.ValidationError as exc:
+                self.invalid_messages += 1
+                _module_logger.warning(
+                    msg='Invalid message skipped: {topic}[{partition}]@{offset}: {errors}'.format(
+                        topic=partition.topic,
+                        partition=partition.partition,
+                        offset=record.offset,
+                        errors=exc.errors(),
+                    ),
+                )
+
+        if messages:
+            await self._handler(messages)
+        await self._consumer.commit({partition: records[-1].offset + 1})
+        self.processed_messages += len(messages)
+
+    def _raise_worker_error(self) -> None:
+        for worker in self._workers.values():
+            if worker.done() and not worker.cancelled() and worker.exception() is not None:
+                raise worker.exception()  # type: ignore[misc]
+
+    def _cancel_workers(self, partitions: list[TopicPartition]) -> None:
+        for partition in partitions:
+            worker = self._workers.pop(partition, None)
+            if worker is not None:
+                worker.cancel()
+            self._queues.pop(partition, None)
+
+
+class DrainingRebalanceListener(ConsumerRebalanceListener):  # type: ignore[misc]
+    """Commit the processed batches of the revoked partitions before the rebalance."""
+
+    def __init__(self, batch_consumer: BatchConsumer) -> None:
+        """Perform custom instantiation of the class."""
+        self._batch_consumer = batch_consumer
+
+    async def on_partitions_revoked(self, revoked: set[TopicPartition]) -> None:
+        """Process and commit the already fetched batches of the revoked partitions."""
+        await self._batch_consumer.forget(partitions=list(revoked))
+
+    async def on_partitions_assigned(self, assigned: set[TopicPartition]) -> None:
+        """Do nothing: the workers are created on the first fetched batch."""
+
+
+def create_kafka_consumer(**kwargs: Any) -> AIOKafkaConsumer:
+    """Create a Kafka consumer with manual offset commit."""
+    return AIOKafkaConsumer(
+        bootstrap_servers=config.KAFKA_BOOTSTRAP_SERVERS,
+        group_id=config.KAFKA_CONSUMER_GROUP_ID,
+        client_id=config.APP_NAME,
+        enable_auto_commit=False,
+        auto_offset_reset='earliest',
+        max_poll_records=config.KAFKA_CONSUMER_MAX_BATCH_SIZE,
+        **kwargs,
+    )
+
+
+async def persist_tasks(messages: list[MetadataRecord]) -> None:
+    """Durably create the received tasks.
+
+    The tasks are created idempotently with `create_tasks`, so a batch consumed again after
+    a restart or a rebalance does not fail on the existing tasks. Messages that cannot be
+    created, e.g. with a `task_id` of another idempotency key, are logged and skipped.
+    """
+    task_states = await create_tasks(messages)
+    for message, task_state in zip(messages, task_states):
+        if task_state is None:
+            _module_logger.warning(
+                msg='Task message rejected: task_id {task_id}, idempotency_key {idempotency_key}.'.format(
+                    task_id=message.task_id,
+                    idempotency_key=message.idempotency_key,
+                ),
+            )
+
+
+async def main() -> None:
+    """Consume the task topic until the process is stopped."""
+    kafka_consumer = create_kafka_consumer()
+    batch_consumer = BatchConsumer(consumer=kafka_consumer, handler=persist_tasks)
+    kafka_consumer.subscribe(
+        topics=[config.KAFKA_TASK_TOPIC],
+        listener=DrainingRebalanceListener(batch_consumer=batch_consumer),
+    )
+
+    await kafka_consumer.start()
+    try:
+        await batch_consumer.run()
+    finally:
+        await kafka_consumer.stop()
+        await close_pool()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Transactional outbox relay.
+
+`OutboxRelay` publishes the messages of the `outbox` table to Kafka in the background, so
+the request path never waits for a synchronous Kafka send. Each iteration:
+  1. Opens a transaction and locks up to `batch_size` unsent messages with
+     `FOR UPDATE SKIP LOCKED`.
+  2. Sends all of them to the producer without waiting, then waits for all broker acks.
+  3. Marks the whole batch as sent with one `UPDATE` and commits.
+
+Several relay processes can run in parallel: `SKIP LOCKED` gives them disjoint batches.
+Note that with more than one relay, messages with the same key may be published out of
+order across batches.
+
+Delivery is at-least-once: if the process dies after the acks but before the commit, the
+batch is published again. The producer is idempotent (`enable_idempotence=True`,
+`acks='all'`), so its internal retries do not produce duplicates.
+
+Usage:
+    ```
+    python -m src.boilerplate.messaging.outbox_relay
+    ```
+"""
+
+import asyncio
+from typing import Any, Optional
+
+import asyncpg
+from aiokafka import AIOKafkaProducer
+
+from src.boilerplate.config import config
+from src.boilerplate.custom_logger import CustomLogger
+from src.boilerplate.db.outbox import lock_unsent_messages, mark_messages_sent
+from src.boilerplate.db.pool import close_pool, get_pool
+
+_module_logger = CustomLogger().get_module_logger(
+    name=__name__,
+    module_extra=None,  # optional data that will be added to each message of this logger
+)
+
+
+class OutboxRelay(object):
+    """Background publisher of the outbox messages to Kafka."""
+
+    def __init__(
+        self,
+        producer: AIOKafkaProducer,
+        pool: Optional[asyncpg.Pool] = None,
+        batch_size: Optional[int] = None,
+        poll_interval_seconds: Optional[float] = None,
+    ) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            producer: started Kafka producer.
+            pool: `asyncpg` pool; the application-wide pool is used by default.
+            batch_size: the maximum number of messages published in one transaction.
+            poll_interval_seconds: pause after an iteration that found no messages.
+        """
+        self._producer = producer
+        self._pool = pool
+        self._batch_size = batch_size or config.OUTBOX_RELAY_BATCH_SIZE
+        self._poll_interval_seconds = poll_interval_seconds or config.OUTBOX_RELAY_POLL_INTERVAL_SECONDS
+        self._is_running = False
+
+        self.published_messages = 0
+
+    async def run(self) -> None:
+        """Publish the outbox messages until `stop` is called."""
+        self._is_running = True
+        while self._is_running:
+            try:
+                published_messages = await self.publish_batch()
+            except Exception:
+                # The batch stays unsent and is taken again on the next iteration.
+                _module_logger.exception(msg='Failed to publish the outbox batch.')
+                published_messages = 0
+            if published_messages < self._batch_size:
+                await asyncio.sleep(self._poll_interval_seconds)
+
+    def stop(self) -> None:
+        """Stop after the current iteration."""
+        self._is_running = False
+
+    async def publish_batch(self) -> int:
+        """Publish one batch of the unsent messages.
+
+        Returns:
+            The number of published messages.
+        """
+        pool = self._pool or await get_pool()
+        async with pool.acquire() as connection:
+            async with connection.transaction():
+                messages = await lock_unsent_messages(connection=connection, batch_size=self._batch_size)
+                if not messages:
+                    return 0
+
+                # `send` only appends the message to the producer's batch; the returned
+                # futures are resolved when the broker acknowledges the messages.
+                delivery_futures = [
+                    await self._producer.send(
+                        message['topic'],
+                        value=message['payload'].encode(),
+                        key=message['message_key'].encode() if message['message_key'] is not None else None,
+                    )
+                    for message in messages
+                ]
+                await asyncio.gather(*delivery_futures)
+
+                await mark_messages_sent(connection=connection, message_ids=[message['id'] for message in messages])
+
+        self.published_messages += len(messages)
+        _module_logger.debug(msg='{count} outbox messages have been published.'.format(count=len(messages)))
+        return len(messages)
+
+
+def create_kafka_producer(**kwargs: Any) -> AIOKafkaProducer:
+    """Create an idempotent Kafka producer."""
+    return AIOKafkaProducer(
+        bootstrap_servers=config.KAFKA_BOOTSTRAP_SERVERS,
+        client_id=config.APP_NAME,
+        enable_idempotence=True,
+        acks='all',
+        linger_ms=config.KAFKA_PRODUCER_LINGER_MS,
+        **kwargs,
+    )
+
+
+async def main() -> None:
+    """Relay the outbox messages until the process is stopped."""
+    producer = create_kafka_producer()
+    await producer.start()
+    try:
+        await OutboxRelay(producer=producer).run()
+    finally:
+        await producer.stop()
+        await close_pool()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,642 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""In-process metrics in the Prometheus text format.
+
+`registry` holds counters, gauges and fixed-bucket histograms with labels. The values are
+aggregated per thread: each thread updates only its own cell of a metric, without locks,
+and the cells are summed when the metrics are collected.
+
+`MetricsMiddleware` records for each request, by method and route template (not the raw
+path, to keep the number of series bounded):
+
+* `http_requests_total`, by status code as well;
+* `http_request_duration_seconds`;
+* `http_response_size_bytes`, as sent, i.e. after compression;
+* `http_requests_in_flight`.
+
+`render_metrics` returns the text for the `/metrics` endpoint. With several worker
+processes, each one has its own registry, and a scrape reaches only one of them; so if
+`METRICS_MULTIPROCESS_DIR` is set, every worker writes its snapshot to a file of the
+directory periodically and before rendering, and `render_metrics` merges the snapshots of
+all workers.
+
+A snapshot file is named by the PID and the start time of the worker, so a restarted
+worker that gets the PID of an exited one does not overwrite its snapshot. Counters and
+histograms of exited workers are merged into one archived snapshot and their files are
+removed, so the totals do not go back and the directory does not grow; gauges of exited
+workers are dropped.
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import functools
+import math
+import os
+import uuid
+from bisect import bisect_left
+from pathlib import Path
+from threading import get_ident
+from time import perf_counter_ns
+from typing import Any, Callable, Final, Iterable, Iterator, Optional, Sequence
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.boilerplate.config import config
+from src.boilerplate.custom_logger import CustomLogger
+
+_module_logger = CustomLogger().get_module_logger(
+    name=__name__,
+    module_extra=None,  # optional data that will be added to each message of this logger
+)
+
+PROMETHEUS_CONTENT_TYPE: Final[str] = 'text/plain; version=0.0.4; charset=utf-8'
+
+_NANOSECONDS_IN_SECOND: Final[float] = 1e9
+
+_UNMATCHED_ROUTE: Final[str] = '<unmatched>'
+
+_WORKER_SNAPSHOT_PREFIX: Final[str] = 'worker-'
+_ARCHIVE_FILE_NAME: Final[str] = 'archive.json'
+_LOCK_FILE_NAME: Final[str] = '.lock'
+# The index of the start time among the fields of `/proc/<pid>/stat` after the command name.
+_START_TIME_FIELD_IDX: Final[int] = 19
+
+# Labels of a series, in the order of the label names of the metric.
+LabelValues = tuple[str, ...]
+# Metrics by name, in the JSON-serializable form of `MetricsRegistry.collect`.
+Snapshot = dict[str, dict[str, Any]]
+
+
+class Series(object):
+    """Values of one labelled series of a metric.
+
+    Each thread updates its own cell, a list of floats, so updates need no lock; the cells
+    are summed by `collect`.
+    """
+
+    __slots__ = ('_cell_size', '_thread_cells')
+
+    def __init__(self, cell_size: int) -> None:
+        """Perform custom instantiation of the class."""
+        self._cell_size = cell_size
+        self._thread_cells: dict[int, list[float]] = {}
+
+    def get_cell(self) -> list[float]:
+        """Get the cell of the current thread."""
+        cell = self._thread_cells.get(get_ident())
+        if cell is None:
+            cell = self._thread_cells.setdefault(get_ident(), _get_zero_cell(self._cell_size))
+        return cell
+
+    def collect(self) -> list[float]:
+        """Sum the cells of the threads."""
+        summed_cell = _get_zero_cell(self._cell_size)
+        for cell in list(self._thread_cells.values()):
+            _add_cell(summed_cell, cell)
+        return summed_cell
+
+
+class CounterSeries(Series):
+    """Series of a counter or a gauge."""
+
+    __slots__ = ()
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the value."""
+        self.get_cell()[0] += amount
+
+
+class HistogramSeries(Series):
+    """Series of a histogram; the cell holds the bucket counts, the `+Inf` bucket count and the sum."""
+
+    __slots__ = ('_upper_bounds', '_sum_idx')
+
+    def __init__(self, upper_bounds: tuple[float, ...]) -> None:
+        """Perform custom instantiation of the class."""
+        super().__init__(cell_size=len(upper_bounds) + 2)
+        self._upper_bounds = upper_bounds
+        self._sum_idx = len(upper_bounds) + 1
+
+    def observe(self, observed_value: float) -> None:
+        """Count the value in its bucket."""
+        cell = self.get_cell()
+        cell[bisect_left(self._upper_bounds, observed_value)] += 1
+        cell[self._sum_idx] += observed_value
+
+
+class _Metric(object):
+    metric_type = ''
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._series: dict[LabelValues, Any] = {}
+
+    def labels(self, *label_values: str) -> Any:
+        """Get the series of the label values, in the order of the label names.
+
+        Keep the series to update it without looking it up, e.g. in a hot path.
+
+        Args:
+            label_values: the values of the labels.
+
+        Returns:
+            The series, created if necessary.
+        """
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series.setdefault(label_values, self._create_series())
+        return series
+
+    def collect(self) -> dict[LabelValues, list[float]]:
+        """Get the values of each series."""
+        # A copy: other threads may add series meanwhile.
+        labelled_series = list(self._series.items())
+        return {label_values: series.collect() for label_values, series in labelled_series}
+
+    def _create_series(self) -> Series:
+        return CounterSeries(cell_size=1)
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        """Perform custom instantiation of the class."""
+        super().__init__(name=name, documentation=documentation, label_names=label_names)
+
+    def inc(self, amount: float = 1, label_values: LabelValues = ()) -> None:
+        """Increase the counter of the series."""
+        self.labels(*label_values).inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. the number of requests in flight."""
+
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        """Perform custom instantiation of the class."""
+        super().__init__(name=name, documentation=documentation, label_names=label_names)
+        self._get_value: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1, label_values: LabelValues = ()) -> None:
+        """Increase the gauge of the series."""
+        self.labels(*label_values).inc(amount)
+
+    def dec(self, amount: float = 1, label_values: LabelValues = ()) -> None:
+        """Decrease the gauge of the series."""
+        self.labels(*label_values).inc(-amount)
+
+    def set_function(self, get_value: Callable[[], float]) -> None:
+        """Take the value of the unlabelled gauge from the function when the metrics are collected."""
+        self._get_value = get_value
+
+    def collect(self) -> dict[LabelValues, list[float]]:
+        """Get the values of each series."""
+        if self._get_value is not None:
+            return {(): [float(self._get_value())]}
+        return super().collect()
+
+
+class Histogram(_Metric):
+    """Histogram with fixed bucket upper bounds."""
+
+    metric_type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        label_names: Sequence[str] = (),
+    ) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            name: the metric name.
+            documentation: the `HELP` text.
+            buckets: the upper bounds of the buckets, without `+Inf`.
+            label_names: the names of the labels.
+        """
+        super().__init__(name=name, documentation=documentation, label_names=label_names)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def observe(self, observed_value: float, label_values: LabelValues = ()) -> None:
+        """Count the value in its bucket."""
+        self.labels(*label_values).observe(observed_value)
+
+    def _create_series(self) -> Series:
+        return HistogramSeries(upper_bounds=self.upper_bounds)
+
+
+class MetricsRegistry(object):
+    """Named metrics of the process."""
+
+    def __init__(self) -> None:
+        """Perform custom instantiation of the class."""
+        self._metrics: dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        """Get the named counter, creating it if necessary."""
+        return self._register(Counter(name=name, documentation=documentation, label_names=label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        """Get the named gauge, creating it if necessary."""
+        return self._register(Gauge(name=name, documentation=documentation, label_names=label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        label_names: Sequence[str] = (),
+    ) -> Histogram:
+        """Get the named histogram, creating it if necessary."""
+        return self._register(
+            Histogram(name=name, documentation=documentation, buckets=buckets, label_names=label_names),
+        )
+
+    def collect(self) -> dict[str, dict[str, Any]]:
+        """Get the snapshot of all metrics, in a JSON-serializable form."""
+        return {
+            metric.name: {
+                'type': metric.metric_type,
+                'documentation': metric.documentation,
+                'label_names': list(metric.label_names),
+                'upper_bounds': list(getattr(metric, 'upper_bounds', ())),
+                'series': [list(labelled_cell) for labelled_cell in metric.collect().items()],
+            }
+            for metric in self._metrics.values()
+        }
+
+    def _register(self, metric: Any) -> Any:
+        return self._metrics.setdefault(metric.name, metric)
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    name='http_requests_total',
+    documentation='Number of HTTP requests.',
+    label_names=('method', 'route', 'status'),
+)
+http_request_duration_seconds = registry.histogram(
+    name='http_request_duration_seconds',
+    documentation='Duration of HTTP requests, until the last body chunk is sent.',
+    buckets=config.METRICS_HTTP_DURATION_BUCKETS_SECONDS,
+    label_names=('method', 'route'),
+)
+http_response_size_bytes = registry.histogram(
+    name='http_response_size_bytes',
+    documentation='Size of HTTP response bodies as sent.',
+    buckets=config.METRICS_HTTP_RESPONSE_SIZE_BUCKETS_BYTES,
+    label_names=('method', 'route'),
+)
+http_requests_in_flight = registry.gauge(
+    name='http_requests_in_flight',
+    documentation='Number of HTTP requests being processed.',
+)
+
+
+class MetricsMiddleware(object):
+    """ASGI middleware recording the latency, the response size and the status of the requests."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            app: the wrapped ASGI application.
+        """
+        self.app = app
+        self.requests_in_flight = 0
+        http_requests_in_flight.set_function(lambda: self.requests_in_flight)
+        # Series of the requests by method, endpoint and status, so that a request updates
+        # the metrics without building and looking up the label values.
+        self._request_series: dict[tuple[str, Any, int], tuple[CounterSeries, HistogramSeries, HistogramSeries]] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle the ASGI call."""
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter_ns()
+        response = _ResponseCounter(send)
+        self.requests_in_flight += 1
+        try:  # noqa: WPS501
+            await self.app(scope, receive, response.send)
+        finally:
+            self.requests_in_flight -= 1
+            self._record_request(scope, response=response, started=started)
+
+    def _record_request(self, scope: Scope, response: '_ResponseCounter', started: int) -> None:
+        series_key = (scope['method'], scope.get('endpoint'), response.status)
+        request_series = self._request_series.get(series_key)
+        if request_series is None:
+            request_series = self._create_request_series(scope, series_key=series_key)
+        requests_total, request_duration_seconds, response_size_bytes = request_series
+        requests_total.inc()
+        request_duration_seconds.observe((perf_counter_ns() - started) / _NANOSECONDS_IN_SECOND)
+        response_size_bytes.observe(response.size)
+
+    def _create_request_series(
+        self,
+        scope: Scope,
+        series_key: tuple[str, Any, int],
+    ) -> tuple[CounterSeries, HistogramSeries, HistogramSeries]:
+        # The route template is used, not the raw path: path parameters would create a
+        # series per value. The router puts the matched endpoint into the scope.
+        method, endpoint, response_status = series_key
+        route_path = _find_route_path(scope.get('app'), endpoint=endpoint)
+        request_series = (
+            http_requests_total.labels(method, route_path, str(response_status)),
+            http_request_duration_seconds.labels(method, route_path),
+            http_response_size_bytes.labels(method, route_path),
+        )
+        self._request_series[series_key] = request_series
+        return request_series
+
+
+class _ResponseCounter(object):
+    # Passes the messages of the response through, remembering its status and body size.
+
+    __slots__ = ('_send', 'status', 'size')
+
+    def __init__(self, send: Send) -> None:
+        self._send = send
+        self.status = 500
+        self.size = 0
+
+    async def send(self, message: Message) -> None:
+        if message['type'] == 'http.response.body':
+            self.size += len(message.get('body', b''))
+        elif message['type'] == 'http.response.start':
+            self.status = message['status']
+        await self._send(message)
+
+
+def _find_route_path(app: Any, endpoint: Any) -> str:
+    if endpoint is None:
+        return _UNMATCHED_ROUTE
+    for route in getattr(app, 'routes', ()):
+        # `Mount` routes, e.g. the static files, have the mounted application as the endpoint.
+        route_endpoint = getattr(route, 'endpoint', None) or getattr(route, 'app', None)
+        if endpoint is route_endpoint:
+            route_path = getattr(route, 'path_format', route.path)
+            return str(route_path)
+    return _UNMATCHED_ROUTE
+
+
+def write_snapshot(metrics_dir: Path) -> None:
+    """Write the snapshot of the process registry to the directory, replacing the previous one.
+
+    Args:
+        metrics_dir: the directory shared by the workers.
+    """
+    _write_json(metrics_dir.joinpath(_get_snapshot_name(os.getpid())), registry.collect())
+
+
+def render_metrics() -> str:
+    """Render the metrics of the process, or of all workers, in the Prometheus text format."""
+    metrics_dir = config.METRICS_MULTIPROCESS_DIR
+    if metrics_dir is None:
+        return _render_snapshot(registry.collect())
+    write_snapshot(metrics_dir)
+    with _lock_directory(metrics_dir):
+        return _render_snapshot(_merge_snapshots(_read_snapshots(metrics_dir)))
+
+
+async def write_snapshots_periodically() -> None:
+    """Write the snapshot of the process every `METRICS_MULTIPROCESS_FLUSH_INTERVAL_SECONDS`."""
+    metrics_dir = config.METRICS_MULTIPROCESS_DIR
+    if metrics_dir is None:
+        return
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    while True:
+        try:
+            write_snapshot(metrics_dir)
+        except OSError:
+            _module_logger.exception(msg='Failed to write the metrics snapshot.')
+        await asyncio.sleep(config.METRICS_MULTIPROCESS_FLUSH_INTERVAL_SECONDS)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_snapshot_name(pid: int) -> str:
+    # Without `/proc`, e.g. on macOS, a random suffix keeps the snapshots of the processes with the same PID apart.
+    start_time = _get_process_start_time(pid) or uuid.uuid4().hex
+    return '{prefix}{pid}-{start_time}.json'.format(prefix=_WORKER_SNAPSHOT_PREFIX, pid=pid, start_time=start_time)
+
+
+def _get_process_start_time(pid: int) -> Optional[str]:
+    # The start time of the process in clock ticks after the boot; None without `/proc` or the process.
+    try:
+        process_stat = Path('/proc/{pid}/stat'.format(pid=pid)).read_text()
+    except OSError:
+        return None
+    # The fields after the command name, which is in parentheses and may contain spaces; the start time is the 22nd.
+    return process_stat.rpartition(')')[2].split()[_START_TIME_FIELD_IDX]
+
+
+def _is_worker_alive(snapshot_path: Path) -> bool:
+    pid, _, start_time = snapshot_path.stem.removeprefix(_WORKER_SNAPSHOT_PREFIX).partition('-')
+    process_start_time = _get_process_start_time(int(pid))
+    if process_start_time is None:
+        return _is_process_alive(int(pid))
+    return process_start_time == start_time
+
+
+def _is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextlib.contextmanager
+def _lock_directory(metrics_dir: Path) -> Iterator[None]:
+    # The snapshots are archived and read by one worker at a time, so no scrape counts an
+    # exited worker twice, both in its own snapshot and in the archive.
+    with open(metrics_dir.joinpath(_LOCK_FILE_NAME), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def _read_snapshots(metrics_dir: Path) -> list[Snapshot]:
+    # Must be called with the directory locked.
+    archive = _read_json(metrics_dir.joinpath(_ARCHIVE_FILE_NAME)) or {'metrics': {}, 'archived_snapshots': []}
+    live_snapshots = []
+    exited_snapshots = {}
+    for snapshot_path in metrics_dir.glob('{prefix}*.json'.format(prefix=_WORKER_SNAPSHOT_PREFIX)):
+        # A snapshot archived before its file could be removed is not counted again.
+        if snapshot_path.name in archive['archived_snapshots']:
+            continue
+        snapshot = _read_json(snapshot_path) or {}
+        if _is_worker_alive(snapshot_path):
+            live_snapshots.append(snapshot)
+        else:
+            exited_snapshots[snapshot_path.name] = snapshot
+    if exited_snapshots or archive['archived_snapshots']:
+        archive = _archive_snapshots(metrics_dir, archive=archive, exited_snapshots=exited_snapshots)
+    return [archive['metrics'], *live_snapshots]
+
+
+def _archive_snapshots(
+    metrics_dir: Path,
+    archive: dict[str, Any],
+    exited_snapshots: dict[str, Snapshot],
+) -> dict[str, Any]:
+    exited_metrics = [_drop_gauges(snapshot) for snapshot in exited_snapshots.values()]
+    archive = {
+        'metrics': _merge_snapshots([archive['metrics'], *exited_metrics]),
+        'archived_snapshots': [*archive['archived_snapshots'], *exited_snapshots],
+    }
+    archive_path = metrics_dir.joinpath(_ARCHIVE_FILE_NAME)
+    with contextlib.suppress(OSError):
+        # The names stay in the archive until the files are removed.
+        _write_json(archive_path, archive)
+        for snapshot_name in archive['archived_snapshots']:
+            metrics_dir.joinpath(snapshot_name).unlink(missing_ok=True)
+        archive = {**archive, 'archived_snapshots': []}
+        _write_json(archive_path, archive)
+    return archive
+
+
+def _drop_gauges(snapshot: Snapshot) -> Snapshot:
+    # The gauges of an exited worker describe nothing that still exists.
+    return {
+        metric_name: metric
+        for metric_name, metric in snapshot.items()
+        if metric['type'] != 'gauge'
+    }
+
+
+def _read_json(json_path: Path) -> Optional[Any]:
+    with contextlib.suppress(OSError, orjson.JSONDecodeError):
+        return orjson.loads(json_path.read_bytes())
+    return None
+
+
+def _write_json(json_path: Path, json_content: Any) -> None:
+    temporary_path = json_path.with_suffix('.tmp')
+    temporary_path.write_bytes(orjson.dumps(json_content))
+    # The scrape of another worker reads either the previous or the new file.
+    temporary_path.replace(json_path)
+
+
+def _merge_snapshots(snapshots: Iterable[Snapshot]) -> Snapshot:
+    merged_snapshot: Snapshot = {}
+    for snapshot in snapshots:
+        for metric_name, metric in snapshot.items():
+            merged_snapshot.setdefault(metric_name, {**metric, 'series': {}})
+            _add_series(merged_snapshot[metric_name]['series'], metric['series'])
+    for summed_metric in merged_snapshot.values():
+        summed_metric['series'] = [list(labelled_cell) for labelled_cell in summed_metric['series'].items()]
+    return merged_snapshot
+
+
+def _add_series(summed_series: dict[LabelValues, list[float]], labelled_cells: Iterable[Any]) -> None:
+    for label_values, cell in labelled_cells:
+        summed_cell = summed_series.setdefault(tuple(label_values), _get_zero_cell(len(cell)))
+        _add_cell(summed_cell, cell)
+
+
+def _add_cell(summed_cell: list[float], cell: Sequence[float]) -> None:
+    for value_idx, cell_value in enumerate(cell):
+        summed_cell[value_idx] += cell_value
+
+
+def _get_zero_cell(cell_size: int) -> list[float]:
+    return [float(0)] * cell_size  # noqa: WPS435; the items are numbers, not mutable objects
+
+
+def _render_snapshot(snapshot: Snapshot) -> str:
+    lines = []
+    for metric_name, metric in snapshot.items():
+        lines.extend(_render_metric(metric_name, metric))
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def _render_metric(name: str, metric: dict[str, Any]) -> list[str]:
+    lines = [
+        '# HELP {name} {documentation}'.format(name=name, documentation=metric['documentation']),
+        '# TYPE {name} {type}'.format(name=name, type=metric['type']),
+    ]
+    for label_values, cell in metric['series']:
+        labels = dict(zip(metric['label_names'], label_values))
+        if metric['type'] == 'histogram':
+            lines.extend(_render_histogram_series(name, labels, metric['upper_bounds'], cell))
+        else:
+            lines.append(_render_sample(name, labels, cell[0]))
+    return lines
+
+
+def _render_histogram_series(
+    name: str,
+    labels: dict[str, str],
+    upper_bounds: Sequence[float],
+    cell: list[float],
+) -> list[str]:
+    lines = []
+    cumulative_count = float(0)
+    for upper_bound, bucket_count in zip([*upper_bounds, math.inf], cell):
+        cumulative_count += bucket_count
+        bucket_labels = {**labels, 'le': _render_value(upper_bound)}
+        lines.append(_render_sample(name, bucket_labels, cumulative_count, suffix='_bucket'))
+    # The last value of the cell is the sum of the observed values.
+    lines.append(_render_sample(name, labels, cell[-1], suffix='_sum'))
+    lines.append(_render_sample(name, labels, cumulative_count, suffix='_count'))
+    return lines
+
+
+def _render_sample(name: str, labels: dict[str, str], sample_value: float, suffix: str = '') -> str:
+    return '{name}{suffix}{labels} {value}'.format(
+        name=name,
+        suffix=suffix,
+        labels=_render_labels(labels),
+        value=_render_value(sample_value),
+    )
+
+
+def _render_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ''
+    rendered_labels = ','.join(
+        '{name}="{value}"'.format(name=label_name, value=_escape_label_value(str(label_value)))
+        for label_name, label_value in labels.items()
+    )
+    return '{{{labels}}}'.format(labels=rendered_labels)
+
+
+def _escape_label_value(label_value: str) -> str:
+    escaped_value = label_value.replace('\\', r'\\')
+    return escaped_value.replace('"', r'\"').replace('\n', r'\n')
+
+
+def _render_value(metric_value: float) -> str:
+    if metric_value == math.inf:
+        return '+Inf'
+    elif metric_value == int(metric_value):
+        return str(int(metric_value))
+    return repr(metric_value)
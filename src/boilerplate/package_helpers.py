@@ -18,11 +18,10 @@
 
 """The package contains helper functions and decorators for the Python package."""
 
-import functools
-from time import time_ns
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
 from src.boilerplate.custom_logger import CustomLogger
+from src.boilerplate.profiling import wrap_timed
 
 _module_logger = CustomLogger().get_module_logger(
     name=__name__,
@@ -36,6 +35,10 @@ def calculate_running_time(
 ) -> Callable[..., Any]:
     """Decorator for measuring the execution time of functions with additional arguments.
 
+    Coroutine functions and async generator functions are timed until they finish, not
+    until the coroutine or the generator is created; see `profiling.wrap_timed`. Use
+    `profiling.profile` to aggregate the durations instead of logging each call.
+
     Args:
         stacklevel: keyword argument for `logging.Logger.debug`.
         extra: `extra` dictionary for `CustomLogger`.
@@ -53,21 +56,17 @@ def calculate_running_time(
             decorated function.
 
         """
-        @functools.wraps(func)
-        def wrapper(*args: Any, **kwargs: Any) -> Any:
-            start_datetime = time_ns()
-            func_returning = func(*args, **kwargs)
-            end_datetime = time_ns()
+        def log_running_time(wall_time_ns: int, cpu_time_ns: Optional[int]) -> None:  # noqa: WPS430
             # Convert nanoseconds to milliseconds.
-            running_time = (end_datetime - start_datetime) / (10**6)
+            running_time = wall_time_ns / (10**6)
             _module_logger.debug(
                 msg="'{func_name}' running_time: {running_time} ms.".format(
                     func_name=func.__name__,
                     running_time=running_time,
                 ),
-                stacklevel=stacklevel,
+                stacklevel=stacklevel + 1,  # this function is called by the wrapper
                 extra=extra,
             )
-            return func_returning
-        return wrapper
+
+        return wrap_timed(func, record=log_running_time)
     return actual_decorator
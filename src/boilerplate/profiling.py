@@ -0,0 +1,387 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Timing and profiling of sync functions, coroutine functions and async generators.
+
+`profile` decorates a function and records the duration of each call in a per-function
+`LatencyHistogram`; `get_profiling_stats` returns the percentiles of all profiled
+functions, e.g. for the admin endpoint.
+
+The kind of the function is detected at decoration time:
+
+* sync functions: the duration of the call;
+* coroutine functions: the duration from the call to the result, including the awaited
+  I/O, not just the creation of the coroutine;
+* async generator functions: the time spent inside the generator while producing the
+  items, excluding the time the consumer spends between the items.
+
+With `measure_cpu=True`, the thread CPU time is recorded as well. For coroutines it is
+measured for each step of the coroutine separately, so the CPU time of other tasks running
+while the coroutine waits is not counted. A large wall time with a small CPU time means the
+function waits (I/O, locks, the event loop); a CPU time close to the wall time means it
+computes, and blocks the event loop while doing so.
+
+If `PROFILING_ENABLED` is off, `profile` returns the function itself, so the decorator costs
+nothing at call time.
+
+Example::
+
+    @profile(measure_cpu=True)
+    async def create_tasks(metadata_batch: Sequence[MetadataMan]) -> list[Optional[TaskStateSchema]]:
+        ...
+"""
+
+import functools
+import inspect
+from array import array
+from time import perf_counter_ns, thread_time_ns
+from typing import Any, AsyncIterator, Awaitable, Callable, Final, Generator, Optional, TypeVar
+
+from src.boilerplate.config import config
+
+FuncT = TypeVar('FuncT', bound=Callable[..., Any])
+
+# A callback receiving the wall time and, if measured, the CPU time of a call in nanoseconds.
+TimingRecorder = Callable[[int, Optional[int]], None]
+
+_NANOSECONDS_IN_MICROSECOND: Final[int] = 1000
+_MICROSECONDS_IN_MILLISECOND: Final[float] = 1000.0
+
+# 2 ** 7 sub-buckets per power of two keep the relative error of a value within 1 / 2 ** 6.
+_SUB_BUCKET_BITS: Final[int] = 7
+_SUB_BUCKET_COUNT: Final[int] = 1 << _SUB_BUCKET_BITS
+_SUB_BUCKET_HALF_COUNT: Final[int] = _SUB_BUCKET_COUNT >> 1
+
+_HIGHEST_TRACKABLE_MICROSECONDS: Final[int] = 60 * 60 * 1000 * 1000  # an hour
+_REPORTED_PERCENTILES: Final[tuple[float, ...]] = (50, 90, 99, 99.9)
+
+
+def _get_bucket_index(duration: int) -> int:
+    if duration < _SUB_BUCKET_COUNT:
+        return duration
+    exponent = duration.bit_length() - _SUB_BUCKET_BITS
+    return exponent * _SUB_BUCKET_HALF_COUNT + (duration >> exponent)
+
+
+def _get_bucket_value(bucket_index: int) -> int:
+    # The middle of the value range of the bucket.
+    if bucket_index < _SUB_BUCKET_COUNT:
+        return bucket_index
+    exponent, sub_bucket_index = divmod(bucket_index - _SUB_BUCKET_COUNT, _SUB_BUCKET_HALF_COUNT)
+    exponent += 1
+    return ((sub_bucket_index + _SUB_BUCKET_HALF_COUNT) << exponent) + (1 << (exponent - 1))
+
+
+_BUCKET_COUNT: Final[int] = _get_bucket_index(_HIGHEST_TRACKABLE_MICROSECONDS) + 1
+
+
+class LatencyHistogram(object):
+    """Histogram of durations in microseconds with log-linear buckets, like HdrHistogram.
+
+    Values up to 127 µs are counted exactly; larger values go to one of 64 buckets per power
+    of two, so the relative error of a percentile is below 1.6%. The memory is fixed: about
+    14 KB for values up to an hour, regardless of the number of recorded values. Larger
+    values are counted as an hour.
+    """
+
+    def __init__(self) -> None:
+        """Perform custom instantiation of the class."""
+        self._counts = array('Q', bytes(8 * _BUCKET_COUNT))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, duration: int) -> None:
+        """Record a duration in microseconds."""
+        duration = min(max(duration, 0), _HIGHEST_TRACKABLE_MICROSECONDS)
+        self._counts[_get_bucket_index(duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def get_percentile(self, percentile: float) -> int:
+        """Get the value below or at which the given percentage of the values lie.
+
+        Args:
+            percentile: the percentage, from 0 to 100.
+
+        Returns:
+            The value in microseconds, 0 if nothing has been recorded.
+        """
+        rank = max(1, round(percentile / 100 * self.count))
+        seen_values = 0
+        for bucket_index, bucket_count in enumerate(self._counts):
+            seen_values += bucket_count
+            if seen_values >= rank:
+                return min(_get_bucket_value(bucket_index), self.max)
+        return 0
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get the count, the mean, the max and the percentiles in milliseconds."""
+        histogram_stats: dict[str, Any] = {
+            'count': self.count,
+            'mean_ms': self.total / max(self.count, 1) / _MICROSECONDS_IN_MILLISECOND,
+            'max_ms': self.max / _MICROSECONDS_IN_MILLISECOND,
+        }
+        for percentile in _REPORTED_PERCENTILES:
+            histogram_stats['p{percentile:g}_ms'.format(percentile=percentile)] = (
+                self.get_percentile(percentile) / _MICROSECONDS_IN_MILLISECOND
+            )
+        return histogram_stats
+
+    def reset(self) -> None:
+        """Remove all recorded values."""
+        self._counts = array('Q', bytes(8 * len(self._counts)))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+class FunctionProfile(object):
+    """Wall and CPU time histograms and the error count of a profiled function."""
+
+    def __init__(self, measure_cpu: bool) -> None:
+        """Perform custom instantiation of the class."""
+        self.wall_time = LatencyHistogram()
+        self.cpu_time: Optional[LatencyHistogram] = LatencyHistogram() if measure_cpu else None
+        self.errors = 0
+
+    def record(self, wall_time_ns: int, cpu_time_ns: Optional[int]) -> None:
+        """Record the wall time and the CPU time of a call in nanoseconds."""
+        self.wall_time.record(wall_time_ns // _NANOSECONDS_IN_MICROSECOND)
+        if self.cpu_time is not None and cpu_time_ns is not None:
+            self.cpu_time.record(cpu_time_ns // _NANOSECONDS_IN_MICROSECOND)
+
+    def record_error(self) -> None:
+        """Count a call that has raised an exception."""
+        self.errors += 1
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get the statistics of the wall time, the CPU time and the errors."""
+        profile_stats: dict[str, Any] = {'errors': self.errors, 'wall_time': self.wall_time.get_stats()}
+        if self.cpu_time is not None:
+            profile_stats['cpu_time'] = self.cpu_time.get_stats()
+        return profile_stats
+
+
+_profiles: dict[str, FunctionProfile] = {}
+
+
+def get_profiling_stats() -> dict[str, dict[str, Any]]:
+    """Get the statistics of all profiled functions of the current worker."""
+    return {name: function_profile.get_stats() for name, function_profile in _profiles.items()}
+
+
+def reset_profiling_stats() -> None:
+    """Remove the recorded values of all profiled functions."""
+    for function_profile in _profiles.values():
+        function_profile.wall_time.reset()
+        if function_profile.cpu_time is not None:
+            function_profile.cpu_time.reset()
+        function_profile.errors = 0
+
+
+def profile(
+    name: Optional[str] = None,
+    measure_cpu: bool = False,
+    enabled: Optional[bool] = None,
+) -> Callable[[FuncT], FuncT]:
+    """Decorator recording the durations of the calls in the histograms of the function.
+
+    Args:
+        name: the name of the statistics; by default, the qualified name of the function.
+        measure_cpu: record the thread CPU time as well.
+        enabled: profile the function; by default, `PROFILING_ENABLED`. If False, the function is returned as is.
+
+    Returns:
+        The decorator.
+    """
+    is_enabled = config.PROFILING_ENABLED if enabled is None else enabled
+
+    def decorator(func: FuncT) -> FuncT:  # noqa: WPS430
+        if not is_enabled:
+            return func
+        profile_name = name or '{module}.{qualname}'.format(module=func.__module__, qualname=func.__qualname__)
+        function_profile = _profiles.setdefault(profile_name, FunctionProfile(measure_cpu=measure_cpu))
+        return wrap_timed(
+            func,
+            record=function_profile.record,
+            measure_cpu=measure_cpu,
+            on_error=function_profile.record_error,
+        )
+
+    return decorator
+
+
+def wrap_timed(
+    func: FuncT,
+    record: TimingRecorder,
+    measure_cpu: bool = False,
+    on_error: Optional[Callable[[], None]] = None,
+) -> FuncT:
+    """Wrap a sync function, a coroutine function or an async generator function with timing.
+
+    Args:
+        func: the wrapped function.
+        record: the callback receiving the wall and the CPU time of each call in nanoseconds; see `TimingRecorder`.
+        measure_cpu: measure the thread CPU time as well.
+        on_error: the callback called when the call raises an exception.
+
+    Returns:
+        The wrapped function.
+    """
+    error_callback = on_error or _ignore_error
+    if inspect.isasyncgenfunction(func):
+        return _wrap_async_generator_function(func, record=record, measure_cpu=measure_cpu, on_error=error_callback)
+    elif inspect.iscoroutinefunction(func):
+        return _wrap_coroutine_function(func, record=record, measure_cpu=measure_cpu, on_error=error_callback)
+    return _wrap_function(func, record=record, measure_cpu=measure_cpu, on_error=error_callback)
+
+
+def _ignore_error() -> None:
+    """Do nothing: the default `on_error` callback of `wrap_timed`."""
+
+
+def _wrap_function(
+    func: FuncT,
+    record: TimingRecorder,
+    measure_cpu: bool,
+    on_error: Callable[[], None],
+) -> FuncT:
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: WPS430
+        cpu_started = thread_time_ns() if measure_cpu else None
+        started = perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            on_error()
+            raise
+        finally:
+            record(perf_counter_ns() - started, _get_cpu_time_since(cpu_started))
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _wrap_coroutine_function(
+    func: FuncT,
+    record: TimingRecorder,
+    measure_cpu: bool,
+    on_error: Callable[[], None],
+) -> FuncT:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: WPS430
+        durations = _Durations(measure_cpu=measure_cpu)
+        started = perf_counter_ns()
+        try:
+            return await durations.measure_cpu(func(*args, **kwargs))
+        except Exception:
+            on_error()
+            raise
+        finally:
+            record(perf_counter_ns() - started, durations.measured_cpu)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _wrap_async_generator_function(
+    func: FuncT,
+    record: TimingRecorder,
+    measure_cpu: bool,
+    on_error: Callable[[], None],
+) -> FuncT:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:  # noqa: WPS430
+        durations = _Durations(measure_cpu=measure_cpu)
+        async_generator = func(*args, **kwargs)
+        try:
+            async for produced in _TimedAsyncIterator(async_generator, durations=durations):
+                yield produced
+        except Exception:
+            on_error()
+            raise
+        finally:
+            await async_generator.aclose()
+            record(durations.wall, durations.measured_cpu)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _get_cpu_time_since(cpu_started: Optional[int]) -> Optional[int]:
+    return None if cpu_started is None else thread_time_ns() - cpu_started
+
+
+class _Durations(object):
+    __slots__ = ('wall', 'cpu', '_measure_cpu')
+
+    def __init__(self, measure_cpu: bool) -> None:
+        self.wall = 0
+        self.cpu = 0
+        self._measure_cpu = measure_cpu
+
+    @property
+    def measured_cpu(self) -> Optional[int]:
+        return self.cpu if self._measure_cpu else None
+
+    def measure_cpu(self, awaitable: Awaitable[Any]) -> Awaitable[Any]:
+        return _CPUTimedAwaitable(awaitable, durations=self) if self._measure_cpu else awaitable
+
+
+class _TimedAsyncIterator(object):
+    # Times the production of each item of the generator, not the time the consumer spends between the items.
+
+    def __init__(self, async_generator: AsyncIterator[Any], durations: _Durations) -> None:
+        self._async_generator = async_generator
+        self._durations = durations
+
+    def __aiter__(self) -> '_TimedAsyncIterator':
+        return self
+
+    async def __anext__(self) -> Any:
+        started = perf_counter_ns()
+        try:  # noqa: WPS501
+            return await self._durations.measure_cpu(anext(self._async_generator))
+        finally:
+            self._durations.wall += perf_counter_ns() - started
+
+
+class _CPUTimedAwaitable(object):
+    # Drives the coroutine step by step and adds the thread CPU time of each step; the time
+    # between the steps belongs to other tasks.
+
+    def __init__(self, coroutine: Awaitable[Any], durations: _Durations) -> None:
+        self._coroutine = coroutine
+        self._durations = durations
+
+    def __await__(self) -> Generator[Any, Any, Any]:  # noqa: WPS231, WPS611
+        coroutine: Any = self._coroutine
+        send_value: Any = None
+        thrown_exc: Optional[BaseException] = None
+        while True:
+            step_started = thread_time_ns()
+            try:
+                if thrown_exc is None:
+                    yielded_value = coroutine.send(send_value)
+                else:
+                    yielded_value = coroutine.throw(thrown_exc)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self._durations.cpu += thread_time_ns() - step_started
+            try:
+                send_value = yield yielded_value
+            except BaseException as exc:  # noqa: WPS424; forwarded to the coroutine, e.g. `CancelledError`
+                send_value, thrown_exc = None, exc
+            else:
+                thrown_exc = None
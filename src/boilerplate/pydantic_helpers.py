@@ -18,9 +18,23 @@
 
 """The module contains helper tools for validating and transforming Pydantic model data."""
 
-from typing import Any, Callable, Optional
+import re
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Final, Optional
 
 import orjson
+from pydantic import AnyUrl, BaseModel, SecretBytes, SecretStr
+
+# `orjson` serializes `dataclasses`, `datetime`, `enum`, `UUID` natively;
+# `numpy` arrays and non-`str` dict keys require the options.
+ORJSON_OPTIONS: Final[int] = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Payload keys come from a small set of field names, so the cache stays warm.
+_CONVERTED_KEYS_CACHE_SIZE: Final[int] = 4096
+
+_CAMEL_ACRONYM_BOUNDARY_PATTERN: Final[re.Pattern[str]] = re.compile('([A-Z]+)([A-Z][a-z])')
+_CAMEL_WORD_BOUNDARY_PATTERN: Final[re.Pattern[str]] = re.compile('([a-z0-9])([A-Z])')
 
 
 def replace_empty_values_to_none(checked_value: Any) -> Any:
@@ -36,6 +50,43 @@ def replace_empty_values_to_none(checked_value: Any) -> Any:
     return checked_value
 
 
+def replace_empty_values_to_none_nested(payload: Any) -> Any:
+    """Apply `replace_empty_values_to_none` to every value of a nested payload.
+
+    Dictionaries and lists are walked iteratively with an explicit stack, so deep payloads
+    do not hit the recursion limit. The payload is not modified; the cleaned copy is
+    returned. A container is replaced with None only if it is empty in the payload, e.g.
+    `{'a': ['']}` becomes `{'a': [None]}`.
+
+    Args:
+        payload: JSON-like value, e.g. a request body parsed with `orjson.loads`.
+
+    Returns:
+        Cleaned copy of the payload.
+    """
+    cleaned_payload = _copy_container_shell(replace_empty_values_to_none(payload))
+    stack = [(payload, cleaned_payload)]
+    while stack:
+        source, target = stack.pop()
+        if not isinstance(target, (list, dict)):
+            continue
+        items = source.items() if isinstance(source, dict) else enumerate(source)
+        for key, child_value in items:
+            cleaned_child = _copy_container_shell(replace_empty_values_to_none(child_value))
+            target[key] = cleaned_child
+            stack.append((child_value, cleaned_child))
+    return cleaned_payload
+
+
+def _copy_container_shell(checked_value: Any) -> Any:
+    # Containers get an empty shell of the same size, filled in by the walk.
+    if isinstance(checked_value, dict):
+        return {}
+    elif isinstance(checked_value, list):
+        return [None] * len(checked_value)
+    return checked_value
+
+
 def orjson_dumps(processed_value: Any, *, default: Optional[Callable[[Any], Any]]) -> Any:
     """Make `orjson` (de)serialisation.
 
@@ -48,9 +99,34 @@ def orjson_dumps(processed_value: Any, *, default: Optional[Callable[[Any], Any]
     return orjson.dumps(processed_value, default=default).decode()
 
 
+def orjson_default(serialized_value: Any) -> Any:
+    """Serialize the types that `orjson` does not support natively.
+
+    Use it as the `default` argument of `orjson.dumps`.
+
+    Raises:
+        TypeError: If the type of the value is not supported.
+    """
+    if isinstance(serialized_value, BaseModel):
+        return serialized_value.model_dump()
+    elif isinstance(serialized_value, AnyUrl):
+        return str(serialized_value)
+    elif isinstance(serialized_value, (SecretStr, SecretBytes)):
+        return str(serialized_value)  # masked value, e.g. '**********'
+    elif isinstance(serialized_value, (set, frozenset)):
+        return list(serialized_value)
+    elif isinstance(serialized_value, Decimal):
+        return str(serialized_value)
+    raise TypeError('Type is not JSON serializable: {type_name}'.format(type_name=type(serialized_value).__name__))
+
+
+@lru_cache(maxsize=_CONVERTED_KEYS_CACHE_SIZE)
 def convert_str_snake_to_camel(snake_str: str) -> str:
     """Convert string 'snake_case' to 'camelCase'.
 
+    Results are memoized in a bounded LRU cache, since the same keys are converted
+    over and over, e.g. by an alias generator or by `convert_keys_snake_to_camel`.
+
     Args:
         snake_str: Snake case string, e.g. 'birth_date' or '_birth_date'.
 
@@ -62,3 +138,66 @@ def convert_str_snake_to_camel(snake_str: str) -> str:
     # We capitalize the first letter of each component except the first one
     # with the `title` method and join them together.
     return components[0] + ''.join(component.title() for component in components[1:])  # noqa: WPS221
+
+
+@lru_cache(maxsize=_CONVERTED_KEYS_CACHE_SIZE)
+def convert_str_camel_to_snake(camel_str: str) -> str:
+    """Convert string 'camelCase' to 'snake_case'.
+
+    Results are memoized in a bounded LRU cache, like in `convert_str_snake_to_camel`.
+
+    Args:
+        camel_str: Camel case string, e.g. 'birthDate' or 'httpURLPath'.
+
+    Returns:
+        Snake case string, e.g. 'birth_date' or 'http_url_path'.
+
+    """
+    snake_str = _CAMEL_ACRONYM_BOUNDARY_PATTERN.sub(r'\1_\2', camel_str)
+    return _CAMEL_WORD_BOUNDARY_PATTERN.sub(r'\1_\2', snake_str).lower()
+
+
+def convert_keys_snake_to_camel(payload: Any) -> Any:
+    """Convert the string keys of all dictionaries of a nested payload to 'camelCase'.
+
+    Use it for response payloads that are not serialized through a model alias.
+
+    Args:
+        payload: JSON-like value, e.g. a list of dictionaries.
+
+    Returns:
+        Converted copy of the payload.
+    """
+    return _convert_keys(payload, convert_key=convert_str_snake_to_camel)
+
+
+def convert_keys_camel_to_snake(payload: Any) -> Any:
+    """Convert the string keys of all dictionaries of a nested payload to 'snake_case'.
+
+    Use it for request payloads before validation.
+
+    Args:
+        payload: JSON-like value, e.g. a list of dictionaries.
+
+    Returns:
+        Converted copy of the payload.
+    """
+    return _convert_keys(payload, convert_key=convert_str_camel_to_snake)
+
+
+def _convert_keys(payload: Any, convert_key: Callable[[str], str]) -> Any:
+    # The walk is iterative, as in `replace_empty_values_to_none_nested`.
+    converted_payload = _copy_container_shell(payload)
+    stack = [(payload, converted_payload)] if isinstance(payload, (list, dict)) else []
+    while stack:
+        source, target = stack.pop()
+        if isinstance(source, dict):
+            items = ((convert_key(key) if isinstance(key, str) else key, child) for key, child in source.items())
+        else:
+            items = enumerate(source)
+        for target_key, child_value in items:
+            converted_child = _copy_container_shell(child_value)
+            target[target_key] = converted_child
+            if isinstance(child_value, (list, dict)):
+                stack.append((child_value, converted_child))
+    return converted_payload
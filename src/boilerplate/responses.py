@@ -0,0 +1,74 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Custom response classes of the application.
+
+`ORJSONResponse` is the default response class of the application and its routers. It
+serializes the content with `orjson` straight to `bytes`, without the stdlib `json`
+encoder and without a `str` round trip. `numpy` arrays, `dataclasses`, `datetime` and
+`UUID` values are serialized natively; Pydantic models through `orjson_default`.
+
+Note: FastAPI passes the endpoint result through `jsonable_encoder` before the response
+class renders it. To skip that step on hot paths (or to return `numpy` arrays), return the
+response directly:
+
+```python
+@router.get('/items', response_class=ORJSONResponse)
+async def get_items() -> ORJSONResponse:
+    return ORJSONResponse(content={'scores': np.zeros(1000)})
+```
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from src.boilerplate.pydantic_helpers import ORJSON_OPTIONS, orjson_default
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with `orjson`."""
+
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        """Render the response body.
+
+        Args:
+            content: response content.
+
+        Returns:
+            UTF-8 encoded JSON.
+        """
+        return orjson.dumps(content, default=orjson_default, option=ORJSON_OPTIONS)
+
+
+class NDJSONResponse(StreamingResponse):
+    """Streaming response of newline delimited JSON lines, e.g. from `stream_ndjson`.
+
+    Unlike `StreamingResponse`, it does not listen for the client disconnect: that listener
+    consumes the `receive` messages, so it would take the request body chunks away from a
+    generator that reads the body while the response is streamed. A disconnect is still
+    detected, since reading the body raises `ClientDisconnect`.
+    """
+
+    media_type = 'application/x-ndjson'
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Stream the response and run the background task, if any."""
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -18,13 +18,24 @@ This router is used to create service endpoints. It is recommended to restrict f
 to them.
 """
 
-from typing import Union
+from typing import Any, Union
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
+from src.boilerplate.cache import get_caches_stats
+from src.boilerplate.conditional_requests import ContentVersion, conditional_get
 from src.boilerplate.config import DevelopmentConfig, ProductionConfig, StagingConfig, config
 from src.boilerplate.custom_logger import CustomLogger
 from src.boilerplate.dependencies import is_media_type_application_json, is_request_has_correct_http_bearer_token
+from src.boilerplate.loop_watchdog import loop_watchdog
+from src.boilerplate.profiling import get_profiling_stats
+from src.boilerplate.responses import ORJSONResponse
+from src.boilerplate.sampling_profiler import (
+    ProfilerBusyError,
+    ProfilerMode,
+    is_cpu_mode_supported,
+    run_profiling_session,
+)
 
 _module_logger = CustomLogger().get_module_logger(
     name=__name__,
@@ -46,9 +57,18 @@ router = APIRouter(
         Depends(is_request_has_correct_http_bearer_token),
         Depends(is_media_type_application_json),
     ],
+    default_response_class=ORJSONResponse,
 )
 
 
+def _get_app_config_content() -> bytes:
+    return config.model_dump_json().encode()
+
+
+# Bump it if the config is changed at runtime.
+app_config_version = ContentVersion(get_content=_get_app_config_content)
+
+
 @router.get(
     path='/app-config',
     # To perform the field limiting and serialization.
@@ -61,8 +81,12 @@ router = APIRouter(
             'description': 'Requested data returned.',
             'model': Union[DevelopmentConfig, StagingConfig, ProductionConfig],
         },
+        status.HTTP_304_NOT_MODIFIED: {'description': 'Config has not changed.'},
     },
     summary='Get the application config depending on the environment.',
+    dependencies=[
+        Depends(conditional_get(cache_control=config.HTTP_CACHE_CONTROL_APP_CONFIG, version=app_config_version)),
+    ],
 )
 async def get_app_config() -> Union[DevelopmentConfig, StagingConfig, ProductionConfig]:
     """Get the application config.
@@ -74,6 +98,9 @@ async def get_app_config() -> Union[DevelopmentConfig, StagingConfig, Production
 
     Fields of type `pydantic.SecretStr` are by default excluded from the description of the model in `Swagger` and
     masked in responses, like this: `"DB_PASSWORD": "**********"`.
+
+    The response has an `ETag` of the config version; a request with a matching `If-None-Match`
+    header gets `304 Not Modified` without the config being serialized.
     """
     return config
 
@@ -90,3 +117,77 @@ async def trigger_sending_an_exception_to_sentry() -> dict[str, str]:
         _module_logger.exception(msg='A `ZeroDivisionError` has occurred.')
 
     return {'message': 'An error message has been sent to Sentry.'}
+
+
+@router.get(
+    path='/cache-stats',
+    status_code=status.HTTP_200_OK,
+    summary='Get hit and miss metrics of the application caches.',
+)
+async def get_cache_stats() -> dict[str, dict[str, Any]]:
+    """Get hit and miss metrics of the read-through caches of the current worker.
+
+    Metrics are collected per worker process, so consecutive calls may return the metrics
+    of different workers.
+    """
+    return get_caches_stats()
+
+
+@router.get(
+    path='/profiling-stats',
+    status_code=status.HTTP_200_OK,
+    summary='Get wall and CPU time percentiles of the profiled functions.',
+)
+async def get_function_profiling_stats() -> dict[str, dict[str, Any]]:
+    """Get the duration histograms of the functions decorated with `profiling.profile`.
+
+    Durations are collected per worker process, like the cache metrics. The result is empty
+    if `PROFILING_ENABLED` is off.
+    """
+    return get_profiling_stats()
+
+
+@router.get(
+    path='/loop-stats',
+    status_code=status.HTTP_200_OK,
+    summary='Get the event loop lag percentiles and the last blocking callbacks of the current worker.',
+)
+async def get_loop_stats() -> dict[str, Any]:
+    """Get the statistics of the event loop watchdog, see `loop_watchdog.py`.
+
+    The lag is collected per worker process; the percentiles are empty if `LOOP_WATCHDOG_ENABLED`
+    is off.
+    """
+    return loop_watchdog.get_stats()
+
+
+@router.post(
+    path='/profiler',
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_409_CONFLICT: {'description': 'A profiling session is already running on this worker.'},
+    },
+    summary='Profile the event loop of the current worker with a sampling profiler.',
+)
+async def profile_worker(
+    duration_seconds: float = Query(default=5.0, gt=0, le=config.PROFILER_MAX_DURATION_SECONDS),
+    mode: ProfilerMode = 'wall',
+) -> dict[str, Any]:
+    """Sample the stacks of the event loop thread of the worker that receives the request.
+
+    The response is returned when the session ends. `collapsed_stacks` is in the collapsed
+    format of flame graph tools: save it to a file and open it in speedscope or pass it to
+    `flamegraph.pl`. The report also has the event loop lag percentiles and the tasks that
+    have been pending the longest.
+
+    Only one session runs at a time per worker; a concurrent request gets `409 Conflict`.
+    """
+    if mode == 'cpu' and not is_cpu_mode_supported():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='The `cpu` mode is not supported on this platform.',
+        )
+    try:
+        return await run_profiling_session(duration_seconds=duration_seconds, mode=mode)
+    except ProfilerBusyError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
@@ -0,0 +1,158 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""FastAPI task router module.
+
+This router is used to track the asynchronous background tasks. The URL of the task
+status endpoint is returned to the client in the `Location` header.
+"""
+
+from typing import Awaitable, Callable, Union
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from src.boilerplate.batching import process_batch
+from src.boilerplate.conditional_requests import conditional_get
+from src.boilerplate.config import config
+from src.boilerplate.custom_logger import CustomLogger
+from src.boilerplate.db.task_repository import create_task, get_task_status
+from src.boilerplate.dependencies import (
+    get_json_body_openapi_extra,
+    get_json_body_validator,
+    is_media_type_application_json,
+    is_request_has_correct_http_bearer_token,
+)
+from src.boilerplate.responses import ORJSONResponse
+from src.boilerplate.schemas.common_schemas import (
+    BatchRequestSchema,
+    ErrorSchema,
+    MetadataMan,
+    MetadataOpt,
+    TaskBatchItemResultSchema,
+    TaskBatchResponseSchema,
+    TaskStateSchema,
+)
+from src.boilerplate.validation_registry import validate_python
+
+_module_logger = CustomLogger().get_module_logger(
+    name=__name__,
+    module_extra=None,  # optional data that will be added to each message of this logger
+)
+
+router = APIRouter(
+    prefix='/api/{app_api_version}/tasks'.format(app_api_version=config.APP_API_VERSION),
+    tags=['task-controller'],
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {'description': 'Unauthorized'},
+        status.HTTP_403_FORBIDDEN: {'description': 'Forbidden'},
+        status.HTTP_404_NOT_FOUND: {'description': 'Not found'},
+        status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {
+            'description': 'Unsupported MIME type in header `Accept` or not provided',
+        },
+    },
+    dependencies=[
+        Depends(is_request_has_correct_http_bearer_token),
+        Depends(is_media_type_application_json),
+    ],
+    default_response_class=ORJSONResponse,
+)
+
+
+@router.get(
+    path='/{task_id}',
+    response_model=TaskStateSchema,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {'description': 'Task state returned.'},
+        status.HTTP_304_NOT_MODIFIED: {'description': 'Task state has not changed.'},
+    },
+    summary='Get the task status.',
+    dependencies=[Depends(conditional_get(cache_control=config.HTTP_CACHE_CONTROL_TASK_STATE))],
+)
+async def get_task_state(task_id: int) -> TaskStateSchema:
+    """Get the status of the asynchronous background task.
+
+    Clients poll this endpoint, so the status is served from the cache; it is invalidated
+    whenever the task changes its state. A poll with the `ETag` of the previous response in
+    `If-None-Match` gets `304 Not Modified` while the state is the same.
+    """
+    task_status = await get_task_status(task_id=task_id)
+    if task_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Task {task_id} not found.'.format(task_id=task_id),
+        )
+    return TaskStateSchema(task_id=task_id, status=task_status)
+
+
+def get_task_creator() -> Callable[[MetadataMan], Awaitable[TaskStateSchema]]:
+    """Get the coroutine function that creates a task; override it to replace the storage."""
+    return create_task
+
+
+@router.post(
+    path='/batch',
+    response_model=TaskBatchResponseSchema,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {'description': 'Results of the items; failed items have `is_error` set to true.'},
+    },
+    openapi_extra=get_json_body_openapi_extra(BatchRequestSchema[MetadataOpt]),
+    summary='Create tasks in a batch.',
+)
+async def create_task_batch(
+    batch: BatchRequestSchema[MetadataOpt] = Depends(get_json_body_validator(BatchRequestSchema[MetadataOpt])),
+    task_creator: Callable[[MetadataMan], Awaitable[TaskStateSchema]] = Depends(get_task_creator),
+) -> TaskBatchResponseSchema:
+    """Create the asynchronous background tasks of the batch items.
+
+    Each item needs its own `idempotency_key` and `task_id`; an item without them fails
+    alone. Items are processed concurrently and independently: the response is returned
+    with status 200 even if some items have failed, and the result of each item is at the
+    position of the item. Repeating an item with the same `idempotency_key` returns the
+    state of the task created by the first request.
+
+    The body is parsed straight from the request bytes with the cached `TypeAdapter`.
+    """
+    async def create_item_task(item: MetadataOpt) -> TaskStateSchema:  # noqa: WPS430
+        return await task_creator(validate_python(MetadataMan, item.model_dump(exclude_none=True)))
+
+    item_results = await process_batch(items=batch.items, process=create_item_task)
+    batch_results = [
+        _get_batch_item_result(item=item, item_result=item_result)
+        for item, item_result in zip(batch.items, item_results)
+    ]
+    return TaskBatchResponseSchema(
+        items=batch_results,
+        error_count=sum(batch_result.is_error for batch_result in batch_results),
+    )
+
+
+def _get_batch_item_result(
+    item: MetadataOpt,
+    item_result: Union[TaskStateSchema, ErrorSchema],
+) -> TaskBatchItemResultSchema:
+    if isinstance(item_result, ErrorSchema):
+        return TaskBatchItemResultSchema(
+            is_error=True,
+            idempotency_key=item.idempotency_key,
+            task_id=item.task_id,
+            error=item_result,
+        )
+    return TaskBatchItemResultSchema(
+        is_error=False,
+        idempotency_key=item.idempotency_key,
+        task_id=item_result.task_id,
+        status=item_result.status,
+    )
@@ -0,0 +1,150 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""FastAPI task streaming router module.
+
+This router is used to submit and track the asynchronous background tasks in bulk. Request
+and response bodies are NDJSON streams: one JSON object per line, one result line per input
+line. Bodies are processed incrementally, so their size is not limited by the memory of the
+application.
+"""
+
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional, Sequence, Union
+
+from fastapi import APIRouter, Depends, Request, status
+
+from src.boilerplate.config import config
+from src.boilerplate.custom_logger import CustomLogger
+from src.boilerplate.db.task_repository import create_tasks, get_task_status
+from src.boilerplate.dependencies import is_media_type_application_x_ndjson, is_request_has_correct_http_bearer_token
+from src.boilerplate.errors import TaskConflictError, get_error_schema
+from src.boilerplate.responses import NDJSONResponse
+from src.boilerplate.schemas.common_schemas import ErrorSchema, MetadataMan, TaskIdMan, TaskStateSchema
+from src.boilerplate.streaming import stream_ndjson, stream_ndjson_batches
+
+_module_logger = CustomLogger().get_module_logger(
+    name=__name__,
+    module_extra=None,  # optional data that will be added to each message of this logger
+)
+
+router = APIRouter(
+    prefix='/api/{app_api_version}/tasks'.format(app_api_version=config.APP_API_VERSION),
+    tags=['task-controller'],
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {'description': 'Unauthorized'},
+        status.HTTP_403_FORBIDDEN: {'description': 'Forbidden'},
+        status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {
+            'description': 'Unsupported MIME type in header `Accept` or not provided',
+        },
+    },
+    dependencies=[
+        Depends(is_request_has_correct_http_bearer_token),
+        Depends(is_media_type_application_x_ndjson),
+    ],
+    default_response_class=NDJSONResponse,
+)
+
+
+TasksCreator = Callable[[Sequence[MetadataMan]], Awaitable[list[Optional[TaskStateSchema]]]]
+
+
+def get_tasks_creator() -> TasksCreator:
+    """Get the coroutine function that creates tasks in bulk; override it to replace the storage."""
+    return create_tasks
+
+
+def _get_ndjson_request_body(line_schema: Any) -> dict[str, Any]:
+    return {
+        'requestBody': {
+            'required': True,
+            'content': {'application/x-ndjson': {'schema': line_schema.model_json_schema()}},
+        },
+    }
+
+
+@router.post(
+    path='/ndjson',
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            'description': 'Result lines: `task_id` and `status`, or the error of the line.',
+            'content': {'application/x-ndjson': {}},
+        },
+    },
+    openapi_extra=_get_ndjson_request_body(line_schema=MetadataMan),
+    summary='Create tasks from an NDJSON stream.',
+)
+async def create_tasks_from_ndjson(
+    request: Request,
+    tasks_creator: TasksCreator = Depends(get_tasks_creator),
+) -> NDJSONResponse:
+    """Create the asynchronous background tasks from an NDJSON stream of `MetadataMan` lines.
+
+    The lines of each received chunk are created in bulk, in one transaction, and their
+    result lines are written after the transaction has been committed: a result line with
+    a `task_id` means that the task is saved. If the response ends without the result of a
+    line, resend the line with the same `idempotency_key`; a line that has already been
+    saved gets the state of its task, as in the other task creation endpoints.
+    """
+    return NDJSONResponse(
+        stream_ndjson_batches(
+            byte_chunks=request.stream(),
+            schema=MetadataMan,
+            process_batch=partial(_create_tasks, tasks_creator=tasks_creator),
+        ),
+    )
+
+
+@router.post(
+    path='/statuses/ndjson',
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            'description': 'Result lines: `task_id` and `status` (null if not found), or the error of the line.',
+            'content': {'application/x-ndjson': {}},
+        },
+    },
+    openapi_extra=_get_ndjson_request_body(line_schema=TaskIdMan),
+    summary='Get the task statuses for an NDJSON stream of task ids.',
+)
+async def get_task_states_from_ndjson(request: Request) -> NDJSONResponse:
+    """Get the statuses of the asynchronous background tasks for an NDJSON stream of `TaskIdMan` lines."""
+    return NDJSONResponse(stream_ndjson(byte_chunks=request.stream(), schema=TaskIdMan, process=_get_task_state))
+
+
+async def _create_tasks(
+    metadata_batch: list[MetadataMan],
+    tasks_creator: TasksCreator,
+) -> list[Union[dict[str, Any], ErrorSchema]]:
+    task_states = await tasks_creator(metadata_batch)
+    return [
+        _get_task_creation_error(metadata) if task_state is None else task_state.model_dump()
+        for metadata, task_state in zip(metadata_batch, task_states)
+    ]
+
+
+def _get_task_creation_error(metadata: MetadataMan) -> ErrorSchema:
+    return get_error_schema(
+        TaskConflictError(
+            'Task {task_id} belongs to another idempotency key, or the task of the key has been deleted.'.format(
+                task_id=metadata.task_id,
+            ),
+        ),
+    )
+
+
+async def _get_task_state(task_id_line: TaskIdMan) -> dict[str, Any]:
+    task_status = await get_task_status(task_id=task_id_line.task_id)
+    return {'task_id': task_id_line.task_id, 'status': task_status}
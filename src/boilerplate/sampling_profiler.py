@@ -0,0 +1,223 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""On-demand sampling profiler of the event loop thread of the current worker.
+
+`run_profiling_session` profiles the worker for a few seconds without redeploying it:
+* a daemon thread takes the stack of the event loop thread every
+  `PROFILER_SAMPLING_INTERVAL_SECONDS` with `sys._current_frames`. In the `wall` mode, every
+  sample is counted, so the waiting in `select` shows up as well; in the `cpu` mode, a
+  sample is counted only if the thread has used the CPU for at least half of the interval
+  since the previous sample (Linux and other systems with `pthread_getcpuclockid`);
+* the samples are aggregated into collapsed stacks, one line per distinct stack, e.g.
+  `base_events.py:BaseEventLoop.run_forever;app.py:get_item 42`. The text is accepted as is
+  by `flamegraph.pl`, speedscope and other flame graph tools;
+* a probe coroutine measures the event loop lag, i.e. how late a timer fires, and tracks
+  the pending tasks; the report lists the tasks that have been pending the longest.
+
+The overhead is bounded: a sample walks at most `PROFILER_MAX_STACK_DEPTH` frames of one
+thread, at most `PROFILER_MAX_STACKS` distinct stacks are kept, and a session lasts at most
+`PROFILER_MAX_DURATION_SECONDS`. Only one session runs at a time per worker;
+`ProfilerBusyError` is raised for a concurrent one.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from types import FrameType
+from typing import Any, Final, Literal, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from src.boilerplate.config import config
+from src.boilerplate.profiling import LatencyHistogram
+
+ProfilerMode = Literal['wall', 'cpu']
+
+_TRUNCATED_STACK: Final[str] = '[truncated]'
+_OTHER_STACKS: Final[str] = '[other stacks]'
+_LAG_PROBE_INTERVAL_SECONDS: Final[float] = 0.01
+_SLOWEST_TASKS_NUM: Final[int] = 10
+_MICROSECONDS_IN_SECOND: Final[int] = 10**6
+
+_session_lock = asyncio.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """A profiling session is already running on this worker."""
+
+
+def is_cpu_mode_supported() -> bool:
+    """Check if the thread CPU clock needed for the `cpu` mode is available."""
+    return hasattr(time, 'pthread_getcpuclockid')
+
+
+async def run_profiling_session(duration_seconds: float, mode: ProfilerMode = 'wall') -> dict[str, Any]:
+    """Profile the event loop thread of the worker.
+
+    Args:
+        duration_seconds: the duration of the session, at most `PROFILER_MAX_DURATION_SECONDS`.
+        mode: `wall` to count all samples, `cpu` to count only those taken while the thread
+            was using the CPU.
+
+    Returns:
+        The report: the collapsed stacks, the sample counts, the loop lag percentiles and
+        the slowest pending tasks.
+
+    Raises:
+        ProfilerBusyError: If another session is running.
+    """
+    if _session_lock.locked():
+        raise ProfilerBusyError('A profiling session is already running on this worker.')
+    async with _session_lock:
+        duration_seconds = min(duration_seconds, config.PROFILER_MAX_DURATION_SECONDS)
+        sampler = _StackSampler(thread_id=threading.get_ident(), mode=mode)
+        task_probe = _LoopProbe()
+        sampler.start()
+        try:
+            await task_probe.run(duration_seconds=duration_seconds)
+        finally:
+            sampler.stop_event.set()
+            await run_in_threadpool(sampler.join)
+    return {
+        'mode': mode,
+        'duration_seconds': duration_seconds,
+        'sampling_interval_seconds': config.PROFILER_SAMPLING_INTERVAL_SECONDS,
+        'samples': sampler.samples_num,
+        'counted_samples': sum(sampler.stacks.values()),
+        'collapsed_stacks': sampler.get_collapsed_stacks(),
+        'loop_lag': task_probe.lag.get_stats(),
+        'slowest_pending_tasks': task_probe.get_slowest_pending_tasks(),
+    }
+
+
+class _StackSampler(threading.Thread):
+    # Daemon thread taking the stacks of the event loop thread.
+
+    def __init__(self, thread_id: int, mode: ProfilerMode) -> None:
+        super().__init__(name='sampling-profiler', daemon=True)
+        self.stop_event = threading.Event()
+        self.stacks: Counter[str] = Counter()
+        self.samples_num = 0
+        self._thread_id = thread_id
+        self._cpu_clock_id = time.pthread_getcpuclockid(thread_id) if mode == 'cpu' else None
+        self._interval = config.PROFILER_SAMPLING_INTERVAL_SECONDS
+        self._max_stack_depth = config.PROFILER_MAX_STACK_DEPTH
+        self._max_stacks = config.PROFILER_MAX_STACKS
+        self._frame_labels: dict[Any, str] = {}
+
+    def run(self) -> None:
+        cpu_time = self._get_cpu_time()
+        wall_time = time.perf_counter()
+        while not self.stop_event.wait(self._interval):
+            previous_cpu_time, previous_wall_time = cpu_time, wall_time
+            cpu_time, wall_time = self._get_cpu_time(), time.perf_counter()
+            self.samples_num += 1
+            if self._cpu_clock_id is not None and cpu_time - previous_cpu_time < (wall_time - previous_wall_time) / 2:
+                continue  # the thread was mostly waiting
+            frame = sys._current_frames().get(self._thread_id)  # noqa: WPS437
+            if frame is not None:
+                self._count_stack(frame)
+
+    def get_collapsed_stacks(self) -> str:
+        return ''.join(
+            '{stack} {count}\n'.format(stack=stack, count=count)
+            for stack, count in self.stacks.most_common()
+        )
+
+    def _get_cpu_time(self) -> float:
+        return 0.0 if self._cpu_clock_id is None else time.clock_gettime(self._cpu_clock_id)
+
+    def _count_stack(self, frame: Optional[FrameType]) -> None:
+        frame_labels = []
+        while frame is not None and len(frame_labels) < self._max_stack_depth:
+            frame_labels.append(self._get_frame_label(frame))
+            frame = frame.f_back
+        if frame is not None:
+            frame_labels.append(_TRUNCATED_STACK)
+        stack = ';'.join(reversed(frame_labels))
+        if stack not in self.stacks and len(self.stacks) >= self._max_stacks:
+            stack = _OTHER_STACKS
+        self.stacks[stack] += 1
+
+    def _get_frame_label(self, frame: FrameType) -> str:
+        code = frame.f_code
+        frame_label = self._frame_labels.get(code)
+        if frame_label is None:
+            frame_label = '{file}:{function}'.format(
+                file=os.path.basename(code.co_filename),
+                function=getattr(code, 'co_qualname', code.co_name),
+            ).replace(';', ':').replace(' ', '_')
+            self._frame_labels[code] = frame_label
+        return frame_label
+
+
+class _LoopProbe(object):
+    # Measures how late a timer fires, and when the pending tasks were first seen.
+
+    def __init__(self) -> None:
+        self.lag = LatencyHistogram()
+        self._first_seen: weakref.WeakKeyDictionary[asyncio.Task[Any], float] = weakref.WeakKeyDictionary()
+
+    async def run(self, duration_seconds: float) -> None:
+        loop = asyncio.get_running_loop()
+        finish_time = loop.time() + duration_seconds
+        while loop.time() < finish_time:
+            self._track_tasks(now=loop.time())
+            started = loop.time()
+            await asyncio.sleep(_LAG_PROBE_INTERVAL_SECONDS)
+            lag_seconds = loop.time() - started - _LAG_PROBE_INTERVAL_SECONDS
+            self.lag.record(int(lag_seconds * _MICROSECONDS_IN_SECOND))
+        self._track_tasks(now=loop.time())
+
+    def get_slowest_pending_tasks(self) -> list[dict[str, Any]]:
+        now = asyncio.get_running_loop().time()
+        current_task = asyncio.current_task()
+        pending_tasks = sorted(
+            (
+                (first_seen, task) for task, first_seen in list(self._first_seen.items())
+                if not task.done() and task is not current_task
+            ),
+            key=lambda task_item: task_item[0],
+        )
+        return [
+            {
+                'name': task.get_name(),
+                'coroutine': getattr(task.get_coro(), '__qualname__', repr(task.get_coro())),
+                'awaiting_at': _get_task_location(task),
+                # A lower bound: the tasks are tracked from the start of the session.
+                'pending_seconds_at_least': round(now - first_seen, 3),
+            }
+            for first_seen, task in pending_tasks[:_SLOWEST_TASKS_NUM]
+        ]
+
+    def _track_tasks(self, now: float) -> None:
+        for task in asyncio.all_tasks():
+            self._first_seen.setdefault(task, now)
+
+
+def _get_task_location(task: 'asyncio.Task[Any]') -> Optional[str]:
+    task_stack = task.get_stack()
+    if not task_stack:
+        return None
+    frame = task_stack[-1]
+    return '{file}:{line} in {function}'.format(
+        file=os.path.basename(frame.f_code.co_filename),
+        line=frame.f_lineno,
+        function=frame.f_code.co_name,
+    )
@@ -15,13 +15,16 @@
 
 from datetime import datetime
 from enum import Enum
-from typing import Any, Final, Optional
+from typing import Annotated, Any, Final, Generic, Optional, TypeVar
 
-from pydantic import UUID4, BaseModel, Field, HttpUrl, NonNegativeInt, PositiveInt, constr, validator
-
-from src.boilerplate.pydantic_helpers import replace_empty_values_to_none
+from pydantic import UUID4, BaseModel, ConfigDict, Field, HttpUrl, NonNegativeInt, PositiveInt, StringConstraints
 
 DATETIME_EXAMPLE: Final[str] = '2021-09-15T11:23:04.055239+00:00'
+BATCH_MAX_ITEMS: Final[int] = 1000
+
+BatchItemT = TypeVar('BatchItemT')
+
+NonEmptyStrippedStr = Annotated[str, StringConstraints(min_length=1, strip_whitespace=True)]
 
 
 # Common.
@@ -31,11 +34,18 @@ class EnvState(str, Enum):
     production = 'production'
 
 
+class TaskStatus(str, Enum):
+    pending = 'pending'
+    processing = 'processing'
+    completed = 'completed'
+    failed = 'failed'
+
+
 class CreatedDatetimeMan(BaseModel):
     created_datetime: datetime = Field(
         title='created_datetime',
         description='Datetime with time zone (UTC) when the DB record was created.',
-        example=DATETIME_EXAMPLE
+        examples=[DATETIME_EXAMPLE],
     )
 
 
@@ -43,7 +53,7 @@ class UpdatedDatetimeMan(BaseModel):
     updated_datetime: datetime = Field(
         title='updated_datetime',
         description='Datetime with time zone (UTC) when the DB record was updated.',
-        example=DATETIME_EXAMPLE
+        examples=[DATETIME_EXAMPLE],
     )
 
 
@@ -53,18 +63,17 @@ class ErrorMessageSchema(BaseModel):
     It is used for parsing API responses and writing data
     to the corresponding fields of the database tables.
     """
-    error_message: Optional[dict[constr(min_length=1, strip_whitespace=True), Any]]
+    error_message: Optional[dict[NonEmptyStrippedStr, Any]] = None
 
 
 class ErrorNameSchema(BaseModel):
-    error_name: Optional[constr(min_length=1, strip_whitespace=True)]
+    model_config = ConfigDict(use_enum_values=True)
 
-    class Config:
-        use_enum_values = True
+    error_name: Optional[NonEmptyStrippedStr] = None
 
 
 class ErrorSourceSchema(BaseModel):
-    error_source: Optional[constr(min_length=1, strip_whitespace=True)]
+    error_source: Optional[NonEmptyStrippedStr] = None
 
 
 class ErrorSchema(
@@ -72,19 +81,17 @@ class ErrorSchema(
     ErrorMessageSchema,
     ErrorSourceSchema
 ):
-    class Config:
-        use_enum_values = True
+    model_config = ConfigDict(use_enum_values=True)
 
 
 class HTTPResponseStatusCodeSchema(BaseModel):
-    http_response_status_code: Optional[NonNegativeInt]
+    http_response_status_code: Optional[NonNegativeInt] = None
 
 
 class HTTPResponseStatusReasonSchema(BaseModel):
-    http_response_status_reason: Optional[constr(min_length=1, strip_whitespace=True)]
+    model_config = ConfigDict(use_enum_values=True)
 
-    class Config:
-        use_enum_values = True
+    http_response_status_reason: Optional[NonEmptyStrippedStr] = None
 
 
 # Mandatory.
@@ -92,7 +99,7 @@ class IdMan(BaseModel):
     id: NonNegativeInt = Field(
         title='id',
         description='The `ID` of the entry or item.',
-        example=1
+        examples=[1],
     )
 
 
@@ -101,7 +108,7 @@ class TaskIdMan(BaseModel):
         title='task_id',
         description='The `id` of the asynchronous background task. '
                     'You can use it to get the processing result at the URL, passed in the `Location` header.',
-        example=1
+        examples=[1],
     )
 
 
@@ -109,7 +116,7 @@ class IdempotencyKeyMan(BaseModel):
     idempotency_key: UUID4 = Field(
         title='idempotency_key',
         description='Idempotency key — v4 UUID.',
-        example='0d2b4fdd-1162-4ce7-b6b6-99f7b896926d'
+        examples=['0d2b4fdd-1162-4ce7-b6b6-99f7b896926d'],
     )
 
 
@@ -118,17 +125,25 @@ class IsErrorMan(BaseModel):
     is_error: bool
 
 
+class TaskStatusMan(BaseModel):
+    status: TaskStatus = Field(
+        title='status',
+        description='Status of the asynchronous background task.',
+        examples=[TaskStatus.pending],
+    )
+
+
 # Optional.
 class TaskIdOpt(BaseModel):
-    task_id: Optional[PositiveInt]
+    task_id: Optional[PositiveInt] = None
 
 
 class CallbackUrlOpt(BaseModel):
-    callback_url: Optional[HttpUrl]
+    callback_url: Optional[HttpUrl] = None
 
 
 class IdempotencyKeyOpt(BaseModel):
-    idempotency_key: Optional[UUID4]
+    idempotency_key: Optional[UUID4] = None
 
 
 
@@ -149,3 +164,43 @@ class MetadataMan(
 ):
     """Metadata Extended model with mandatory fields."""
     pass
+
+
+# Task models.
+class TaskStateSchema(
+    TaskIdMan,
+    TaskStatusMan,
+):
+    """Task state model returned by the task status endpoint."""
+    pass
+
+
+# Batch models.
+class BatchRequestSchema(BaseModel, Generic[BatchItemT]):
+    """Batch envelope; the items are processed independently of each other."""
+    items: list[BatchItemT] = Field(
+        title='items',
+        description='Batch items; the result of each of them is returned at the same position.',
+        min_length=1,
+        max_length=BATCH_MAX_ITEMS,
+    )
+
+
+class TaskBatchItemResultSchema(
+    IsErrorMan,
+    IdempotencyKeyOpt,
+    TaskIdOpt,
+):
+    """Result of a batch item: the task state, or the error if `is_error` is true."""
+    status: Optional[TaskStatus] = None
+    error: Optional[ErrorSchema] = None
+
+
+class TaskBatchResponseSchema(BaseModel):
+    """Results of the batch items, in the order of the items."""
+    items: list[TaskBatchItemResultSchema]
+    error_count: NonNegativeInt = Field(
+        title='error_count',
+        description='The number of items with `is_error` set to true.',
+        examples=[0],
+    )
@@ -0,0 +1,116 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Compact internal records mirroring the Pydantic schemas.
+
+A Pydantic model instance carries a `__dict__`, the set of the explicitly set fields and
+the private attributes; for high-volume internal data (consumed messages, buffered rows,
+collected errors) that is several times the size of the data itself. The records below are
+frozen slotted dataclasses with the same fields: no per-instance `__dict__`, no validation
+on creation, and immutable.
+
+Validate at the API boundary with the Pydantic schemas, convert to records with
+`from_model`, pass the records around internally, and convert back with `to_model` when
+the data leaves the application. `to_model` does not validate again, since the records are
+only built from validated data.
+
+Example:
+    ```python
+    metadata_records = [MetadataRecord.from_model(metadata) for metadata in batch]
+    ...
+    response_items = [metadata_record.to_model() for metadata_record in metadata_records]
+    ```
+"""
+
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+from uuid import UUID
+
+from pydantic import HttpUrl
+
+from src.boilerplate.schemas.common_schemas import ErrorSchema, HTTPResponseStatusCodeSchema, MetadataMan
+
+
+@dataclass(frozen=True, slots=True)
+class MetadataRecord(object):
+    """Internal record of `MetadataMan`."""
+
+    idempotency_key: UUID
+    task_id: int
+    callback_url: Optional[HttpUrl] = None
+
+    @classmethod
+    def from_model(cls, metadata: MetadataMan) -> 'MetadataRecord':
+        """Build the record from the validated model; the field values are shared, not copied."""
+        return cls(
+            idempotency_key=metadata.idempotency_key,
+            task_id=metadata.task_id,
+            callback_url=metadata.callback_url,
+        )
+
+    def to_model(self) -> MetadataMan:
+        """Build the model without validation."""
+        return MetadataMan.model_construct(
+            idempotency_key=self.idempotency_key,
+            task_id=self.task_id,
+            callback_url=self.callback_url,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ErrorRecord(object):
+    """Internal record of `ErrorSchema`."""
+
+    error_name: Optional[str] = None
+    error_message: Optional[dict[str, Any]] = None
+    error_source: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, error: ErrorSchema) -> 'ErrorRecord':
+        """Build the record from the validated model; the field values are shared, not copied."""
+        return cls(
+            error_name=error.error_name,
+            error_message=error.error_message,
+            error_source=error.error_source,
+        )
+
+    def to_model(self) -> ErrorSchema:
+        """Build the model without validation."""
+        return ErrorSchema.model_construct(
+            error_name=self.error_name,
+            error_message=self.error_message,
+            error_source=self.error_source,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class HTTPResponseStatusCodeRecord(object):
+    """Internal record of `HTTPResponseStatusCodeSchema`."""
+
+    http_response_status_code: Optional[int] = None
+
+    @classmethod
+    def from_model(cls, status_code: HTTPResponseStatusCodeSchema) -> 'HTTPResponseStatusCodeRecord':
+        """Build the record from the validated model."""
+        return cls(http_response_status_code=status_code.http_response_status_code)
+
+    def to_model(self) -> HTTPResponseStatusCodeSchema:
+        """Build the model without validation."""
+        return HTTPResponseStatusCodeSchema.model_construct(
+            http_response_status_code=self.http_response_status_code,
+        )
+
+
+# Any internal record, e.g. for `BulkWriter.add`.
+Record = Union[MetadataRecord, ErrorRecord, HTTPResponseStatusCodeRecord]
@@ -14,38 +14,371 @@
 
 """Sentry initialization module.
 
-Sampling is not used for `development` and `staging` environments.
-For other environments, it is applied with a factor of 0.2.
+Transactions are sampled by `TracesSampler`:
+
+* a transaction continued from an upstream service keeps the upstream decision;
+* otherwise the rate is taken from `SENTRY_TRACES_ROUTE_SAMPLE_RATES` by the longest path
+  prefix, or from `SENTRY_TRACES_SAMPLE_RATE`. A zero rate disables tracing of the route,
+  e.g. for `/static` and `/docs`. Without the rate, sampling is not used for the
+  `development` environment; it is 0.5 for `staging` and 0.1 for the other environments;
+* the decision is made when the transaction starts, so the dropped ones are not recorded.
+  If `SENTRY_TRACES_KEEP_ERRORS_AND_SLOW` is on, every transaction of a route with a rate is
+  recorded and the decision is made when it finishes: server errors and requests slower than
+  `SENTRY_TRACES_SLOW_REQUEST_SECONDS` are always sent, the others are sent with the route rate.
+  Recording costs CPU on every request, so the option is off by default; turn it on where the
+  errors and the slow requests are worth it, e.g. in `staging`;
+* the transactions sent with the route rate are capped at `SENTRY_TRACES_MAX_PER_SECOND`.
+
+Sentry work is kept off the request path:
+
+* with `SENTRY_LAZY_REQUEST_BODIES`, the SDK does not read and parse request bodies before the
+  endpoints. `RequestBodyRecorderMiddleware` keeps references to the received body chunks,
+  and the body is parsed only when an error event is sent;
+* with `SENTRY_BACKGROUND_EVENTS`, `BackgroundEventsClient` builds and serializes events in a
+  background thread with a queue of `SENTRY_EVENT_QUEUE_SIZE` events; the events that do not
+  fit in the queue are dropped and reported as lost.
 """
 
-from typing import Any
+import contextvars
+import copy
+import functools
+import logging
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Final, Optional, Union
 
+import orjson
 import sentry_sdk
+from sentry_sdk.scope import add_global_event_processor
+from sentry_sdk.worker import BackgroundWorker
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.boilerplate.config import config
 from src.boilerplate.schemas.common_schemas import EnvState
 
+# The SDK logs several debug messages per request and drops them only after building the records.
+_sentry_sdk_logger = logging.getLogger('sentry_sdk.errors')
+
+# The body chunks received by the current request, see `RequestBodyRecorderMiddleware`.
+_BodyChunks = list[bytes]
+_request_body_chunks: contextvars.ContextVar[Optional[_BodyChunks]] = contextvars.ContextVar(
+    '_request_body_chunks',
+    default=None,
+)
+
+_MIN_SERVER_ERROR_STATUS: Final[int] = 500
 
-def _get_traces_sampler(sampling_context: dict[Any, Any]) -> float:
-    if config.SENTRY_ENVIRONMENT is EnvState.development:
-        traces_sampler_lvl = 1.0
+# An event, or a transaction, in the form passed to the event processors and `before_send`.
+SentryEvent = dict[str, Any]
+
+# The sampler and the route rate of the transaction waiting for the decision at its end.
+_DeferredSampling = tuple['TracesSampler', float]
+_deferred_sampling: contextvars.ContextVar[Optional[_DeferredSampling]] = contextvars.ContextVar(
+    '_deferred_sampling',
+    default=None,
+)
+
+
+def _get_default_sample_rate() -> float:
+    if config.SENTRY_TRACES_SAMPLE_RATE is not None:
+        return config.SENTRY_TRACES_SAMPLE_RATE
+    elif config.SENTRY_ENVIRONMENT is EnvState.development:
+        return 1.0
     elif config.SENTRY_ENVIRONMENT is EnvState.staging:
-        traces_sampler_lvl = 0.5
-    else:
-        traces_sampler_lvl = 0.1
-    return traces_sampler_lvl
+        return 0.5
+    return 0.1
+
+
+class _RateBudget(object):
+    """Token bucket of the transactions sampled per second."""
+
+    def __init__(self, max_per_second: float) -> None:
+        self._max_per_second = max_per_second
+        self._tokens = max_per_second
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            refilled_tokens = self._tokens + (now - self._updated_at) * self._max_per_second
+            self._tokens = min(refilled_tokens, self._max_per_second)
+            self._updated_at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class TracesSampler(object):
+    """Rule-based sampler of the Sentry transactions, see the module docstring."""
+
+    def __init__(  # noqa: WPS211
+        self,
+        default_sample_rate: float,
+        route_sample_rates: dict[str, float],
+        keep_errors_and_slow: bool,
+        slow_request_seconds: float,
+        max_per_second: Optional[float],
+    ) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            default_sample_rate: the rate of the routes without a rule.
+            route_sample_rates: the rates by the path prefix.
+            keep_errors_and_slow: whether to always send server errors and slow requests.
+            slow_request_seconds: the duration of a slow request.
+            max_per_second: the maximum number of the transactions sampled with a rate per second.
+        """
+        self._default_sample_rate = default_sample_rate
+        # The longest prefix is checked first.
+        self._route_sample_rates = sorted(route_sample_rates.items(), key=_get_prefix_length, reverse=True)
+        self._keep_errors_and_slow = keep_errors_and_slow
+        self._slow_request_seconds = slow_request_seconds
+        self._budget = _RateBudget(max_per_second) if max_per_second is not None else None
+
+    def __call__(self, sampling_context: dict[str, Any]) -> Union[bool, float]:
+        """Make the sampling decision when a transaction starts; use it as `traces_sampler`."""
+        _deferred_sampling.set(None)
+        parent_sampled = sampling_context.get('parent_sampled')
+        if parent_sampled is not None:
+            return parent_sampled
+
+        asgi_scope = sampling_context.get('asgi_scope') or {}
+        sample_rate = self.get_route_sample_rate(asgi_scope.get('path', ''))
+        if not sample_rate:
+            return False
+        elif self._keep_errors_and_slow:
+            _deferred_sampling.set((self, sample_rate))
+            return True
+        return self._sample(sample_rate)
+
+    @classmethod
+    def from_config(cls) -> 'TracesSampler':
+        """Create the sampler from the application config."""
+        return cls(
+            default_sample_rate=_get_default_sample_rate(),
+            route_sample_rates=config.SENTRY_TRACES_ROUTE_SAMPLE_RATES,
+            keep_errors_and_slow=config.SENTRY_TRACES_KEEP_ERRORS_AND_SLOW,
+            slow_request_seconds=config.SENTRY_TRACES_SLOW_REQUEST_SECONDS,
+            max_per_second=config.SENTRY_TRACES_MAX_PER_SECOND,
+        )
+
+    def get_route_sample_rate(self, path: str) -> float:
+        """Get the sample rate of a request path."""
+        for path_prefix, sample_rate in self._route_sample_rates:
+            if path.startswith(path_prefix):
+                return sample_rate
+        return self._default_sample_rate
+
+    def process_event(self, event: SentryEvent, hint: dict[str, Any]) -> Optional[SentryEvent]:
+        """Make the deferred decision when a transaction finishes; use it as an event processor.
+
+        Event processors run before the event is serialized, so a dropped transaction costs
+        neither the serialization nor the request data extraction.
+
+        Args:
+            event: the event or the transaction.
+            hint: the hint of the event, not used.
+
+        Returns:
+            The event, or None if the transaction is dropped.
+        """
+        deferred_sampling = _deferred_sampling.get()
+        if event.get('type') != 'transaction' or deferred_sampling is None:
+            return event
+        sampler, sample_rate = deferred_sampling
+        if sampler is not self:
+            return event
+        _deferred_sampling.set(None)
+        if _is_server_error(event) or _get_duration_seconds(event) >= self._slow_request_seconds:
+            return event
+        return event if self._sample(sample_rate) else None
+
+    def _sample(self, sample_rate: float) -> bool:
+        if random.random() >= sample_rate:  # noqa: S311
+            return False
+        return self._budget is None or self._budget.try_acquire()
+
+
+def _get_prefix_length(route_rule: tuple[str, float]) -> int:
+    return len(route_rule[0])
+
+
+def _is_server_error(event: SentryEvent) -> bool:
+    contexts = event.get('contexts', {})
+    # The status is `internal_error` for an unhandled exception.
+    return (
+        contexts.get('response', {}).get('status_code', 0) >= _MIN_SERVER_ERROR_STATUS or
+        contexts.get('trace', {}).get('status') == 'internal_error'
+    )
+
+
+def _get_duration_seconds(event: SentryEvent) -> float:
+    started_at, finished_at = event.get('start_timestamp'), event.get('timestamp')
+    if started_at is None or finished_at is None:
+        return 0
+    return (finished_at - started_at).total_seconds()
+
+
+traces_sampler = TracesSampler.from_config()
+add_global_event_processor(traces_sampler.process_event)
+
+
+class RequestBodyRecorderMiddleware(object):
+    """Keep the request body chunks for the lazy capture of the body in the error events.
+
+    The chunks are the ones the application receives, so nothing is copied or parsed on the
+    request path. Recording stops and the recorded chunks are released as soon as the body
+    exceeds `max_body_size` bytes, so the larger bodies are not sent and not kept.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: Optional[int] = None) -> None:
+        """Perform custom instantiation of the class.
+
+        Args:
+            app: the ASGI application.
+            max_body_size: the maximum size of the sent body.
+        """
+        self.app = app
+        self.max_body_size = config.SENTRY_MAX_REQUEST_BODY_BYTES if max_body_size is None else max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Call the application with the recording `receive`."""
+        if scope['type'] != 'http' or not config.SENTRY_LAZY_REQUEST_BODIES:
+            await self.app(scope, receive, send)
+            return
+
+        body_recorder = _BodyRecorder(receive, max_body_size=self.max_body_size)
+        _request_body_chunks.set(body_recorder.body_chunks)
+        await self.app(scope, body_recorder.receive, send)
+
+
+class _BodyRecorder(object):
+    # Passes the request messages through, keeping the body chunks while the body fits in the limit.
+
+    __slots__ = ('_receive', '_max_body_size', '_body_size', 'body_chunks')
+
+    def __init__(self, receive: Receive, max_body_size: int) -> None:
+        self._receive = receive
+        self._max_body_size = max_body_size
+        self._body_size = 0
+        self.body_chunks: _BodyChunks = []
+
+    async def receive(self) -> Message:
+        message = await self._receive()
+        body_chunk = message.get('body', b'')
+        if body_chunk and self._body_size <= self._max_body_size:
+            self._body_size += len(body_chunk)
+            if self._body_size <= self._max_body_size:
+                self.body_chunks.append(body_chunk)
+            else:
+                # The body is too large to be sent: the chunks recorded so far are released.
+                self.body_chunks.clear()
+        return message
+
+
+def attach_request_body(event: SentryEvent, hint: dict[str, Any]) -> SentryEvent:
+    """Parse the recorded request body into an error event; use it as `before_send`.
+
+    The hook runs for error events only, after the event is serialized. JSON bodies are
+    attached; the larger and the other bodies keep the annotation of the SDK.
+
+    Args:
+        event: the error event.
+        hint: the hint of the event, not used.
+
+    Returns:
+        The event.
+    """
+    body_chunks = _request_body_chunks.get()
+    # A body over the limit has no recorded chunks.
+    if not body_chunks or 'request' not in event:
+        return event
+    try:
+        event['request']['data'] = orjson.loads(b''.join(body_chunks))
+    except orjson.JSONDecodeError:
+        return event
+    # The annotation of the body removed by the SDK.
+    event.get('_meta', {}).get('request', {}).pop('data', None)
+    return event
+
+
+# The callback of `flush` and `close`, receiving the number of pending events and the timeout.
+_FlushCallback = Callable[[int, float], None]
+
+
+class BackgroundEventsClient(sentry_sdk.Client):
+    """Sentry client building and serializing the events in a background thread."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Perform custom instantiation of the class."""
+        super().__init__(*args, **kwargs)
+        self._events_worker = BackgroundWorker(queue_size=config.SENTRY_EVENT_QUEUE_SIZE)
+
+    def capture_event(
+        self,
+        event: SentryEvent,
+        hint: Optional[dict[str, Any]] = None,
+        scope: Optional[sentry_sdk.Scope] = None,
+    ) -> Optional[str]:
+        """Queue the event to be built and sent in the background thread.
+
+        The event processors and `before_send` run in a copy of the current context, so the
+        context variables of the request, e.g. the recorded body, are available to them.
+
+        Args:
+            event: the event or the transaction.
+            hint: the hint of the event.
+            scope: the scope of the event, copied.
+
+        Returns:
+            The ID of the event, or None if the queue is full and the event is dropped.
+        """
+        event_id = event.setdefault('event_id', uuid.uuid4().hex)
+        # The scope of the request may change after the event is queued.
+        scope = copy.copy(scope)
+        capture_event: Callable[[], Any] = functools.partial(
+            contextvars.copy_context().run, super().capture_event, event, hint, scope,
+        )
+        if self._events_worker.submit(capture_event):
+            return event_id
+        if self.transport is not None:
+            data_category = 'transaction' if event.get('type') == 'transaction' else 'error'
+            self.transport.record_lost_event('queue_overflow', data_category=data_category)
+        return None
+
+    def flush(self, timeout: Optional[float] = None, callback: Optional[_FlushCallback] = None) -> None:
+        """Wait for the queued events to be built and sent."""
+        self._events_worker.flush(timeout if timeout is not None else self.options['shutdown_timeout'])
+        super().flush(timeout=timeout, callback=callback)
+
+    def close(self, timeout: Optional[float] = None, callback: Optional[_FlushCallback] = None) -> None:
+        """Send the queued events and stop the threads of the client."""
+        super().close(timeout=timeout, callback=callback)
+        self._events_worker.kill()
 
 
 def init_sentry() -> None:
     """Initialize Sentry."""
     # Sentry configuration options: https://docs.sentry.io/platforms/python/guides/asgi/configuration/options
-    sentry_sdk.init(
-        dsn=config.SENTRY_DSN,
-        debug=False,
-        release=config.SENTRY_RELEASE,
-        environment=config.SENTRY_ENVIRONMENT,
-        request_bodies='medium',
-        with_locals=False,
-        traces_sampler=_get_traces_sampler,
-    )
+    sentry_options: dict[str, Any] = {
+        'dsn': str(config.SENTRY_DSN) if config.SENTRY_DSN else None,
+        'debug': False,
+        'release': config.SENTRY_RELEASE,
+        'environment': config.SENTRY_ENVIRONMENT,
+        'request_bodies': 'medium',
+        'with_locals': False,
+        'traces_sampler': traces_sampler,
+    }
+    if config.SENTRY_LAZY_REQUEST_BODIES:
+        sentry_options.update(request_bodies='never', before_send=attach_request_body)
+    if config.SENTRY_BACKGROUND_EVENTS:
+        # The same as `sentry_sdk.init`, with the client class replaced.
+        sentry_sdk.Hub.current.bind_client(BackgroundEventsClient(**sentry_options))
+    else:
+        sentry_sdk.init(**sentry_options)
+    _sentry_sdk_logger.setLevel(logging.DEBUG if sentry_options['debug'] else logging.WARNING)
     sentry_sdk.set_tag('app_name', config.APP_NAME)
@@ -0,0 +1,269 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Streaming processing of NDJSON request bodies.
+
+The request body is read chunk by chunk, split into lines, and each line is validated
+against a schema; results are written back as NDJSON lines, one per input line. The body
+is never buffered as a whole, so the memory used by a request does not depend on its size.
+
+The three stages are connected with bounded buffers, so the slowest one sets the pace:
+1. reading: a background task reads the body, validates the lines of each received chunk
+   and puts them into a queue of at most `STREAMING_NDJSON_MAX_PENDING_CHUNKS` chunks. When
+   the queue is full, the body is not read further and the client is throttled by TCP;
+2. processing: the response generator takes the validated lines from the queue and awaits
+   the `process` coroutine function for each of them (`stream_ndjson`), or the
+   `process_batch` coroutine function for the valid lines of each chunk
+   (`stream_ndjson_batches`);
+3. writing: the response generator is resumed only after the ASGI server has sent the
+   previous chunk to the client, so a slow client pauses the processing.
+
+Example:
+    ```python
+    @router.post('/items/ndjson', response_class=NDJSONResponse)
+    async def create_items(request: Request) -> NDJSONResponse:
+        return NDJSONResponse(stream_ndjson(request.stream(), schema=MetadataMan, process=create_item))
+    ```
+"""
+
+import asyncio
+import contextlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Final, Iterator, Optional, TypeVar, Union
+
+import orjson
+from pydantic import ValidationError
+
+from src.boilerplate.config import config
+from src.boilerplate.errors import ClientError, get_error_schema
+from src.boilerplate.pydantic_helpers import ORJSON_OPTIONS, orjson_default
+from src.boilerplate.schemas.common_schemas import ErrorSchema
+from src.boilerplate.validation_registry import get_type_adapter
+
+SchemaT = TypeVar('SchemaT')
+
+# A validated line: its number and either the parsed item or the error result.
+_ParsedLine = tuple[int, Union[SchemaT, dict[str, Any]], bool]
+
+_END_OF_STREAM: Final[None] = None
+
+_RESULT_LINE_OPTIONS: Final[int] = ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+
+
+class NDJSONLineTooLongError(ClientError, ValueError):
+    """The NDJSON line exceeds the maximum line size."""
+
+
+async def iter_ndjson_lines(byte_chunks: AsyncIterator[bytes], max_line_size: int) -> AsyncIterator[list[bytes]]:
+    """Split a stream of byte chunks into NDJSON lines.
+
+    Lines are yielded in groups, one group per chunk that completes at least one line, so
+    the consumers do not pay a per-line `await`. Blank lines are skipped.
+
+    Args:
+        byte_chunks: chunks of the body, e.g. `request.stream()`.
+        max_line_size: the maximum size of a line in bytes.
+
+    Yields:
+        Lines completed by the received chunk, without line separators.
+
+    Raises:
+        NDJSONLineTooLongError: If a line exceeds `max_line_size` bytes.
+    """
+    buffer = bytearray()
+    async for chunk in byte_chunks:
+        buffer.extend(chunk)
+        lines = buffer.split(b'\n')
+        # The last element is the beginning of a line that is not complete yet.
+        buffer = lines.pop()
+        if len(buffer) > max_line_size:
+            raise NDJSONLineTooLongError(
+                'NDJSON line exceeds {max_line_size} bytes.'.format(max_line_size=max_line_size),
+            )
+        completed_lines = [bytes(line) for line in lines if line.strip()]
+        if completed_lines:
+            yield completed_lines
+    if buffer.strip():
+        yield [bytes(buffer)]
+
+
+async def stream_ndjson(
+    byte_chunks: AsyncIterator[bytes],
+    schema: type[SchemaT],
+    process: Callable[[SchemaT], Awaitable[dict[str, Any]]],
+    max_line_size: Optional[int] = None,
+    max_pending_chunks: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Validate and process an NDJSON stream line by line.
+
+    For each non-blank input line, one result line is written in the input order:
+    * `{"line_number": 1, "is_error": false, ...}` with the fields returned by `process`;
+    * `{"line_number": 2, "is_error": true, "error_name": ..., "error_message": ...,
+      "error_source": ...}` if the line is not valid.
+
+    A line that is too long ends the stream with an error line, since the position of the
+    next line is unknown.
+
+    Args:
+        byte_chunks: chunks of the body, e.g. `request.stream()`.
+        schema: schema of a line, e.g. `MetadataMan`.
+        process: coroutine function called with each validated line.
+        max_line_size: the maximum size of a line in bytes.
+        max_pending_chunks: the maximum number of chunks read ahead of the processing.
+
+    Yields:
+        Result lines of each processed chunk.
+    """
+    async with contextlib.aclosing(
+        _iter_parsed_chunks(
+            byte_chunks=byte_chunks,
+            schema=schema,
+            max_line_size=max_line_size,
+            max_pending_chunks=max_pending_chunks,
+        ),
+    ) as parsed_chunks:
+        async for parsed_lines in parsed_chunks:
+            result_lines = []
+            for line_number, parsed_item, is_error in parsed_lines:
+                if is_error:
+                    line_result = parsed_item
+                else:
+                    line_result = await process(parsed_item)  # type: ignore[arg-type]
+                result_lines.append(_dump_result_line(line_number=line_number, is_error=is_error, **line_result))
+            yield b''.join(result_lines)
+
+
+async def stream_ndjson_batches(
+    byte_chunks: AsyncIterator[bytes],
+    schema: type[SchemaT],
+    process_batch: Callable[[list[SchemaT]], Awaitable[list[Union[dict[str, Any], ErrorSchema]]]],
+    max_batch_size: Optional[int] = None,
+    max_line_size: Optional[int] = None,
+    max_pending_chunks: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Validate an NDJSON stream line by line and process the valid lines in batches.
+
+    The output is the same as of `stream_ndjson`. The valid lines of each received chunk
+    are passed to `process_batch` in batches of at most `max_batch_size` items, and the
+    result lines of the chunk are written only after all its batches have been processed.
+    So if `process_batch` writes the items durably, a result line means that its item is
+    saved. If `process_batch` fails, the stream ends without the results of the chunk.
+
+    Args:
+        byte_chunks: chunks of the body, e.g. `request.stream()`.
+        schema: schema of a line, e.g. `MetadataMan`.
+        process_batch: coroutine function called with the valid lines; it returns one
+            result per line, in the same order: the fields of the result line or the error.
+        max_batch_size: the maximum number of lines passed to `process_batch` at once.
+        max_line_size: the maximum size of a line in bytes.
+        max_pending_chunks: the maximum number of chunks read ahead of the processing.
+
+    Yields:
+        Result lines of each processed chunk.
+    """
+    max_batch_size = max_batch_size or config.STREAMING_NDJSON_MAX_BATCH_SIZE
+    async with contextlib.aclosing(
+        _iter_parsed_chunks(
+            byte_chunks=byte_chunks,
+            schema=schema,
+            max_line_size=max_line_size,
+            max_pending_chunks=max_pending_chunks,
+        ),
+    ) as parsed_chunks:
+        async for parsed_lines in parsed_chunks:
+            valid_items = [parsed_item for _, parsed_item, is_error in parsed_lines if not is_error]
+            item_results: list[Union[dict[str, Any], ErrorSchema]] = []
+            for batch_start in range(0, len(valid_items), max_batch_size):
+                item_results.extend(await process_batch(valid_items[batch_start:batch_start + max_batch_size]))
+            yield b''.join(_dump_batch_result_lines(parsed_lines=parsed_lines, item_results=iter(item_results)))
+
+
+async def _iter_parsed_chunks(
+    byte_chunks: AsyncIterator[bytes],
+    schema: type[SchemaT],
+    max_line_size: Optional[int],
+    max_pending_chunks: Optional[int],
+) -> AsyncIterator[list[_ParsedLine[SchemaT]]]:
+    pending_chunks: asyncio.Queue[Optional[list[_ParsedLine[SchemaT]]]] = asyncio.Queue(
+        maxsize=max_pending_chunks or config.STREAMING_NDJSON_MAX_PENDING_CHUNKS,
+    )
+    reader_task = asyncio.create_task(
+        _read_lines(
+            byte_chunks=byte_chunks,
+            schema=schema,
+            max_line_size=max_line_size or config.STREAMING_NDJSON_MAX_LINE_SIZE_BYTES,
+            pending_chunks=pending_chunks,
+        ),
+    )
+    try:
+        while True:
+            parsed_lines = await pending_chunks.get()
+            if parsed_lines is _END_OF_STREAM:
+                break
+            yield parsed_lines
+        # Re-raise the unexpected errors of the reader, e.g. a client disconnect.
+        await reader_task
+    finally:
+        reader_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await reader_task
+
+
+async def _read_lines(
+    byte_chunks: AsyncIterator[bytes],
+    schema: type[SchemaT],
+    max_line_size: int,
+    pending_chunks: 'asyncio.Queue[Optional[list[_ParsedLine[SchemaT]]]]',
+) -> None:
+    type_adapter = get_type_adapter(schema)
+    line_number = 0
+    try:
+        async for lines in iter_ndjson_lines(byte_chunks=byte_chunks, max_line_size=max_line_size):
+            parsed_lines: list[_ParsedLine[SchemaT]] = []
+            for line in lines:
+                line_number += 1
+                try:
+                    parsed_lines.append((line_number, type_adapter.validate_json(line), False))
+                except ValidationError as exc:
+                    parsed_lines.append((line_number, _get_error_result(exc), True))
+            await pending_chunks.put(parsed_lines)
+    except NDJSONLineTooLongError as exc:
+        await pending_chunks.put([(line_number + 1, _get_error_result(exc), True)])
+    except Exception:
+        # Wake up the consumer; it re-raises the error when awaiting this task.
+        await pending_chunks.put(_END_OF_STREAM)
+        raise
+    await pending_chunks.put(_END_OF_STREAM)
+
+
+def _get_error_result(exc: Exception) -> dict[str, Any]:
+    return get_error_schema(exc).model_dump()
+
+
+def _dump_batch_result_lines(
+    parsed_lines: list[_ParsedLine[SchemaT]],
+    item_results: Iterator[Union[dict[str, Any], ErrorSchema]],
+) -> Iterator[bytes]:
+    for line_number, parsed_item, is_error in parsed_lines:
+        if is_error:
+            yield _dump_result_line(line_number=line_number, is_error=True, **parsed_item)  # type: ignore[arg-type]
+            continue
+        item_result = next(item_results)
+        if isinstance(item_result, ErrorSchema):
+            yield _dump_result_line(line_number=line_number, is_error=True, **item_result.model_dump())
+        else:
+            yield _dump_result_line(line_number=line_number, is_error=False, **item_result)
+
+
+def _dump_result_line(**line_result: Any) -> bytes:
+    return orjson.dumps(line_result, default=orjson_default, option=_RESULT_LINE_OPTIONS)
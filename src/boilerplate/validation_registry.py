@@ -0,0 +1,71 @@
+# ########################################################################################
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this
+#  file except in compliance with the License. You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under
+#  the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+# ########################################################################################
+
+"""Registry of pre-built validators for hot-path parsing.
+
+Building a Pydantic validator is expensive compared to running it, and a `TypeAdapter`
+for types such as `list[MetadataMan]` would otherwise be rebuilt on every call. The
+registry builds one `TypeAdapter` per schema on first use and reuses it afterwards.
+
+`validate_json` parses raw bytes straight into models in `pydantic-core`, without first
+building Python dicts with `json.loads`.
+
+Example:
+    ```python
+    metadata = validate_json(MetadataMan, request_body)
+    batch = validate_json(list[MetadataMan], request_body)
+    ```
+"""
+
+from typing import Any, TypeVar, Union
+
+from pydantic import TypeAdapter
+
+SchemaT = TypeVar('SchemaT')
+
+_type_adapters: dict[Any, TypeAdapter[Any]] = {}
+
+
+def get_type_adapter(schema: type[SchemaT]) -> TypeAdapter[SchemaT]:
+    """Get the cached `TypeAdapter` of the schema, building it on first use.
+
+    Args:
+        schema: hashable type, e.g. `MetadataMan` or `list[MetadataMan]`.
+
+    Returns:
+        `TypeAdapter` of the schema.
+    """
+    type_adapter = _type_adapters.get(schema)
+    if type_adapter is None:
+        type_adapter = TypeAdapter(schema)
+        _type_adapters[schema] = type_adapter
+    return type_adapter
+
+
+def validate_python(schema: type[SchemaT], raw_data: Any) -> SchemaT:
+    """Validate Python data against the schema.
+
+    Raises:
+        pydantic.ValidationError: If the data is invalid.
+    """
+    return get_type_adapter(schema).validate_python(raw_data)
+
+
+def validate_json(schema: type[SchemaT], raw_json: Union[str, bytes, bytearray]) -> SchemaT:
+    """Parse and validate raw JSON against the schema in one pass.
+
+    Raises:
+        pydantic.ValidationError: If the JSON is malformed or the data is invalid.
+    """
+    return get_type_adapter(schema).validate_json(raw_json)
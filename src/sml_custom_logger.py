@@ -16,6 +16,7 @@
 
 from src.boilerplate.custom_logger import CustomLogger
 from src.boilerplate.schemas.common_schemas import MetadataOpt  # type: ignore[import]
+from src.boilerplate.validation_registry import validate_python
 
 _module_logger = CustomLogger().get_module_logger(
     name=__name__,
@@ -43,7 +44,7 @@ class LoggerTester(object):
 
         _module_logger.error(
             msg='Application progress: {app_progress}.'.format(app_progress='Some error occurred...'),
-            extra=self._metadata.dict(),
+            extra=self._metadata.model_dump(),
         )
 
     def log_exception(self) -> None:
@@ -63,7 +64,7 @@ class LoggerTester(object):
                 ),
                 exc_info=True,  # enabled by default for `exception` level
                 stack_info=True,  # enabled for demo purposes only
-                extra=self._metadata.dict(),
+                extra=self._metadata.model_dump(),
             )
             # raise exc  # send an exception one level up (sometimes this is not required)
 
@@ -77,7 +78,7 @@ class LoggerTester(object):
             msg='Application progress: {app_progress}.'.format(
                 app_progress='A serious error, indicating that the program itself may be unable to continue running.'
             ),
-            extra=self._metadata.dict(),
+            extra=self._metadata.model_dump(),
         )
 
 
@@ -87,7 +88,7 @@ def get_metadata() -> MetadataOpt:
         'task_id': 555,
         'callback_url': 'http://127.0.0.1:50000/callback_url',
     }
-    return MetadataOpt.parse_obj(raw_metadata)
+    return validate_python(MetadataOpt, raw_metadata)
 
 
 def main() -> None:
@@ -0,0 +1,158 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the `batching.py` module and of the task batch endpoint."""
+
+import asyncio
+import uuid
+from typing import Union
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.boilerplate.app import app
+from src.boilerplate.batching import process_batch
+from src.boilerplate.dependencies import is_request_has_correct_http_bearer_token
+from src.boilerplate.routers.task_controller import get_task_creator
+from src.boilerplate.schemas.common_schemas import ErrorSchema, MetadataMan, TaskStateSchema, TaskStatus
+
+
+class ConcurrencyProbe(object):
+    """Coroutine function stub that records the maximum number of concurrent calls."""
+
+    def __init__(self) -> None:
+        self.active_calls = 0
+        self.max_active_calls = 0
+
+    async def __call__(self, item_number: int) -> int:
+        self.active_calls += 1
+        self.max_active_calls = max(self.max_active_calls, self.active_calls)
+        await asyncio.sleep(0.001)
+        self.active_calls -= 1
+        if item_number < 0:
+            raise ValueError('Negative item number.')
+        return item_number * 10
+
+
+async def create_task_in_memory(metadata: MetadataMan) -> TaskStateSchema:
+    """Create a task without a database; task 3 always fails."""
+    if metadata.task_id == 3:
+        raise RuntimeError('Storage is not available.')
+    return TaskStateSchema(task_id=metadata.task_id, status=TaskStatus.pending)
+
+
+async def skip_bearer_token_check() -> None:
+    """Replace the bearer token check."""
+
+
+@pytest.mark.fast
+class TestBatching(object):
+    """Unit tests of the `batching.py` module and of the task batch endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_results_keep_order_and_concurrency_is_bounded(self) -> None:
+        """Test the fan-out of the batch items.
+
+        GIVEN: 50 items, one of which fails, and at most 4 concurrent items;
+
+        WHEN: the items are processed with the `process_batch` function;
+
+        THEN: results are in the order of the items, the failed item gets `ErrorSchema`,
+        and no more than 4 items are processed at a time.
+        """
+        probe = ConcurrencyProbe()
+        items = list(range(50))
+        items[7] = -1
+
+        results = await process_batch(items=items, process=probe, max_concurrency=4)
+
+        assert probe.max_active_calls == 4
+        assert results[:3] == [0, 10, 20]
+        assert isinstance(results[7], ErrorSchema)
+        assert results[7].error_name == 'InternalError'
+        assert results[49] == 490
+
+    def test_batch_endpoint_reports_partial_failure(self) -> None:
+        """Test the per-item results of the task batch endpoint.
+
+        GIVEN: a valid item, an item without `idempotency_key` and an item whose creation fails;
+
+        WHEN: the batch is posted to the task batch endpoint;
+
+        THEN: the response is 200, the valid item is pending and the others have errors.
+        """
+        app.dependency_overrides[get_task_creator] = lambda: create_task_in_memory
+        app.dependency_overrides[is_request_has_correct_http_bearer_token] = skip_bearer_token_check
+        batch_items = [
+            {'idempotency_key': str(uuid.uuid4()), 'task_id': 1},
+            {'task_id': 2},
+            {'idempotency_key': str(uuid.uuid4()), 'task_id': 3},
+        ]
+        try:
+            response = TestClient(app).post(
+                '/api/v1/tasks/batch',
+                headers={'Accept': 'application/json'},
+                json={'items': batch_items},
+            )
+        finally:
+            app.dependency_overrides.clear()
+
+        response_body = response.json()
+        assert response.status_code == 200
+        assert response_body['error_count'] == 2
+        assert [item['is_error'] for item in response_body['items']] == [False, True, True]
+        assert response_body['items'][0]['status'] == 'pending'
+        assert response_body['items'][1]['error']['error_message']['errors'][0]['msg'] == 'Field required'
+        assert response_body['items'][2]['error']['error_name'] == 'InternalError'
+        assert 'Storage' not in response.text
+
+    @pytest.mark.parametrize(
+        'request_body,expected_type,expected_loc', [
+            pytest.param(b'{"items": []}', 'too_short', ['body', 'items'], id='empty_batch'),
+            pytest.param(b'{"items": [{"task_id": "x"}]}', 'int_parsing', ['body', 'items', 0, 'task_id'], id='item'),
+            pytest.param(b'{"items": [', 'json_invalid', ['body'], id='malformed_json'),
+        ],
+    )
+    def test_batch_endpoint_rejects_invalid_body(
+        self,
+        request_body: bytes,
+        expected_type: str,
+        expected_loc: list[Union[str, int]],
+    ) -> None:
+        """Test the validation of the raw batch body.
+
+        GIVEN: an empty batch, a batch with an invalid item or malformed JSON;
+
+        WHEN: the body is posted to the task batch endpoint;
+
+        THEN: the response is 422 with the error type and the location of the body part.
+
+        Args:
+            request_body: the raw request body.
+            expected_type: the expected error type.
+            expected_loc: the expected error location.
+        """
+        app.dependency_overrides[is_request_has_correct_http_bearer_token] = skip_bearer_token_check
+        try:
+            response = TestClient(app).post(
+                '/api/v1/tasks/batch',
+                headers={'Accept': 'application/json', 'Content-Type': 'application/json'},
+                content=request_body,
+            )
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 422
+        assert response.json()['detail'][0]['type'] == expected_type
+        assert response.json()['detail'][0]['loc'] == expected_loc
@@ -0,0 +1,172 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""Benchmarks of the hot paths of the application, see `package_scripts/run_benchmarks.sh`.
+
+The benchmarks use `pytest-benchmark`. By default (`--benchmark-disable` in `addopts`) each
+benchmark runs once as a regular test. Run them with `--benchmark-enable`, save a baseline
+with `--benchmark-save` and fail on regressions with `--benchmark-compare-fail`.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Any, Iterator
+
+import httpx
+import pytest
+from pydantic import SecretStr
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from src.boilerplate.app import app
+from src.boilerplate.config import DevelopmentConfig, config
+from src.boilerplate.custom_logger import CustomAdapter, LevelFilter
+from src.boilerplate.pydantic_helpers import (
+    convert_str_snake_to_camel,
+    orjson_default,
+    orjson_dumps,
+    replace_empty_values_to_none,
+)
+from src.boilerplate.schemas.common_schemas import BatchRequestSchema, MetadataMan
+from src.boilerplate.validation_registry import validate_json
+
+_BEARER_TOKEN = 'benchmark-token'
+_RAW_METADATA = {
+    'idempotency_key': str(uuid.uuid4()),
+    'task_id': 555,
+    'callback_url': 'http://127.0.0.1:50000/callback_url',
+}
+_BATCH_REQUEST_JSON = BatchRequestSchema[MetadataMan](
+    items=[MetadataMan.model_validate({**_RAW_METADATA, 'task_id': task_id}) for task_id in range(1, 101)],
+).model_dump_json()
+
+
+@pytest.fixture
+def event_loop_runner() -> Iterator[asyncio.AbstractEventLoop]:
+    """Get an event loop to run coroutines in the synchronous benchmarks."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.mark.fast
+class TestHotPathBenchmarks(object):
+    """Benchmarks of the hot paths of the application."""
+
+    @pytest.mark.benchmark(group='logging')
+    def test_custom_adapter_process(self, benchmark: BenchmarkFixture) -> None:
+        """Benchmark `CustomAdapter.process` with the module and the call `extra`."""
+        adapter = CustomAdapter(logger=logging.getLogger(__name__), extra={'env_state': 'development'})
+
+        processed_msg, _ = benchmark(adapter.process, 'Task created.', {'extra': {'task_id': 1}})
+
+        assert processed_msg == 'env_state: development | task_id: 1 | Task created.'
+
+    @pytest.mark.benchmark(group='logging')
+    def test_level_filter(self, benchmark: BenchmarkFixture) -> None:
+        """Benchmark `LevelFilter.filter`."""
+        level_filter = LevelFilter(low=logging.DEBUG, high=logging.WARNING)
+        record = logging.LogRecord(__name__, logging.INFO, __file__, 1, 'Task created.', None, None)
+
+        assert benchmark(level_filter.filter, record)
+
+    @pytest.mark.benchmark(group='config')
+    def test_config_construction(self, benchmark: BenchmarkFixture) -> None:
+        """Benchmark the construction of the config from the environment and the `.env` file."""
+        development_config = benchmark(DevelopmentConfig)
+
+        assert development_config.APP_NAME == config.APP_NAME
+
+    @pytest.mark.benchmark(group='pydantic_helpers')
+    def test_orjson_dumps(self, benchmark: BenchmarkFixture) -> None:
+        """Benchmark `orjson_dumps` of a batch of task states."""
+        payload = {'items': [{'task_id': task_id, 'status': 'pending', 'error': None} for task_id in range(100)]}
+
+        dumped_payload = benchmark(orjson_dumps, payload, default=orjson_default)
+
+        assert dumped_payload.startswith('{"items":[{"task_id":0')
+
+    @pytest.mark.benchmark(group='pydantic_helpers')
+    @pytest.mark.parametrize(
+        'checked_value,expected', [
+            pytest.param('', None, id='empty_str'),
+            pytest.param('None', None, id='none_str'),
+            pytest.param('value', 'value', id='str'),
+            pytest.param([], None, id='empty_list'),
+            pytest.param({'key': 1}, {'key': 1}, id='dict'),
+        ],
+    )
+    def test_replace_empty_values_to_none(
+        self,
+        benchmark: BenchmarkFixture,
+        checked_value: Any,
+        expected: Any,
+    ) -> None:
+        """Benchmark `replace_empty_values_to_none` with empty and non-empty values.
+
+        Args:
+            benchmark: the pytest-benchmark fixture.
+            checked_value: the replaced value.
+            expected: the value returned.
+        """
+        assert benchmark(replace_empty_values_to_none, checked_value) == expected
+
+    @pytest.mark.benchmark(group='pydantic_helpers')
+    @pytest.mark.parametrize('is_cached', [True, False], ids=['cached', 'uncached'])
+    def test_convert_str_snake_to_camel(self, benchmark: BenchmarkFixture, is_cached: bool) -> None:
+        """Benchmark `convert_str_snake_to_camel` with and without its LRU cache.
+
+        Args:
+            benchmark: the pytest-benchmark fixture.
+            is_cached: whether the cached function is called.
+        """
+        convert = convert_str_snake_to_camel if is_cached else convert_str_snake_to_camel.__wrapped__
+
+        assert benchmark(convert, 'http_response_status_code') == 'httpResponseStatusCode'
+
+    @pytest.mark.benchmark(group='schemas')
+    def test_batch_request_validation(self, benchmark: BenchmarkFixture) -> None:
+        """Benchmark the validation of a batch request of 100 items from JSON."""
+        batch_request = benchmark(validate_json, BatchRequestSchema[MetadataMan], _BATCH_REQUEST_JSON)
+
+        assert len(batch_request.items) == 100
+
+    @pytest.mark.benchmark(group='asgi')
+    def test_asgi_round_trip(
+        self,
+        benchmark: BenchmarkFixture,
+        event_loop_runner: asyncio.AbstractEventLoop,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Benchmark an admin request through the middleware, the auth and the router of `app`.
+
+        Args:
+            benchmark: the pytest-benchmark fixture.
+            event_loop_runner: the event loop of the requests.
+            monkeypatch: the pytest fixture.
+        """
+        monkeypatch.setattr(config, 'APP_API_ACCESS_HTTP_BEARER_TOKEN', SecretStr(_BEARER_TOKEN))
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://testserver')
+        headers = {'Authorization': 'Bearer {token}'.format(token=_BEARER_TOKEN), 'Accept': 'application/json'}
+
+        def get_app_config() -> httpx.Response:  # noqa: WPS430
+            return event_loop_runner.run_until_complete(
+                client.get('/api/{version}/admin/app-config'.format(version=config.APP_API_VERSION), headers=headers),
+            )
+
+        response = benchmark(get_app_config)
+        event_loop_runner.run_until_complete(client.aclose())
+
+        assert response.status_code == 200
@@ -0,0 +1,193 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the `BulkWriter` class of the `db/bulk_writer.py` module."""
+
+import contextlib
+from typing import Any, AsyncIterator
+
+import asyncpg
+import pytest
+import sqlalchemy as sa
+
+from src.boilerplate.config import config
+from src.boilerplate.db.bulk_writer import BulkWriterOverflowError, create_task_error_writer
+from src.boilerplate.schemas.common_schemas import ErrorSchema
+from src.boilerplate.schemas.records import ErrorRecord
+
+
+class FakeConnection(object):
+    """`asyncpg` connection stub that records the `COPY` calls."""
+
+    def __init__(self, failures: int, poison_error_names: frozenset[str]) -> None:
+        self.failures = failures
+        self.poison_error_names = poison_error_names
+        self.copied_batches: list[list[tuple[Any, ...]]] = []
+
+    async def copy_records_to_table(self, table_name: str, **kwargs: Any) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionResetError('Connection lost.')
+        if any(row[1] in self.poison_error_names for row in kwargs['records']):
+            raise asyncpg.UniqueViolationError('duplicate key value violates unique constraint')
+        self.copied_batches.append(list(kwargs['records']))
+
+
+class FakePool(object):
+    """`asyncpg` pool stub that always returns the same connection."""
+
+    def __init__(self, failures: int = 0, poison_error_names: frozenset[str] = frozenset()) -> None:
+        self.connection = FakeConnection(failures=failures, poison_error_names=poison_error_names)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[FakeConnection]:
+        yield self.connection
+
+
+@pytest.fixture()
+def no_retry_wait(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Disable waiting between retry attempts."""
+    monkeypatch.setattr(config, 'TENACITY_WAIT_FIXED', 0)
+    monkeypatch.setattr(config, 'TENACITY_WAIT_RANDOM_MAX', 0)
+
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+class TestBulkWriter(object):
+    """Unit tests of the `BulkWriter` class."""
+
+    async def test_flush_on_max_batch_size(self) -> None:
+        """Test that the buffer is written as soon as it reaches `max_batch_size`.
+
+        GIVEN: a writer with `max_batch_size=2`;
+
+        WHEN: three records are added;
+
+        THEN: the first two records are copied in one batch, the third stays in the buffer.
+        """
+        pool = FakePool()
+        writer = create_task_error_writer(max_batch_size=2, pool=pool)
+
+        for task_id in range(1, 4):
+            await writer.add(ErrorSchema(error_name='SomeError', error_message={'key': 'val'}), task_id=task_id)
+
+        assert pool.connection.copied_batches == [
+            [(1, 'SomeError', '{"key":"val"}', None), (2, 'SomeError', '{"key":"val"}', None)],
+        ]
+        assert writer.buffered_rows == 1
+
+    async def test_records_and_models_give_same_rows(self) -> None:
+        """Test the rows of the internal records.
+
+        GIVEN: an `ErrorSchema` model and the `ErrorRecord` of the model;
+
+        WHEN: both are added to the writer and flushed;
+
+        THEN: both give the same row.
+        """
+        pool = FakePool()
+        writer = create_task_error_writer(pool=pool)
+        error = ErrorSchema(error_name='SomeError', error_message={'key': 'val'}, error_source='boilerplate')
+
+        await writer.add_many([error, ErrorRecord.from_model(error)], task_id=1)
+        await writer.flush()
+
+        assert pool.connection.copied_batches == [[(1, 'SomeError', '{"key":"val"}', 'boilerplate')] * 2]
+
+    async def test_failed_batch_is_retried_in_order(self, no_retry_wait: None) -> None:
+        """Test the ordered retry of a failed batch.
+
+        GIVEN: a connection that fails the first two `COPY` calls;
+
+        WHEN: buffered records are flushed;
+
+        THEN: the batches are written in the order the records were added.
+        """
+        pool = FakePool(failures=2)
+        writer = create_task_error_writer(max_batch_size=10, pool=pool)
+        await writer.add_many([ErrorSchema(error_name=str(task_id)) for task_id in range(5)], task_id=1)
+
+        written_rows = await writer.flush()
+
+        assert written_rows == 5
+        assert [row[1] for row in pool.connection.copied_batches[0]] == ['0', '1', '2', '3', '4']
+        assert writer.buffered_rows == 0
+
+    async def test_rows_are_kept_if_retries_are_exhausted(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        no_retry_wait: None,
+    ) -> None:
+        """Test that rows are not lost when all attempts fail.
+
+        GIVEN: a connection that fails more times than `TENACITY_STOP_AFTER_ATTEMPT`;
+
+        WHEN: buffered records are flushed;
+
+        THEN: the error is raised and the records remain in the buffer.
+        """
+        monkeypatch.setattr(config, 'TENACITY_STOP_AFTER_ATTEMPT', 2)
+        pool = FakePool(failures=3)
+        writer = create_task_error_writer(max_batch_size=10, pool=pool)
+        await writer.add(ErrorSchema(error_name='SomeError'), task_id=1)
+
+        with pytest.raises(ConnectionResetError):
+            await writer.flush()
+
+        assert writer.buffered_rows == 1
+
+    async def test_poison_row_is_dead_lettered(self) -> None:
+        """Test that a row rejected by the database does not block the buffer.
+
+        GIVEN: a connection that rejects the rows of one record with `UniqueViolationError`;
+
+        WHEN: buffered records are flushed;
+
+        THEN: the other rows are written in order, the rejected row is passed to the
+        dead-letter handler and the buffer is empty.
+        """
+        dead_letter_rows = []
+
+        async def dead_letter(table: sa.Table, row: tuple[Any, ...], exc: Exception) -> None:  # noqa: WPS430
+            dead_letter_rows.append((row[1], type(exc)))
+
+        pool = FakePool(poison_error_names=frozenset({'2'}))
+        writer = create_task_error_writer(max_batch_size=10, pool=pool, dead_letter=dead_letter)
+        await writer.add_many([ErrorSchema(error_name=str(task_id)) for task_id in range(5)], task_id=1)
+
+        written_rows = await writer.flush()
+
+        assert written_rows == 4
+        assert [batch[0][1] for batch in pool.connection.copied_batches] == ['0', '1', '3', '4']
+        assert dead_letter_rows == [('2', asyncpg.UniqueViolationError)]
+        assert writer.buffered_rows == 0
+
+    async def test_full_buffer_rejects_rows(self, monkeypatch: pytest.MonkeyPatch, no_retry_wait: None) -> None:
+        """Test the buffer limit.
+
+        GIVEN: a writer with `max_buffer_size=2` and a connection that is down;
+
+        WHEN: a third record is added;
+
+        THEN: `BulkWriterOverflowError` is raised and the buffer does not grow.
+        """
+        monkeypatch.setattr(config, 'TENACITY_STOP_AFTER_ATTEMPT', 1)
+        pool = FakePool(failures=100)
+        writer = create_task_error_writer(max_batch_size=10, max_buffer_size=2, pool=pool)
+        await writer.add_many([ErrorSchema(error_name=str(task_id)) for task_id in range(2)], task_id=1)
+
+        with pytest.raises(BulkWriterOverflowError):
+            await writer.add(ErrorSchema(error_name='2'), task_id=1)
+
+        assert writer.buffered_rows == 2
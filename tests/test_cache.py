@@ -0,0 +1,190 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the `AsyncCache` class of the `cache.py` module."""
+
+import asyncio
+from typing import Optional
+
+import pytest
+
+from src.boilerplate.cache import AsyncCache
+
+
+class FakeTimer(object):
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingLoader(object):
+    """Coroutine function stub that counts its calls."""
+
+    def __init__(self, loaded_value: Optional[str], delay: float = 0) -> None:
+        self.loaded_value = loaded_value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> Optional[str]:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.loaded_value
+
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+class TestAsyncCache(object):
+    """Unit tests of the `AsyncCache` class."""
+
+    async def test_concurrent_misses_share_one_computation(self) -> None:
+        """Test the stampede protection.
+
+        GIVEN: an empty cache and a slow loader;
+
+        WHEN: the same key is requested concurrently 100 times;
+
+        THEN: the loader is called once and all callers get its result.
+        """
+        cache: AsyncCache[str] = AsyncCache(max_size=10, ttl_seconds=10)
+        loader = CountingLoader(loaded_value='pending', delay=0.01)
+
+        cached_values = await asyncio.gather(*(cache.get_or_compute(key=1, compute=loader) for _ in range(100)))
+
+        assert loader.calls == 1
+        assert set(cached_values) == {'pending'}
+        assert cache.get_stats()['coalesced'] == 99
+
+    async def test_entry_expires_after_ttl(self) -> None:
+        """Test the TTL of the entries.
+
+        GIVEN: a cached key;
+
+        WHEN: the key is requested before and after its TTL;
+
+        THEN: the loader is called again only after the TTL.
+        """
+        timer = FakeTimer()
+        cache: AsyncCache[str] = AsyncCache(max_size=10, ttl_seconds=5, timer=timer)
+        loader = CountingLoader(loaded_value='pending')
+
+        await cache.get_or_compute(key=1, compute=loader)
+        timer.now = 4.9
+        await cache.get_or_compute(key=1, compute=loader)
+        assert loader.calls == 1
+
+        timer.now = 5.1
+        await cache.get_or_compute(key=1, compute=loader)
+        assert loader.calls == 2
+
+    async def test_least_recently_used_entry_is_evicted(self) -> None:
+        """Test the LRU bound of the cache.
+
+        GIVEN: a full cache of two keys, where key `1` has been used recently;
+
+        WHEN: the third key is added;
+
+        THEN: key `2` is evicted.
+        """
+        cache: AsyncCache[str] = AsyncCache(max_size=2, ttl_seconds=10)
+        cache.set(key=1, cache_value='one')
+        cache.set(key=2, cache_value='two')
+        await cache.get_or_compute(key=1, compute=CountingLoader(loaded_value=None))
+
+        cache.set(key=3, cache_value='three')
+
+        loader = CountingLoader(loaded_value='new')
+        assert await cache.get_or_compute(key=1, compute=loader) == 'one'
+        assert await cache.get_or_compute(key=2, compute=loader) == 'new'
+        assert cache.get_stats()['evictions'] >= 1
+
+    async def test_missing_value_is_cached(self) -> None:
+        """Test the negative caching.
+
+        GIVEN: a loader that returns `None`;
+
+        WHEN: the key is requested twice;
+
+        THEN: the loader is called once.
+        """
+        cache: AsyncCache[str] = AsyncCache(max_size=10, ttl_seconds=10, negative_ttl_seconds=1)
+        loader = CountingLoader(loaded_value=None)
+
+        assert await cache.get_or_compute(key=1, compute=loader) is None
+        assert await cache.get_or_compute(key=1, compute=loader) is None
+        assert loader.calls == 1
+        assert cache.get_stats()['negative_hits'] == 1
+
+    async def test_zero_ttl_disables_caching(self) -> None:
+        """Test an explicit zero lifetime of the entries.
+
+        GIVEN: a cache with `ttl_seconds=0`;
+
+        WHEN: the key is requested twice;
+
+        THEN: the zero is not replaced with the configured lifetime, and the loader is called twice.
+        """
+        cache: AsyncCache[str] = AsyncCache(max_size=10, ttl_seconds=0)
+        loader = CountingLoader(loaded_value='value')
+
+        assert await cache.get_or_compute(key=1, compute=loader) == 'value'
+        assert await cache.get_or_compute(key=1, compute=loader) == 'value'
+        assert loader.calls == 2
+
+    async def test_invalidation_during_computation(self) -> None:
+        """Test that a result computed before the invalidation is not stored.
+
+        GIVEN: a computation in progress;
+
+        WHEN: the key is invalidated before the computation completes;
+
+        THEN: the next request computes the value again.
+        """
+        cache: AsyncCache[str] = AsyncCache(max_size=10, ttl_seconds=10)
+        stale_loader = CountingLoader(loaded_value='pending', delay=0.01)
+        fresh_loader = CountingLoader(loaded_value='completed')
+
+        stale_lookup = asyncio.create_task(cache.get_or_compute(key=1, compute=stale_loader))
+        await asyncio.sleep(0)
+        cache.invalidate(key=1)
+        assert await stale_lookup == 'pending'
+
+        assert await cache.get_or_compute(key=1, compute=fresh_loader) == 'completed'
+        assert fresh_loader.calls == 1
+
+    async def test_cancelled_caller_does_not_cancel_waiters(self) -> None:
+        """Test that the shared computation survives the cancellation of its starter.
+
+        GIVEN: a computation started by one caller and awaited by another one;
+
+        WHEN: the first caller is cancelled;
+
+        THEN: the second caller gets the value and the value is cached.
+        """
+        cache: AsyncCache[str] = AsyncCache(max_size=10, ttl_seconds=10)
+        loader = CountingLoader(loaded_value='pending', delay=0.01)
+
+        starting_lookup = asyncio.create_task(cache.get_or_compute(key=1, compute=loader))
+        await asyncio.sleep(0)
+        waiting_lookup = asyncio.create_task(cache.get_or_compute(key=1, compute=loader))
+        await asyncio.sleep(0)
+        starting_lookup.cancel()
+
+        assert await waiting_lookup == 'pending'
+        assert starting_lookup.cancelled()
+        assert await cache.get_or_compute(key=1, compute=loader) == 'pending'
+        assert loader.calls == 1
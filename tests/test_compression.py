@@ -0,0 +1,189 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the `compression.py` module."""
+
+import asyncio
+import zlib
+from typing import Any, AsyncIterator, Optional
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+from starlette.types import ASGIApp, Message
+
+from src.boilerplate.app import app
+from src.boilerplate.compression import CompressionMiddleware, negotiate_encoding
+
+_JSON_BODY = b'{"task_id": 1, "status": "pending"}' * 100
+
+
+async def get_response(app: ASGIApp, accept_encoding: str) -> tuple[Headers, list[bytes]]:
+    """Call the ASGI app and collect the response headers and body chunks."""
+    sent_messages: list[Message] = []
+    request_messages: list[Message] = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    client_disconnected = asyncio.Event()
+
+    async def receive() -> Message:  # noqa: WPS430
+        if request_messages:
+            return request_messages.pop()
+        # The client stays connected until the whole response is sent.
+        await client_disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message: Message) -> None:  # noqa: WPS430
+        sent_messages.append(message)
+
+    scope: dict[str, Any] = {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/',
+        'headers': [(b'accept-encoding', accept_encoding.encode())],
+    }
+    await CompressionMiddleware(app, minimum_size=500)(scope, receive, send)
+    client_disconnected.set()
+    return Headers(raw=sent_messages[0]['headers']), [message['body'] for message in sent_messages[1:]]
+
+
+@pytest.mark.fast
+class TestCompression(object):
+    """Unit tests of the `compression.py` module."""
+
+    @pytest.mark.parametrize(
+        'accept_encoding,expected', [
+            pytest.param('gzip, deflate, br, zstd', 'zstd', id='server_preference_on_tie'),
+            pytest.param('gzip;q=1.0, br;q=0.5', 'gzip', id='client_quality'),
+            pytest.param('br;q=0, *', 'zstd', id='wildcard'),
+            pytest.param('deflate, identity', None, id='not_supported'),
+            pytest.param('', None, id='empty'),
+        ],
+    )
+    def test_negotiate_encoding(self, accept_encoding: str, expected: Optional[str]) -> None:
+        """Test the choice of the content encoding.
+
+        GIVEN: an `Accept-Encoding` header value and the zstd, br, gzip server preference;
+
+        WHEN: the `negotiate_encoding` function is called;
+
+        THEN: the encoding with the highest q-value, or the preferred one on a tie, is chosen.
+
+        Args:
+            accept_encoding: the `Accept-Encoding` header value.
+            expected: the expected encoding.
+        """
+        assert negotiate_encoding(accept_encoding, supported_encodings=('zstd', 'br', 'gzip')) == expected
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        'body,media_type,expected_encoding', [
+            pytest.param(_JSON_BODY, 'application/json', 'gzip', id='json'),
+            pytest.param(b'{}', 'application/json', None, id='below_minimum_size'),
+            pytest.param(_JSON_BODY, 'image/png', None, id='already_compressed'),
+        ],
+    )
+    async def test_whole_body_compression(
+        self,
+        body: bytes,
+        media_type: str,
+        expected_encoding: Optional[str],
+    ) -> None:
+        """Test the compression of a response sent in one message.
+
+        GIVEN: a large JSON body, a small JSON body or a PNG body;
+
+        WHEN: the response passes through the middleware with `Accept-Encoding: gzip`;
+
+        THEN: only the large JSON body is compressed, with the matching `Content-Length`.
+
+        Args:
+            body: the response body.
+            media_type: the response media type.
+            expected_encoding: the expected `Content-Encoding`.
+        """
+        headers, body_chunks = await get_response(Response(body, media_type=media_type), accept_encoding='gzip')
+
+        response_body = b''.join(body_chunks)
+        assert headers.get('content-encoding') == expected_encoding
+        assert int(headers['content-length']) == len(response_body)
+        if expected_encoding is not None:
+            assert headers['vary'] == 'Accept-Encoding'
+            response_body = zlib.decompress(response_body, zlib.MAX_WBITS | 16)
+        assert response_body == body
+
+    @pytest.mark.asyncio
+    async def test_streaming_chunks_are_flushed(self) -> None:
+        """Test the chunk by chunk compression of a streaming response.
+
+        GIVEN: a streaming response of two small chunks;
+
+        WHEN: the response passes through the middleware with `Accept-Encoding: gzip`;
+
+        THEN: the first compressed chunk decompresses to the first chunk on its own,
+        and the response has no `Content-Length`.
+        """
+        async def stream_body() -> AsyncIterator[bytes]:  # noqa: WPS430
+            yield b'{"line_number": 1}\n'
+            yield b'{"line_number": 2}\n'
+
+        headers, body_chunks = await get_response(StreamingResponse(stream_body()), accept_encoding='gzip')
+
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        assert headers['content-encoding'] == 'gzip'
+        assert 'content-length' not in headers
+        assert decompressor.decompress(body_chunks[0]) == b'{"line_number": 1}\n'
+        assert decompressor.decompress(b''.join(body_chunks[1:])) == b'{"line_number": 2}\n'
+        assert decompressor.eof
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('encoding,module_name', [('br', 'brotli'), ('zstd', 'zstandard')])
+    async def test_optional_encodings(self, encoding: str, module_name: str) -> None:
+        """Test the `br` and `zstd` encodings, if their packages are installed.
+
+        GIVEN: a large JSON body;
+
+        WHEN: the response passes through the middleware with the encoding accepted;
+
+        THEN: the body is compressed with the encoding and decompresses to the source body.
+
+        Args:
+            encoding: the content encoding.
+            module_name: the package implementing the encoding.
+        """
+        compression_module = pytest.importorskip(module_name)
+
+        headers, body_chunks = await get_response(Response(_JSON_BODY), accept_encoding=encoding)
+
+        assert headers['content-encoding'] == encoding
+        if encoding == 'br':
+            assert compression_module.decompress(b''.join(body_chunks)) == _JSON_BODY
+        else:
+            # Streamed frames have no content size in the header, so a streaming decompressor is used.
+            decompressor = compression_module.ZstdDecompressor().decompressobj()
+            assert decompressor.decompress(b''.join(body_chunks)) == _JSON_BODY
+
+    def test_app_starts_with_compression(self) -> None:
+        """Test the middleware of the application.
+
+        GIVEN: the application;
+
+        WHEN: the application runs its startup and shutdown events;
+
+        THEN: the application starts, and its responses are compressed.
+        """
+        with TestClient(app) as client:
+            response = client.get('/openapi.json', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.status_code == 200
+        assert response.headers['content-encoding'] == 'gzip'
@@ -0,0 +1,126 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""Unit tests of the `conditional_requests.py` module."""
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from src.boilerplate.conditional_requests import ContentVersion, ETagMiddleware, conditional_get, is_etag_matched
+
+
+class VersionedContent(object):
+    """Content with a version and a counter of the handler calls."""
+
+    def __init__(self) -> None:
+        self.content = {'value': 1}
+        self.version = ContentVersion(get_content=lambda: str(self.content).encode())
+        self.handler_calls = 0
+
+
+def create_app(versioned_content: VersionedContent) -> FastAPI:
+    """Create an application with a versioned route and a tagged-by-hash route."""
+    app = FastAPI()
+    app.add_middleware(ETagMiddleware)
+
+    @app.get('/versioned', dependencies=[Depends(conditional_get('no-cache', version=versioned_content.version))])
+    async def get_versioned() -> dict[str, int]:  # noqa: WPS430
+        versioned_content.handler_calls += 1
+        return versioned_content.content
+
+    @app.get('/hashed', dependencies=[Depends(conditional_get('private, max-age=5'))])
+    async def get_hashed() -> dict[str, int]:  # noqa: WPS430
+        return versioned_content.content
+
+    return app
+
+
+@pytest.mark.fast
+class TestConditionalRequests(object):
+    """Unit tests of the `conditional_requests.py` module."""
+
+    @pytest.mark.parametrize(
+        'if_none_match,expected', [
+            pytest.param('W/"abc"', True, id='weak'),
+            pytest.param('"abc"', True, id='strong'),
+            pytest.param('"x", W/"abc"', True, id='list'),
+            pytest.param('*', True, id='wildcard'),
+            pytest.param('W/"abd"', False, id='other'),
+            pytest.param('', False, id='empty'),
+        ],
+    )
+    def test_is_etag_matched(self, if_none_match: str, expected: bool) -> None:
+        """Test the weak comparison of the tags.
+
+        GIVEN: an `If-None-Match` header value and the `W/"abc"` tag;
+
+        WHEN: the `is_etag_matched` function is called;
+
+        THEN: the tag matches regardless of the weak prefix, in a list or with a wildcard.
+
+        Args:
+            if_none_match: the `If-None-Match` header value.
+            expected: the expected result.
+        """
+        assert is_etag_matched(if_none_match=if_none_match, etag='W/"abc"') is expected
+
+    def test_versioned_route_skips_handler(self) -> None:
+        """Test the `304` response of a route with a content version.
+
+        GIVEN: a route whose content has a `ContentVersion`;
+
+        WHEN: the route is requested with the tag of the previous response, before and after
+        a version bump;
+
+        THEN: the handler is not called for `304`, and it is called again after the bump.
+        """
+        versioned_content = VersionedContent()
+        client = TestClient(create_app(versioned_content))
+
+        etag = client.get('/versioned').headers['etag']
+        not_modified_response = client.get('/versioned', headers={'If-None-Match': etag})
+        versioned_content.content = {'value': 2}
+        versioned_content.version.bump()
+        modified_response = client.get('/versioned', headers={'If-None-Match': etag})
+
+        assert not_modified_response.status_code == 304
+        assert not_modified_response.content == b''
+        assert not_modified_response.headers['cache-control'] == 'no-cache'
+        assert modified_response.status_code == 200
+        assert modified_response.json() == {'value': 2}
+        assert versioned_content.handler_calls == 2
+
+    def test_middleware_tags_body(self) -> None:
+        """Test the `304` response of a route tagged by the body hash.
+
+        GIVEN: a route without a content version behind `ETagMiddleware`;
+
+        WHEN: the route is requested with the tag of the previous response;
+
+        THEN: the response is `304` with the same tag and `Cache-Control`, and without a body.
+        """
+        client = TestClient(create_app(VersionedContent()))
+
+        response = client.get('/hashed')
+        not_modified_response = client.get('/hashed', headers={'If-None-Match': response.headers['etag']})
+
+        assert response.headers['etag'].startswith('W/"')
+        assert response.headers['cache-control'] == 'private, max-age=5'
+        assert not_modified_response.status_code == 304
+        assert not_modified_response.headers['etag'] == response.headers['etag']
+        assert not_modified_response.headers['cache-control'] == 'private, max-age=5'
+        assert 'content-length' not in not_modified_response.headers
+        assert not_modified_response.content == b''
@@ -0,0 +1,70 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the functions of the `dataframe_helpers.py` module."""
+
+from collections import OrderedDict, UserList
+
+import pandas as pd
+import pytest
+
+from src.boilerplate.dataframe_helpers import replace_empty_values_to_none_in_frame
+from src.boilerplate.pydantic_helpers import replace_empty_values_to_none
+from tests.test_pydantic_helpers import REPLACE_EMPTY_VALUES_CASES
+
+
+@pytest.mark.fast
+class TestDataframeHelpers(object):
+    """Unit tests of the functions of the `dataframe_helpers.py` module."""
+
+    def test_replace_empty_values_to_none_in_frame_parity(self) -> None:
+        """Test that the vectorized version matches the scalar one cell by cell.
+
+        GIVEN: an object column with the cases of `test_replace_empty_values_to_none`,
+        values that must be kept and container subclasses, and an integer column;
+
+        WHEN: the `replace_empty_values_to_none_in_frame` function is called;
+
+        THEN: the result equals the scalar function applied to every cell,
+        and the source frame is not modified.
+        """
+        checked_values = [checked_value for checked_value, _ in REPLACE_EMPTY_VALUES_CASES]
+        checked_values.extend([(), [1], {'key': ''}, 0, OrderedDict(), OrderedDict(key=1), UserList()])
+        frame = pd.DataFrame({
+            'values': pd.Series(checked_values, dtype=object),
+            'numbers': range(len(checked_values)),
+        })
+        source_frame = frame.copy()
+
+        cleaned_frame = replace_empty_values_to_none_in_frame(frame)
+
+        assert cleaned_frame['values'].tolist() == [replace_empty_values_to_none(value) for value in checked_values]
+        assert cleaned_frame['numbers'].tolist() == source_frame['numbers'].tolist()
+        assert frame['values'].tolist() == source_frame['values'].tolist()
+
+    def test_replace_empty_values_to_none_in_string_column(self) -> None:
+        """Test the cleaning of a column with the `string` dtype.
+
+        GIVEN: a `string` column with empty strings and 'None' strings;
+
+        WHEN: the `replace_empty_values_to_none_in_frame` function is called;
+
+        THEN: these values become missing, the others are kept.
+        """
+        frame = pd.DataFrame({'names': pd.Series(['', 'None', 'some value'], dtype='string')})
+
+        cleaned_frame = replace_empty_values_to_none_in_frame(frame, columns=['names'])
+
+        assert cleaned_frame['names'].isna().tolist() == [True, True, False]
+        assert cleaned_frame['names'].iloc[2] == 'some value'
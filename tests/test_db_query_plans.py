@@ -0,0 +1,133 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Query plan regression tests of the database schema.
+
+The tests apply the Alembic migrations to the local PostgreSQL configured with the `DB_*`
+settings and check that the hot queries are served by the intended indexes. The tests are
+skipped if the database is not reachable.
+
+Usage: `pytest -m db_dependent`.
+"""
+
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+import sqlalchemy as sa
+
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from src.boilerplate.db.pool import get_dsn
+from src.boilerplate.db.tables import idempotency_key_table, outbox_table, task_error_table, task_table
+
+_ALEMBIC_INI_PATH = Path(__file__).resolve().parents[1].joinpath('alembic.ini')
+
+
+@pytest.fixture(scope='module')
+def db_connection() -> Iterator[sa.engine.Connection]:
+    """Get a connection to the migrated database."""
+    engine = sa.create_engine(get_dsn(), poolclass=sa.pool.NullPool)
+    try:
+        connection = engine.connect()
+    except sa.exc.OperationalError:
+        pytest.skip('PostgreSQL is not reachable.')
+
+    command.upgrade(AlembicConfig(str(_ALEMBIC_INI_PATH)), 'head')
+    yield connection
+    connection.close()
+    engine.dispose()
+
+
+def _get_index_names(plan_node: dict[str, Any]) -> set[str]:
+    index_names = {plan_node['Index Name']} if 'Index Name' in plan_node else set()
+    for child_node in plan_node.get('Plans', []):
+        index_names |= _get_index_names(child_node)
+    return index_names
+
+
+@pytest.mark.db_dependent
+@pytest.mark.integration
+class TestDbQueryPlans(object):
+    """Query plan regression tests of the database schema."""
+
+    @pytest.mark.parametrize(
+        'query,expected_index', [
+            # Case 1.
+            pytest.param(
+                "SELECT task_id FROM {table} WHERE status = 'pending' ORDER BY created_datetime LIMIT 100".format(
+                    table=task_table.fullname,
+                ),
+                'ix_task_pending_created_datetime',
+                id='pending_tasks',
+            ),
+
+            # Case 2.
+            pytest.param(
+                "SELECT count(*) FROM {table} WHERE created_datetime >= now() - interval '1 day'".format(
+                    table=task_error_table.fullname,
+                ),
+                'ix_task_error_created_datetime_brin',
+                id='task_errors_by_time_range',
+            ),
+
+            # Case 3.
+            pytest.param(
+                "SELECT task_id FROM {table} WHERE idempotency_key = '0d2b4fdd-1162-4ce7-b6b6-99f7b896926d'".format(
+                    table=idempotency_key_table.fullname,
+                ),
+                'uq_idempotency_key_idempotency_key',
+                id='idempotency_key_lookup',
+            ),
+
+            # Case 4.
+            pytest.param(
+                'SELECT id FROM {table} WHERE sent_datetime IS NULL ORDER BY id LIMIT 100'.format(
+                    table=outbox_table.fullname,
+                ),
+                'ix_outbox_unsent_id',
+                id='unsent_outbox_messages',
+            ),
+        ],
+    )
+    def test_query_uses_index(
+        self,
+        db_connection: sa.engine.Connection,
+        query: str,
+        expected_index: str,
+    ) -> None:
+        """Test that the query is served by the expected index.
+
+        GIVEN:
+        * Case 1: selection of pending tasks in creation order; expected: partial index;
+        * OR Case 2: time-range scan of the task errors; expected: BRIN index;
+        * OR Case 3: lookup by the idempotency key; expected: unique index;
+        * OR Case 4: selection of unsent outbox messages; expected: partial index;
+
+        WHEN: the query plan is built with sequential scans disabled, so that the result
+        does not depend on the amount of data in the tables;
+
+        THEN: the plan contains the expected index.
+
+        Args:
+            db_connection: connection to the migrated database.
+            query: checked SQL query.
+            expected_index: the name of the index that must be used.
+        """
+        with db_connection.begin() as transaction:
+            db_connection.execute(sa.text('SET LOCAL enable_seqscan = off'))
+            query_plan = db_connection.execute(sa.text('EXPLAIN (FORMAT JSON) {query}'.format(query=query))).scalar()
+            transaction.rollback()
+
+        assert expected_index in _get_index_names(plan_node=query_plan[0]['Plan'])
@@ -0,0 +1,97 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""Unit tests of the `errors.py` module."""
+
+import pytest
+from pydantic import BaseModel, PositiveInt, ValidationError
+from starlette.exceptions import HTTPException
+
+from src.boilerplate.errors import TaskConflictError, get_error_schema
+
+
+class ItemSchema(BaseModel):
+    """The item of the validation error test."""
+
+    task_id: PositiveInt
+
+
+def get_validation_error() -> ValidationError:
+    """Get the validation error of an item with a negative `task_id`."""
+    try:
+        ItemSchema(task_id=-1)
+    except ValidationError as exc:
+        return exc
+    raise AssertionError('The item is valid.')
+
+
+@pytest.mark.fast
+class TestErrors(object):
+    """Unit tests of the `errors.py` module."""
+
+    @pytest.mark.parametrize(
+        'exc,expected_error_message', [
+            pytest.param(TaskConflictError('Task 1 is taken.'), {'detail': 'Task 1 is taken.'}),
+            pytest.param(HTTPException(status_code=404, detail='Not Found'), {'detail': 'Not Found'}),
+        ],
+    )
+    def test_known_error_is_described(self, exc: Exception, expected_error_message: dict[str, str]) -> None:
+        """Test the description of a domain error.
+
+        GIVEN: a `ClientError` or an HTTP exception;
+
+        WHEN: the `get_error_schema` function is called;
+
+        THEN: the exception class name and its message are returned to the client.
+
+        Args:
+            exc: the exception.
+            expected_error_message: the expected error message.
+        """
+        error_schema = get_error_schema(exc)
+
+        assert error_schema.error_name == type(exc).__name__
+        assert error_schema.error_message == expected_error_message
+
+    def test_validation_error_is_described(self) -> None:
+        """Test the description of a validation error.
+
+        GIVEN: a validation error of an item;
+
+        WHEN: the `get_error_schema` function is called;
+
+        THEN: the error type, location and message are returned, without the input.
+        """
+        error_schema = get_error_schema(get_validation_error())
+
+        assert error_schema.error_name == 'ValidationError'
+        assert error_schema.error_message == {
+            'errors': [{'type': 'greater_than', 'loc': ('task_id',), 'msg': 'Input should be greater than 0'}],
+        }
+
+    def test_unknown_error_is_hidden(self) -> None:
+        """Test the description of an unexpected error.
+
+        GIVEN: an exception with internal details in its message;
+
+        WHEN: the `get_error_schema` function is called;
+
+        THEN: the client gets a generic message with a reference, without the details.
+        """
+        error_schema = get_error_schema(RuntimeError('connection to db-primary.internal:5432 refused'))
+
+        assert error_schema.error_name == 'InternalError'
+        assert 'db-primary' not in str(error_schema.error_message)
+        assert len(error_schema.error_message['error_reference']) == 32
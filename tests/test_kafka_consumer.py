@@ -0,0 +1,196 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the `BatchConsumer` class of the `messaging/consumer.py` module."""
+
+import asyncio
+import uuid
+from typing import Optional
+
+import orjson
+import pytest
+from aiokafka import ConsumerRecord, TopicPartition
+
+from src.boilerplate.messaging.consumer import BatchConsumer
+from src.boilerplate.schemas.records import MetadataRecord
+
+_TOPIC = 'boilerplate.tasks'
+
+
+def _get_record(partition: int, offset: int, record_value: bytes) -> ConsumerRecord:  # type: ignore[type-arg]
+    return ConsumerRecord(
+        topic=_TOPIC,
+        partition=partition,
+        offset=offset,
+        timestamp=0,
+        timestamp_type=0,
+        key=None,
+        value=record_value,
+        checksum=None,
+        serialized_key_size=0,
+        serialized_value_size=len(record_value),
+        headers=(),
+    )
+
+
+def _get_task_message(task_id: int) -> bytes:
+    return orjson.dumps({'task_id': task_id, 'idempotency_key': str(uuid.uuid4())})
+
+
+class FakeBroker(object):
+    """In-memory stand-in for `AIOKafkaConsumer` with pre-filled partitions."""
+
+    def __init__(self, partitions: dict[int, list[bytes]]) -> None:
+        self.records = {
+            TopicPartition(_TOPIC, partition): [
+                _get_record(partition=partition, offset=offset, record_value=record_value)
+                for offset, record_value in enumerate(record_values)
+            ]
+            for partition, record_values in partitions.items()
+        }
+        self.positions = {partition: 0 for partition in self.records}
+        self.committed: dict[TopicPartition, int] = {}
+        self.paused_partitions: set[TopicPartition] = set()
+        self.pause_calls = 0
+
+    async def getmany(
+        self,
+        *partitions: TopicPartition,
+        timeout_ms: int = 0,
+        max_records: Optional[int] = None,
+    ) -> dict[TopicPartition, list[ConsumerRecord]]:  # type: ignore[type-arg]
+        await asyncio.sleep(0)
+        batches = {}
+        for partition, records in self.records.items():
+            if partition in self.paused_partitions:
+                continue
+            position = self.positions[partition]
+            batch = records[position:position + (max_records or len(records))]
+            if batch:
+                batches[partition] = batch
+                self.positions[partition] += len(batch)
+        return batches
+
+    async def commit(self, offsets: Optional[dict[TopicPartition, int]] = None) -> None:
+        self.committed.update(offsets or {})
+
+    def pause(self, *partitions: TopicPartition) -> None:
+        self.pause_calls += 1
+        self.paused_partitions.update(partitions)
+
+    def resume(self, *partitions: TopicPartition) -> None:
+        self.paused_partitions.difference_update(partitions)
+
+    def paused(self) -> set[TopicPartition]:
+        return set(self.paused_partitions)
+
+    def is_consumed(self) -> bool:
+        return all(
+            self.committed.get(partition) == len(records)
+            for partition, records in self.records.items()
+        )
+
+
+async def _consume_all(broker: FakeBroker, batch_consumer: BatchConsumer) -> None:
+    consuming = asyncio.create_task(batch_consumer.run())
+    while not broker.is_consumed() and not consuming.done():
+        await asyncio.sleep(0.001)
+    batch_consumer.stop()
+    await asyncio.wait_for(consuming, timeout=5)
+
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+class TestBatchConsumer(object):
+    """Unit tests of the `BatchConsumer` class."""
+
+    async def test_all_partitions_are_processed_and_committed(self) -> None:
+        """Test the processing of several partitions.
+
+        GIVEN: two partitions with 25 valid messages each and a slow handler;
+
+        WHEN: the consumer fetches batches of 10 messages;
+
+        THEN: every message is handled in partition order, partitions under backpressure
+        are paused, and the offsets are committed up to the end of each partition.
+        """
+        # The task IDs of partition N are N * 100 + 1 ... N * 100 + 25.
+        broker = FakeBroker(partitions={
+            partition: [_get_task_message(task_id=partition * 100 + task_idx) for task_idx in range(1, 26)]
+            for partition in (0, 1)
+        })
+        handled_task_ids: list[int] = []
+
+        async def handler(messages: list[MetadataRecord]) -> None:  # noqa: WPS430
+            await asyncio.sleep(0.005)
+            handled_task_ids.extend(message.task_id for message in messages)
+
+        batch_consumer = BatchConsumer(
+            consumer=broker,
+            handler=handler,
+            max_batch_size=10,
+            max_in_flight_batches=1,
+            max_pending_batches=1,
+        )
+        await _consume_all(broker=broker, batch_consumer=batch_consumer)
+
+        for partition in (0, 1):
+            partition_task_ids = [task_id for task_id in handled_task_ids if task_id // 100 == partition]
+            assert partition_task_ids == [partition * 100 + task_idx for task_idx in range(1, 26)]
+        assert broker.committed == {TopicPartition(_TOPIC, partition): 25 for partition in (0, 1)}
+        assert broker.pause_calls > 0
+        assert batch_consumer.processed_messages == 50
+
+    async def test_invalid_messages_are_skipped(self) -> None:
+        """Test the validation of messages.
+
+        GIVEN: a partition with one valid and two invalid messages;
+
+        WHEN: the partition is consumed;
+
+        THEN: only the valid message is handled and the offset is committed past all of them.
+        """
+        broker = FakeBroker(partitions={0: [b'not json', _get_task_message(task_id=1), b'{"task_id": -1}']})
+        handled_messages: list[MetadataRecord] = []
+
+        async def handler(messages: list[MetadataRecord]) -> None:  # noqa: WPS430
+            handled_messages.extend(messages)
+
+        batch_consumer = BatchConsumer(consumer=broker, handler=handler)
+        await _consume_all(broker=broker, batch_consumer=batch_consumer)
+
+        assert [message.task_id for message in handled_messages] == [1]
+        assert isinstance(handled_messages[0], MetadataRecord)
+        assert batch_consumer.invalid_messages == 2
+        assert broker.committed == {TopicPartition(_TOPIC, 0): 3}
+
+    async def test_offsets_are_not_committed_on_handler_error(self) -> None:
+        """Test that a failed batch is not committed.
+
+        GIVEN: a handler that raises an error;
+
+        WHEN: the partition is consumed;
+
+        THEN: the consumer stops with the error and no offset is committed.
+        """
+        broker = FakeBroker(partitions={0: [_get_task_message(task_id=1)]})
+
+        async def handler(messages: list[MetadataRecord]) -> None:  # noqa: WPS430
+            raise ConnectionError('Database is not reachable.')
+
+        batch_consumer = BatchConsumer(consumer=broker, handler=handler)
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(batch_consumer.run(), timeout=5)
+
+        assert not broker.committed
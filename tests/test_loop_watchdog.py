@@ -0,0 +1,61 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""Unit tests of the `loop_watchdog.py` module."""
+
+import asyncio
+import time
+
+import pytest
+
+from src.boilerplate.loop_watchdog import LoopWatchdog
+
+
+def block_event_loop(seconds: float) -> None:
+    """Keep the event loop thread busy, like a blocking call in a handler."""
+    time.sleep(seconds)
+
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+class TestLoopWatchdog(object):
+    """Unit tests of the `loop_watchdog.py` module."""
+
+    async def test_blocking_call_is_reported(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test the report of a callback blocking the loop.
+
+        GIVEN: a running watchdog with a 50 ms threshold and a long warning interval;
+
+        WHEN: the loop is blocked twice for 300 ms;
+
+        THEN: each stall is reported once with the stack of the blocking call, only the first
+        one is logged, and the lag is recorded.
+        """
+        watchdog = LoopWatchdog(interval_seconds=0.02, slow_callback_seconds=0.05, warning_interval_seconds=60)
+        watchdog.start()
+        try:
+            for _ in range(2):
+                await asyncio.sleep(0.05)
+                block_event_loop(0.3)
+            await asyncio.sleep(0.05)
+        finally:
+            await watchdog.stop()
+
+        stats = watchdog.get_stats()
+        assert len(stats['blocked_reports']) == 2
+        assert 'block_event_loop' in stats['blocked_reports'][0]['stack'][-1]
+        assert stats['blocked_reports'][0]['blocked_seconds_at_least'] >= 0.05
+        assert stats['loop_lag']['max_ms'] >= 250
+        assert sum('The event loop is blocked' in record.message for record in caplog.records) == 1
@@ -0,0 +1,128 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""Unit tests of the `metrics.py` module."""
+
+import os
+import threading
+from pathlib import Path
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.boilerplate import metrics
+from src.boilerplate.config import config
+from src.boilerplate.metrics import MetricsMiddleware, MetricsRegistry, render_metrics
+
+
+@pytest.mark.fast
+class TestMetrics(object):
+    """Unit tests of the `metrics.py` module."""
+
+    def test_thread_cells_are_summed(self) -> None:
+        """Test the per-thread aggregation.
+
+        GIVEN: a counter and a histogram;
+
+        WHEN: 4 threads update them 1000 times each;
+
+        THEN: the collected values include every update, and the histogram buckets hold the
+        values by their upper bounds.
+        """
+        registry = MetricsRegistry()
+        counter = registry.counter(name='jobs_total', documentation='Jobs.', label_names=('kind',))
+        histogram = registry.histogram(name='job_seconds', documentation='Job duration.', buckets=(0.1, 1))
+
+        def update() -> None:  # noqa: WPS430
+            for _ in range(1000):
+                counter.inc(label_values=('import',))
+                histogram.observe(0.5)
+
+        threads = [threading.Thread(target=update) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.collect() == {('import',): [4000]}
+        assert histogram.collect() == {(): [0, 4000, 0, 2000]}
+
+    def test_middleware_labels_routes_by_template(self) -> None:
+        """Test the request metrics of the middleware.
+
+        GIVEN: an application with a route with a path parameter behind `MetricsMiddleware`;
+
+        WHEN: the route is requested with two different parameter values;
+
+        THEN: both requests are counted in one series labelled with the route template.
+        """
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get('/items/{item_id}')
+        async def get_item(item_id: int) -> dict[str, int]:  # noqa: WPS430
+            return {'item_id': item_id}
+
+        client = TestClient(app)
+        client.get('/items/1')
+        client.get('/items/2')
+
+        rendered_metrics = render_metrics()
+        assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in rendered_metrics
+        assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 2' in rendered_metrics
+        assert 'http_response_size_bytes_sum{method="GET",route="/items/{item_id}"} 26' in rendered_metrics
+
+    @pytest.mark.skipif(not Path('/proc/self/stat').exists(), reason='The start time of a process is read from /proc.')
+    def test_worker_snapshots_are_merged(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test the metrics of several workers.
+
+        GIVEN: the snapshot of an exited worker with a counter and a gauge, with the PID of
+        this worker, as after a restart in a container;
+
+        WHEN: the metrics are rendered with `METRICS_MULTIPROCESS_DIR` twice;
+
+        THEN: the snapshot of the exited worker is not overwritten: its counter is added to the
+        counter of this worker once, its gauge is dropped, and its file is merged into the archive.
+        """
+        monkeypatch.setattr(config, 'METRICS_MULTIPROCESS_DIR', tmp_path)
+        metrics.http_requests_total.inc(label_values=('POST', '/merged', '201'))
+        exited_worker_snapshot = {
+            'http_requests_total': {
+                'type': 'counter',
+                'documentation': 'Number of HTTP requests.',
+                'label_names': ['method', 'route', 'status'],
+                'upper_bounds': [],
+                'series': [[['POST', '/merged', '201'], [2]]],
+            },
+            'http_requests_in_flight': {
+                'type': 'gauge',
+                'documentation': 'Number of HTTP requests being processed.',
+                'label_names': [],
+                'upper_bounds': [],
+                'series': [[[], [100]]],
+            },
+        }
+        exited_worker_path = tmp_path.joinpath('worker-{pid}-0.json'.format(pid=os.getpid()))
+        exited_worker_path.write_bytes(orjson.dumps(exited_worker_snapshot))
+
+        rendered_metrics = render_metrics()
+
+        assert 'http_requests_total{method="POST",route="/merged",status="201"} 3' in rendered_metrics
+        assert 'http_requests_in_flight 100' not in rendered_metrics
+        assert not exited_worker_path.exists()
+        assert len(list(tmp_path.glob('*.json'))) == 2
+        assert 'http_requests_total{method="POST",route="/merged",status="201"} 3' in render_metrics()
@@ -0,0 +1,126 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the `OutboxRelay` class of the `messaging/outbox_relay.py` module."""
+
+import asyncio
+import contextlib
+from typing import Any, AsyncIterator, Optional
+
+import pytest
+
+from src.boilerplate.messaging.outbox_relay import OutboxRelay
+
+
+class FakeConnection(object):
+    """`asyncpg` connection stub with the outbox rows."""
+
+    def __init__(self, rows: list[dict[str, Any]]) -> None:
+        self.rows = rows
+        self.executed: list[tuple[str, tuple[Any, ...]]] = []
+        self.fetch_queries: list[str] = []
+
+    @contextlib.asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        yield
+
+    async def fetch(self, query: str, *args: Any) -> list[dict[str, Any]]:
+        self.fetch_queries.append(query)
+        return self.rows[:args[0]]
+
+    async def execute(self, query: str, *args: Any) -> str:
+        self.executed.append((query, args))
+        return 'UPDATE {count}'.format(count=len(args[0]))
+
+
+class FakePool(object):
+    """`asyncpg` pool stub that always returns the same connection."""
+
+    def __init__(self, connection: FakeConnection) -> None:
+        self.connection = connection
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[FakeConnection]:
+        yield self.connection
+
+
+class FakeProducer(object):
+    """`AIOKafkaProducer` stub that acknowledges or rejects every message."""
+
+    def __init__(self, error: Optional[Exception] = None) -> None:
+        self.error = error
+        self.sent: list[tuple[str, bytes, Optional[bytes]]] = []
+
+    async def send(self, topic: str, value: bytes, key: Optional[bytes] = None) -> 'asyncio.Future[None]':
+        self.sent.append((topic, value, key))
+        delivery_future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        if self.error is None:
+            delivery_future.set_result(None)
+        else:
+            delivery_future.set_exception(self.error)
+        return delivery_future
+
+
+def _get_rows(count: int) -> list[dict[str, Any]]:
+    return [
+        {'id': row_id, 'topic': 'events', 'message_key': str(row_id), 'payload': '{"task_id":1}'}
+        for row_id in range(1, count + 1)
+    ]
+
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+class TestOutboxRelay(object):
+    """Unit tests of the `OutboxRelay` class."""
+
+    async def test_batch_is_published_and_marked_sent_in_bulk(self) -> None:
+        """Test the publication of a batch.
+
+        GIVEN: five unsent outbox messages and `batch_size=3`;
+
+        WHEN: one batch is published;
+
+        THEN: three messages are sent in order, rows are locked with `SKIP LOCKED` and
+        marked as sent by one statement.
+        """
+        connection = FakeConnection(rows=_get_rows(count=5))
+        producer = FakeProducer()
+        relay = OutboxRelay(producer=producer, pool=FakePool(connection=connection), batch_size=3)
+
+        assert await relay.publish_batch() == 3
+
+        assert [sent_key for _, _, sent_key in producer.sent] == [b'1', b'2', b'3']
+        assert 'FOR UPDATE SKIP LOCKED' in connection.fetch_queries[0]
+        assert len(connection.executed) == 1
+        assert connection.executed[0][1] == ([1, 2, 3],)
+
+    async def test_batch_is_not_marked_sent_on_delivery_error(self) -> None:
+        """Test that the messages stay unsent if the broker rejects them.
+
+        GIVEN: a producer that fails every delivery;
+
+        WHEN: one batch is published;
+
+        THEN: the error is raised and no message is marked as sent.
+        """
+        connection = FakeConnection(rows=_get_rows(count=2))
+        relay = OutboxRelay(
+            producer=FakeProducer(error=ConnectionError('Broker is not reachable.')),
+            pool=FakePool(connection=connection),
+        )
+
+        with pytest.raises(ConnectionError):
+            await relay.publish_batch()
+
+        assert not connection.executed
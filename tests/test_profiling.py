@@ -0,0 +1,171 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""Unit tests of the `profiling.py` module."""
+
+import asyncio
+import random
+from typing import AsyncIterator, Optional
+
+import pytest
+
+from src.boilerplate.profiling import LatencyHistogram, get_profiling_stats, profile, wrap_timed
+
+
+def spin(seconds: float) -> None:
+    """Keep the CPU busy for the given time."""
+    loop_time = asyncio.get_event_loop().time
+    finish = loop_time() + seconds
+    while loop_time() < finish:
+        continue
+
+
+class TimingRecords(object):
+    """Recorder of the timings of the calls."""
+
+    def __init__(self) -> None:
+        self.timings: list[tuple[int, Optional[int]]] = []
+
+    def record(self, wall_time_ns: int, cpu_time_ns: Optional[int]) -> None:
+        """Record the timing of a call."""
+        self.timings.append((wall_time_ns, cpu_time_ns))
+
+
+@pytest.mark.fast
+class TestProfiling(object):
+    """Unit tests of the `profiling.py` module."""
+
+    def test_histogram_percentiles(self) -> None:
+        """Test the precision of the histogram percentiles.
+
+        GIVEN: 10 000 random durations from 1 µs to 10 s;
+
+        WHEN: they are recorded in the histogram;
+
+        THEN: the percentiles are within 2% of the exact ones, and the maximum is exact.
+        """
+        durations = sorted(int(10 ** random.uniform(0, 7)) for _ in range(10_000))
+        histogram = LatencyHistogram()
+
+        for duration in durations:
+            histogram.record(duration)
+
+        for percentile in (50, 90, 99):
+            exact_value = durations[round(percentile / 100 * len(durations)) - 1]
+            assert histogram.get_percentile(percentile) == pytest.approx(exact_value, rel=0.02, abs=1)
+        assert histogram.max == durations[-1]
+
+    @pytest.mark.asyncio
+    async def test_coroutine_cpu_time_excludes_other_tasks(self) -> None:
+        """Test the timing of a coroutine function.
+
+        GIVEN: a coroutine that sleeps while another task keeps the CPU busy;
+
+        WHEN: the coroutine function is wrapped with `wrap_timed(measure_cpu=True)`;
+
+        THEN: the wall time includes the sleep and the wait for the busy task, while the CPU
+        time of the coroutine stays small.
+        """
+        timing_records = TimingRecords()
+
+        async def sleep() -> str:  # noqa: WPS430
+            await asyncio.sleep(0.01)
+            return 'done'
+
+        async def compute() -> None:  # noqa: WPS430
+            spin(0.05)
+
+        timed_sleep = wrap_timed(sleep, record=timing_records.record, measure_cpu=True)
+        results = await asyncio.gather(timed_sleep(), compute())
+
+        wall_time_ns, cpu_time_ns = timing_records.timings[0]
+        assert results[0] == 'done'
+        assert wall_time_ns >= 50 * 10**6
+        assert cpu_time_ns is not None
+        assert cpu_time_ns < 10 * 10**6
+
+    @pytest.mark.asyncio
+    async def test_async_generator_excludes_consumer_time(self) -> None:
+        """Test the timing of an async generator function.
+
+        GIVEN: an async generator of two items and a consumer that sleeps after each item;
+
+        WHEN: the generator is consumed through `profile`;
+
+        THEN: the items are passed through, one call is recorded, and the consumer time is
+        not counted.
+        """
+        @profile(name='test_profiling.generate', enabled=True)
+        async def generate() -> AsyncIterator[int]:  # noqa: WPS430
+            for item in range(2):
+                await asyncio.sleep(0.001)
+                yield item
+
+        consumed_items = []
+        async for item in generate():
+            consumed_items.append(item)
+            await asyncio.sleep(0.05)
+
+        wall_time_stats = get_profiling_stats()['test_profiling.generate']['wall_time']
+        assert consumed_items == [0, 1]
+        assert wall_time_stats['count'] == 1
+        assert wall_time_stats['max_ms'] < 50
+
+    @pytest.mark.asyncio
+    async def test_cancellation_reaches_cpu_timed_coroutine(self) -> None:
+        """Test the cancellation of a profiled coroutine.
+
+        GIVEN: a coroutine function profiled with `measure_cpu=True` that waits forever;
+
+        WHEN: the task running it is cancelled;
+
+        THEN: `CancelledError` is thrown into the coroutine and propagated to the task, and
+        the call is recorded without counting an error.
+        """
+        cancelled_inside = asyncio.Event()
+
+        @profile(name='test_profiling.wait_forever', measure_cpu=True, enabled=True)
+        async def wait_forever() -> None:  # noqa: WPS430
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled_inside.set()
+                raise
+
+        task = asyncio.create_task(wait_forever())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        profile_stats = get_profiling_stats()['test_profiling.wait_forever']
+        assert cancelled_inside.is_set()
+        assert profile_stats['errors'] == 0
+        assert profile_stats['wall_time']['count'] == 1
+        assert profile_stats['cpu_time']['count'] == 1
+
+    def test_disabled_profile_returns_function(self) -> None:
+        """Test the no-op mode.
+
+        GIVEN: a function;
+
+        WHEN: it is decorated with a disabled `profile`;
+
+        THEN: the function itself is returned, so calls cost nothing extra.
+        """
+        def add_one(number: int) -> int:  # noqa: WPS430
+            return number + 1
+
+        assert profile(enabled=False)(add_one) is add_one
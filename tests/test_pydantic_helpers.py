@@ -18,35 +18,42 @@ from typing import Any
 
 import pytest
 
-from src.boilerplate.pydantic_helpers import replace_empty_values_to_none
+from src.boilerplate.pydantic_helpers import (
+    convert_keys_camel_to_snake,
+    convert_keys_snake_to_camel,
+    convert_str_camel_to_snake,
+    convert_str_snake_to_camel,
+    replace_empty_values_to_none,
+    replace_empty_values_to_none_nested,
+)
 
+REPLACE_EMPTY_VALUES_CASES = (
+    # Case 1.
+    (None, None),
 
-@pytest.mark.smoke
-@pytest.mark.fast
-class TestPydanticHelpers(object):
-    """Unit tests of the functions of the `pydantic_helpers.py` module."""
+    # Case 2.
+    ([], None),
 
-    @pytest.mark.parametrize(
-        'checked_value,expected', [
-            # Case 1.
-            (None, None),
+    # Case 3.
+    ({}, None),
 
-            # Case 2.
-            ([], None),
+    # Case 4.
+    ('None', None),
 
-            # Case 3.
-            ({}, None),
+    # Case 5.
+    ('', None),
 
-            # Case 4.
-            ('None', None),
+    # Case 6.
+    ('some value', 'some value'),
+)
 
-            # Case 5.
-            ('', None),
 
-            # Case 6.
-            ('some value', 'some value'),
-        ],
-    )
+@pytest.mark.smoke
+@pytest.mark.fast
+class TestPydanticHelpers(object):
+    """Unit tests of the functions of the `pydantic_helpers.py` module."""
+
+    @pytest.mark.parametrize('checked_value,expected', REPLACE_EMPTY_VALUES_CASES)
     def test_replace_empty_values_to_none(
         self,
         checked_value: Any,
@@ -71,3 +78,93 @@ class TestPydanticHelpers(object):
             expected: the expected response from the `replace_empty_values_to_none` function.
         """
         assert replace_empty_values_to_none(checked_value=checked_value) == expected
+
+    @pytest.mark.parametrize('checked_value,expected', REPLACE_EMPTY_VALUES_CASES)
+    def test_replace_empty_values_to_none_nested_parity(
+        self,
+        checked_value: Any,
+        expected: Any,
+    ) -> None:
+        """Test that the nested version matches the scalar one at every depth.
+
+        GIVEN: the cases of `test_replace_empty_values_to_none`;
+
+        WHEN: the value is passed as is, in a list and in a dictionary to the
+        `replace_empty_values_to_none_nested` function;
+
+        THEN: each occurrence is replaced with the expected value.
+
+        Args:
+            checked_value: argument to be placed in the payload.
+            expected: the expected replacement of the argument.
+        """
+        payload = {'items': [checked_value, {'value': checked_value}]}
+
+        assert replace_empty_values_to_none_nested(checked_value) == expected
+        assert replace_empty_values_to_none_nested(payload) == {'items': [expected, {'value': expected}]}
+
+    def test_replace_empty_values_to_none_nested_deep_payload(self) -> None:
+        """Test the iterative walk of a payload deeper than the recursion limit.
+
+        GIVEN: a payload of lists nested 5000 levels deep and ending with an empty string;
+
+        WHEN: the `replace_empty_values_to_none_nested` function is called;
+
+        THEN: the payload is not modified and the innermost value of the copy is None.
+        """
+        payload: list[Any] = []
+        innermost = payload
+        for _ in range(5000):
+            innermost.append([])
+            innermost = innermost[0]
+        innermost.append('')
+
+        cleaned_payload = replace_empty_values_to_none_nested(payload)
+
+        for _ in range(5000):
+            cleaned_payload = cleaned_payload[0]
+        assert cleaned_payload == [None]
+        assert innermost == ['']
+
+    @pytest.mark.parametrize(
+        'camel_str,expected', [
+            ('birthDate', 'birth_date'),
+            ('idempotencyKey', 'idempotency_key'),
+            ('taskID', 'task_id'),
+            ('httpURLPath', 'http_url_path'),
+            ('already_snake', 'already_snake'),
+        ],
+    )
+    def test_convert_str_camel_to_snake(self, camel_str: str, expected: str) -> None:
+        """Test the conversion of 'camelCase' strings, including acronyms.
+
+        GIVEN: a camel case string;
+
+        WHEN: the `convert_str_camel_to_snake` function is called twice;
+
+        THEN: both calls return the expected snake case string.
+
+        Args:
+            camel_str: argument to be passed in the `convert_str_camel_to_snake` function call.
+            expected: the expected response from the `convert_str_camel_to_snake` function.
+        """
+        assert convert_str_camel_to_snake(camel_str) == expected
+        assert convert_str_camel_to_snake(camel_str) == expected
+
+    def test_convert_keys_round_trip(self) -> None:
+        """Test the key conversion of a nested payload in both directions.
+
+        GIVEN: a dictionary with a list of dictionaries and a non-string key;
+
+        WHEN: the keys are converted to camel case and back;
+
+        THEN: only the string keys are converted, the values are kept,
+        and the round trip returns the source payload.
+        """
+        payload = {'task_id': 1, 'task_errors': [{'error_type': 'x', 2: {'http_status_code': 500}}]}
+
+        camel_payload = convert_keys_snake_to_camel(payload)
+
+        assert camel_payload == {'taskId': 1, 'taskErrors': [{'errorType': 'x', 2: {'httpStatusCode': 500}}]}
+        assert convert_keys_camel_to_snake(camel_payload) == payload
+        assert convert_str_snake_to_camel.cache_info().currsize > 0
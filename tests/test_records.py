@@ -0,0 +1,72 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the internal records of the `schemas/records.py` module."""
+
+import dataclasses
+import uuid
+
+import pytest
+from pydantic import BaseModel
+
+from src.boilerplate.schemas.common_schemas import ErrorSchema, HTTPResponseStatusCodeSchema, MetadataMan
+from src.boilerplate.schemas.records import ErrorRecord, HTTPResponseStatusCodeRecord, MetadataRecord
+
+
+@pytest.mark.fast
+class TestRecords(object):
+    """Unit tests of the internal records of the `schemas/records.py` module."""
+
+    @pytest.mark.parametrize(
+        'record_class,model', [
+            pytest.param(
+                MetadataRecord,
+                MetadataMan(idempotency_key=uuid.uuid4(), task_id=1, callback_url='http://127.0.0.1/callback'),
+                id='metadata',
+            ),
+            pytest.param(
+                ErrorRecord,
+                ErrorSchema(error_name='TimeoutError', error_message={'detail': 'Read timeout.'}),
+                id='error',
+            ),
+            pytest.param(
+                HTTPResponseStatusCodeRecord,
+                HTTPResponseStatusCodeSchema(http_response_status_code=504),
+                id='http_response_status_code',
+            ),
+        ],
+    )
+    def test_round_trip_keeps_model(self, record_class: type, model: BaseModel) -> None:
+        """Test the conversion from the model to the record and back.
+
+        GIVEN: a validated model;
+
+        WHEN: it is converted to the record and back;
+
+        THEN: the model is equal to the source one and serializes to the same JSON,
+        and the record is immutable and has no instance `__dict__`.
+
+        Args:
+            record_class: the record class of the model.
+            model: the validated model.
+        """
+        record = record_class.from_model(model)
+
+        restored_model = record.to_model()
+
+        assert restored_model == model
+        assert restored_model.model_dump_json() == model.model_dump_json()
+        assert not hasattr(record, '__dict__')
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            setattr(record, dataclasses.fields(record)[0].name, None)  # noqa: B010
@@ -0,0 +1,85 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the `responses.py` module."""
+
+import dataclasses
+from typing import Any
+
+import numpy as np
+import orjson
+import pytest
+from pydantic import SecretStr
+
+from src.boilerplate.responses import ORJSONResponse
+from src.boilerplate.schemas.common_schemas import ErrorSchema
+
+
+@dataclasses.dataclass
+class TimingRecord(object):
+    """Dataclass for the serialization test."""
+
+    name: str
+    duration_ms: float
+
+
+@pytest.mark.smoke
+@pytest.mark.fast
+class TestORJSONResponse(object):
+    """Unit tests of the `ORJSONResponse` class."""
+
+    @pytest.mark.parametrize(
+        'content,expected', [
+            # Case 1.
+            pytest.param({'scores': np.array([1, 2, 3])}, {'scores': [1, 2, 3]}, id='numpy_array'),
+
+            # Case 2.
+            pytest.param(
+                [TimingRecord(name='validation', duration_ms=1.5)],
+                [{'name': 'validation', 'duration_ms': 1.5}],
+                id='dataclass',
+            ),
+
+            # Case 3.
+            pytest.param(
+                ErrorSchema(error_name='TimeoutError'),
+                {'error_name': 'TimeoutError', 'error_message': None, 'error_source': None},
+                id='pydantic_model',
+            ),
+
+            # Case 4.
+            pytest.param({'token': SecretStr('secret')}, {'token': '**********'}, id='secret_str'),
+        ],
+    )
+    def test_render(self, content: Any, expected: Any) -> None:
+        """Test the rendering of the types that the stdlib `json` does not support.
+
+        GIVEN:
+        * Case 1: a `numpy` array;
+        * OR Case 2: a dataclass;
+        * OR Case 3: a Pydantic model;
+        * OR Case 4: a secret string, which must stay masked;
+
+        WHEN: the response is created with the content;
+
+        THEN: the body is the expected JSON.
+
+        Args:
+            content: response content.
+            expected: the expected decoded body.
+        """
+        response = ORJSONResponse(content=content)
+
+        assert orjson.loads(response.body) == expected
+        assert response.headers['content-type'] == 'application/json'
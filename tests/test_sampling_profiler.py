@@ -0,0 +1,83 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""Unit tests of the `sampling_profiler.py` module."""
+
+import asyncio
+import time
+
+import pytest
+
+from src.boilerplate.config import config
+from src.boilerplate.sampling_profiler import ProfilerBusyError, run_profiling_session
+
+
+def block_event_loop(seconds: float) -> None:
+    """Keep the event loop thread busy, like a blocking call in a handler."""
+    finish = time.perf_counter() + seconds
+    while time.perf_counter() < finish:
+        continue
+
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+class TestSamplingProfiler(object):
+    """Unit tests of the `sampling_profiler.py` module."""
+
+    async def test_blocking_call_is_sampled(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test the report of a session.
+
+        GIVEN: a task that blocks the event loop for 100 ms and then waits;
+
+        WHEN: a wall-clock profiling session runs meanwhile;
+
+        THEN: the collapsed stacks contain the blocking function, the loop lag reflects the
+        blocking, and the waiting task is reported as pending.
+        """
+        monkeypatch.setattr(config, 'PROFILER_SAMPLING_INTERVAL_SECONDS', 0.002)
+
+        async def block_later() -> None:  # noqa: WPS430
+            await asyncio.sleep(0.05)
+            block_event_loop(0.1)
+            await asyncio.sleep(10)
+
+        blocker = asyncio.create_task(block_later(), name='blocker')
+        report = await run_profiling_session(duration_seconds=0.3, mode='wall')
+        blocker.cancel()
+
+        blocking_samples = sum(
+            int(stack_line.rsplit(' ', 1)[1])
+            for stack_line in report['collapsed_stacks'].splitlines()
+            if stack_line.split(' ')[0].endswith('test_sampling_profiler.py:block_event_loop')
+        )
+        assert blocking_samples >= 10
+        assert report['loop_lag']['max_ms'] >= 50
+        assert 'blocker' in [task['name'] for task in report['slowest_pending_tasks']]
+
+    async def test_concurrent_session_is_refused(self) -> None:
+        """Test the single session limit.
+
+        GIVEN: a running profiling session;
+
+        WHEN: another session is requested on the same worker;
+
+        THEN: `ProfilerBusyError` is raised, and the first session completes.
+        """
+        first_session = asyncio.create_task(run_profiling_session(duration_seconds=0.1))
+        await asyncio.sleep(0)
+
+        with pytest.raises(ProfilerBusyError):
+            await run_profiling_session(duration_seconds=0.1)
+        assert (await first_session)['samples'] > 0
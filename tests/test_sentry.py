@@ -0,0 +1,234 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""Unit tests of the `sentry.py` module."""
+
+import asyncio
+import threading
+from typing import Any, Iterator
+
+import pytest
+import sentry_sdk
+from sentry_sdk.envelope import Envelope
+from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
+from sentry_sdk.transport import Transport
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from src.boilerplate.sentry import _request_body_chunks  # noqa: WPS450
+from src.boilerplate.sentry import (
+    BackgroundEventsClient,
+    RequestBodyRecorderMiddleware,
+    TracesSampler,
+    attach_request_body,
+)
+
+
+def get_sampler(**options: Any) -> TracesSampler:
+    """Create a sampler with the options replacing the defaults of the tests."""
+    sampler_options: dict[str, Any] = {
+        'default_sample_rate': 1.0,
+        'route_sample_rates': {'/static': 0, '/api/v1/tasks': 0.5},
+        'keep_errors_and_slow': False,
+        'slow_request_seconds': 0.05,
+        'max_per_second': None,
+    }
+    sampler_options.update(options)
+    return TracesSampler(**sampler_options)
+
+
+class MemoryTransport(Transport):
+    """Sentry transport keeping the sent transactions in memory."""
+
+    def __init__(self) -> None:
+        """Perform custom instantiation of the class."""
+        super().__init__()
+        self.events: list[dict[str, Any]] = []
+        self.transactions: list[dict[str, Any]] = []
+
+    def capture_event(self, event: dict[str, Any]) -> None:
+        """Keep the error event."""
+        self.events.append(event)
+
+    def capture_envelope(self, envelope: Envelope) -> None:
+        """Keep the transaction of the envelope."""
+        self.transactions.append(envelope.get_transaction_event())
+
+
+@pytest.fixture
+def transport() -> Iterator[MemoryTransport]:
+    """Get the transport of the Sentry client initialized in the test."""
+    yield MemoryTransport()
+    sentry_sdk.Hub.current.bind_client(None)
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    """Respond with the status from the path, after a delay for `/slow`."""
+    if scope['path'] == '/slow':
+        await asyncio.sleep(0.06)
+    elif scope['path'] == '/fail':
+        await receive()
+        raise RuntimeError('The request failed.')
+    status_code = 500 if scope['path'] == '/error' else 200
+    await Response(status_code=status_code)(scope, receive, send)
+
+
+async def call(path: str, body: bytes = b'') -> None:
+    """Make a request to the app through the Sentry middleware."""
+    async def receive() -> dict[str, Any]:  # noqa: WPS430
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message: dict[str, Any]) -> None:  # noqa: WPS430
+        return None
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': [], 'query_string': b''}
+    await SentryAsgiMiddleware(RequestBodyRecorderMiddleware(app))(scope, receive, send)
+
+
+@pytest.mark.fast
+class TestTracesSampler(object):
+    """Unit tests of the `TracesSampler` class."""
+
+    @pytest.mark.parametrize(
+        'sampling_context,expected', [
+            pytest.param({'asgi_scope': {'path': '/static/favicon.png'}}, False, id='disabled_route'),
+            pytest.param({'asgi_scope': {'path': '/api/v1/tasks/1'}}, 0.5, id='route_rate'),
+            pytest.param({'asgi_scope': {'path': '/api/v1/admin/app-config'}}, 1.0, id='default_rate'),
+            pytest.param({'asgi_scope': {'path': '/static'}, 'parent_sampled': True}, True, id='parent_sampled'),
+        ],
+    )
+    def test_head_decision(self, monkeypatch: pytest.MonkeyPatch, sampling_context: Any, expected: Any) -> None:
+        """Test the decision when a transaction starts.
+
+        GIVEN: a sampler with the rules by the path prefix;
+
+        WHEN: the sampler is called for a request;
+
+        THEN: the upstream decision is kept, otherwise the rate of the longest matching prefix is used.
+
+        Args:
+            monkeypatch: the pytest fixture.
+            sampling_context: the Sentry sampling context.
+            expected: the expected decision, or the probability of a positive one.
+        """
+        random_value = 0.4999
+        monkeypatch.setattr('src.boilerplate.sentry.random.random', lambda: random_value)
+
+        decision = get_sampler()(sampling_context)
+
+        assert decision is (expected if isinstance(expected, bool) else random_value < expected)
+
+    def test_budget_caps_sampled_transactions(self) -> None:
+        """Test the per-second budget.
+
+        GIVEN: a sampler with the rate of 1.0 and the budget of 2 transactions per second;
+
+        WHEN: 10 transactions start at once;
+
+        THEN: only 2 of them are sampled.
+        """
+        sampler = get_sampler(max_per_second=2)
+
+        decisions = [sampler({'asgi_scope': {'path': '/api'}}) for _ in range(10)]
+
+        assert decisions.count(True) == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_and_slow_requests_are_kept(self, transport: MemoryTransport) -> None:
+        """Test the decision when a transaction finishes.
+
+        GIVEN: a sampler with a negligible rate that keeps errors and slow requests;
+
+        WHEN: a fast, a failed and a slow request pass through the Sentry middleware;
+
+        THEN: only the transactions of the failed and the slow requests are sent.
+        """
+        sampler = get_sampler(default_sample_rate=1e-9, keep_errors_and_slow=True)
+        sentry_sdk.init(transport=transport, traces_sampler=sampler, default_integrations=False)
+        sentry_sdk.scope.add_global_event_processor(sampler.process_event)
+
+        for path in ('/fast', '/error', '/slow'):
+            await call(path)
+
+        assert [event['request']['url'] for event in transport.transactions] == ['/error', '/slow']
+
+
+@pytest.mark.fast
+class TestBackgroundEventsClient(object):
+    """Unit tests of the `BackgroundEventsClient` class."""
+
+    @pytest.mark.asyncio
+    async def test_error_event_gets_lazy_body(self, transport: MemoryTransport) -> None:
+        """Test the error event of a failed request.
+
+        GIVEN: the client building the events in the background with the lazy request bodies;
+
+        WHEN: a request with a JSON body fails;
+
+        THEN: the event is built in another thread and has the parsed body.
+        """
+        before_send_thread_ids = []
+
+        def before_send(event: dict[str, Any], hint: dict[str, Any]) -> dict[str, Any]:  # noqa: WPS430
+            before_send_thread_ids.append(threading.get_ident())
+            return attach_request_body(event, hint)
+
+        client = BackgroundEventsClient(
+            transport=transport,
+            request_bodies='never',
+            before_send=before_send,
+            default_integrations=False,
+        )
+        sentry_sdk.Hub.current.bind_client(client)
+
+        with pytest.raises(RuntimeError):
+            await call('/fail', body=b'{"task_id": 1}')
+        client.flush(timeout=5)
+
+        assert before_send_thread_ids[0] != threading.get_ident()
+        assert transport.events[0]['request']['data'] == {'task_id': 1}
+
+
+@pytest.mark.fast
+class TestRequestBodyRecorderMiddleware(object):
+    """Unit tests of the `RequestBodyRecorderMiddleware` class."""
+
+    @pytest.mark.asyncio
+    async def test_recording_stops_over_limit(self) -> None:
+        """Test the memory bound of the recorded body.
+
+        GIVEN: a request body of three 4-byte chunks and a limit of 6 bytes;
+
+        WHEN: the application receives the chunks through the middleware;
+
+        THEN: the first chunk is recorded, and the recorded chunks are released as soon as the
+        body exceeds the limit.
+        """
+        body_chunks = [b'[1, ', b'2, 3', b'4, 5]']
+        recorded_chunk_counts = []
+
+        async def receive_chunk() -> dict[str, Any]:  # noqa: WPS430
+            body_chunk = body_chunks.pop(0)
+            return {'type': 'http.request', 'body': body_chunk, 'more_body': bool(body_chunks)}
+
+        async def receive_body(scope: Scope, receive: Receive, send: Send) -> None:  # noqa: WPS430
+            for _ in range(3):
+                await receive()
+                recorded_chunk_counts.append(len(_request_body_chunks.get() or []))
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/tasks', 'headers': [], 'query_string': b''}
+        await RequestBodyRecorderMiddleware(receive_body, max_body_size=6)(scope, receive_chunk, None)
+
+        assert recorded_chunk_counts == [1, 0, 0]
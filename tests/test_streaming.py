@@ -0,0 +1,186 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the functions of the `streaming.py` module."""
+
+import asyncio
+from typing import Any, AsyncIterator, Iterable, Union
+
+import orjson
+import pytest
+
+from src.boilerplate.schemas.common_schemas import ErrorSchema, TaskIdMan
+from src.boilerplate.streaming import iter_ndjson_lines, stream_ndjson, stream_ndjson_batches
+
+
+class ChunkSource(object):
+    """Async iterator over byte chunks that counts the chunks read from it."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self.read_chunks = 0
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+        self.read_chunks += 1
+        return chunk
+
+
+async def echo_task_id(task_id_line: TaskIdMan) -> dict[str, Any]:
+    """Process a line by returning its `task_id`."""
+    return {'task_id': task_id_line.task_id}
+
+
+class BatchRecorder(object):
+    """Batch processing stub that records the batches; task 4 fails, task 5 breaks the storage."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[int]] = []
+
+    async def __call__(self, task_id_lines: list[TaskIdMan]) -> list[Union[dict[str, Any], ErrorSchema]]:
+        task_ids = [task_id_line.task_id for task_id_line in task_id_lines]
+        if 5 in task_ids:
+            raise ConnectionError('Database is not reachable.')
+        self.batches.append(task_ids)
+        return [
+            ErrorSchema(error_name='LookupError') if task_id == 4 else {'task_id': task_id}
+            for task_id in task_ids
+        ]
+
+
+async def collect_result_lines(result_chunks: AsyncIterator[bytes]) -> list[dict[str, Any]]:
+    """Parse all result lines of the stream."""
+    result_body = b''.join([result_chunk async for result_chunk in result_chunks])
+    return [orjson.loads(result_line) for result_line in result_body.splitlines()]
+
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+class TestStreaming(object):
+    """Unit tests of the functions of the `streaming.py` module."""
+
+    async def test_lines_are_split_across_chunks(self) -> None:
+        """Test the splitting of a stream into lines.
+
+        GIVEN: chunks that cut lines in the middle, a blank line and no trailing newline;
+
+        WHEN: the chunks are passed to the `iter_ndjson_lines` function;
+
+        THEN: the complete non-blank lines are yielded in order.
+        """
+        byte_chunks = ChunkSource([b'{"a": 1}\n{"a"', b': 2}\n\n', b'{"a": 3}'])
+
+        line_groups = [lines async for lines in iter_ndjson_lines(byte_chunks, max_line_size=1024)]
+
+        assert line_groups == [[b'{"a": 1}'], [b'{"a": 2}'], [b'{"a": 3}']]
+
+    async def test_each_line_gets_result_in_order(self) -> None:
+        """Test the results of valid and invalid lines.
+
+        GIVEN: an NDJSON stream with valid lines and a line with an invalid `task_id`;
+
+        WHEN: the stream is processed with the `stream_ndjson` function;
+
+        THEN: each line gets its result line in the input order, the invalid one gets an error.
+        """
+        byte_chunks = ChunkSource([b'{"task_id": 1}\n{"task_id": -1}\n', b'{"task_id": "3"}\n'])
+
+        result_lines = await collect_result_lines(
+            stream_ndjson(byte_chunks, schema=TaskIdMan, process=echo_task_id),
+        )
+
+        assert [result_line['line_number'] for result_line in result_lines] == [1, 2, 3]
+        assert [result_line['is_error'] for result_line in result_lines] == [False, True, False]
+        assert result_lines[0]['task_id'] == 1
+        assert result_lines[1]['error_name'] == 'ValidationError'
+        assert result_lines[1]['error_message']['errors'][0]['loc'] == ['task_id']
+        assert result_lines[2]['task_id'] == 3
+
+    async def test_too_long_line_ends_stream(self) -> None:
+        """Test the limit of the line size.
+
+        GIVEN: a line longer than `max_line_size` after a valid line;
+
+        WHEN: the stream is processed with the `stream_ndjson` function;
+
+        THEN: the valid line is processed and the stream ends with an error line.
+        """
+        byte_chunks = ChunkSource([b'{"task_id": 1}\n', b' ' * 100, b'{"task_id": 2}\n'])
+
+        result_lines = await collect_result_lines(
+            stream_ndjson(byte_chunks, schema=TaskIdMan, process=echo_task_id, max_line_size=50),
+        )
+
+        assert len(result_lines) == 2
+        assert result_lines[1]['line_number'] == 2
+        assert result_lines[1]['error_name'] == 'NDJSONLineTooLongError'
+
+    async def test_reading_waits_for_processing(self) -> None:
+        """Test the backpressure between reading and processing.
+
+        GIVEN: a stream of 100 chunks and at most 2 pending chunks;
+
+        WHEN: only the first result chunk is taken from the `stream_ndjson` generator;
+
+        THEN: the body is read only a few chunks ahead of the processing.
+        """
+        byte_chunks = ChunkSource([b'{"task_id": 1}\n'] * 100)
+        result_chunks = stream_ndjson(byte_chunks, schema=TaskIdMan, process=echo_task_id, max_pending_chunks=2)
+
+        await result_chunks.__anext__()
+        await asyncio.sleep(0.05)
+
+        # 1 processed, 2 queued, 1 waiting for a free slot in the queue.
+        assert byte_chunks.read_chunks <= 4
+        await result_chunks.aclose()
+
+    async def test_batch_results_are_written_after_processing(self) -> None:
+        """Test the batch processing of the valid lines of each chunk.
+
+        GIVEN: a chunk with four valid lines and an invalid one, a chunk whose processing
+        fails, and at most 2 lines per batch;
+
+        WHEN: the stream is processed with the `stream_ndjson_batches` function;
+
+        THEN: the valid lines of the first chunk are processed in two batches and all its
+        lines get results, the error of a processed item is an error line, and the stream
+        ends without the results of the failed chunk.
+        """
+        byte_chunks = ChunkSource([
+            b'{"task_id": 1}\n{"task_id": -1}\n{"task_id": 2}\n{"task_id": 3}\n{"task_id": 4}\n',
+            b'{"task_id": 5}\n',
+        ])
+        process_batch = BatchRecorder()
+        result_chunks = stream_ndjson_batches(
+            byte_chunks,
+            schema=TaskIdMan,
+            process_batch=process_batch,
+            max_batch_size=2,
+        )
+
+        first_result_chunk = await result_chunks.__anext__()
+        first_result_lines = [orjson.loads(result_line) for result_line in first_result_chunk.splitlines()]
+        with pytest.raises(ConnectionError):
+            await result_chunks.__anext__()
+
+        assert process_batch.batches == [[1, 2], [3, 4]]
+        assert [result_line['line_number'] for result_line in first_result_lines] == [1, 2, 3, 4, 5]
+        assert [result_line['is_error'] for result_line in first_result_lines] == [False, True, False, False, True]
+        assert first_result_lines[4]['error_name'] == 'LookupError'
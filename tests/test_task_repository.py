@@ -0,0 +1,139 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""Integration tests of the `db/task_repository.py` module.
+
+The tests apply the Alembic migrations to the local PostgreSQL configured with the `DB_*`
+settings. The tests are skipped if the database is not reachable.
+
+Usage: `pytest -m db_dependent`.
+"""
+
+import random
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import httpx
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from src.boilerplate.app import app
+from src.boilerplate.db.pool import close_pool, get_dsn
+from src.boilerplate.db.task_repository import create_tasks
+from src.boilerplate.dependencies import is_request_has_correct_http_bearer_token
+from src.boilerplate.schemas.common_schemas import MetadataMan, TaskStateSchema, TaskStatus
+
+_ALEMBIC_INI_PATH = Path(__file__).resolve().parents[1].joinpath('alembic.ini')
+
+
+async def skip_bearer_token_check() -> None:
+    """Replace the bearer token check."""
+
+
+async def post_batch_item(client: httpx.AsyncClient, task_id: int, idempotency_key: str) -> dict[str, Any]:
+    """Post a batch of one item to the task batch endpoint and get the result of the item."""
+    response = await client.post(
+        '/api/v1/tasks/batch',
+        headers={'Accept': 'application/json'},
+        json={'items': [{'idempotency_key': idempotency_key, 'task_id': task_id}]},
+    )
+    assert response.status_code == 200
+    return response.json()['items'][0]
+
+
+@pytest.fixture(scope='module')
+def migrated_database() -> None:
+    """Apply the migrations, or skip the tests if the database is not reachable."""
+    engine = sa.create_engine(get_dsn(), poolclass=sa.pool.NullPool)
+    try:
+        engine.connect().close()
+    except sa.exc.OperationalError:
+        pytest.skip('PostgreSQL is not reachable.')
+    finally:
+        engine.dispose()
+    command.upgrade(AlembicConfig(str(_ALEMBIC_INI_PATH)), 'head')
+
+
+@pytest_asyncio.fixture()
+async def db_pool(migrated_database: None) -> AsyncIterator[None]:
+    """Close the application-wide pool, which is bound to the event loop of the test."""
+    yield
+    await close_pool()
+
+
+@pytest.mark.db_dependent
+@pytest.mark.integration
+@pytest.mark.asyncio
+class TestTaskRepository(object):
+    """Integration tests of the `db/task_repository.py` module."""
+
+    async def test_create_tasks_is_idempotent(self, db_pool: None) -> None:
+        """Test the redelivery of a batch of tasks.
+
+        GIVEN: a batch of tasks created with `create_tasks`;
+
+        WHEN: the same batch is created again, together with a new task and a task that
+        reuses a `task_id` with another idempotency key;
+
+        THEN: the existing tasks are returned, the new task is created and the reused
+        `task_id` is rejected.
+        """
+        first_task_id = random.randint(1, 2 ** 62)
+        metadata_batch = [
+            MetadataMan(task_id=first_task_id + task_idx, idempotency_key=uuid.uuid4()) for task_idx in range(3)
+        ]
+        new_metadata = MetadataMan(task_id=first_task_id + 3, idempotency_key=uuid.uuid4())
+        conflicting_metadata = MetadataMan(task_id=first_task_id, idempotency_key=uuid.uuid4())
+
+        created_states = await create_tasks(metadata_batch)
+        redelivered_states = await create_tasks([*metadata_batch, new_metadata, conflicting_metadata])
+
+        expected_states = [
+            TaskStateSchema(task_id=metadata.task_id, status=TaskStatus.pending)
+            for metadata in (*metadata_batch, new_metadata)
+        ]
+        assert created_states == expected_states[:3]
+        assert redelivered_states == [*expected_states, None]
+
+    async def test_batch_endpoint_rejects_reused_task_id(self, db_pool: None) -> None:
+        """Test an item of the task batch endpoint that reuses a `task_id` with a new idempotency key.
+
+        GIVEN: a task created with the task batch endpoint;
+
+        WHEN: an item with the same `task_id` and a new idempotency key is posted, then the new
+        key is posted again with another `task_id`;
+
+        THEN: the first item fails with `TaskConflictError` instead of an internal error, and
+        the new key is not taken by it, so the second item creates a task.
+        """
+        task_id = random.randint(1, 2 ** 62)
+        new_idempotency_key = str(uuid.uuid4())
+        app.dependency_overrides[is_request_has_correct_http_bearer_token] = skip_bearer_token_check
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+                await post_batch_item(client, task_id=task_id, idempotency_key=str(uuid.uuid4()))
+                conflict_result = await post_batch_item(client, task_id=task_id, idempotency_key=new_idempotency_key)
+                retry_result = await post_batch_item(client, task_id=task_id + 1, idempotency_key=new_idempotency_key)
+        finally:
+            app.dependency_overrides.clear()
+
+        assert conflict_result['is_error']
+        assert conflict_result['error']['error_name'] == 'TaskConflictError'
+        assert not retry_result['is_error']
+        assert retry_result['task_id'] == task_id + 1
@@ -0,0 +1,77 @@
+#  Copyright (c) 2022. Viacheslav Kolupaev, https://vkolupaev.com/
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Unit tests of the `validation_registry.py` module."""
+
+import pytest
+from pydantic import ValidationError
+
+from src.boilerplate.schemas.common_schemas import MetadataMan
+from src.boilerplate.validation_registry import get_type_adapter, validate_json
+
+
+@pytest.mark.fast
+class TestValidationRegistry(object):
+    """Unit tests of the `validation_registry.py` module."""
+
+    def test_type_adapter_is_built_once(self) -> None:
+        """Test the caching of type adapters.
+
+        GIVEN: a generic alias schema;
+
+        WHEN: the adapter is requested twice with equal aliases;
+
+        THEN: the same adapter instance is returned.
+        """
+        assert get_type_adapter(list[MetadataMan]) is get_type_adapter(list[MetadataMan])
+
+    def test_validate_json_batch(self) -> None:
+        """Test the parsing of a raw JSON batch.
+
+        GIVEN: raw JSON bytes with a list of two items;
+
+        WHEN: the bytes are validated against `list[MetadataMan]`;
+
+        THEN: two models with the coerced values are returned.
+        """
+        raw_json = (
+            b'[{"idempotency_key": "6f1c1d3e-9f7a-4c5b-8d0e-2a4b6c8d0e1f", "task_id": "1",'
+            b' "callback_url": "http://127.0.0.1/cb"},'
+            b' {"idempotency_key": "0b7e2f4a-3c5d-4e6f-8a9b-1c2d3e4f5a6b", "task_id": 2,'
+            b' "callback_url": "http://127.0.0.1/cb"}]'
+        )
+
+        batch = validate_json(list[MetadataMan], raw_json)
+
+        assert [metadata.task_id for metadata in batch] == [1, 2]
+        assert all(isinstance(metadata, MetadataMan) for metadata in batch)
+
+    @pytest.mark.parametrize(
+        'raw_json',
+        [
+            pytest.param(b'{"idempotency_key": "k-1",', id='malformed_json'),
+            pytest.param(b'{"idempotency_key": "k-1", "task_id": "x"}', id='invalid_data'),
+        ],
+    )
+    def test_validate_json_raises_validation_error(self, raw_json: bytes) -> None:
+        """Test the error on bad input.
+
+        GIVEN: malformed JSON or JSON with invalid data;
+
+        WHEN: it is validated against `MetadataMan`;
+
+        THEN: `ValidationError` is raised.
+        """
+        with pytest.raises(ValidationError):
+            validate_json(MetadataMan, raw_json)